@@ -0,0 +1,897 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import reduce
+from typing import Any
+
+import numpy as np
+
+from datemath import parse_interval, parse_offset, tz_offsets
+from dsl_models import MAX_BUCKETS, Aggregation, resolve_bound
+from localaggs import (
+    _check_terms_order,
+    _group_rows,
+    _include_filter,
+    _iso,
+    _metric_values,
+    _new_sketch,
+    _percentiles_response,
+    _present_rows,
+    _range_key,
+    _terms_key_fields,
+    _terms_keys,
+    _terms_missing_key,
+)
+from localexec import Column, ExecContext, LogBatch, compile_query
+from sketches import Sketch
+
+
+# -----------------------------------------------------------------------------
+# HyperLogLog++ (cardinality)
+# -----------------------------------------------------------------------------
+
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_PRECISION_THRESHOLD = 3000  # ES default: exact below this many distinct values
+MIN_HLL_PRECISION, MAX_HLL_PRECISION = 4, 18
+_U64 = np.uint64
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        z = x + _U64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> _U64(30))) * _U64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> _U64(27))) * _U64(0x94D049BB133111EB)
+        return z ^ (z >> _U64(31))
+
+
+def _hash_text(values: list[Any]) -> np.ndarray:
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(str(v).encode("utf-8"), digest_size=8).digest(), "little")
+         for v in values],
+        dtype=np.uint64,
+    )
+
+
+def hash_column(col: Column, rows: np.ndarray) -> np.ndarray:
+    """64-bit hashes of the present values of `col` at `rows` (keyword vocab hashed once per value)."""
+    rows = _present_rows(col, rows)
+    if col.kind == "keyword":
+        used, inverse = np.unique(col.values[rows], return_inverse=True)
+        return _hash_text([col.vocab[i] for i in used])[inverse]
+    if col.kind == "number":
+        bits = (col.values[rows].astype(np.float64) + 0.0).view(np.uint64)  # -0.0 -> 0.0
+    else:
+        bits = col.values[rows].astype(np.int64).view(np.uint64)
+    return _splitmix64(bits)
+
+
+def _leading_zeros(w: np.ndarray) -> np.ndarray:
+    lz = np.zeros(len(w), dtype=np.int64)
+    w = w.copy()
+    for s in (32, 16, 8, 4, 2, 1):
+        empty = (w >> _U64(64 - s)) == 0
+        lz[empty] += s
+        w[empty] <<= _U64(s)
+    lz[(w >> _U64(63)) == 0] += 1
+    return lz
+
+
+class HyperLogLog:
+    """
+    HyperLogLog++ sketch: exact set of hashes up to `threshold` distinct
+    values, then 2**p dense registers. Merges are register-wise max.
+
+    Notes:
+      - 64-bit hashes, so no large-range correction is needed.
+      - Dense estimates use Ertl's improved estimator (arXiv:1702.01284),
+        which is unbiased across the whole range without HLL++'s empirical
+        bias tables or a linear-counting switch-over.
+    """
+    __slots__ = ("p", "threshold", "_hashes", "_registers")
+
+    def __init__(self, p: int = DEFAULT_HLL_PRECISION, threshold: int = DEFAULT_PRECISION_THRESHOLD) -> None:
+        if not MIN_HLL_PRECISION <= p <= MAX_HLL_PRECISION:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.p = p
+        self.threshold = threshold
+        self._hashes: np.ndarray | None = np.empty(0, dtype=np.uint64)
+        self._registers: np.ndarray | None = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self._hashes is not None
+
+    def add_hashes(self, hashes: np.ndarray) -> HyperLogLog:
+        if self._hashes is not None:
+            self._hashes = np.union1d(self._hashes, hashes)
+            if len(self._hashes) > self.threshold:
+                self._densify()
+            return self
+        p = _U64(self.p)
+        idx = (hashes >> (_U64(64) - p)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self._registers, idx, rank)
+        return self
+
+    def _densify(self) -> None:
+        hashes, self._hashes = self._hashes, None
+        self._registers = np.zeros(1 << self.p, dtype=np.uint8)
+        self.add_hashes(hashes)
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        if other._hashes is not None:
+            return self.add_hashes(other._hashes)
+        if self._hashes is not None:
+            self._densify()
+        np.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def estimate(self) -> float:
+        if self._hashes is not None:
+            return float(len(self._hashes))
+        m = float(1 << self.p)
+        q = 64 - self.p
+        hist = np.bincount(self._registers, minlength=q + 2).astype(np.float64)
+        z = m * _tau(1.0 - hist[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + hist[k])
+        z += m * _sigma(hist[0] / m)
+        return m * m / (2.0 * math.log(2.0) * z)
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        prev, z = z, z + x * y
+        y += y
+        if z == prev:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        prev = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == prev:
+            return z / 3.0
+
+
+# -----------------------------------------------------------------------------
+# States
+# -----------------------------------------------------------------------------
+
+class AggState(ABC):
+    """
+    Mergeable partial result of one `Aggregation` node.
+
+    `a.merge(b)` folds `b` into `a` in place (and returns `a`); `b` must not be
+    used afterwards. `to_response(spec)` renders the ES response object.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def merge(self, other: AggState) -> AggState:
+        """Fold `other` (same node kind) into this state and return it."""
+
+    @abstractmethod
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        """The ES response object of `spec` for this state."""
+
+
+_METRICS = ("avg", "sum", "min", "max", "stats")
+
+
+@dataclass(slots=True)
+class StatsState(AggState):
+    """count / sum / min / max / sum of squares; backs avg, sum, min, max and stats."""
+    count: int = 0
+    sum: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    sum_sq: float | None = 0.0  # None when built from responses that do not carry it
+    is_date: bool = False
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, is_date: bool = False) -> StatsState:
+        n = len(values)
+        return cls(
+            count=n,
+            sum=float(values.sum()),
+            min=float(values.min()) if n else math.inf,
+            max=float(values.max()) if n else -math.inf,
+            sum_sq=float(np.dot(values, values)),
+            is_date=is_date,
+        )
+
+    def merge(self, other: StatsState) -> StatsState:
+        self.count += other.count
+        self.sum = math.fsum((self.sum, other.sum))
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum_sq = None if self.sum_sq is None or other.sum_sq is None else self.sum_sq + other.sum_sq
+        self.is_date = self.is_date or other.is_date
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        n = self.count
+        lo = self.min if self.min != math.inf else None
+        hi = self.max if self.max != -math.inf else None
+        avg = self.sum / n if n else None
+        if spec.sum is not None:
+            return {"value": self.sum}
+        for kind, v in (("avg", avg), ("min", lo), ("max", hi)):
+            if getattr(spec, kind) is not None:
+                out: dict[str, Any] = {"value": v}
+                if self.is_date and v is not None:
+                    out["value_as_string"] = _iso(v)
+                return out
+        out = {"count": n, "min": lo, "max": hi, "avg": avg, "sum": self.sum}
+        if self.is_date and n:
+            out.update(min_as_string=_iso(lo), max_as_string=_iso(hi), avg_as_string=_iso(avg))
+        return out
+
+
+@dataclass(slots=True)
+class CardinalityState(AggState):
+    """HLL++ sketch; `floor` keeps known lower bounds from opaque (response-only) partials."""
+    hll: HyperLogLog | None = None
+    floor: int = 0
+
+    def merge(self, other: CardinalityState) -> CardinalityState:
+        if self.hll is None:
+            self.hll = other.hll
+        elif other.hll is not None:
+            self.hll.merge(other.hll)
+        self.floor = max(self.floor, other.floor)
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        est = self.hll.estimate() if self.hll is not None else 0.0
+        return {"value": int(round(max(est, self.floor)))}
+
+
+@dataclass(slots=True)
+class PercentilesState(AggState):
+    """t-digest or HDR sketch (as configured on the node); backs percentiles and percentile_ranks."""
+    sketch: Sketch
+
+    def merge(self, other: PercentilesState) -> PercentilesState:
+        self.sketch.merge(other.sketch)
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        return _percentiles_response(_percentiles_spec(spec), self.sketch)
+
+
+def _percentiles_spec(spec: Aggregation) -> Any:
+    return spec.percentiles if spec.percentiles is not None else spec.percentile_ranks
+
+
+@dataclass(slots=True)
+class BucketState:
+    doc_count: int
+    sub: dict[str, AggState] = field(default_factory=dict)
+    extra: dict[str, Any] = field(default_factory=dict)  # key / key_as_string / from / to ...
+    error: int = 0  # terms: upper bound on docs missed by partials that did not return this key
+
+    def merge(self, other: BucketState) -> BucketState:
+        self.doc_count += other.doc_count
+        self.error += other.error
+        for name, state in other.sub.items():
+            mine = self.sub.get(name)
+            self.sub[name] = state if mine is None else mine.merge(state)
+        return self
+
+    def render(self, spec: Aggregation, now_ms: float | None) -> dict[str, Any]:
+        out = {**self.extra, "doc_count": self.doc_count}
+        for name, sub_spec in (spec.aggs or {}).items():
+            state = self.sub.get(name) or empty_state(sub_spec)
+            out[name] = state.to_response(sub_spec, now_ms)
+        return out
+
+
+def _sort_value(bucket: BucketState, key: str, spec: Aggregation) -> Any:
+    if key == "_count":
+        return bucket.doc_count
+    if key == "_key":
+        return bucket.extra["key"]
+    name, _, prop = key.partition(".")
+    sub_spec = (spec.aggs or {})[name]
+    state = bucket.sub.get(name) or empty_state(sub_spec)
+    v = state.to_response(sub_spec).get(prop or "value")
+    return float("-inf") if v is None else v
+
+
+@dataclass(slots=True)
+class TermsState(AggState):
+    """
+    Top-k candidates with `shard_size`-style error bounds.
+
+    `error` bounds the count any key NOT in `buckets` may have in the merged
+    partials; merging adds it to every key the other side did not return.
+    """
+    buckets: dict[Any, BucketState] = field(default_factory=dict)
+    other_doc_count: int = 0
+    error: int = 0
+
+    def trim(self, size: int) -> TermsState:
+        """Keep the `size` largest buckets, as one shard returning `shard_size` terms would."""
+        if len(self.buckets) <= size:
+            return self
+        ranked = sorted(self.buckets.items(), key=lambda kv: (-kv[1].doc_count, kv[0]))
+        kept, dropped = ranked[:size], ranked[size:]
+        self.buckets = dict(kept)
+        self.other_doc_count += sum(b.doc_count for _, b in dropped)
+        self.error += kept[-1][1].doc_count if kept else 0
+        return self
+
+    def merge(self, other: TermsState) -> TermsState:
+        for key, bucket in self.buckets.items():
+            if key not in other.buckets:
+                bucket.error += other.error
+        for key, bucket in other.buckets.items():
+            mine = self.buckets.get(key)
+            if mine is None:
+                bucket.error += self.error
+                self.buckets[key] = bucket
+            else:
+                mine.merge(bucket)
+        self.other_doc_count += other.other_doc_count
+        self.error += other.error
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        agg = spec.terms
+        size = 10 if agg.size is None else agg.size
+        min_doc_count = 1 if agg.min_doc_count is None else agg.min_doc_count
+        order = agg.order or {"_count": "desc"}
+        ranked = [b for b in self.buckets.values() if b.doc_count >= min_doc_count]
+        # Stable multi-key sort: criteria applied last to first; ties fall back to key asc.
+        ranked.sort(key=lambda b: b.extra["key"])
+        for key, direction in reversed(list(order.items())):
+            ranked.sort(key=lambda b: _sort_value(b, key, spec), reverse=direction == "desc")
+        top = ranked[:size]
+        total = sum(b.doc_count for b in self.buckets.values()) + self.other_doc_count
+        buckets = []
+        for b in top:
+            out = b.render(spec, now_ms)
+            if agg.show_term_doc_count_error:
+                out["doc_count_error_upper_bound"] = b.error
+            buckets.append(out)
+        return {
+            "doc_count_error_upper_bound": self.error if order == {"_count": "desc"} else 0,
+            "sum_other_doc_count": total - sum(b.doc_count for b in top),
+            "buckets": buckets,
+        }
+
+
+@dataclass(slots=True)
+class HistogramState(AggState):
+    """`date_histogram` / `histogram` buckets by key; gaps are filled at render time."""
+    buckets: dict[Any, BucketState] = field(default_factory=dict)
+
+    def merge(self, other: HistogramState) -> HistogramState:
+        for key, bucket in other.buckets.items():
+            mine = self.buckets.get(key)
+            self.buckets[key] = bucket if mine is None else mine.merge(bucket)
+        return self
+
+    def _keys(self, spec: Aggregation, now_ms: float | None) -> list[Any]:
+        keys = sorted(self.buckets)
+        dh, h = spec.date_histogram, spec.histogram
+        agg = dh or h
+        if (agg.min_doc_count or 0) != 0 or not (keys or agg.extended_bounds):
+            return keys
+        ext = agg.extended_bounds or {}
+        if dh is not None:
+            now_ms = ExecContext().now_ms if now_ms is None else now_ms
+            bounds = [*keys[:1], *keys[-1:]]
+            e_lo = resolve_bound(ext.get("min"), now_ms, dh.time_zone)
+            e_hi = resolve_bound(ext.get("max"), now_ms, dh.time_zone, round_up=True)
+            lo = min([b for b in (bounds[0] if bounds else None, e_lo) if b is not None])
+            hi = max([b for b in (bounds[-1] if bounds else None, e_hi) if b is not None])
+            interval = parse_interval(dh.fixed_interval, calendar=False) if dh.fixed_interval \
+                else parse_interval(dh.calendar_interval or "", calendar=True)
+            return interval.boundaries(int(lo), int(hi), dh.time_zone, parse_offset(dh.offset)).tolist()
+        offset = h.offset or 0.0
+        slots = [int(round((k - offset) / h.interval)) for k in keys]
+        for bound in ("min", "max"):
+            if ext.get(bound) is not None:
+                slots.append(int(np.floor((ext[bound] - offset) / h.interval)))
+        return [float(s * h.interval + offset) for s in range(min(slots), max(slots) + 1)]
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        dh = spec.date_histogram
+        agg = dh or spec.histogram
+        min_doc_count = agg.min_doc_count or 0
+        keys = self._keys(spec, now_ms)
+        offsets = tz_offsets(np.asarray(keys, dtype=np.int64), dh.time_zone).tolist() if dh else None
+        buckets = []
+        for i, key in enumerate(keys):
+            state = self.buckets.get(key) or BucketState(0)
+            if state.doc_count < min_doc_count:
+                continue
+            if dh is not None:
+                state.extra = {"key_as_string": _iso(key, offsets[i]), "key": int(key)}
+            else:
+                state.extra = {"key": float(key)}
+            buckets.append(state.render(spec, now_ms))
+        order = getattr(agg, "order", None)
+        if order and order.get("_count"):
+            buckets.sort(key=lambda b: b["doc_count"], reverse=order["_count"] == "desc")
+        elif order and order.get("_key") == "desc":
+            buckets.reverse()
+        return {"buckets": buckets}
+
+
+@dataclass(slots=True)
+class RangeState(AggState):
+    """`range` buckets, positionally aligned with `spec.range.ranges`."""
+    buckets: list[BucketState] = field(default_factory=list)
+
+    def merge(self, other: RangeState) -> RangeState:
+        if not self.buckets:
+            self.buckets = other.buckets
+        elif other.buckets:
+            for mine, theirs in zip(self.buckets, other.buckets):
+                mine.merge(theirs)
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        buckets = self.buckets or [BucketState(0, extra=_range_extra(r, now_ms, False)) for r in spec.range.ranges]
+        return {"buckets": [b.render(spec, now_ms) for b in buckets]}
+
+
+@dataclass(slots=True)
+class FiltersState(AggState):
+    buckets: dict[str, BucketState] = field(default_factory=dict)
+
+    def merge(self, other: FiltersState) -> FiltersState:
+        for name, bucket in other.buckets.items():
+            mine = self.buckets.get(name)
+            self.buckets[name] = bucket if mine is None else mine.merge(bucket)
+        return self
+
+    def to_response(self, spec: Aggregation, now_ms: float | None = None) -> dict[str, Any]:
+        return {
+            "buckets": {
+                name: (self.buckets.get(name) or BucketState(0)).render(spec, now_ms)
+                for name in spec.filters.filters
+            }
+        }
+
+
+_COMPOSITE_UNMERGEABLE = (
+    "composite pages cannot be merged as partials; page through them with "
+    "composite.iter_composite_pages instead."
+)
+_SAMPLER_UNMERGEABLE = (
+    "sampler partials cannot be merged (each partial samples on its own); "
+    "run a sampled aggregation as one request instead."
+)
+
+
+def empty_state(spec: Aggregation) -> AggState:
+    """Identity element for `spec` (what an empty partial contributes)."""
+    if spec.composite is not None:
+        raise ValueError(_COMPOSITE_UNMERGEABLE)
+    if spec.is_sampler:
+        raise ValueError(_SAMPLER_UNMERGEABLE)
+    if spec.terms is not None:
+        return TermsState()
+    if spec.date_histogram is not None or spec.histogram is not None:
+        return HistogramState()
+    if spec.range is not None:
+        return RangeState()
+    if spec.filters is not None:
+        return FiltersState()
+    if spec.cardinality is not None:
+        return CardinalityState(_new_hll(spec.cardinality))
+    if _percentiles_spec(spec) is not None:
+        return PercentilesState(_new_sketch(_percentiles_spec(spec)))
+    if any(getattr(spec, k) is not None for k in _METRICS):
+        return StatsState()
+    raise ValueError("Aggregation node defines no aggregation type.")
+
+
+def _new_hll(card: dict[str, Any]) -> HyperLogLog:
+    return HyperLogLog(threshold=int(card.get("precision_threshold", DEFAULT_PRECISION_THRESHOLD)))
+
+
+# -----------------------------------------------------------------------------
+# Building states from a LogBatch (local engine)
+# -----------------------------------------------------------------------------
+
+def terms_shard_size(size: int | None, shard_size: int | None) -> int:
+    """Candidates one partial keeps for a `terms` of `size` (ES heuristic: 1.5 * size + 10)."""
+    return min(MAX_BUCKETS, shard_size or int((10 if size is None else size) * 1.5 + 10))
+
+
+def collect(
+    aggs: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, AggState]:
+    """
+    Partial states of an `aggs` tree over `rows` of `batch`.
+
+    Usage:
+      states = collect(req.aggs, batch, np.flatnonzero(mask), ExecContext())
+      merged = merge_states(states, other_states)
+      render(req.aggs, merged)   # ES `aggregations` object
+    """
+    return {name: _collect_node(node, batch, rows, ctx) for name, node in (aggs or {}).items()}
+
+
+def _collect_node(spec: Aggregation, batch: LogBatch, rows: np.ndarray, ctx: ExecContext) -> AggState:
+    if spec.composite is not None:
+        raise ValueError(_COMPOSITE_UNMERGEABLE)
+    if spec.is_sampler:
+        raise ValueError(_SAMPLER_UNMERGEABLE)
+    if spec.terms is not None:
+        return _collect_terms(spec, batch, rows, ctx)
+    if spec.date_histogram is not None or spec.histogram is not None:
+        return _collect_histogram(spec, batch, rows, ctx)
+    if spec.range is not None:
+        return _collect_range(spec, batch, rows, ctx)
+    if spec.filters is not None:
+        buckets = {}
+        for name, query in spec.filters.filters.items():
+            mask, _ = compile_query(query, ctx)(batch)
+            matched = rows[mask[rows]]
+            buckets[name] = BucketState(len(matched), collect(spec.aggs, batch, matched, ctx))
+        return FiltersState(buckets)
+    if spec.cardinality is not None:
+        state = CardinalityState(_new_hll(spec.cardinality))
+        col = batch.column(spec.cardinality.get("field", ""))
+        if col is not None:
+            state.hll.add_hashes(hash_column(col, rows))
+        return state
+    pct = _percentiles_spec(spec)
+    if pct is not None:
+        return PercentilesState(_new_sketch(pct).add(_metric_values(pct.field, batch, rows)))
+    for kind in _METRICS:
+        metric = getattr(spec, kind)
+        if metric is not None:
+            col = batch.column(metric["field"])
+            if col is None or col.kind not in ("number", "date", "bool"):
+                return StatsState()
+            values = col.values[_present_rows(col, rows)].astype(np.float64)
+            return StatsState.from_values(values, is_date=col.kind == "date")
+    raise ValueError("Aggregation node defines no aggregation type.")
+
+
+def _collect_terms(spec: Aggregation, batch: LogBatch, rows: np.ndarray, ctx: ExecContext) -> TermsState:
+    agg = spec.terms
+    if agg.script is not None:
+        raise ValueError("terms.script is not supported by the local aggregation engine.")
+    col = batch.column(agg.field)
+    _check_terms_order(agg, spec.aggs)
+    missing_key = None if agg.missing is None else _terms_missing_key(agg, col, ctx)
+    if col is None:
+        group, present, keys = np.empty(0, np.int64), np.empty(0, np.int64), []
+    else:
+        group, present, keys = _terms_keys(col, rows)
+    counts = np.bincount(group, minlength=len(keys))
+    if missing_key is not None:
+        missing_rows = rows if col is None else rows[~col.present[rows]]
+        if len(missing_rows):
+            g = keys.index(missing_key) if missing_key in keys else len(keys)
+            if g == len(keys):
+                keys = keys + [missing_key]
+                counts = np.append(counts, 0)
+            counts[g] += len(missing_rows)
+            group = np.append(group, np.full(len(missing_rows), g))
+            present = np.append(present, missing_rows)
+    keep = (counts >= 1) & _include_filter(agg.include, keys, True) & _include_filter(agg.exclude, keys, False)
+    candidates = np.flatnonzero(keep)
+    state = TermsState()
+    by_count = (agg.order or {"_count": "desc"}) == {"_count": "desc"}
+    limit = terms_shard_size(agg.size, agg.shard_size)
+    if by_count and len(candidates) > limit:
+        # Only the shard_size best keys need sub-states; the rest feed the error bound.
+        ranked = sorted(candidates.tolist(), key=lambda g: (-int(counts[g]), keys[g]))
+        candidates, dropped = np.array(ranked[:limit]), ranked[limit:]
+        state.other_doc_count = int(sum(int(counts[g]) for g in dropped))
+        state.error = int(counts[candidates[-1]])
+    groups = _group_rows(present, group, len(keys)) if spec.aggs else None
+    for g in candidates:
+        key = keys[g]
+        extra = _terms_key_fields(col, key) if col is not None else {"key": key}
+        sub = collect(spec.aggs, batch, groups[g], ctx) if groups is not None else {}
+        state.buckets[extra["key"]] = BucketState(int(counts[g]), sub, extra)
+    return state
+
+
+def _collect_histogram(spec: Aggregation, batch: LogBatch, rows: np.ndarray, ctx: ExecContext) -> HistogramState:
+    dh, h = spec.date_histogram, spec.histogram
+    agg = dh or h
+    col = batch.column(agg.field)
+    if col is None or col.kind not in (("date",) if dh else ("number", "date")):
+        return HistogramState()
+    rows = _present_rows(col, rows)
+    values = col.values[rows]
+    if agg.hard_bounds:
+        tz = dh.time_zone if dh else None
+        lo = resolve_bound(agg.hard_bounds.get("min"), ctx.now_ms, tz)
+        hi = resolve_bound(agg.hard_bounds.get("max"), ctx.now_ms, tz, round_up=dh is not None)
+        keep = np.ones(len(values), dtype=bool)
+        if lo is not None:
+            keep &= values >= lo
+        if hi is not None:
+            keep &= values <= hi
+        rows, values = rows[keep], values[keep]
+    if dh is not None:
+        interval = parse_interval(dh.fixed_interval, calendar=False) if dh.fixed_interval \
+            else parse_interval(dh.calendar_interval or "", calendar=True)
+        raw = interval.round_down(values, dh.time_zone, parse_offset(dh.offset))
+    else:
+        offset = h.offset or 0.0
+        raw = np.floor((values.astype(np.float64) - offset) / h.interval) * h.interval + offset
+    keys, group = np.unique(raw, return_inverse=True)
+    counts = np.bincount(group, minlength=len(keys))
+    groups = _group_rows(rows, group, len(keys)) if spec.aggs else None
+    state = HistogramState()
+    for i, key in enumerate(keys.tolist()):
+        sub = collect(spec.aggs, batch, groups[i], ctx) if groups is not None else {}
+        state.buckets[key] = BucketState(int(counts[i]), sub)
+    return state
+
+
+def _range_extra(r: Any, now_ms: float | None, is_date: bool) -> dict[str, Any]:
+    now_ms = ExecContext().now_ms if now_ms is None else now_ms
+    lo, hi = resolve_bound(r.from_, now_ms), resolve_bound(r.to, now_ms)
+    extra: dict[str, Any] = {"key": r.key or _range_key(r.from_, r.to)}
+    if lo is not None:
+        extra["from"] = float(lo)
+        if is_date:
+            extra["from_as_string"] = _iso(lo)
+    if hi is not None:
+        extra["to"] = float(hi)
+        if is_date:
+            extra["to_as_string"] = _iso(hi)
+    return extra
+
+
+def _collect_range(spec: Aggregation, batch: LogBatch, rows: np.ndarray, ctx: ExecContext) -> RangeState:
+    col = batch.column(spec.range.field)
+    numeric = col is not None and col.kind in ("number", "date")
+    if numeric:
+        rows = _present_rows(col, rows)
+        values = col.values[rows]
+    state = RangeState()
+    for r in spec.range.ranges:
+        extra = _range_extra(r, ctx.now_ms, numeric and col.kind == "date")
+        if numeric:
+            keep = np.ones(len(values), dtype=bool)
+            if "from" in extra:
+                keep &= values >= extra["from"]
+            if "to" in extra:
+                keep &= values < extra["to"]
+            in_range = rows[keep]
+        else:
+            in_range = np.empty(0, dtype=np.int64)
+        state.buckets.append(BucketState(len(in_range), collect(spec.aggs, batch, in_range, ctx), extra))
+    return state
+
+
+# -----------------------------------------------------------------------------
+# Building states from ES responses
+# -----------------------------------------------------------------------------
+
+_BUCKET_META = ("key", "key_as_string", "from", "to", "from_as_string", "to_as_string")
+
+
+def _bucket_from_response(spec: Aggregation, b: dict[str, Any]) -> BucketState:
+    return BucketState(
+        doc_count=b["doc_count"],
+        sub={
+            name: from_response(sub, b[name], percentiles_count(b, name))
+            for name, sub in (spec.aggs or {}).items() if name in b
+        },
+        extra={k: b[k] for k in _BUCKET_META if k in b},
+        error=b.get("doc_count_error_upper_bound", 0) or 0,
+    )
+
+
+def from_response(spec: Aggregation, resp: dict[str, Any], count: int | None = None) -> AggState:
+    """
+    State of one aggregation from an ES response object.
+
+    Partials for `avg` must carry `count`/`sum` (request them as `stats`);
+    `cardinality` responses have no sketch and only contribute a lower bound.
+    Percentiles partials are rebuilt from their values (see
+    `partial_percentiles`) and need the field's value `count`.
+    """
+    if spec.composite is not None:
+        raise ValueError(_COMPOSITE_UNMERGEABLE)
+    if spec.is_sampler:
+        raise ValueError(_SAMPLER_UNMERGEABLE)
+    if spec.terms is not None:
+        state = TermsState(
+            {b["key"]: _bucket_from_response(spec, b) for b in resp.get("buckets", [])},
+            other_doc_count=resp.get("sum_other_doc_count", 0),
+            error=resp.get("doc_count_error_upper_bound", 0) or 0,
+        )
+        by_count = (spec.terms.order or {"_count": "desc"}) == {"_count": "desc"}
+        if by_count and state.other_doc_count > 0 and state.buckets:
+            state.error += min(b.doc_count for b in state.buckets.values())
+        return state
+    if spec.date_histogram is not None or spec.histogram is not None:
+        return HistogramState({b["key"]: _bucket_from_response(spec, b) for b in resp.get("buckets", [])})
+    if spec.range is not None:
+        return RangeState([_bucket_from_response(spec, b) for b in resp.get("buckets", [])])
+    if spec.filters is not None:
+        return FiltersState({n: _bucket_from_response(spec, b) for n, b in resp.get("buckets", {}).items()})
+    if spec.cardinality is not None:
+        return CardinalityState(None, int(resp.get("value") or 0))
+    if _percentiles_spec(spec) is not None:
+        return _percentiles_from_response(spec, resp, count)
+    is_date = any(k.endswith("_as_string") for k in resp)
+    if "count" in resp:
+        n = resp["count"]
+        return StatsState(
+            count=n,
+            sum=resp.get("sum") or 0.0,
+            min=resp["min"] if resp.get("min") is not None else math.inf,
+            max=resp["max"] if resp.get("max") is not None else -math.inf,
+            sum_sq=resp.get("sum_of_squares"),
+            is_date=is_date,
+        )
+    value = resp.get("value")
+    if spec.sum is not None:
+        return StatsState(sum=value or 0.0, sum_sq=None)
+    if spec.min is not None or spec.max is not None:
+        if value is None:
+            return StatsState(sum_sq=None, is_date=is_date)
+        return StatsState(count=1, sum=value, min=value, max=value, sum_sq=None, is_date=is_date)
+    raise ValueError("avg partials need count and sum; request them as `stats`.")
+
+
+# -----------------------------------------------------------------------------
+# Percentiles partials
+# -----------------------------------------------------------------------------
+
+# Percents every partial reports (dense at the tails, where merging matters most).
+PARTIAL_PERCENTS = (
+    0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, *range(10, 91, 5),
+    92.5, 95.0, 97.0, 98.0, 99.0, 99.5, 99.9, 99.95, 99.99, 100.0,
+)
+PARTIAL_POINTS_PER_STEP = 16  # points a rebuilt sketch spreads between two reported percents
+PERCENTILES_COUNT_SUFFIX = "#count"  # sibling `stats` carrying a partial's value count
+
+
+def partial_percentiles(name: str, node: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """
+    Merge-friendly replacement for a dumped percentiles/percentile_ranks node:
+    a `percentiles` over PARTIAL_PERCENTS (plus any requested percents) and a
+    `{name}#count` stats sibling, keyed by agg name.
+
+    ES returns no sketch, so `from_response` rebuilds one from the reported
+    values: exact at every reported percent, interpolated in between.
+    """
+    kind = "percentiles" if "percentiles" in node else "percentile_ranks"
+    body = dict(node[kind])
+    percents = sorted({*PARTIAL_PERCENTS, *body.pop("percents", ())})
+    body.pop("values", None)
+    return {
+        name: {**{k: v for k, v in node.items() if k != kind}, "percentiles": {**body, "percents": percents, "keyed": False}},
+        f"{name}{PERCENTILES_COUNT_SUFFIX}": {"stats": {"field": body["field"]}},
+    }
+
+
+def percentiles_count(container: dict[str, Any], name: str) -> int | None:
+    """Value count reported next to a percentiles partial (None when absent)."""
+    return (container.get(f"{name}{PERCENTILES_COUNT_SUFFIX}") or {}).get("count")
+
+
+def _percentiles_from_response(spec: Aggregation, resp: dict[str, Any], count: int | None) -> PercentilesState:
+    sketch = _new_sketch(_percentiles_spec(spec))
+    values = resp.get("values") or {}
+    pairs = [(float(k), v) for k, v in values.items()] if isinstance(values, dict) else [
+        (float(e["key"]), e.get("value")) for e in values
+    ]
+    pairs = sorted((p, v) for p, v in pairs if v is not None)
+    if count is None or (pairs and (pairs[0][0] != 0 or pairs[-1][0] != 100)):
+        raise ValueError("percentiles partials need the value count and min/max; request them via partial_percentiles.")
+    if not pairs or not count:
+        return PercentilesState(sketch)
+    percents = np.array([p for p, _ in pairs])
+    points = np.array([v for _, v in pairs], dtype=np.float64)
+    # Mass between consecutive reported percents is spread evenly over their
+    # values (a piecewise-linear CDF); min/max carry no weight of their own.
+    steps = (np.arange(PARTIAL_POINTS_PER_STEP) + 0.5) / PARTIAL_POINTS_PER_STEP
+    spread = (points[:-1, None] + np.diff(points)[:, None] * steps).ravel()
+    weights = np.repeat(np.diff(percents) / 100 * count / PARTIAL_POINTS_PER_STEP, PARTIAL_POINTS_PER_STEP)
+    sketch.add(np.r_[points[0], spread, points[-1]], np.r_[0.0, weights, 0.0])
+    return PercentilesState(sketch)
+
+
+# -----------------------------------------------------------------------------
+# Tree-level helpers
+# -----------------------------------------------------------------------------
+
+def states_from_response(aggs: dict[str, Aggregation], response_aggs: dict[str, Any]) -> dict[str, AggState]:
+    return {
+        name: from_response(spec, response_aggs[name], percentiles_count(response_aggs, name))
+        for name, spec in aggs.items()
+    }
+
+
+def merge_states(a: dict[str, AggState], b: dict[str, AggState]) -> dict[str, AggState]:
+    """Fold the states of `b` into `a` (in place, recursively through buckets)."""
+    for name, state in b.items():
+        mine = a.get(name)
+        a[name] = state if mine is None else mine.merge(state)
+    return a
+
+
+def render(
+    aggs: dict[str, Aggregation],
+    states: dict[str, AggState],
+    now_ms: float | None = None,
+) -> dict[str, Any]:
+    """ES `aggregations` object for merged `states`."""
+    return {
+        name: (states.get(name) or empty_state(spec)).to_response(spec, now_ms)
+        for name, spec in aggs.items()
+    }
+
+
+def merge_partials(
+    spec: Aggregation,
+    parts: list[dict[str, Any]],
+    now_ms: float | None = None,
+    counts: list[int | None] | None = None,
+) -> dict[str, Any]:
+    """
+    Merge several ES response objects of the same aggregation into one
+    (`counts`: per-part value counts, needed by top-level percentiles).
+    """
+    if not parts:
+        return empty_state(spec).to_response(spec, now_ms)
+    counts = counts or [None] * len(parts)
+    states = [from_response(spec, p, c) for p, c in zip(parts, counts)]
+    return reduce(lambda acc, s: acc.merge(s), states[1:], states[0]).to_response(spec, now_ms)
+
+
+if __name__ == "__main__":
+    from datetime import datetime, timezone
+
+    import localaggs
+    from dsl_models import SearchRequestWithAggs
+    from localexec import synthetic_batch
+
+    batch = synthetic_batch(120_000, seed=3)
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"match_all": {}},
+        "size": 0,
+        "aggs": {
+            "svc": {"terms": {"field": "service.name", "size": 3},
+                    "aggs": {"lat": {"stats": {"field": "event.duration"}},
+                             "hosts": {"cardinality": {"field": "host.name", "precision_threshold": 100}}}},
+            "per_day": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1w"}},
+        },
+    })
+    ctx = ExecContext(datetime(2025, 2, 1, tzinfo=timezone.utc))
+    thirds = np.array_split(np.arange(len(batch)), 3)
+    merged = reduce(merge_states, (collect(req.aggs, batch, part, ctx) for part in thirds))
+    local = localaggs.aggregate(req.aggs, batch, None, ctx)
+    print(render(req.aggs, merged)["svc"]["buckets"][0])
+    print(local["svc"]["buckets"][0])
+    ids = HyperLogLog(threshold=0).add_hashes(_splitmix64(np.arange(1_000_000, dtype=np.uint64)))
+    print(f"HLL p=14 estimate of 1,000,000 distinct: {ids.estimate():,.0f}")
@@ -0,0 +1,353 @@
+"""
+Parallel bulk runs of the local ingest simulator over large log files.
+
+The input file is memory-mapped and cut into chunks of about `chunk_bytes`
+on line boundaries (only offsets are computed up front). Each chunk runs in
+a worker process that compiled the pipeline once, at startup. The worker
+maps the same file and slices its own chunk, so only (start, end) offsets
+go out and only the NDJSON output and per-chunk stats come back.
+
+Usage:
+  stats = simulate_file(pipeline, "day.ndjson", workers=8, output=open("out.ndjson", "wb"))
+  stats.summary()   # {"docs", "dropped", "failed", "invalid", "failures_by_tag", "field_cardinality", ...}
+
+  for chunk in iter_file(pipeline, "day.log", fmt="lines", ordered=False):
+      sink.write(chunk.output)
+
+  python bulksim.py pipeline.json day.ndjson --workers 8 --unordered --output out.ndjson
+
+JSON shape (output, one line per input line, as `_simulate` docs[] entries):
+  {"doc": {"_index", "_id", "_source", "_ingest": {"timestamp"}}}
+  | {"error": {"type", "reason", "processor_type", "processor_tag"}}
+  | null (dropped)
+
+Notes:
+  - fmt="ndjson": each line is a source document, or a `_simulate`-style
+    doc when it has a `_source` key (its `_index`, `_id`, ... become meta).
+    fmt="lines": each raw line becomes `{message_field: line}`. Blank lines
+    are skipped; lines that are not JSON objects count as `invalid`.
+  - ordered=True yields chunks in file order; ordered=False yields them as
+    they finish. Either way at most `2 * workers` chunks are in flight, so
+    a slow consumer applies backpressure instead of buffering the file.
+  - `failures_by_tag` counts documents that failed without a handling
+    on_failure, keyed by processor tag (the processor type when untagged).
+  - Field cardinalities are HyperLogLog++ sketches (aggstate.HyperLogLog)
+    over the leaf fields of output sources, merged across chunks; exact up
+    to `precision_threshold` distinct values.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterator, Literal, Mapping
+
+from aggstate import DEFAULT_PRECISION_THRESHOLD, HyperLogLog, _hash_text
+from dsl_models.ingest import IngestPipeline
+from ingestsim import METADATA_FIELDS, CompiledPipeline, _now_iso, _simulate_doc, compile_pipeline
+
+
+DEFAULT_CHUNK_BYTES = 8 << 20
+DEFAULT_MESSAGE_FIELD = "message"
+MAX_IN_FLIGHT_PER_WORKER = 2
+
+InputFormat = Literal["ndjson", "lines"]
+
+
+# -----------------------------------------------------------------------------
+# Splitting
+# -----------------------------------------------------------------------------
+
+def split_lines(path: str | os.PathLike[str], chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> list[tuple[int, int]]:
+    """`[start, end)` byte ranges of about `chunk_bytes` each, every one ending after a newline (or at EOF)."""
+    if chunk_bytes <= 0:
+        raise ValueError("chunk_bytes must be positive")
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges: list[tuple[int, int]] = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            target = start + chunk_bytes
+            newline = mm.find(b"\n", target - 1) if target < size else -1
+            end = size if newline < 0 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+# -----------------------------------------------------------------------------
+# Stats
+# -----------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class BulkStats:
+    """Counters of one chunk or a whole run; `merge` folds another in."""
+    docs: int = 0
+    dropped: int = 0
+    failed: int = 0
+    invalid: int = 0
+    bytes: int = 0
+    seconds: float = 0.0  # worker CPU-side time, summed over chunks
+    failures_by_tag: Counter[str] = field(default_factory=Counter)
+    cardinalities: dict[str, HyperLogLog] = field(default_factory=dict)
+
+    def merge(self, other: BulkStats) -> BulkStats:
+        self.docs += other.docs
+        self.dropped += other.dropped
+        self.failed += other.failed
+        self.invalid += other.invalid
+        self.bytes += other.bytes
+        self.seconds += other.seconds
+        self.failures_by_tag.update(other.failures_by_tag)
+        for name, hll in other.cardinalities.items():
+            mine = self.cardinalities.get(name)
+            self.cardinalities[name] = hll if mine is None else mine.merge(hll)
+        return self
+
+    def field_cardinality(self) -> dict[str, int]:
+        return {name: round(hll.estimate()) for name, hll in sorted(self.cardinalities.items())}
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "docs": self.docs,
+            "indexed": self.docs - self.dropped - self.failed - self.invalid,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "bytes": self.bytes,
+            "failures_by_tag": dict(self.failures_by_tag.most_common()),
+            "field_cardinality": self.field_cardinality(),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class BulkChunk:
+    """One processed chunk: its byte range, NDJSON output (b"" with outputs=False) and stats."""
+    index: int
+    start: int
+    end: int
+    output: bytes
+    stats: BulkStats
+
+
+def _leaves(value: Any, path: str, out: dict[str, set[str]]) -> None:
+    """Collect leaf values per dotted path; list elements count under the list's path."""
+    if type(value) is dict:
+        for k, v in value.items():
+            _leaves(v, f"{path}.{k}" if path else k, out)
+    elif type(value) is list:
+        for v in value:
+            _leaves(v, path, out)
+    elif value is not None and path:
+        values = out.get(path)
+        if values is None:
+            out[path] = values = set()
+        values.add(value if type(value) is str else json.dumps(value))
+
+
+# -----------------------------------------------------------------------------
+# Workers (one compiled pipeline per process)
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class _Job:
+    path: str
+    fmt: InputFormat
+    message_field: str
+    outputs: bool
+    cardinality: bool
+    precision_threshold: int
+
+
+_INVALID_LINE = '{"error":{"type":"parse_exception","reason":"line is not a JSON object"}}'
+_WORKER: tuple[CompiledPipeline, _Job] | None = None
+
+
+def _init_worker(
+    pipeline: IngestPipeline | dict[str, Any],
+    pipelines: Mapping[str, IngestPipeline | dict[str, Any]] | None,
+    job: _Job,
+) -> None:
+    global _WORKER
+    _WORKER = (compile_pipeline(pipeline, pipelines), job)
+
+
+def _parse(line: str, fmt: InputFormat, message_field: str) -> tuple[dict[str, Any], dict[str, Any] | None] | None:
+    """(source, meta) of one input line; None when it is not a JSON object."""
+    if fmt == "lines":
+        return {message_field: line}, None
+    try:
+        doc = json.loads(line)
+    except ValueError:
+        return None
+    if type(doc) is not dict:
+        return None
+    if "_source" in doc:
+        return doc["_source"], {k: doc[k] for k in METADATA_FIELDS if k in doc}
+    return doc, None
+
+
+def _run_chunk(index: int, start: int, end: int) -> BulkChunk:
+    sim, job = _WORKER
+    t0 = time.perf_counter()
+    with open(job.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8", "replace")
+    stats = BulkStats(bytes=end - start)
+    out: list[str] = []
+    seen: dict[str, set[str]] = {}
+    timestamp = _now_iso()
+    for line in text.split("\n"):
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line.strip():
+            continue
+        stats.docs += 1
+        parsed = _parse(line, job.fmt, job.message_field)
+        if parsed is None:
+            stats.invalid += 1
+            if job.outputs:
+                out.append(_INVALID_LINE)
+            continue
+        result = sim.run(parsed[0], parsed[1], timestamp, copy=False)
+        if result.dropped:
+            stats.dropped += 1
+        elif result.error is not None:
+            stats.failed += 1
+            stats.failures_by_tag[result.error.tag or result.error.processor_type] += 1
+        elif job.cardinality:
+            _leaves(result.source, "", seen)
+        if job.outputs:
+            out.append(json.dumps(_simulate_doc(result, timestamp), separators=(",", ":"), ensure_ascii=False))
+    for name, values in seen.items():
+        hll = HyperLogLog(threshold=job.precision_threshold)
+        stats.cardinalities[name] = hll.add_hashes(_hash_text(list(values)))
+    stats.seconds = time.perf_counter() - t0
+    output = ("\n".join(out) + "\n").encode("utf-8") if out else b""
+    return BulkChunk(index, start, end, output, stats)
+
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+def iter_file(
+    pipeline: IngestPipeline | dict[str, Any],
+    path: str | os.PathLike[str],
+    *,
+    pipelines: Mapping[str, IngestPipeline | dict[str, Any]] | None = None,
+    fmt: InputFormat = "ndjson",
+    message_field: str = DEFAULT_MESSAGE_FIELD,
+    workers: int | None = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ordered: bool = True,
+    outputs: bool = True,
+    cardinality: bool = True,
+    precision_threshold: int = DEFAULT_PRECISION_THRESHOLD,
+) -> Iterator[BulkChunk]:
+    """
+    Run `pipeline` over every line of `path` across a process pool, yielding
+    chunks in file order (`ordered`) or as they complete.
+    """
+    if fmt not in ("ndjson", "lines"):
+        raise ValueError(f"Unknown input format {fmt!r}; expected 'ndjson' or 'lines'.")
+    if isinstance(pipeline, dict):
+        pipeline = IngestPipeline.model_validate(pipeline)
+    compile_pipeline(pipeline, pipelines)  # fail fast in the caller, not once per worker
+    ranges = split_lines(path, chunk_bytes)
+    if not ranges:
+        return
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ranges)))
+    job = _Job(os.fspath(path), fmt, message_field, outputs, cardinality, precision_threshold)
+    pending = iter(enumerate(ranges))
+    in_flight: deque[Future[BulkChunk]] = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pipeline, pipelines, job)) as pool:
+        def submit() -> None:
+            for index, (start, end) in pending:
+                in_flight.append(pool.submit(_run_chunk, index, start, end))
+                if len(in_flight) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                    return
+
+        submit()
+        while in_flight:
+            if ordered:
+                future = in_flight.popleft()
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                future = next(iter(done))
+                in_flight.remove(future)
+            yield future.result()
+            submit()
+
+
+def simulate_file(
+    pipeline: IngestPipeline | dict[str, Any],
+    path: str | os.PathLike[str],
+    *,
+    output: BinaryIO | None = None,
+    **options: Any,
+) -> BulkStats:
+    """
+    Run `pipeline` over `path` (see `iter_file` for options), writing the
+    NDJSON output to `output` when given, and return the merged stats.
+    """
+    stats = BulkStats()
+    for chunk in iter_file(pipeline, path, outputs=output is not None, **options):
+        if output is not None:
+            output.write(chunk.output)
+        stats.merge(chunk.stats)
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Run an ingest pipeline over a large log file locally.")
+    parser.add_argument("pipeline", help="IngestPipeline JSON file")
+    parser.add_argument("input", help="NDJSON or raw line file")
+    parser.add_argument("--format", choices=("ndjson", "lines"), default="ndjson")
+    parser.add_argument("--message-field", default=DEFAULT_MESSAGE_FIELD)
+    parser.add_argument("--pipelines", help="JSON file mapping names to pipelines called by `pipeline` processors")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1 << 20))
+    parser.add_argument("--unordered", action="store_true", help="write chunks as they finish")
+    parser.add_argument("--output", help="write _simulate docs as NDJSON here ('-' for stdout)")
+    parser.add_argument("--no-cardinality", action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(args.pipeline, encoding="utf-8") as f:
+        pipeline = json.load(f)
+    pipelines = None
+    if args.pipelines:
+        with open(args.pipelines, encoding="utf-8") as f:
+            pipelines = json.load(f)
+    sink: BinaryIO | None = None
+    if args.output == "-":
+        sink = sys.stdout.buffer
+    elif args.output:
+        sink = open(args.output, "wb")
+    t0 = time.perf_counter()
+    try:
+        stats = simulate_file(
+            pipeline, args.input, output=sink, pipelines=pipelines, fmt=args.format,
+            message_field=args.message_field, workers=args.workers,
+            chunk_bytes=max(1, int(args.chunk_mb * (1 << 20))), ordered=not args.unordered,
+            cardinality=not args.no_cardinality,
+        )
+    finally:
+        if sink is not None and sink is not sys.stdout.buffer:
+            sink.close()
+    elapsed = time.perf_counter() - t0
+    summary = {**stats.summary(), "seconds": round(elapsed, 3), "docs_per_s": round(stats.docs / elapsed if elapsed else 0)}
+    print(json.dumps(summary, indent=1), file=sys.stderr if args.output == "-" else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from dsl_models import SearchRequestWithAggs
+from slicing import SearchFn, _gateway_search
+
+
+DEFAULT_MAX_PAGES = 1000
+
+
+@dataclass(frozen=True, slots=True)
+class CompositePage:
+    """
+    One page of a composite aggregation.
+
+    `after_key` is where the NEXT page starts: pass it as `composite.after`
+    (or `resume_after=`) to continue later.
+    """
+    number: int
+    buckets: list[dict[str, Any]]
+    after_key: dict[str, Any] | None
+    buckets_seen: int
+    took_ms: int
+
+
+def composite_agg_name(request: SearchRequestWithAggs, name: str | None = None) -> str:
+    """Name of the top-level composite aggregation (the only one unless `name` is given)."""
+    found = [n for n, node in (request.aggs or {}).items() if node.composite is not None]
+    if name is not None:
+        if name not in found:
+            raise ValueError(f"{name!r} is not a top-level composite aggregation (found {found}).")
+        return name
+    if len(found) != 1:
+        raise ValueError(f"Expected exactly one top-level composite aggregation, found {found}; pass `name`.")
+    return found[0]
+
+
+def iter_composite_pages(
+    request: SearchRequestWithAggs,
+    index: str | None = None,
+    search: SearchFn | None = None,
+    name: str | None = None,
+    max_pages: int | None = DEFAULT_MAX_PAGES,
+    resume_after: dict[str, Any] | None = None,
+) -> Iterator[CompositePage]:
+    """
+    Page through a composite aggregation by `after_key`, one request per page.
+
+    Every page request carries the query and that composite aggregation
+    (with its sub-aggregations) only: `size` is 0 and sibling aggregations
+    are dropped, so each response holds one page of buckets.
+
+    Usage:
+      for page in iter_composite_pages(req, index="logs-*"):
+          sink(page.buckets)                 # memory bounded by the page size
+      iter_composite_pages(req, search=lambda body: localexec.search(body, batch))
+
+    Notes:
+      - Stops on the first empty page, as Elasticsearch recommends.
+      - Stops after `max_pages`; the last page's `after_key` resumes it.
+    """
+    if search is None:
+        if index is None:
+            raise ValueError("Pass either `index` (gateway search) or a `search` callable.")
+        search = _gateway_search(index)
+    name = composite_agg_name(request, name)
+    body = request.model_dump(by_alias=True, exclude_none=True)
+    node = body["aggs"][name]
+    body = {"query": body["query"], "size": 0}
+    after = resume_after if resume_after is not None else node["composite"].get("after")
+    seen = 0
+    number = 0
+    while max_pages is None or number < max_pages:
+        composite = node["composite"] if after is None else {**node["composite"], "after": after}
+        t0 = time.perf_counter()
+        result = search({**body, "aggs": {name: {**node, "composite": composite}}})["aggregations"][name]
+        buckets = result.get("buckets") or []
+        if not buckets:
+            return
+        number += 1
+        seen += len(buckets)
+        after = result.get("after_key") or buckets[-1]["key"]
+        yield CompositePage(number, buckets, after, seen, int((time.perf_counter() - t0) * 1000))
+
+
+if __name__ == "__main__":
+    import localexec
+
+    batch = localexec.synthetic_batch(200_000, seed=4)
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"bool": {"filter": [{"terms": {"log.level": ["error", "warn"]}}]}},
+        "aggs": {"per_host": {
+            "composite": {"size": 50, "sources": [
+                {"host": {"terms": {"field": "host.name"}}},
+                {"level": {"terms": {"field": "log.level"}}},
+            ]},
+            "aggs": {"latency": {"max": {"field": "event.duration"}}},
+        }},
+    })
+    local = lambda body: localexec.search(body, batch)  # noqa: E731
+    pages = list(iter_composite_pages(req, search=local))
+    for p in pages[:3]:
+        print(f"page {p.number}: {len(p.buckets)} buckets, {p.buckets_seen} so far, after {p.after_key}")
+    total = sum(b["doc_count"] for p in pages for b in p.buckets)
+    matched = local({"query": req.model_dump(by_alias=True)["query"], "size": 0})["hits"]["total"]["value"]
+    print(f"{len(pages)} pages, {pages[-1].buckets_seen} buckets, {total} docs (query matches {matched})")
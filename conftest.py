@@ -0,0 +1,46 @@
+"""
+Benchmark runs vs unit runs.
+
+  pytest                                        # unit run: benchmarked functions run once, untimed
+  pytest test_bench_dsl.py --benchmark-only     # benchmark run: timed, compared to the baseline
+  DSL_BENCH_UPDATE=1 pytest test_bench_dsl.py --benchmark-only   # re-record bench_throughput.json
+
+A benchmark run compares every `benchmark` test against
+`bench_throughput.json` and fails when a mean regresses by more than
+THROUGHPUT_FAIL, unless --benchmark-compare / --benchmark-compare-fail are
+given explicitly. Means are machine dependent: record the baseline on the
+machine (CI runner) that runs the comparison.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+
+THROUGHPUT_BASELINE = Path(__file__).with_name("bench_throughput.json")
+THROUGHPUT_FAIL = "mean:25%"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # runs before pytest-benchmark builds its session from these options
+    option = config.option
+    if not hasattr(option, "benchmark_only"):
+        return  # pytest-benchmark is not installed
+    if not (option.benchmark_only or option.benchmark_enable):
+        option.benchmark_disable = True
+        return
+    if os.environ.get("DSL_BENCH_UPDATE"):
+        option.benchmark_json = THROUGHPUT_BASELINE
+        return
+    if not option.benchmark_compare and THROUGHPUT_BASELINE.exists():
+        from pytest_benchmark.utils import parse_compare_fail
+
+        option.benchmark_compare = str(THROUGHPUT_BASELINE)
+        option.benchmark_compare_fail = option.benchmark_compare_fail or [parse_compare_fail(THROUGHPUT_FAIL)]
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    if os.environ.get("DSL_BENCH_UPDATE"):
+        for bench in output_json["benchmarks"]:
+            bench["stats"].pop("data", None)  # the summary stats are what a comparison reads
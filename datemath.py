@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Literal
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+
+# -----------------------------------------------------------------------------
+# Time zones
+# -----------------------------------------------------------------------------
+
+_UTC_NAMES = {"UTC", "utc", "Z", "GMT", "Etc/UTC", "+00:00", "-00:00"}
+_OFFSET_TZ_RE = re.compile(r"^([+-])(\d{2}):?(\d{2})$")
+
+
+@lru_cache(maxsize=256)
+def get_zone(tz: str | None) -> tzinfo:
+    """`time_zone` string -> tzinfo ("UTC", "+01:00", or an IANA name)."""
+    if not tz or tz in _UTC_NAMES:
+        return timezone.utc
+    m = _OFFSET_TZ_RE.match(tz)
+    if m:
+        delta = timedelta(hours=int(m.group(2)), minutes=int(m.group(3)))
+        return timezone(-delta if m.group(1) == "-" else delta)
+    return ZoneInfo(tz)
+
+
+def tz_offsets(ms: np.ndarray, tz: str | None) -> np.ndarray:
+    """
+    UTC offset in ms at each instant of `ms`.
+
+    Fixed-offset zones are a constant; IANA zones are resolved once per
+    distinct hour (DST transitions fall on hour boundaries).
+    """
+    ms = np.asarray(ms, dtype=np.int64)
+    zone = get_zone(tz)
+    if isinstance(zone, timezone):
+        off = int(zone.utcoffset(None).total_seconds() * 1000)
+        return np.full(len(ms), off, dtype=np.int64)
+    hours, inverse = np.unique(np.floor_divide(ms, 3_600_000), return_inverse=True)
+    offs = np.array(
+        [int(datetime.fromtimestamp(int(h) * 3600, tz=zone).utcoffset().total_seconds() * 1000) for h in hours],
+        dtype=np.int64,
+    )
+    return offs[inverse]
+
+
+def local_to_utc(local_ms: np.ndarray, tz: str | None) -> np.ndarray:
+    """Wall-clock epoch ms in `tz` -> UTC epoch ms (two-pass offset lookup)."""
+    local_ms = np.asarray(local_ms, dtype=np.int64)
+    guess = local_ms - tz_offsets(local_ms, tz)
+    return local_ms - tz_offsets(guess, tz)
+
+
+# -----------------------------------------------------------------------------
+# Date formats (ES `format`)
+# -----------------------------------------------------------------------------
+
+_JAVA_TOKEN_RE = re.compile(r"'[^']*'|y+|u+|M+|d+|H+|h+|m+|s+|S+|Z+|X+|x+|E+|a|.")
+_JAVA_TO_STRPTIME = {
+    "yyyy": "%Y", "uuuu": "%Y", "yy": "%y", "MM": "%m", "M": "%m", "MMM": "%b", "MMMM": "%B",
+    "dd": "%d", "d": "%d", "HH": "%H", "H": "%H", "hh": "%I", "h": "%I", "mm": "%M", "m": "%M",
+    "ss": "%S", "s": "%S", "SSS": "%f", "SSSSSS": "%f", "Z": "%z", "ZZ": "%z", "X": "%z",
+    "XX": "%z", "XXX": "%z", "x": "%z", "xx": "%z", "xxx": "%z", "EEE": "%a", "EEEE": "%A", "a": "%p",
+}
+_NAMED_FORMATS = {
+    "strict_date_optional_time", "date_optional_time", "strict_date_optional_time_nanos",
+    "date_time", "strict_date_time", "date_time_no_millis", "strict_date_time_no_millis",
+    "date", "strict_date",
+}
+
+
+@lru_cache(maxsize=256)
+def _strptime_pattern(java: str) -> str:
+    out = []
+    for tok in _JAVA_TOKEN_RE.findall(java):
+        if tok.startswith("'"):
+            out.append(tok[1:-1].replace("%", "%%") or "'")
+        elif tok in _JAVA_TO_STRPTIME:
+            out.append(_JAVA_TO_STRPTIME[tok])
+        elif tok[0].isalpha():
+            raise ValueError(f"Unsupported date format token {tok!r} in {java!r}.")
+        else:
+            out.append(tok.replace("%", "%%"))
+    return "".join(out)
+
+
+def _java_offset(dt: datetime, tok: str) -> str:
+    seconds = int(dt.utcoffset().total_seconds()) if dt.utcoffset() is not None else 0
+    if not seconds and tok[0] == "X":
+        return "Z"
+    sign = "-" if seconds < 0 else "+"
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    if len(tok) == 1 and tok[0] in "Xx":
+        return f"{sign}{hours:02d}" + (f"{minutes:02d}" if minutes else "")
+    return f"{sign}{hours:02d}:{minutes:02d}" if len(tok) >= 3 and tok[0] in "Xx" else f"{sign}{hours:02d}{minutes:02d}"
+
+
+@lru_cache(maxsize=256)
+def _format_plan(java: str) -> tuple[tuple[str, str], ...]:
+    """Java pattern -> ("strftime", fmt) runs (merged) and ("frac" | "offset" | "unpadded", token) pieces."""
+    plan: list[tuple[str, str]] = []
+
+    def strftime(fmt: str) -> None:
+        if plan and plan[-1][0] == "strftime":
+            plan[-1] = ("strftime", plan[-1][1] + fmt)
+        else:
+            plan.append(("strftime", fmt))
+
+    for tok in _JAVA_TOKEN_RE.findall(java):
+        c = tok[0]
+        if c == "'":
+            strftime((tok[1:-1] or "'").replace("%", "%%"))
+        elif c == "S":
+            plan.append(("frac", tok))
+        elif c in "XxZ":
+            plan.append(("offset", tok))
+        elif c.isalpha():
+            if tok not in _JAVA_TO_STRPTIME:
+                raise ValueError(f"Unsupported date format token {tok!r} in {java!r}.")
+            if len(tok) == 1 and c in "dMHhms":
+                plan.append(("unpadded", _JAVA_TO_STRPTIME[tok]))
+            else:
+                strftime(_JAVA_TO_STRPTIME[tok])
+        else:
+            strftime(tok.replace("%", "%%"))
+    return tuple(plan)
+
+
+def format_date(dt: datetime, java: str) -> str:
+    """Render `dt` in its own zone with a Java pattern (the subset `_strptime_pattern` reads)."""
+    out = []
+    for kind, arg in _format_plan(java):
+        if kind == "strftime":
+            out.append(dt.strftime(arg))
+        elif kind == "frac":
+            out.append(f"{dt.microsecond:06d}"[:len(arg)].ljust(len(arg), "0"))
+        elif kind == "offset":
+            out.append(_java_offset(dt, arg))
+        else:
+            out.append(dt.strftime(arg).lstrip("0") or "0")
+    return "".join(out)
+
+
+# ISO dates may stop at any field; the last one present is the date's precision
+_ISO_FIELDS_RE = re.compile(
+    r"^[+-]?\d{4}(?:-?(?P<M>\d{2})(?:-?(?P<d>\d{2})(?:[T ](?P<h>\d{2})"
+    r"(?::?(?P<m>\d{2})(?::?(?P<s>\d{2})(?P<frac>[.,]\d+)?)?)?)?)?)?"
+)
+_YEAR_MONTH_RE = re.compile(r"^(\d{4})(?:-(\d{2}))?$")
+_JAVA_PRECISION = (("S", None), ("s", "s"), ("m", "m"), ("H", "h"), ("h", "h"), ("d", "d"), ("M", "M"))
+
+
+def _iso_precision(text: str) -> str | None:
+    m = _ISO_FIELDS_RE.match(text)
+    if m is None or m.group("frac"):
+        return None
+    return next((unit for unit in ("s", "m", "h", "d", "M") if m.group(unit)), "y")
+
+
+@lru_cache(maxsize=256)
+def _java_precision(java: str) -> str | None:
+    tokens = {tok[0] for tok in _JAVA_TOKEN_RE.findall(java) if not tok.startswith("'")}
+    return next((unit for c, unit in _JAVA_PRECISION if c in tokens), "y")
+
+
+def _parse_date(text: str, formats: str | None, tz: str | None) -> tuple[datetime, str | None]:
+    """`parse_date` plus the unit of the last field the text gave (None when exact to the ms)."""
+    zone = get_zone(tz)
+    errors = []
+    for fmt in (formats or "strict_date_optional_time||epoch_millis").split("||"):
+        fmt = fmt.strip()
+        try:
+            if fmt == "epoch_millis":
+                return datetime.fromtimestamp(float(text) / 1000, tz=timezone.utc), None
+            if fmt == "epoch_second":
+                return datetime.fromtimestamp(float(text), tz=timezone.utc), None
+            if fmt in _NAMED_FORMATS:
+                ym = _YEAR_MONTH_RE.match(text)
+                dt = datetime(int(ym.group(1)), int(ym.group(2) or 1), 1) if ym else datetime.fromisoformat(text)
+                precision = _iso_precision(text)
+            else:
+                dt = datetime.strptime(text, _strptime_pattern(fmt))
+                precision = _java_precision(fmt)
+        except ValueError as exc:
+            errors.append(str(exc))
+            continue
+        return (dt if dt.tzinfo else dt.replace(tzinfo=zone)), precision
+    raise ValueError(f"Cannot parse date {text!r} with format {formats or 'default'!r}: {errors[-1]}")
+
+
+def parse_date(text: str, formats: str | None = None, tz: str | None = None) -> datetime:
+    """
+    Parse a literal date with ES `format` semantics (default:
+    strict_date_optional_time||epoch_millis). Naive results are placed in `tz`.
+    """
+    return _parse_date(text, formats, tz)[0]
+
+
+def to_epoch_ms(value: Any, formats: str | None = None, tz: str | None = None) -> int:
+    """Epoch millis for a datetime/date/number/date string."""
+    if isinstance(value, bool):
+        raise ValueError(f"Cannot interpret {value!r} as a date.")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        dt = value if value.tzinfo else value.replace(tzinfo=get_zone(tz))
+        return _dt_ms(dt)
+    if isinstance(value, date):
+        return _dt_ms(datetime(value.year, value.month, value.day, tzinfo=get_zone(tz)))
+    return _dt_ms(parse_date(str(value), formats, tz))
+
+
+def _dt_ms(dt: datetime) -> int:
+    return int(round(dt.timestamp() * 1000))
+
+
+# -----------------------------------------------------------------------------
+# Date math: "now-7d/d", "2025-01-01||+1M/d"
+# -----------------------------------------------------------------------------
+
+DateUnit = Literal["y", "M", "w", "d", "h", "H", "m", "s"]
+
+_DATE_MATH_RE = re.compile(r"^(?:(?P<now>now)|(?P<anchor>.+?)\|\|)(?P<ops>(?:[+-]\d+[yMwdhHms])*)(?:/(?P<round>[yMwdhHms]))?$")
+_DATE_MATH_OP_RE = re.compile(r"([+-]\d+)([yMwdhHms])")
+
+
+@dataclass(frozen=True, slots=True)
+class DateMath:
+    """
+    Compiled date-math expression.
+
+    `anchor` is None for `now`, else the literal date text before `||`.
+    `ops` are (signed amount, unit) steps; `rounding` is the `/unit` suffix.
+    """
+    anchor: str | None
+    ops: tuple[tuple[int, str], ...] = ()
+    rounding: str | None = None
+
+    def resolve(
+        self,
+        now: datetime | int | float | None = None,
+        tz: str | None = None,
+        round_up: bool = False,
+        formats: str | None = None,
+    ) -> int:
+        """
+        Epoch millis. `round_up` follows ES range semantics: `gt`/`lte` round
+        to the LAST millisecond of the unit, `gte`/`lt` to the first. Like
+        ES, the anchor before `||` is read as is (see `resolve_date` for
+        plain dates).
+        """
+        zone = get_zone(tz)
+        if self.anchor is None:
+            ref = _now_datetime(now)
+            dt = ref.astimezone(zone)
+        else:
+            dt = parse_date(self.anchor, formats, tz).astimezone(zone)
+        for amount, unit in self.ops:
+            dt = _add(dt, amount, unit)
+        if self.rounding:
+            start = _floor(dt, self.rounding)
+            if round_up:
+                return _dt_ms(_add(start, 1, self.rounding)) - 1
+            return _dt_ms(start)
+        return _dt_ms(dt)
+
+
+def _now_datetime(now: datetime | int | float | None) -> datetime:
+    if now is None:
+        return datetime.now(timezone.utc)
+    if isinstance(now, datetime):
+        return now if now.tzinfo else now.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(now / 1000, tz=timezone.utc)
+
+
+def _add(dt: datetime, amount: int, unit: str) -> datetime:
+    """Wall-clock arithmetic in dt's zone (calendar-exact for months/years)."""
+    if unit in ("y", "M"):
+        months = dt.month - 1 + amount * (12 if unit == "y" else 1)
+        year, month = dt.year + months // 12, months % 12 + 1
+        day = min(dt.day, _days_in_month(year, month))
+        out = dt.replace(year=year, month=month, day=day)
+    else:
+        step = {"w": timedelta(weeks=1), "d": timedelta(days=1), "h": timedelta(hours=1),
+                "H": timedelta(hours=1), "m": timedelta(minutes=1), "s": timedelta(seconds=1)}[unit]
+        out = dt + amount * step
+    # Re-normalize so the UTC offset matches the new wall time (DST).
+    return out.astimezone(timezone.utc).astimezone(dt.tzinfo) if dt.tzinfo else out
+
+
+def _days_in_month(year: int, month: int) -> int:
+    nxt = date(year + (month == 12), month % 12 + 1, 1)
+    return (nxt - timedelta(days=1)).day
+
+
+def _floor(dt: datetime, unit: str) -> datetime:
+    if unit == "y":
+        out = dt.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "M":
+        out = dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "w":
+        out = (dt - timedelta(days=dt.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif unit == "d":
+        out = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif unit in ("h", "H"):
+        out = dt.replace(minute=0, second=0, microsecond=0)
+    elif unit == "m":
+        out = dt.replace(second=0, microsecond=0)
+    else:
+        out = dt.replace(microsecond=0)
+    return out.astimezone(timezone.utc).astimezone(dt.tzinfo) if dt.tzinfo else out
+
+
+@lru_cache(maxsize=4096)
+def parse_date_math(expr: str) -> DateMath | None:
+    """Compile a date-math expression (cached); None if `expr` is not date math."""
+    m = _DATE_MATH_RE.match(expr.strip())
+    if not m:
+        return None
+    ops = tuple((int(a), u) for a, u in _DATE_MATH_OP_RE.findall(m.group("ops")))
+    return DateMath(anchor=m.group("anchor"), ops=ops, rounding=m.group("round"))
+
+
+def resolve_date(
+    value: Any,
+    now: datetime | int | float | None = None,
+    tz: str | None = None,
+    round_up: bool = False,
+    formats: str | None = None,
+) -> int:
+    """
+    Epoch millis for a range bound: date math, literal date or number.
+
+    With `round_up` (`gt`/`lte`) a literal date string is filled out to the
+    last millisecond of its least significant field, as ES does:
+    "2025-01-01" -> 2025-01-01T23:59:59.999, "2025-01" -> 2025-01-31T23:59:59.999.
+    """
+    if isinstance(value, str):
+        compiled = parse_date_math(value)
+        if compiled is not None:
+            return compiled.resolve(now, tz, round_up, formats)
+        if round_up:
+            dt, precision = _parse_date(value, formats, tz)
+            return _dt_ms(_add(dt, 1, precision)) - 1 if precision else _dt_ms(dt)
+    return to_epoch_ms(value, formats, tz)
+
+
+@dataclass(frozen=True, slots=True)
+class TimeWindow:
+    """Resolved `[start, end)` window in epoch ms; either side may be open (None)."""
+    start: int | None
+    end: int | None
+
+    def contains(self, ms: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(ms), dtype=bool)
+        if self.start is not None:
+            mask &= ms >= self.start
+        if self.end is not None:
+            mask &= ms < self.end
+        return mask
+
+
+def resolve_range(
+    gte: Any = None,
+    gt: Any = None,
+    lte: Any = None,
+    lt: Any = None,
+    time_zone: str | None = None,
+    format: str | None = None,
+    now: datetime | int | float | None = None,
+) -> TimeWindow:
+    """
+    Resolve `RangeOps` bounds to a half-open window with ES rounding rules.
+
+    Example:
+      resolve_range(gte="now-7d/d", lt="now/d", now=ref)  # 7 whole days before ref's day
+      resolve_range(gte="2025-01-01", lte="2025-01-01")   # the whole day (lte fills out the date)
+    """
+    start = end = None
+    if gte is not None:
+        start = resolve_date(gte, now, time_zone, False, format)
+    if gt is not None:
+        v = resolve_date(gt, now, time_zone, True, format) + 1
+        start = v if start is None else max(start, v)
+    if lt is not None:
+        end = resolve_date(lt, now, time_zone, False, format)
+    if lte is not None:
+        v = resolve_date(lte, now, time_zone, True, format) + 1
+        end = v if end is None else min(end, v)
+    return TimeWindow(start, end)
+
+
+# -----------------------------------------------------------------------------
+# Histogram intervals
+# -----------------------------------------------------------------------------
+
+_FIXED_UNIT_MS = {"ms": 1, "s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+_FIXED_RE = re.compile(r"^(\d+)(ms|s|m|h|d)$")
+_CALENDAR_UNITS = {
+    "minute": "m", "1m": "m", "hour": "h", "1h": "h", "day": "d", "1d": "d",
+    "week": "w", "1w": "w", "month": "M", "1M": "M", "quarter": "q", "1q": "q",
+    "year": "y", "1y": "y",
+}
+# (shortest, longest) length of one calendar unit in ms
+_CALENDAR_LENGTH_MS = {
+    "m": (60_000, 60_000),
+    "h": (3_600_000, 3_600_000),
+    "d": (82_800_000, 90_000_000),  # 23h / 25h across DST
+    "w": (7 * 86_400_000 - 3_600_000, 7 * 86_400_000 + 3_600_000),
+    "M": (28 * 86_400_000, 31 * 86_400_000),
+    "q": (90 * 86_400_000, 92 * 86_400_000),
+    "y": (365 * 86_400_000, 366 * 86_400_000),
+}
+_MONTHS_PER_UNIT = {"M": 1, "q": 3, "y": 12}
+_WEEK_MS = 7 * 86_400_000
+_MONDAY_SHIFT_MS = 3 * 86_400_000  # 1970-01-01 was a Thursday
+_OFFSET_RE = re.compile(r"^([+-]?)(\d+)(ms|s|m|h|d)$")
+
+
+@lru_cache(maxsize=256)
+def parse_offset(offset: str | None) -> int:
+    """`offset` string ("+6h", "-1d") -> ms."""
+    if not offset:
+        return 0
+    m = _OFFSET_RE.match(offset)
+    if not m:
+        raise ValueError(f"Unsupported offset {offset!r}.")
+    v = int(m.group(2)) * _FIXED_UNIT_MS[m.group(3)]
+    return -v if m.group(1) == "-" else v
+
+
+@dataclass(frozen=True, slots=True)
+class Interval:
+    """
+    Compiled `fixed_interval` / `calendar_interval`.
+
+    All array methods are vectorized; rounding happens in local (wall-clock)
+    time of `tz`, and keys are returned as UTC epoch ms, like ES bucket keys.
+    """
+    kind: Literal["fixed", "calendar"]
+    unit: str
+    amount: int = 1
+
+    @property
+    def min_length_ms(self) -> int:
+        if self.kind == "fixed":
+            return self.amount * _FIXED_UNIT_MS[self.unit]
+        return _CALENDAR_LENGTH_MS[self.unit][0]
+
+    @property
+    def max_length_ms(self) -> int:
+        if self.kind == "fixed":
+            return self.amount * _FIXED_UNIT_MS[self.unit]
+        return _CALENDAR_LENGTH_MS[self.unit][1]
+
+    def _floor_local(self, local: np.ndarray) -> np.ndarray:
+        if self.kind == "fixed" or self.unit in ("m", "h", "d"):
+            step = self.min_length_ms if self.kind == "fixed" else _FIXED_UNIT_MS[self.unit]
+            return np.floor_divide(local, step) * step
+        if self.unit == "w":
+            return np.floor_divide(local + _MONDAY_SHIFT_MS, _WEEK_MS) * _WEEK_MS - _MONDAY_SHIFT_MS
+        months = local.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        per = _MONTHS_PER_UNIT[self.unit]
+        months = np.floor_divide(months, per) * per
+        return months.astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64)
+
+    def round_down(self, ms: np.ndarray, tz: str | None = None, offset_ms: int = 0) -> np.ndarray:
+        """Bucket key (UTC epoch ms) for every timestamp in `ms`."""
+        ms = np.asarray(ms, dtype=np.int64)
+        local = ms + tz_offsets(ms, tz) - offset_ms
+        return local_to_utc(self._floor_local(local) + offset_ms, tz)
+
+    def boundaries(self, start_ms: int, end_ms: int, tz: str | None = None, offset_ms: int = 0) -> np.ndarray:
+        """All bucket keys (UTC epoch ms) whose buckets intersect [start_ms, end_ms]."""
+        first, last = self.round_down(np.array([start_ms, end_ms], dtype=np.int64), tz, offset_ms)
+        if last < first:
+            return np.empty(0, dtype=np.int64)
+        lo_local = int(first + tz_offsets(np.array([first]), tz)[0]) - offset_ms
+        hi_local = int(last + tz_offsets(np.array([last]), tz)[0]) - offset_ms
+        if self.kind == "fixed" or self.unit in ("m", "h", "d", "w"):
+            step = self.min_length_ms if self.kind == "fixed" else (
+                _WEEK_MS if self.unit == "w" else _FIXED_UNIT_MS[self.unit]
+            )
+            local = np.arange(lo_local, hi_local + 1, step, dtype=np.int64)
+        else:
+            per = _MONTHS_PER_UNIT[self.unit]
+            m_lo = np.datetime64(lo_local, "ms").astype("datetime64[M]").astype(np.int64)
+            m_hi = np.datetime64(hi_local, "ms").astype("datetime64[M]").astype(np.int64)
+            months = np.arange(m_lo, m_hi + 1, per, dtype=np.int64)
+            local = months.astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64)
+        return local_to_utc(local + offset_ms, tz)
+
+    def bucket_count(self, start_ms: int, end_ms: int) -> int:
+        """Upper bound on buckets across [start_ms, end_ms] without generating them."""
+        if end_ms < start_ms:
+            return 0
+        return (end_ms - start_ms) // self.min_length_ms + 2
+
+
+@lru_cache(maxsize=1024)
+def parse_interval(text: str, calendar: bool) -> Interval:
+    """Compile a `calendar_interval` (calendar=True) or `fixed_interval` string (cached)."""
+    if calendar:
+        unit = _CALENDAR_UNITS.get(text)
+        if unit is None:
+            raise ValueError(f"Unsupported calendar_interval {text!r}.")
+        return Interval("calendar", unit)
+    m = _FIXED_RE.match(text)
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Unsupported fixed_interval {text!r}.")
+    return Interval("fixed", m.group(2), int(m.group(1)))
+
+
+if __name__ == "__main__":
+    ref = datetime(2025, 3, 30, 14, 25, tzinfo=timezone.utc)
+    print(resolve_range(gte="now-7d/d", lt="now/d", now=ref))
+    print(resolve_range(gt="2025-01-31||+1M/d", lte="now/M", time_zone="Europe/Paris", now=ref))
+    day = parse_interval("1d", calendar=True)
+    keys = day.boundaries(_dt_ms(ref) - 3 * 86_400_000, _dt_ms(ref) + 86_400_000, tz="Europe/Paris")
+    print(np.diff(keys) // 3_600_000)  # ... 24h, 23h across the DST switch
@@ -0,0 +1,81 @@
+"""
+Elasticsearch DSL models shared by the MCP server, the local executor and the
+tooling around them (one canonical copy; `trm.py`, `trm-2.py`, `mods.py`,
+`ipppp.py` and `wwww.py` re-export from here).
+
+Layout:
+  dsl_models.query    core Query DSL + SearchRequest   (imported eagerly)
+  dsl_models.aggs     aggregations, bucket budget,     (loaded on first access)
+                      SearchRequestWithAggs
+  dsl_models.ingest   ingest pipelines                 (optional extra)
+  dsl_models.watcher  watcher watches                  (optional extra)
+
+Usage:
+  from dsl_models import BoolQuery, SearchRequest        # core only
+  from dsl_models import SearchRequestWithAggs           # loads .aggs
+  from dsl_models.ingest import IngestPipeline           # loads .ingest
+
+Notes:
+  - Every model defers its pydantic-core schema to first use, so importing
+    the package costs class definitions only (see test_dsl_import.py).
+  - Module-level settings (e.g. `BUCKET_BUDGET_POLICY`) live on the submodule:
+    assign `dsl_models.aggs.BUCKET_BUDGET_POLICY`, not the package attribute.
+"""
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any
+
+from dsl_models.query import (
+    BoolBody,
+    BoolQuery,
+    ExistsQuery,
+    IdsQuery,
+    JsonScalar,
+    MAX_TERMS_VALUES,
+    MatchAllQuery,
+    MatchFieldOptions,
+    MatchQuery,
+    MultiMatchQuery,
+    Query,
+    RangeOps,
+    RangeQuery,
+    SearchRequest,
+    TermQuery,
+    TermsLookup,
+    TermsQuery,
+    TermValue,
+)
+
+
+_LAZY_EXTRAS = {
+    "aggs": (
+        "MAX_AGG_NESTING", "MAX_BUCKETS", "MAX_TOTAL_BUCKETS", "BUCKET_BUDGET_POLICY",
+        "MAX_SAMPLING_PROBABILITY", "MAX_PERCENTS", "MAX_TDIGEST_COMPRESSION",
+        "DEFAULT_TERMS_SIZE", "DEFAULT_COMPOSITE_SIZE", "UNBOUNDED_HISTOGRAM_BUCKETS", "BucketBudgetWarning",
+        "TermsAgg", "DateHistogramAgg", "HistogramAgg", "RangeSpec", "RangeAgg", "FiltersAgg",
+        "CompositeAgg", "CompositeSource", "CompositeTermsSource", "CompositeHistogramSource",
+        "CompositeDateHistogramSource", "SamplerAgg", "RandomSamplerAgg",
+        "AvgAgg", "SumAgg", "MinAgg", "MaxAgg", "StatsAgg", "CardinalityAgg",
+        "TDigestOptions", "HdrOptions", "PercentilesAgg", "PercentileRanksAgg",
+        "Aggregation", "AggregationsRoot", "SearchRequestWithAggs",
+        "MAX_PIPELINE_STEPS", "MAX_MOVING_WINDOW", "DerivativeStep", "MovingAvgStep", "CumulativeSumStep",
+        "BucketRatioStep", "RateOfChangeStep", "PipelineStep", "ClientPipeline",
+        "resolve_bound", "query_window", "date_histogram_interval_ms",
+        "node_bucket_count", "estimate_total_buckets", "reduce_to_bucket_budget",
+    ),
+    "ingest": ("IngestPipeline", "Processor"),
+    "watcher": ("WatcherWatch",),
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY_EXTRAS.items() for name in names}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f"{__name__}.{module}"), name)
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_NAMES})
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DslModel(BaseModel):
+    """
+    Base for every model in the package.
+
+    Notes:
+      - `defer_build`: the pydantic-core schema and validator are built on
+        first validation/serialization, not at import. Subclass configs are
+        merged with this one, so per-model `model_config` stays as before.
+    """
+    model_config = ConfigDict(defer_build=True)
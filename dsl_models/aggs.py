@@ -0,0 +1,999 @@
+"""
+Aggregation models, the global bucket budget and `SearchRequestWithAggs`.
+
+Loaded on first access of any of its names through `dsl_models`; date math
+(and numpy with it) is imported only when a bound is actually resolved.
+"""
+from __future__ import annotations
+
+import math
+import re
+import warnings
+from datetime import date, datetime, timezone
+from typing import Any, Literal
+
+from pydantic import ConfigDict, Field, ValidationInfo, model_validator
+
+from dsl_models._base import DslModel
+from dsl_models.query import (
+    BoolBody,
+    BoolQuery,
+    JsonScalar,
+    MatchFieldOptions,
+    MatchQuery,
+    Query,
+    RangeOps,
+    RangeQuery,
+    SearchRequest,
+    TermQuery,
+    TermsQuery,
+)
+
+
+# -----------------------------------------------------------------------------
+# Aggregations (Elasticsearch-compatible)
+# -----------------------------------------------------------------------------
+
+MAX_AGG_NESTING = 3
+MAX_BUCKETS = 1000
+MAX_TOTAL_BUCKETS = 65_536  # ES search.max_buckets; worst case across the whole tree (see estimate_total_buckets)
+BUCKET_BUDGET_POLICY: Literal["reject", "reduce"] = "reject"
+MAX_SAMPLING_PROBABILITY = 0.5  # ES: random_sampler probability is in (0, 0.5] or exactly 1
+MAX_PERCENTS = 100  # percents / values per percentiles node
+MAX_TDIGEST_COMPRESSION = 10_000  # t-digest memory grows linearly with compression
+
+
+class TermsAgg(DslModel):
+    """
+    Bucket: terms aggregation.
+
+    JSON shape:
+      {"terms": {"field": "user", "size": 100, "order": {"_count": "desc"}}}
+    """
+    field: str = Field(..., description="Keyword/numeric/boolean field to bucket by.")
+    size: int | None = Field(None, description=f"Max buckets to return (<= {MAX_BUCKETS}).")
+    shard_size: int | None = Field(None, description="Candidate buckets per shard.")
+    min_doc_count: int | None = Field(None, description="Minimum doc count per bucket.")
+    order: dict[str, Literal["asc", "desc"]] | None = Field(None, description="Sort buckets, e.g. {'_count':'desc'}")
+    include: str | list[str] | None = Field(None, description="Regex or values to include.")
+    exclude: str | list[str] | None = Field(None, description="Regex or values to exclude.")
+    missing: JsonScalar | None = Field(None, description="Bucket docs with missing field value.")
+    script: dict[str, Any] | None = Field(None, description="Painless script object.")
+    show_term_doc_count_error: bool | None = None
+    execution_hint: Literal["map", "global_ordinals", "bytes_hash"] | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _enforce_size_cap(self) -> "TermsAgg":
+        if self.size is not None and self.size > MAX_BUCKETS:
+            raise ValueError(f"terms.size must be <= {MAX_BUCKETS}")
+        return self
+
+
+class DateHistogramAgg(DslModel):
+    """
+    Bucket: date_histogram.
+
+    JSON shape:
+      {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d"}}
+
+    Notes:
+      - Provide exactly one of calendar_interval or fixed_interval.
+    """
+    field: str
+    calendar_interval: str | None = None  # e.g. '1d', '1w', '1M', '1y'
+    fixed_interval: str | None = None     # e.g. '1m', '10m', '1h'
+    offset: str | None = None
+    min_doc_count: int | None = None
+    time_zone: str | None = None
+    extended_bounds: dict[str, JsonScalar] | None = Field(
+        None, description="{'min': <date/datetime>, 'max': <date/datetime>}"
+    )
+    hard_bounds: dict[str, JsonScalar] | None = None
+    order: dict[str, Literal["asc", "desc"]] | None = None  # recent ES supports ordering
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _interval_choice(self) -> "DateHistogramAgg":
+        if bool(self.calendar_interval) == bool(self.fixed_interval):
+            raise ValueError("Provide exactly one of calendar_interval or fixed_interval")
+        return self
+
+
+class HistogramAgg(DslModel):
+    """
+    Bucket: numeric histogram.
+
+    JSON shape:
+      {"histogram": {"field": "latency_ms", "interval": 50}}
+    """
+    field: str
+    interval: float
+    min_doc_count: int | None = None
+    offset: float | None = None
+    extended_bounds: dict[str, float] | None = None
+    hard_bounds: dict[str, float] | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class RangeSpec(DslModel):
+    from_: JsonScalar | None = Field(None, alias="from")
+    to: JsonScalar | None = None
+    key: str | None = None
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+
+class RangeAgg(DslModel):
+    """
+    Bucket: range aggregation.
+
+    JSON shape:
+      {"range": {"field": "bytes", "ranges": [{"to": 1000}, {"from": 1000, "to": 10000}]}}
+    """
+    field: str
+    ranges: list[RangeSpec]
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _bucket_cap(self) -> "RangeAgg":
+        if len(self.ranges) > MAX_BUCKETS:
+            raise ValueError(f"range.ranges length must be <= {MAX_BUCKETS}")
+        return self
+
+
+class FiltersAgg(DslModel):
+    """
+    Bucket: filters aggregation (named filters only so we can count them).
+
+    JSON shape:
+      {"filters": {"filters": {"ok": {"term": {"status": "ok"}}, "ko": {"term": {"status": "ko"}}}}}
+    """
+    filters: dict[str, Query] = Field(..., description="Named filters map.")
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _bucket_cap(self) -> "FiltersAgg":
+        if len(self.filters) > MAX_BUCKETS:
+            raise ValueError(f"filters must define <= {MAX_BUCKETS} named filters")
+        return self
+
+
+class CompositeTermsSource(DslModel):
+    field: str
+    order: Literal["asc", "desc"] | None = None
+    missing_bucket: bool | None = Field(None, description="Emit a null-key bucket for docs without the field.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class CompositeHistogramSource(DslModel):
+    field: str
+    interval: float
+    order: Literal["asc", "desc"] | None = None
+    missing_bucket: bool | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class CompositeDateHistogramSource(DslModel):
+    field: str
+    calendar_interval: str | None = None
+    fixed_interval: str | None = None
+    offset: str | None = None
+    time_zone: str | None = None
+    format: str | None = None
+    order: Literal["asc", "desc"] | None = None
+    missing_bucket: bool | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _interval_choice(self) -> "CompositeDateHistogramSource":
+        if bool(self.calendar_interval) == bool(self.fixed_interval):
+            raise ValueError("Provide exactly one of calendar_interval or fixed_interval")
+        return self
+
+
+class CompositeSource(DslModel):
+    """One values source of a composite key (exactly one kind)."""
+    terms: CompositeTermsSource | None = None
+    histogram: CompositeHistogramSource | None = None
+    date_histogram: CompositeDateHistogramSource | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _one_kind(self) -> "CompositeSource":
+        if sum(v is not None for v in (self.terms, self.histogram, self.date_histogram)) != 1:
+            raise ValueError("Each composite source must define exactly one of terms, histogram, date_histogram.")
+        return self
+
+
+class CompositeAgg(DslModel):
+    """
+    Bucket: composite aggregation (every combination of source values, paged).
+
+    JSON shape:
+      {"composite": {"size": 500,
+                     "sources": [{"host": {"terms": {"field": "host.name"}}}],
+                     "after": {"host": "web-0417"}}}
+
+    LLM guidance:
+      - Use for exhaustive breakdowns over high-cardinality fields (every
+        host, every user) instead of a `terms` agg capped at MAX_BUCKETS.
+      - `size` is the PAGE size; pass the previous response's `after_key` as
+        `after` to get the next page (see composite.iter_composite_pages).
+      - Top-level only (no parent aggregation), as in Elasticsearch.
+    """
+    sources: list[dict[str, CompositeSource]] = Field(
+        ..., min_length=1, description="Ordered key parts: [{name: {terms|histogram|date_histogram: {...}}}]."
+    )
+    size: int | None = Field(None, description=f"Buckets per page (<= {MAX_BUCKETS}, default 10).")
+    after: dict[str, JsonScalar | None] | None = Field(
+        None, description="Resume after this composite key (the previous page's `after_key`)."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _check_sources(self) -> "CompositeAgg":
+        if self.size is not None and not 1 <= self.size <= MAX_BUCKETS:
+            raise ValueError(f"composite.size must be between 1 and {MAX_BUCKETS}")
+        names = [name for source in self.sources for name in source]
+        if any(len(source) != 1 for source in self.sources):
+            raise ValueError("Each composite source must be a single {name: source} object.")
+        if len(set(names)) != len(names):
+            raise ValueError(f"composite source names must be unique (got {names}).")
+        if self.after is not None and set(self.after) != set(names):
+            raise ValueError(f"composite.after must have exactly the keys {names}.")
+        return self
+
+
+# --- Single-bucket sampling aggregations (wrap sub-aggregations) ---
+
+class SamplerAgg(DslModel):
+    """
+    Single bucket: sampler (sub-aggregations see only the top-scoring docs).
+
+    JSON shape:
+      {"sampler": {"shard_size": 200}, "aggs": {"kw": {"terms": {"field": "tags"}}}}
+
+    LLM guidance:
+      - Use with a scoring query (`match`) to keep sub-aggregations on the
+        most relevant documents; for cheap approximate counts over a large
+        time range use `random_sampler` instead.
+    """
+    shard_size: int | None = Field(None, ge=1, description="Top-scoring docs sampled per shard (default 100).")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class RandomSamplerAgg(DslModel):
+    """
+    Single bucket: random_sampler (sub-aggregations see a random subset of docs).
+
+    JSON shape:
+      {"random_sampler": {"probability": 0.01, "seed": 42}, "aggs": {...}}
+      {"random_sampler": {"probability": "auto"}, "aggs": {...}}
+
+    LLM guidance:
+      - Use for approximate breakdowns over long windows ("error mix over
+        the last week"): counts come back scaled up with confidence intervals.
+      - Prefer "auto": the probability is chosen from the estimated number
+        of matching docs (see sampling.run_sampled).
+      - Top-level only, as in Elasticsearch.
+    """
+    probability: float | Literal["auto"] = Field(
+        ..., description='Sampling probability: "auto", a value in (0, 0.5], or 1 (no sampling).'
+    )
+    seed: int | None = Field(None, description="Fixed seed for repeatable samples.")
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _probability_range(self) -> "RandomSamplerAgg":
+        p = self.probability
+        if p != "auto" and not (0 < p <= MAX_SAMPLING_PROBABILITY or p == 1):
+            raise ValueError(
+                f"random_sampler.probability must be in (0, {MAX_SAMPLING_PROBABILITY}], exactly 1, or \"auto\"."
+            )
+        return self
+
+
+# --- Metric aggregations (do not create buckets; no bucket cap needed) ---
+
+class AvgAgg(DslModel):
+    avg: dict[Literal["field"], str]
+    model_config = ConfigDict(extra="forbid")
+
+
+class SumAgg(DslModel):
+    sum: dict[Literal["field"], str]
+    model_config = ConfigDict(extra="forbid")
+
+
+class MinAgg(DslModel):
+    min: dict[Literal["field"], str]
+    model_config = ConfigDict(extra="forbid")
+
+
+class MaxAgg(DslModel):
+    max: dict[Literal["field"], str]
+    model_config = ConfigDict(extra="forbid")
+
+
+class StatsAgg(DslModel):
+    stats: dict[Literal["field"], str]
+    model_config = ConfigDict(extra="forbid")
+
+
+class CardinalityAgg(DslModel):
+    cardinality: dict[str, Any]  # {'field': '...', 'precision_threshold': 100}
+    model_config = ConfigDict(extra="forbid")
+
+
+class TDigestOptions(DslModel):
+    compression: float | None = Field(
+        None, gt=0, le=MAX_TDIGEST_COMPRESSION,
+        description="Accuracy vs memory: about this many centroids (default 100).",
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class HdrOptions(DslModel):
+    number_of_significant_value_digits: int | None = Field(
+        None, ge=0, le=5, description="Relative precision 10^-digits (default 3); values must be >= 0."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class _PercentilesBase(DslModel):
+    field: str
+    keyed: bool | None = Field(None, description="Values as an object keyed by percent (default true).")
+    tdigest: TDigestOptions | None = None
+    hdr: HdrOptions | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _one_method(self) -> "_PercentilesBase":
+        if self.tdigest is not None and self.hdr is not None:
+            raise ValueError("Provide at most one of tdigest or hdr")
+        return self
+
+
+class PercentilesAgg(_PercentilesBase):
+    """
+    Metric: percentiles (latency distribution).
+
+    JSON shape:
+      {"percentiles": {"field": "event.duration", "percents": [50, 95, 99]}}
+      {"percentiles": {"field": "event.duration", "hdr": {"number_of_significant_value_digits": 2}}}
+
+    LLM guidance:
+      - Use for "p99 latency" questions; `avg` hides the tail.
+      - Default method is t-digest (compression 100, most accurate at the
+        extremes); `hdr` is faster with a fixed relative error but needs
+        non-negative values.
+    """
+    percents: list[float] | None = Field(
+        None, min_length=1, max_length=MAX_PERCENTS, description="Percents in [0, 100] (default 1,5,25,50,75,95,99)."
+    )
+
+    @model_validator(mode="after")
+    def _percent_range(self) -> "PercentilesAgg":
+        if any(not 0 <= p <= 100 for p in self.percents or ()):
+            raise ValueError("percentiles.percents must be between 0 and 100")
+        return self
+
+
+class PercentileRanksAgg(_PercentilesBase):
+    """
+    Metric: percentile_ranks (share of values at or below thresholds).
+
+    JSON shape:
+      {"percentile_ranks": {"field": "event.duration", "values": [200, 500]}}
+
+    LLM guidance:
+      - Use for SLO questions ("what share of requests finished under 500 ms").
+    """
+    values: list[float] = Field(..., min_length=1, max_length=MAX_PERCENTS, description="Thresholds to rank.")
+
+
+# -----------------------------------------------------------------------------
+# Aggregation container (one-of per node) + recursive sub-aggregations
+# -----------------------------------------------------------------------------
+
+class Aggregation(DslModel):
+    """
+    A single aggregation node (exactly one of the following must be present),
+    with optional sub-aggregations via `aggs`.
+    """
+    # Bucket aggs
+    terms: TermsAgg | None = None
+    date_histogram: DateHistogramAgg | None = None
+    histogram: HistogramAgg | None = None
+    range: RangeAgg | None = None
+    filters: FiltersAgg | None = None
+    composite: CompositeAgg | None = None
+
+    # Single-bucket sampling aggs (do not count towards nesting)
+    sampler: SamplerAgg | None = None
+    random_sampler: RandomSamplerAgg | None = None
+
+    # Metric aggs
+    avg: dict[Literal["field"], str] | None = None
+    sum: dict[Literal["field"], str] | None = None
+    min: dict[Literal["field"], str] | None = None
+    max: dict[Literal["field"], str] | None = None
+    stats: dict[Literal["field"], str] | None = None
+    cardinality: dict[str, Any] | None = None
+    percentiles: PercentilesAgg | None = None
+    percentile_ranks: PercentileRanksAgg | None = None
+
+    # Sub-aggregations
+    aggs: dict[str, "Aggregation"] | None = Field(
+        None, description="Sub-aggregations (counts towards nesting limit)."
+    )
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _one_of(self) -> "Aggregation":
+        present = [
+            name
+            for name, val in self.__dict__.items()
+            if name not in {"aggs"} and val is not None
+        ]
+        if len(present) != 1:
+            raise ValueError(
+                "Each aggregation node must define exactly one aggregation type "
+                f"(found {present or 'none'})."
+            )
+        if self.is_sampler and not self.aggs:
+            raise ValueError(f"{present[0]} needs sub-aggregations (`aggs`) to run on the sample.")
+        return self
+
+    @property
+    def is_sampler(self) -> bool:
+        return self.sampler is not None or self.random_sampler is not None
+
+
+# -----------------------------------------------------------------------------
+# Bucket budget (static worst-case estimate over the whole tree)
+# -----------------------------------------------------------------------------
+
+DEFAULT_TERMS_SIZE = 10  # ES default when `terms.size` is omitted
+DEFAULT_COMPOSITE_SIZE = 10  # ES default page size of `composite`
+UNBOUNDED_HISTOGRAM_BUCKETS = MAX_BUCKETS  # assumed when no window can be derived
+
+
+class BucketBudgetWarning(UserWarning):
+    """Only a guessed histogram window (no bounds in the request) puts the tree over budget."""
+
+_CALENDAR_COARSER = {
+    "minute": "hour", "1m": "1h",
+    "hour": "day", "1h": "1d",
+    "day": "week", "1d": "1w",
+    "week": "month", "1w": "1M",
+    "month": "quarter", "1M": "1q",
+    "quarter": "year", "1q": "1y",
+}
+_FIXED_INTERVAL_RE = re.compile(r"^(\d+)(ms|s|m|h|d)$")
+
+
+def _now_ms() -> float:
+    return datetime.now(timezone.utc).timestamp() * 1000
+
+
+def resolve_bound(
+    value: Any,
+    now_ms: float,
+    time_zone: str | None = None,
+    round_up: bool = False,
+    format: str | None = None,
+) -> float | None:
+    """
+    Numeric value of a range bound: epoch millis for dates, date strings and
+    date math (see datemath.resolve_date), the value itself for numbers;
+    None when the value cannot be interpreted.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    if not isinstance(value, (str, date)):
+        return None
+    from datemath import resolve_date  # deferred: pulls in numpy/zoneinfo
+
+    try:
+        return float(resolve_date(value, now_ms, time_zone, round_up, format))
+    except (ValueError, KeyError):
+        return None
+
+
+def query_window(query: Any, field: str, now_ms: float) -> tuple[float | None, float | None]:
+    """
+    Bounds on `field` implied by `range` clauses the query REQUIRES
+    (top level, `bool.must`, `bool.filter`); `should`/`must_not` are ignored.
+    """
+    lo: float | None = None
+    hi: float | None = None
+    stack = [query]
+    while stack:
+        q = stack.pop()
+        if isinstance(q, BoolQuery):
+            stack.extend(q.bool.must or ())
+            stack.extend(q.bool.filter or ())
+        elif isinstance(q, RangeQuery) and field in q.range:
+            ops = q.range[field]
+            for bound, up in ((ops.gte, False), (ops.gt, True)):
+                v = resolve_bound(bound, now_ms, ops.time_zone, up, ops.format)
+                if v is not None:
+                    lo = v if lo is None else max(lo, v)
+            for bound, up in ((ops.lte, True), (ops.lt, False)):
+                v = resolve_bound(bound, now_ms, ops.time_zone, up, ops.format)
+                if v is not None:
+                    hi = v if hi is None else min(hi, v)
+    return lo, hi
+
+
+def _apply_bounds(
+    lo: float | None,
+    hi: float | None,
+    extended: dict[str, Any] | None,
+    hard: dict[str, Any] | None,
+    now_ms: float,
+) -> tuple[float | None, float | None]:
+    if extended:
+        e_lo, e_hi = resolve_bound(extended.get("min"), now_ms), resolve_bound(extended.get("max"), now_ms)
+        lo = e_lo if lo is None or (e_lo is not None and e_lo < lo) else lo
+        hi = e_hi if hi is None or (e_hi is not None and e_hi > hi) else hi
+    if hard:
+        h_lo, h_hi = resolve_bound(hard.get("min"), now_ms), resolve_bound(hard.get("max"), now_ms)
+        lo = h_lo if lo is None or (h_lo is not None and h_lo > lo) else lo
+        hi = h_hi if hi is None or (h_hi is not None and h_hi < hi) else hi
+    return lo, hi
+
+
+def _span_buckets(lo: float | None, hi: float | None, interval: float | None, unbounded: int) -> int:
+    if lo is None or hi is None or not interval or interval <= 0:
+        return unbounded
+    if hi < lo:
+        return 0
+    return math.floor((hi - lo) / interval) + 1
+
+
+def date_histogram_interval_ms(agg: DateHistogramAgg) -> int | None:
+    """Interval length in ms (shortest calendar length for calendar intervals)."""
+    from datemath import parse_interval
+
+    try:
+        if agg.fixed_interval:
+            return parse_interval(agg.fixed_interval, calendar=False).min_length_ms
+        return parse_interval(agg.calendar_interval or "", calendar=True).min_length_ms
+    except ValueError:
+        return None
+
+
+def node_bucket_count(
+    node: Aggregation,
+    query: Any = None,
+    now_ms: float | None = None,
+    unbounded: int = UNBOUNDED_HISTOGRAM_BUCKETS,
+) -> int:
+    """
+    Worst-case buckets produced by ONE node per parent bucket (0 for metrics).
+
+    A date range with no upper bound ends at `now_ms` (nothing newer is
+    indexed); a histogram whose window still cannot be derived counts as
+    `unbounded` buckets.
+    """
+    now_ms = _now_ms() if now_ms is None else now_ms
+    if node.terms is not None:
+        return node.terms.size if node.terms.size is not None else DEFAULT_TERMS_SIZE
+    if node.range is not None:
+        return len(node.range.ranges)
+    if node.filters is not None:
+        return len(node.filters.filters)
+    if node.composite is not None:  # one page; later pages are separate requests
+        return node.composite.size if node.composite.size is not None else DEFAULT_COMPOSITE_SIZE
+    if node.date_histogram is not None:
+        dh = node.date_histogram
+        lo, hi = query_window(query, dh.field, now_ms)
+        if lo is not None and hi is None:
+            hi = max(lo, now_ms)
+        lo, hi = _apply_bounds(lo, hi, dh.extended_bounds, dh.hard_bounds, now_ms)
+        return _span_buckets(lo, hi, date_histogram_interval_ms(dh), unbounded)
+    if node.histogram is not None:
+        h = node.histogram
+        lo, hi = query_window(query, h.field, now_ms)
+        lo, hi = _apply_bounds(lo, hi, h.extended_bounds, h.hard_bounds, now_ms)
+        return _span_buckets(lo, hi, h.interval, unbounded)
+    return 0
+
+
+def estimate_total_buckets(
+    aggs: dict[str, Aggregation] | None,
+    query: Any = None,
+    now_ms: float | None = None,
+    unbounded: int = UNBOUNDED_HISTOGRAM_BUCKETS,
+) -> int:
+    """
+    Static worst-case bucket count for an `aggs` tree.
+
+    Every bucket node multiplies its parent's bucket count; the total is the
+    sum over all bucket nodes, e.g. terms(1000) -> date_histogram(1h over 7d)
+    -> terms(10) gives 1000 + 1000*169 + 1000*169*10. Date/numeric histogram
+    windows come from required `range` clauses in `query` plus
+    extended/hard bounds; windows that cannot be derived count as `unbounded`
+    (pass 1 for the buckets the request provably produces).
+    """
+    now_ms = _now_ms() if now_ms is None else now_ms
+    total = 0
+    stack = [(node, 1) for node in (aggs or {}).values()]
+    while stack:
+        node, parent_buckets = stack.pop()
+        n = node_bucket_count(node, query, now_ms, unbounded)
+        buckets = parent_buckets * n if n else parent_buckets
+        if n:
+            total += buckets
+        stack.extend((child, buckets) for child in (node.aggs or {}).values())
+    return total
+
+
+def _coarsen(node: Aggregation) -> bool:
+    """Halve one node's bucket count in place; False if it cannot shrink."""
+    if node.terms is not None:
+        size = node.terms.size if node.terms.size is not None else DEFAULT_TERMS_SIZE
+        if size <= 1:
+            return False
+        node.terms.size = size // 2
+        return True
+    if node.composite is not None:  # smaller pages, same buckets overall
+        size = node.composite.size if node.composite.size is not None else DEFAULT_COMPOSITE_SIZE
+        if size <= 1:
+            return False
+        node.composite.size = size // 2
+        return True
+    if node.date_histogram is not None:
+        dh = node.date_histogram
+        if dh.fixed_interval:
+            m = _FIXED_INTERVAL_RE.match(dh.fixed_interval)
+            if not m:
+                return False
+            dh.fixed_interval = f"{int(m.group(1)) * 2}{m.group(2)}"
+            return True
+        coarser = _CALENDAR_COARSER.get(dh.calendar_interval or "")
+        if coarser is None:
+            return False
+        dh.calendar_interval = coarser
+        return True
+    if node.histogram is not None:
+        node.histogram.interval *= 2
+        return True
+    return False
+
+
+def _warn_guessed(total: int, budget: int) -> None:
+    warnings.warn(
+        f"Aggregations may produce up to {total} buckets (budget {budget}) if their "
+        f"unbounded histograms span {UNBOUNDED_HISTOGRAM_BUCKETS} buckets each; "
+        "add a range filter on the histogram field to bound them.",
+        BucketBudgetWarning,
+        stacklevel=3,
+    )
+
+
+def reduce_to_bucket_budget(
+    aggs: dict[str, Aggregation],
+    query: Any = None,
+    budget: int = MAX_TOTAL_BUCKETS,
+    now_ms: float | None = None,
+) -> dict[str, Aggregation]:
+    """
+    Copy of `aggs` shrunk until its worst-case bucket count fits `budget`
+    (`aggs` itself is left untouched).
+
+    Greedy: repeatedly halve the widest reducible node (terms size, histogram
+    interval, calendar interval step), so all levels shrink evenly instead of
+    collapsing the outermost one. Histograms without a derivable window are
+    left alone (coarsening does not change their guessed width); if only they
+    keep the tree over budget, it warns (BucketBudgetWarning). Raises
+    ValueError when range/filters nodes alone exceed the budget.
+    """
+    now_ms = _now_ms() if now_ms is None else now_ms
+    aggs = {name: node.model_copy(deep=True) for name, node in aggs.items()}
+    blocked: set[int] = set()
+    while True:
+        total = estimate_total_buckets(aggs, query, now_ms)
+        if total <= budget:
+            return aggs
+        width: dict[int, tuple[int, Aggregation]] = {}
+        stack = list(aggs.values())
+        while stack:
+            node = stack.pop()
+            n = node_bucket_count(node, query, now_ms, unbounded=0)
+            if n > 1 and id(node) not in blocked:
+                width[id(node)] = (n, node)
+            stack.extend((node.aggs or {}).values())
+        if not width and estimate_total_buckets(aggs, query, now_ms, unbounded=1) <= budget:
+            _warn_guessed(total, budget)
+            return aggs
+        if not width:
+            raise ValueError(
+                f"Aggregations may produce up to {total} buckets and cannot be reduced "
+                f"below the budget of {budget}."
+            )
+        _, target = max(width.values(), key=lambda item: item[0])
+        if not _coarsen(target):
+            blocked.add(id(target))
+
+
+def _enforce_bucket_budget(
+    aggs: dict[str, Aggregation],
+    query: Any,
+    context: dict[str, Any] | None,
+) -> dict[str, Aggregation]:
+    """
+    `aggs` if its worst-case bucket count fits the budget, else a reduced
+    copy ("reduce") or ValueError ("reject").
+
+    "reject" only rejects buckets the request provably produces: when the
+    excess comes from histograms without a derivable window (each guessed at
+    UNBOUNDED_HISTOGRAM_BUCKETS), it warns (BucketBudgetWarning) and accepts.
+
+    Validation context overrides: {"bucket_budget": int,
+    "bucket_policy": "reject" | "reduce", "now": datetime}.
+    """
+    context = context or {}
+    budget = context.get("bucket_budget", MAX_TOTAL_BUCKETS)
+    policy = context.get("bucket_policy", BUCKET_BUDGET_POLICY)
+    now = context.get("now")
+    now_ms = resolve_bound(now, 0.0) if now is not None else _now_ms()
+    total = estimate_total_buckets(aggs, query, now_ms)
+    if total <= budget:
+        return aggs
+    if policy == "reduce":
+        return reduce_to_bucket_budget(aggs, query, budget, now_ms)
+    known = estimate_total_buckets(aggs, query, now_ms, unbounded=1)
+    if known <= budget:
+        _warn_guessed(total, budget)
+        return aggs
+    raise ValueError(
+        f"Aggregations may produce up to {known} buckets (budget {budget}); "
+        "lower terms sizes, coarsen histogram intervals or narrow the time range."
+    )
+
+
+def _descendants(node: Aggregation) -> list[Aggregation]:
+    out, stack = [], list((node.aggs or {}).values())
+    while stack:
+        n = stack.pop()
+        out.append(n)
+        stack.extend((n.aggs or {}).values())
+    return out
+
+
+class AggregationsRoot(DslModel):
+    """
+    Top-level 'aggs' object with max nesting enforcement.
+    """
+    aggs: dict[str, Aggregation] = Field(default_factory=dict)
+
+    model_config = ConfigDict(extra="forbid")
+
+    @staticmethod
+    def _compute_depth(node: Aggregation, current: int = 1) -> int:
+        """
+        Depth of this node including itself; children add +1 (iterative walk),
+        except under sampler nodes, whose single bucket adds no level.
+        """
+        deepest = current
+        stack = [(node, current)]
+        while stack:
+            n, d = stack.pop()
+            if d > deepest:
+                deepest = d
+            if n.aggs:
+                step = 0 if n.is_sampler else 1
+                stack.extend((child, d + step) for child in n.aggs.values())
+        return deepest
+
+    @staticmethod
+    def _check_depth(aggs: dict[str, Aggregation]) -> None:
+        for name, agg in aggs.items():
+            depth = AggregationsRoot._compute_depth(agg, current=1)
+            if depth > MAX_AGG_NESTING:
+                raise ValueError(
+                    f"Aggregation '{name}' exceeds max nesting depth "
+                    f"{MAX_AGG_NESTING} (found depth {depth})."
+                )
+            for child in _descendants(agg):
+                if child.composite is not None:
+                    raise ValueError(
+                        f"Aggregation '{name}' nests a composite aggregation; "
+                        "composite is only allowed at the top level of `aggs`."
+                    )
+                if child.random_sampler is not None:
+                    raise ValueError(
+                        f"Aggregation '{name}' nests a random_sampler aggregation; "
+                        "random_sampler is only allowed at the top level of `aggs`."
+                    )
+
+    @model_validator(mode="after")
+    def _enforce_depth_limit(self, info: ValidationInfo) -> "AggregationsRoot":
+        self._check_depth(self.aggs)
+        # No query here, so histogram windows fall back to extended/hard bounds.
+        self.aggs = _enforce_bucket_budget(self.aggs, None, info.context)
+        return self
+
+
+# -----------------------------------------------------------------------------
+# Search request with aggregations
+# -----------------------------------------------------------------------------
+
+class SearchRequestWithAggs(SearchRequest):
+    """
+    `_search` request wrapper with optional aggregations.
+    """
+    aggs: dict[str, Aggregation] | None = Field(
+        default=None,
+        description="Top-level aggregations ('aggs' object)."
+    )
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    @model_validator(mode="after")
+    def _validate_tree(self, info: ValidationInfo) -> "SearchRequestWithAggs":
+        if self.aggs:
+            # Depth limit as in AggregationsRoot; per-node caps are enforced in the nodes.
+            AggregationsRoot._check_depth(self.aggs)
+            # Global budget needs the query: histogram windows come from its ranges.
+            self.aggs = _enforce_bucket_budget(self.aggs, self.query, info.context)
+        return self
+
+
+# -----------------------------------------------------------------------------
+# Client-side pipeline steps (computed over histogram responses, see postaggs)
+# -----------------------------------------------------------------------------
+
+MAX_PIPELINE_STEPS = 16
+MAX_MOVING_WINDOW = 500
+
+GapPolicy = Literal["skip", "insert_zeros"]
+_BUCKETS_PATH = (
+    "`_count`, `_key`, a sub-aggregation (`lat`, `lat.avg`, `lat[99.0]`, `level['error']>_count`) or an earlier step"
+)
+
+
+class DerivativeStep(DslModel):
+    """Difference to the previous bucket; `unit` (fixed interval, e.g. "1s") adds a per-unit `normalized_value`."""
+    buckets_path: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+    unit: str | None = None
+    gap_policy: GapPolicy | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class MovingAvgStep(DslModel):
+    """Mean (`simple`) or exponentially weighted mean (`ewma`) of the previous `window` buckets."""
+    buckets_path: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+    window: int = Field(..., ge=1, le=MAX_MOVING_WINDOW)
+    model: Literal["simple", "ewma"] | None = None
+    alpha: float | None = Field(None, gt=0, le=1, description="ewma weight of the newest bucket (default 0.3).")
+    shift: int | None = Field(None, ge=0, description="1 includes the current bucket (ES moving_fn `shift`).")
+    gap_policy: GapPolicy | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class CumulativeSumStep(DslModel):
+    buckets_path: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class BucketRatioStep(DslModel):
+    """numerator / denominator per bucket (bucket_script for ratios); `scale` 100 gives percent."""
+    numerator: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+    denominator: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+    scale: float | None = None
+    gap_policy: GapPolicy | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class RateOfChangeStep(DslModel):
+    """(x - previous) / |previous|; `scale` 100 gives percent change."""
+    buckets_path: str = Field(..., description=f"Series: {_BUCKETS_PATH}.")
+    scale: float | None = None
+    gap_policy: GapPolicy | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class PipelineStep(DslModel):
+    """One client-side pipeline step (exactly one kind)."""
+    derivative: DerivativeStep | None = None
+    moving_avg: MovingAvgStep | None = None
+    cumulative_sum: CumulativeSumStep | None = None
+    bucket_ratio: BucketRatioStep | None = None
+    rate_of_change: RateOfChangeStep | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _one_kind(self) -> "PipelineStep":
+        present = [name for name, val in self.__dict__.items() if val is not None]
+        if len(present) != 1:
+            raise ValueError(f"Each pipeline step must define exactly one kind (found {present or 'none'}).")
+        return self
+
+
+class ClientPipeline(DslModel):
+    """
+    Pipeline aggregations computed client-side over a histogram response,
+    instead of Elasticsearch pipeline aggs (no extra cluster load).
+
+    JSON shape:
+      {"histogram": "per_service>per_hour",
+       "steps": {"error_rate": {"bucket_ratio": {"numerator": "level['error']>_count", "denominator": "_count"}},
+                 "trend": {"moving_avg": {"buckets_path": "error_rate", "window": 6}}}}
+
+    LLM guidance:
+      - `histogram` names a `date_histogram`/`histogram` aggregation of the
+        request; `>` walks through parent bucket aggregations (every bucket).
+      - Steps run in order and may read earlier steps; results are added to
+        each histogram bucket as {"value": ...}.
+    """
+    histogram: str = Field(..., description="Path to a (date_)histogram aggregation: 'per_hour' or 'by_host>per_hour'.")
+    steps: dict[str, PipelineStep] = Field(..., min_length=1, max_length=MAX_PIPELINE_STEPS)
+
+    model_config = ConfigDict(extra="forbid")
+
+
+# -----------------------------------------------------------------------------
+# Optional: quick self-test when run directly
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    # Sanity: valid bool+aggs
+    q = BoolQuery(
+        bool=BoolBody(
+            must=[MatchQuery(match={"title": MatchFieldOptions(query="wind power", operator="and")})],
+            filter=[RangeQuery(range={"@timestamp": RangeOps(gte="now-7d/d", lt="now/d")})],
+            should=[TermQuery(term={"lang": "en"}), TermsQuery(terms={"category": ["energy", "climate"]})],
+            minimum_should_match=1,
+        )
+    )
+    req = SearchRequestWithAggs(
+        query=q,
+        size=10,
+        aggs={
+            "by_lang": Aggregation(
+                terms=TermsAgg(field="lang", size=10),
+                aggs={
+                    "per_day": Aggregation(
+                        date_histogram=DateHistogramAgg(field="@timestamp", calendar_interval="1d"),
+                        aggs={"bytes_stats": Aggregation(stats={"field": "bytes"})},
+                    )
+                },
+            )
+        },
+        **{"from": 0},
+    )
+    print(req.model_dump(by_alias=True, exclude_none=True))
@@ -0,0 +1,358 @@
+"""
+Core Query DSL models: leaf bodies, query containers, the recursive `bool`
+query and the `_search` request wrapper.
+
+Notes:
+  - Schemas are built on first use (`defer_build`); importing this module
+    only defines classes.
+  - The recursive `Query` union starts as a string alias (so `BoolBody` can
+    refer to it) and is rebound to the union once `BoolQuery` is defined;
+    both resolve to the same type when the schemas are first built.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from itertools import pairwise
+from typing import Any, Literal, TypeAlias
+
+from pydantic import ConfigDict, Field, ValidationInfo, model_validator
+
+from dsl_models._base import DslModel
+
+
+# -----------------------------------------------------------------------------
+# Shared scalar type
+# -----------------------------------------------------------------------------
+
+JsonScalar = str | int | float | bool | date | datetime
+
+MAX_TERMS_VALUES = 65_536  # ES `index.max_terms_count` default
+
+
+# -----------------------------------------------------------------------------
+# Leaf query bodies
+# -----------------------------------------------------------------------------
+
+class MatchFieldOptions(DslModel):
+    """
+    Options for a single field in a `match` query.
+
+    LLM guidance:
+      - Use when you need per-field controls like `operator` or `fuzziness`.
+      - Example shape: {"match": {"<field>": {"query": "...", "operator": "and"}}}
+    """
+    query: JsonScalar = Field(..., description="Analyzed input to match against this field.")
+    operator: Literal["and", "or"] | None = Field(
+        None, description="Logical operator between analyzed terms."
+    )
+    minimum_should_match: int | str | None = Field(
+        None, description='Minimum number/percent of terms required, e.g. 2 or "75%".'
+    )
+    fuzziness: int | Literal["AUTO"] | None = Field(
+        None, description='Allowed edit distance; e.g. "AUTO", 1, 2.'
+    )
+    prefix_length: int | None = Field(
+        None, description="Number of initial characters exempt from fuzziness."
+    )
+    max_expansions: int | None = Field(
+        None, description="Upper bound on term variations generated by fuzziness."
+    )
+    analyzer: str | None = Field(None, description="Override analyzer for this query.")
+    boost: float | None = Field(None, description="Score multiplier for this clause.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class TermValue(DslModel):
+    """
+    Verbose object form for a `term` query value (when you need a boost).
+
+    LLM guidance:
+      - Compact: {"term": {"status": "active"}}
+      - Verbose: {"term": {"status": {"value": "active", "boost": 2.0}}}
+    """
+    value: JsonScalar = Field(..., description="Exact (non-analyzed) value to match.")
+    boost: float | None = Field(None, description="Score multiplier for this term.")
+    model_config = ConfigDict(extra="forbid")
+
+
+class RangeOps(DslModel):
+    """
+    Range operators for a single field in a `range` query.
+
+    LLM guidance:
+      - Use ISO datetimes or date math (e.g., 'now-7d/d') for time fields.
+      - Example: {"range": {"@timestamp": {"gte": "now-7d/d", "lt": "now/d"}}}
+    """
+    gte: JsonScalar | None = Field(None, description="Greater than or equal.")
+    gt: JsonScalar | None = Field(None, description="Greater than (strict).")
+    lte: JsonScalar | None = Field(None, description="Less than or equal.")
+    lt: JsonScalar | None = Field(None, description="Less than (strict).")
+    format: str | None = Field(None, description="Date format string for parsing inputs.")
+    time_zone: str | None = Field(None, description="Time zone used when parsing dates.")
+    boost: float | None = Field(None, description="Score multiplier for this range.")
+    model_config = ConfigDict(extra="forbid")
+
+
+# -----------------------------------------------------------------------------
+# Query containers (each is a one-key object matching ES DSL)
+# -----------------------------------------------------------------------------
+
+class MatchQuery(DslModel):
+    """
+    Container for a `match` query (single-field full-text).
+
+    JSON shape:
+      {"match": {"<field>": <text or MatchFieldOptions>}}
+
+    LLM usage:
+      - Default choice for full-text search on one field.
+      - For multi-field text, prefer `MultiMatchQuery`.
+    """
+    match: dict[str, JsonScalar | MatchFieldOptions] = Field(
+        ..., description="Map of one field name to its match value/options."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+class MultiMatchQuery(DslModel):
+    """
+    Container for a `multi_match` query (full-text across multiple fields).
+
+    JSON shape:
+      {"multi_match": {"query": "...", "fields": ["title^2","body"], "type": "best_fields"}}
+
+    LLM usage:
+      - Use for multi-field text; boost via '^' (e.g., 'title^2').
+      - `type`: best_fields | most_fields | cross_fields | phrase | phrase_prefix.
+    """
+    multi_match: dict[str, Any] = Field(
+        ..., description="Options for the multi_match query (query, fields, type, etc.)."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+    @classmethod
+    def build(
+        cls,
+        query: str,
+        fields: list[str],
+        type: Literal["best_fields", "most_fields", "cross_fields", "phrase", "phrase_prefix"] | None = None,
+        tie_breaker: float | None = None,
+        operator: Literal["and", "or"] | None = None,
+        minimum_should_match: int | str | None = None,
+        boost: float | None = None,
+        **kwargs: Any,
+    ) -> MultiMatchQuery:
+        """Convenience builder that sets only provided keys (keeps JSON clean)."""
+        payload: dict[str, Any] = {"query": query, "fields": fields}
+        if type is not None:
+            payload["type"] = type
+        if tie_breaker is not None:
+            payload["tie_breaker"] = tie_breaker
+        if operator is not None:
+            payload["operator"] = operator
+        if minimum_should_match is not None:
+            payload["minimum_should_match"] = minimum_should_match
+        if boost is not None:
+            payload["boost"] = boost
+        payload.update(kwargs)
+        return cls(multi_match=payload)
+
+
+class TermQuery(DslModel):
+    """
+    Container for a `term` query (exact match on a single field).
+
+    JSON shapes:
+      Compact: {"term": {"status": "active"}}
+      Verbose: {"term": {"status": {"value": "active", "boost": 2.0}}}
+
+    LLM usage:
+      - Use for keyword/numeric/boolean/date fields (non-analyzed exact).
+    """
+    term: dict[str, JsonScalar | TermValue] = Field(
+        ..., description="Map of one field name to an exact value or TermValue object."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+class TermsLookup(DslModel):
+    """
+    Terms lookup: fetch the value list from a field of a stored document.
+
+    JSON shape:
+      {"terms": {"host.name": {"index": "lookups", "id": "q-42", "path": "values"}}}
+    """
+    index: str = Field(..., description="Index holding the lookup document.")
+    id: str = Field(..., description="ID of the lookup document.")
+    path: str = Field(..., description="Field of the lookup document that holds the values.")
+    routing: str | None = Field(None, description="Custom routing of the lookup document.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+def _term_sort_key(value: JsonScalar) -> tuple[int, Any]:
+    """Equality/sort key across mixed scalar types (1 and 1.0 are one term)."""
+    if isinstance(value, bool):
+        return 0, value
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    return 3, value.isoformat()
+
+
+class TermsQuery(DslModel):
+    """
+    Container for a `terms` query (IN-list exact match).
+
+    JSON shape:
+      {"terms": {"status": ["draft", "published"]}}
+
+    Notes:
+      - Values are deduplicated and sorted, so equal IN-lists produce equal
+        bodies (cache keys) and the cluster expands each term once.
+      - At most MAX_TERMS_VALUES values (validation context "max_terms"
+        overrides); larger lists are split or rewritten by `largeterms`.
+    """
+    terms: dict[str, list[JsonScalar] | TermsLookup] = Field(
+        ..., description="Map of one field name to a list of allowed values (or a terms lookup)."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _dedupe_and_cap(self, info: ValidationInfo) -> "TermsQuery":
+        limit = (info.context or {}).get("max_terms", MAX_TERMS_VALUES)
+        for field, values in self.terms.items():
+            if isinstance(values, TermsLookup):
+                continue
+            kinds = {type(v) for v in values}
+            if kinds <= {str} or kinds <= {int, float}:
+                # homogeneous lists (the common case) compare natively, no per-value keys
+                if not all(a < b for a, b in pairwise(values)):
+                    values = self.terms[field] = sorted(set(values))
+            else:
+                unique: dict[tuple[int, Any], JsonScalar] = {}
+                for v in values:
+                    unique.setdefault(_term_sort_key(v), v)
+                values = self.terms[field] = [unique[k] for k in sorted(unique)]
+            if len(values) > limit:
+                raise ValueError(
+                    f"terms on '{field}' has {len(values)} distinct values (max {limit}); "
+                    "use largeterms.run_large_terms to chunk the query or a terms lookup."
+                )
+        return self
+
+
+class RangeQuery(DslModel):
+    """
+    Container for a `range` query.
+
+    JSON shape:
+      {"range": {"timestamp": {"gte": "2025-01-01", "lt": "2026-01-01"}}}
+    """
+    range: dict[str, RangeOps] = Field(
+        ..., description="Map of one field name to RangeOps operators."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+class ExistsQuery(DslModel):
+    """
+    Container for an `exists` query (documents where a field is present).
+
+    JSON shape:
+      {"exists": {"field": "author"}}
+    """
+    exists: dict[Literal["field"], str] = Field(
+        ..., description='Object with key "field" naming the field that must exist.'
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+class MatchAllQuery(DslModel):
+    """
+    Container for a `match_all` query (matches every document).
+
+    JSON shapes:
+      {"match_all": {}}
+      {"match_all": {"boost": 1.2}}
+    """
+    match_all: dict[str, Any] = Field(
+        default_factory=dict, description="Optional object; may contain 'boost'."
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+class IdsQuery(DslModel):
+    """
+    Container for an `ids` query (match by document IDs).
+
+    JSON shape:
+      {"ids": {"values": ["1","2","3"]}}
+    """
+    ids: dict[Literal["values"], list[str]] = Field(
+        ..., description='Object with key "values" listing document IDs.'
+    )
+    model_config = ConfigDict(extra="forbid")
+
+
+# -----------------------------------------------------------------------------
+# Declare the forward-ref union as a STRING TypeAlias (resolved lazily)
+# -----------------------------------------------------------------------------
+
+Query: TypeAlias = (
+    "MatchQuery | MultiMatchQuery | TermQuery | TermsQuery | "
+    "RangeQuery | ExistsQuery | MatchAllQuery | IdsQuery | BoolQuery"
+)
+
+
+# -----------------------------------------------------------------------------
+# Recursive bool query (uses the forward-ref "Query")
+# -----------------------------------------------------------------------------
+
+class BoolBody(DslModel):
+    """
+    Inner body for a `bool` query. Combines other queries using boolean logic.
+    """
+    must: list[Query] | None = Field(None, description="All must match; contributes to score.")
+    filter: list[Query] | None = Field(None, description="All must match; does NOT affect score.")
+    should: list[Query] | None = Field(None, description="Optional; affects score unless minimum_should_match is set.")
+    must_not: list[Query] | None = Field(None, description="Documents must NOT match these.")
+    minimum_should_match: int | str | None = Field(
+        None, description='Minimum number/percent of `should` clauses that must match, e.g. 1 or "75%".'
+    )
+    boost: float | None = Field(None, description="Score multiplier for the bool query as a whole.")
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class BoolQuery(DslModel):
+    """
+    Container for a `bool` query.
+    """
+    bool: BoolBody = Field(..., description="Boolean composition of other queries.")
+    model_config = ConfigDict(extra="forbid")
+
+
+# Every member exists now: rebind the alias to the union itself, so annotations
+# importing `Query` from other modules (dsl_models.aggs) resolve without the
+# member names in their own namespace.
+Query = (
+    MatchQuery | MultiMatchQuery | TermQuery | TermsQuery
+    | RangeQuery | ExistsQuery | MatchAllQuery | IdsQuery | BoolQuery
+)
+
+
+# -----------------------------------------------------------------------------
+# Search request wrapper (base)
+# -----------------------------------------------------------------------------
+
+class SearchRequest(DslModel):
+    """
+    Minimal wrapper for the Elasticsearch `_search` request body.
+    """
+    query: Query = Field(..., description="A single Query DSL container (match, bool, range, etc.).")
+    size: int | None = Field(None, description="Maximum number of hits to return.")
+    from_: int | None = Field(default=None, alias="from", description="Offset for pagination (use with `size`).")
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
@@ -0,0 +1,477 @@
+"""
+Hypothesis strategies for `_search` payloads (`SearchRequestWithAggs` JSON).
+
+Valid payloads stay inside every model limit: per-node bucket caps
+(MAX_BUCKETS), MAX_AGG_NESTING and the global bucket budget
+(MAX_TOTAL_BUCKETS, estimated as in `estimate_total_buckets`). They are
+generated in canonical form (sorted, distinct `terms` values; no nulls), so
+validating and dumping one gives the payload back.
+
+Invalid payloads are a valid payload plus ONE targeted mutation; the rule
+name maps to a fragment of the expected validation message (INVALID_RULES).
+
+Usage:
+  @given(search_requests())
+  def test_round_trip(payload): ...
+
+  @given(invalid_search_requests())
+  def test_rejected(case):
+      rule, payload = case
+      ...
+
+  sample_payloads(200)       # deterministic corpus for throughput benchmarks
+"""
+from __future__ import annotations
+
+import copy
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from hypothesis import HealthCheck, Phase, given, settings
+from hypothesis import strategies as st
+
+from dsl_models import MAX_AGG_NESTING, MAX_BUCKETS, MAX_TERMS_VALUES
+from dsl_models.aggs import (
+    DEFAULT_COMPOSITE_SIZE,
+    DEFAULT_TERMS_SIZE,
+    MAX_SAMPLING_PROBABILITY,
+    MAX_TDIGEST_COMPRESSION,
+    MAX_TOTAL_BUCKETS,
+)
+
+
+KEYWORD_FIELDS = ("service.name", "log.level", "host.name", "env", "http.request.method")
+TEXT_FIELDS = ("message", "error.message", "title")
+NUMERIC_FIELDS = ("http.response.status_code", "event.duration", "bytes")
+DATE_FIELD = "@timestamp"
+DATE_MATH = ("now", "now-15m", "now-1h", "now-7d/d", "now/d", "2025-01-01T00:00:00Z", "2025-03-01")
+HISTOGRAM_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+MAX_LEAVES = 12  # query leaves per generated `bool` tree
+MAX_SIBLINGS = 3  # sibling aggregations per level
+METRIC_KINDS = ("avg", "sum", "min", "max", "stats", "cardinality")
+
+INVALID_RULES = {
+    "terms_agg_size_over_cap": "terms.size must be <=",
+    "range_agg_over_cap": "range.ranges length must be <=",
+    "filters_agg_over_cap": "named filters",
+    "date_histogram_two_intervals": "exactly one of calendar_interval or fixed_interval",
+    "date_histogram_no_interval": "exactly one of calendar_interval or fixed_interval",
+    "two_agg_types": "exactly one aggregation type",
+    "empty_agg_node": "exactly one aggregation type",
+    "nesting_too_deep": "exceeds max nesting depth",
+    "bucket_budget_exceeded": "buckets (budget",
+    "terms_query_over_cap": "distinct values (max",
+    "unknown_key": "Extra inputs are not permitted",
+    "bad_size": "valid integer",
+    "nested_composite": "composite is only allowed at the top level",
+    "nested_random_sampler": "random_sampler is only allowed at the top level",
+    "sampler_without_aggs": "needs sub-aggregations",
+    "random_sampler_bad_probability": "random_sampler.probability must be",
+    "percent_out_of_range": "percents must be between 0 and 100",
+    "two_percentiles_methods": "at most one of tdigest or hdr",
+}
+
+
+# -----------------------------------------------------------------------------
+# Scalars
+# -----------------------------------------------------------------------------
+
+words = st.text(alphabet="abcdefghijklmnopqrstuvwxyz", min_size=1, max_size=10)
+texts = st.lists(words, min_size=1, max_size=4).map(" ".join)
+ints = st.integers(min_value=-(2**31), max_value=2**31)
+boosts = st.floats(min_value=0.1, max_value=10.0, allow_nan=False).map(lambda f: round(f, 2))
+names = st.text(alphabet="abcdefghijklmnopqrstuvwxyz_", min_size=1, max_size=8)
+
+
+def _optional(payload: dict[str, Any], draw: Any, key: str, strategy: st.SearchStrategy) -> None:
+    if draw(st.booleans()):
+        payload[key] = draw(strategy)
+
+
+# -----------------------------------------------------------------------------
+# Query leaves and bool trees
+# -----------------------------------------------------------------------------
+
+@st.composite
+def match_queries(draw: Any) -> dict[str, Any]:
+    field = draw(st.sampled_from(TEXT_FIELDS))
+    if draw(st.booleans()):
+        return {"match": {field: draw(texts)}}
+    options: dict[str, Any] = {"query": draw(texts)}
+    _optional(options, draw, "operator", st.sampled_from(["and", "or"]))
+    _optional(options, draw, "fuzziness", st.sampled_from(["AUTO", 1, 2]))
+    _optional(options, draw, "minimum_should_match", st.sampled_from([1, 2, "75%"]))
+    _optional(options, draw, "boost", boosts)
+    return {"match": {field: options}}
+
+
+@st.composite
+def multi_match_queries(draw: Any) -> dict[str, Any]:
+    fields = draw(st.lists(st.sampled_from(TEXT_FIELDS), min_size=1, max_size=3, unique=True))
+    body: dict[str, Any] = {"query": draw(texts), "fields": [f"{f}^{draw(st.integers(1, 3))}" for f in fields]}
+    _optional(body, draw, "type", st.sampled_from(["best_fields", "most_fields", "cross_fields", "phrase"]))
+    return {"multi_match": body}
+
+
+@st.composite
+def term_queries(draw: Any) -> dict[str, Any]:
+    field = draw(st.sampled_from(KEYWORD_FIELDS + NUMERIC_FIELDS))
+    value = draw(words if field in KEYWORD_FIELDS else ints)
+    if draw(st.booleans()):
+        return {"term": {field: value}}
+    return {"term": {field: {"value": value, "boost": draw(boosts)}}}
+
+
+@st.composite
+def terms_queries(draw: Any, max_values: int = 8) -> dict[str, Any]:
+    field = draw(st.sampled_from(KEYWORD_FIELDS))
+    values = draw(st.lists(words, min_size=1, max_size=max_values, unique=True))
+    return {"terms": {field: sorted(values)}}
+
+
+@st.composite
+def range_queries(draw: Any) -> dict[str, Any]:
+    if draw(st.booleans()):
+        field, bound = DATE_FIELD, st.sampled_from(DATE_MATH)
+    else:
+        field, bound = draw(st.sampled_from(NUMERIC_FIELDS)), ints
+    ops: dict[str, Any] = {}
+    _optional(ops, draw, draw(st.sampled_from(["gte", "gt"])), bound)
+    _optional(ops, draw, draw(st.sampled_from(["lte", "lt"])), bound)
+    if not ops:
+        ops["gte"] = draw(bound)
+    if field == DATE_FIELD:
+        _optional(ops, draw, "time_zone", st.sampled_from(["UTC", "+02:00", "Europe/Paris"]))
+    return {"range": {field: ops}}
+
+
+leaf_queries = st.one_of(
+    match_queries(),
+    multi_match_queries(),
+    term_queries(),
+    terms_queries(),
+    range_queries(),
+    st.sampled_from(KEYWORD_FIELDS + NUMERIC_FIELDS).map(lambda f: {"exists": {"field": f}}),
+    st.just({"match_all": {}}),
+    st.lists(words, min_size=1, max_size=5).map(lambda ids: {"ids": {"values": ids}}),
+)
+
+
+@st.composite
+def _bool_of(draw: Any, children: st.SearchStrategy) -> dict[str, Any]:
+    clauses = st.lists(children, min_size=1, max_size=4)
+    body: dict[str, Any] = {}
+    for occur in ("must", "filter", "should", "must_not"):
+        _optional(body, draw, occur, clauses)
+    if not body:
+        body["filter"] = draw(clauses)
+    if "should" in body:
+        _optional(body, draw, "minimum_should_match", st.integers(0, len(body["should"])))
+    _optional(body, draw, "boost", boosts)
+    return {"bool": body}
+
+
+def queries(max_leaves: int = MAX_LEAVES) -> st.SearchStrategy[dict[str, Any]]:
+    """Any Query DSL container; `bool` trees nest arbitrarily up to `max_leaves` leaves."""
+    return st.recursive(leaf_queries, lambda children: _bool_of(children), max_leaves=max_leaves)
+
+
+# -----------------------------------------------------------------------------
+# Aggregation trees (budget-aware)
+# -----------------------------------------------------------------------------
+
+@st.composite
+def _percentiles_node(draw: Any) -> dict[str, Any]:
+    body: dict[str, Any] = {"field": draw(st.sampled_from(NUMERIC_FIELDS))}
+    kind = draw(st.sampled_from(["percentiles", "percentile_ranks"]))
+    points = st.lists(st.floats(0, 100), min_size=1, max_size=8)
+    if kind == "percentiles":
+        _optional(body, draw, "percents", points)
+    else:
+        body["values"] = draw(points)
+    _optional(body, draw, "keyed", st.booleans())
+    method = draw(st.sampled_from([None, "tdigest", "hdr"]))
+    if method == "tdigest":
+        body["tdigest"] = {}
+        _optional(body["tdigest"], draw, "compression", st.integers(1, MAX_TDIGEST_COMPRESSION))
+    elif method == "hdr":
+        body["hdr"] = {}
+        _optional(body["hdr"], draw, "number_of_significant_value_digits", st.integers(0, 5))
+    return {kind: body}
+
+
+@st.composite
+def _metric_node(draw: Any) -> dict[str, Any]:
+    if draw(st.integers(0, 4)) == 0:
+        return draw(_percentiles_node())
+    field = draw(st.sampled_from(NUMERIC_FIELDS + KEYWORD_FIELDS))
+    kind = draw(st.sampled_from(METRIC_KINDS))
+    if kind == "cardinality":
+        body: dict[str, Any] = {"field": field}
+        _optional(body, draw, "precision_threshold", st.integers(1, 40_000))
+        return {kind: body}
+    return {kind: {"field": field}}
+
+
+@st.composite
+def _composite_source(draw: Any) -> dict[str, Any]:
+    kind = draw(st.sampled_from(["terms", "histogram", "date_histogram"]))
+    if kind == "terms":
+        body: dict[str, Any] = {"field": draw(st.sampled_from(KEYWORD_FIELDS))}
+    elif kind == "histogram":
+        body = {"field": draw(st.sampled_from(NUMERIC_FIELDS)), "interval": draw(st.integers(1, 1000))}
+    else:
+        body = {"field": DATE_FIELD, "fixed_interval": f"{draw(st.sampled_from([1, 6, 24]))}h"}
+    _optional(body, draw, "order", st.sampled_from(["asc", "desc"]))
+    _optional(body, draw, "missing_bucket", st.booleans())
+    return {kind: body}
+
+
+@st.composite
+def _bucket_node(draw: Any, buckets: int, top_level: bool = False) -> dict[str, Any]:
+    """A bucket aggregation whose worst-case bucket count is exactly `buckets`."""
+    kinds = ["terms", "histogram", "date_histogram"]
+    if top_level:
+        kinds.append("composite")
+    if buckets <= 50:
+        kinds.append("range")
+    if buckets <= 8:
+        kinds.append("filters")
+    kind = draw(st.sampled_from(kinds))
+    if kind == "terms":
+        body: dict[str, Any] = {"field": draw(st.sampled_from(KEYWORD_FIELDS))}
+        if buckets != DEFAULT_TERMS_SIZE or draw(st.booleans()):
+            body["size"] = buckets
+        _optional(body, draw, "min_doc_count", st.integers(0, 5))
+        _optional(body, draw, "order", st.sampled_from([{"_count": "desc"}, {"_key": "asc"}]))
+        return {"terms": body}
+    if kind == "composite":
+        keys = draw(st.lists(names, min_size=1, max_size=3, unique=True))
+        body = {"sources": [{k: draw(_composite_source())} for k in keys]}
+        if buckets != DEFAULT_COMPOSITE_SIZE or draw(st.booleans()):
+            body["size"] = buckets
+        return {"composite": body}
+    if kind == "range":
+        edges = sorted(draw(st.lists(ints, min_size=buckets + 1, max_size=buckets + 1, unique=True)))
+        ranges = [{"from": lo, "to": hi} for lo, hi in zip(edges, edges[1:])]
+        return {"range": {"field": draw(st.sampled_from(NUMERIC_FIELDS)), "ranges": ranges}}
+    if kind == "filters":
+        keys = draw(st.lists(names, min_size=buckets, max_size=buckets, unique=True))
+        return {"filters": {"filters": {k: draw(queries(max_leaves=3)) for k in keys}}}
+    if kind == "histogram":
+        interval = draw(st.integers(1, 1000))
+        lo = draw(st.integers(-10_000, 10_000))
+        body = {
+            "field": draw(st.sampled_from(NUMERIC_FIELDS)),
+            "interval": interval,
+            "hard_bounds": {"min": lo, "max": lo + interval * (buckets - 1)},
+        }
+        _optional(body, draw, "min_doc_count", st.integers(0, 5))
+        return {"histogram": body}
+    hours = draw(st.sampled_from([1, 3, 6, 12, 24]))
+    body = {"field": DATE_FIELD}
+    span_hours = hours
+    if hours == 24 and draw(st.booleans()):
+        body["calendar_interval"] = draw(st.sampled_from(["1d", "day"]))
+        span_hours = 23  # the estimate counts calendar days at their shortest (DST) length
+    else:
+        body["fixed_interval"] = f"{hours}h"
+    start = HISTOGRAM_EPOCH + timedelta(days=draw(st.integers(0, 365)))
+    end = start + timedelta(hours=span_hours * (buckets - 1))
+    body["hard_bounds"] = {"min": start.strftime("%Y-%m-%dT%H:%M:%SZ"), "max": end.strftime("%Y-%m-%dT%H:%M:%SZ")}
+    _optional(body, draw, "time_zone", st.sampled_from(["UTC", "Europe/Paris"]))
+    return {"date_histogram": body}
+
+
+@st.composite
+def _sampler_node(draw: Any, depth: int, budget: int) -> dict[str, Any]:
+    """A sampler around a sub-map at the same depth (samplers add no nesting or buckets)."""
+    if depth == 1 and draw(st.booleans()):
+        probability = draw(st.one_of(
+            st.just("auto"), st.just(1), st.floats(1e-6, MAX_SAMPLING_PROBABILITY, allow_subnormal=False)
+        ))
+        body: dict[str, Any] = {"probability": probability}
+        _optional(body, draw, "seed", st.integers(0, 2**31 - 1))
+        node = {"random_sampler": body}
+    else:
+        body = {}
+        _optional(body, draw, "shard_size", st.integers(1, 5000))
+        node = {"sampler": body}
+    node["aggs"] = draw(_agg_map(depth, budget, in_sampler=True))
+    return node
+
+
+@st.composite
+def _agg_node(draw: Any, depth: int, budget: int, in_sampler: bool = False) -> dict[str, Any]:
+    """`budget` = buckets this node (and its subtree) may add per parent bucket."""
+    if not in_sampler and draw(st.integers(0, 9)) == 0:
+        return draw(_sampler_node(depth, budget))
+    if budget < 1 or draw(st.integers(0, 2)) == 0:
+        return draw(_metric_node())
+    buckets = draw(st.integers(1, min(budget, MAX_BUCKETS)))
+    node = draw(_bucket_node(buckets, top_level=depth == 1 and not in_sampler))
+    if depth < MAX_AGG_NESTING and draw(st.booleans()):
+        node["aggs"] = draw(_agg_map(depth + 1, (budget - buckets) // buckets))
+    return node
+
+
+@st.composite
+def _agg_map(draw: Any, depth: int, budget: int, in_sampler: bool = False) -> dict[str, Any]:
+    keys = draw(st.lists(names, min_size=1, max_size=MAX_SIBLINGS, unique=True))
+    share = budget // len(keys)
+    return {k: draw(_agg_node(depth, share, in_sampler)) for k in keys}
+
+
+def aggregations(budget: int = MAX_TOTAL_BUCKETS) -> st.SearchStrategy[dict[str, Any]]:
+    """An `aggs` map within MAX_AGG_NESTING, MAX_BUCKETS and `budget` total buckets."""
+    return _agg_map(1, budget)
+
+
+# -----------------------------------------------------------------------------
+# Whole requests
+# -----------------------------------------------------------------------------
+
+@st.composite
+def search_requests(draw: Any, with_aggs: bool | None = None, max_leaves: int = MAX_LEAVES) -> dict[str, Any]:
+    """Valid `SearchRequestWithAggs` payloads (`with_aggs=None`: sometimes)."""
+    payload: dict[str, Any] = {"query": draw(queries(max_leaves))}
+    _optional(payload, draw, "size", st.integers(0, 500))
+    _optional(payload, draw, "from", st.integers(0, 10_000))
+    if with_aggs or (with_aggs is None and draw(st.booleans())):
+        payload["aggs"] = draw(aggregations())
+    return payload
+
+
+def _agg_nodes(aggs: dict[str, Any]) -> list[dict[str, Any]]:
+    out, stack = [], list(aggs.values())
+    while stack:
+        node = stack.pop()
+        out.append(node)
+        stack.extend((node.get("aggs") or {}).values())
+    return out
+
+
+def _chain(depth: int) -> dict[str, Any]:
+    node: dict[str, Any] = {"terms": {"field": "env", "size": 1}}
+    for _ in range(depth - 1):
+        node = {"terms": {"field": "env", "size": 1}, "aggs": {"deeper": node}}
+    return node
+
+
+@st.composite
+def invalid_search_requests(draw: Any, rules: tuple[str, ...] = tuple(INVALID_RULES)) -> tuple[str, dict[str, Any]]:
+    """(rule, payload): a valid payload broken by exactly one INVALID_RULES mutation."""
+    rule = draw(st.sampled_from(rules))
+    payload = copy.deepcopy(draw(search_requests(with_aggs=True, max_leaves=4)))
+    aggs = payload["aggs"]
+    node = draw(st.sampled_from(_agg_nodes(aggs)))
+    children = {"aggs": node["aggs"]} if "aggs" in node else {}
+    field = draw(st.sampled_from(KEYWORD_FIELDS))
+
+    if rule == "terms_agg_size_over_cap":
+        node.clear()
+        node["terms"] = {"field": field, "size": draw(st.integers(MAX_BUCKETS + 1, 10 * MAX_BUCKETS))}
+    elif rule == "range_agg_over_cap":
+        node.clear()
+        node["range"] = {"field": "bytes", "ranges": [{"to": i} for i in range(MAX_BUCKETS + 1)]}
+    elif rule == "filters_agg_over_cap":
+        node.clear()
+        node["filters"] = {"filters": {f"f{i}": {"match_all": {}} for i in range(MAX_BUCKETS + 1)}}
+    elif rule == "date_histogram_two_intervals":
+        node.clear()
+        node["date_histogram"] = {"field": DATE_FIELD, "calendar_interval": "1d", "fixed_interval": "1h"}
+        node.update(children)
+    elif rule == "date_histogram_no_interval":
+        node.clear()
+        node["date_histogram"] = {"field": DATE_FIELD}
+    elif rule == "two_agg_types":
+        kind = draw(st.sampled_from([k for k in METRIC_KINDS if k not in node]))
+        node[kind] = {"field": "bytes"}
+    elif rule == "empty_agg_node":
+        node.clear()
+        node.update(children)
+    elif rule == "nesting_too_deep":
+        aggs[f"deep_{draw(names)}"] = _chain(MAX_AGG_NESTING + 1)
+    elif rule == "bucket_budget_exceeded":
+        wide = MAX_BUCKETS
+        aggs[f"wide_{draw(names)}"] = {
+            "terms": {"field": field, "size": wide},
+            "aggs": {"inner": {"terms": {"field": field, "size": MAX_TOTAL_BUCKETS // wide + 1}}},
+        }
+    elif rule == "terms_query_over_cap":
+        payload["query"] = {"bool": {"must": [payload["query"]],
+                                     "filter": [{"terms": {field: list(range(MAX_TERMS_VALUES + 1))}}]}}
+    elif rule == "unknown_key":
+        kind = next(k for k in node if k != "aggs")
+        targets = ["request", "agg_node"] + ([] if kind in METRIC_KINDS else ["agg_body"])  # metric bodies are plain maps
+        target = draw(st.sampled_from(targets))
+        where = payload if target == "request" else node if target == "agg_node" else node[kind]
+        where[f"bogus_{draw(names)}"] = draw(st.one_of(ints, words))
+    elif rule == "nested_composite":
+        aggs[f"outer_{draw(names)}"] = {"terms": {"field": field, "size": 1}, "aggs": {"pages": {
+            "composite": {"size": 1, "sources": [{"k": {"terms": {"field": field}}}]}}}}
+    elif rule == "nested_random_sampler":
+        aggs[f"outer_{draw(names)}"] = {"terms": {"field": field, "size": 1}, "aggs": {"sample": {
+            "random_sampler": {"probability": "auto"}, "aggs": {"n": {"cardinality": {"field": field}}}}}}
+    elif rule == "sampler_without_aggs":
+        node.clear()
+        node.update(draw(st.sampled_from([{"sampler": {}}, {"random_sampler": {"probability": "auto"}}])))
+    elif rule == "random_sampler_bad_probability":
+        probability = draw(st.one_of(
+            st.floats(MAX_SAMPLING_PROBABILITY, 1, exclude_min=True, exclude_max=True),
+            st.floats(max_value=0),
+            st.floats(min_value=1, exclude_min=True),
+        ))
+        aggs[f"sample_{draw(names)}"] = {"random_sampler": {"probability": probability},
+                                         "aggs": {"n": {"cardinality": {"field": field}}}}
+    elif rule == "percent_out_of_range":
+        bad = draw(st.one_of(st.floats(max_value=0, exclude_max=True), st.floats(min_value=100, exclude_min=True)))
+        node.clear()
+        node["percentiles"] = {"field": "bytes", "percents": [50, bad]}
+    elif rule == "two_percentiles_methods":
+        node.clear()
+        node.update(draw(st.sampled_from([
+            {"percentiles": {"field": "bytes", "tdigest": {}, "hdr": {}}},
+            {"percentile_ranks": {"field": "bytes", "values": [100], "tdigest": {}, "hdr": {}}},
+        ])))
+    elif rule == "bad_size":
+        payload["size"] = draw(words)
+    else:
+        raise ValueError(f"Unknown mutation rule {rule!r}; expected one of {sorted(INVALID_RULES)}.")
+    return rule, payload
+
+
+# -----------------------------------------------------------------------------
+# Deterministic corpus
+# -----------------------------------------------------------------------------
+
+def sample_payloads(n: int = 200, with_aggs: bool | None = None) -> list[dict[str, Any]]:
+    """`n` valid payloads, identical across runs (derandomized, no example database)."""
+    out: list[dict[str, Any]] = []
+
+    @settings(max_examples=n, derandomize=True, database=None, deadline=None,
+              phases=[Phase.generate], suppress_health_check=list(HealthCheck))
+    @given(search_requests(with_aggs=with_aggs))
+    def collect(payload: dict[str, Any]) -> None:
+        out.append(payload)
+
+    collect()
+    return out[:n]
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    from dsl_models import SearchRequestWithAggs
+
+    corpus = sample_payloads(500)
+    t0 = time.perf_counter()
+    for p in corpus:
+        SearchRequestWithAggs.model_validate(p)
+    took = time.perf_counter() - t0
+    total = sum(len(json.dumps(p)) for p in corpus)
+    print(f"{len(corpus)} payloads, {total / 1024:.0f} KiB: {len(corpus) / took:,.0f} validations/s")
+    largest = max(corpus, key=lambda p: len(json.dumps(p)))
+    print(json.dumps(largest)[:400])
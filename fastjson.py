@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from datetime import date, datetime, time, timedelta
+from json.encoder import encode_basestring as _encode_str
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+
+# -----------------------------------------------------------------------------
+# Scalars (formatted exactly like pydantic-core's JSON serializer)
+# -----------------------------------------------------------------------------
+
+def _encode_float(v: float) -> str:
+    if not math.isfinite(v):
+        return "null"  # pydantic default: ser_json_inf_nan="null"
+    text = repr(v)
+    e = text.find("e")
+    if e < 0 or text[e + 1] == "+":
+        return text
+    exp = int(text[e + 1:])
+    mantissa = text[:e]
+    if exp < -5:
+        return f"{mantissa}e{exp}"
+    # 1e-05 -> 0.00001, 2.5e-05 -> 0.000025
+    sign = "-" if mantissa.startswith("-") else ""
+    digits = mantissa.lstrip("-").replace(".", "")
+    return f"{sign}0.{'0' * (-exp - 1)}{digits}"
+
+
+def _encode_datetime(v: datetime) -> str:
+    text = v.isoformat()
+    offset = v.utcoffset()
+    if offset is not None and not offset:
+        text = text[:-6] + "Z"
+    return f'"{text}"'
+
+
+# -----------------------------------------------------------------------------
+# Per-class serializers (generated once per model class)
+# -----------------------------------------------------------------------------
+
+Writer = Callable[[Any, list], None]
+_MODEL_WRITERS: dict[type, Writer] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def _compile_model(cls: type[BaseModel]) -> Writer:
+    """
+    Build `write(obj, out)` for `cls`: one straight-line block per field that
+    skips None, writes the by-alias key as a pre-encoded literal and recurses.
+    """
+    lines = ["def write(obj, out):", "    d = obj.__dict__", "    sep = '{'"]
+    for name, info in cls.model_fields.items():
+        key = info.serialization_alias or info.alias or name
+        literal = _encode_str(key) + ":"
+        lines += [
+            f"    v = d[{name!r}]",
+            "    if v is not None:",
+            "        t = type(v)",
+            "        if t is str:",
+            f"            out.append(sep + {literal!r} + _encode_str(v))",
+            "        elif t is int:",
+            f"            out.append(sep + {literal!r} + int.__repr__(v))",
+            "        elif t is bool:",
+            f"            out.append(sep + {literal!r} + ('true' if v else 'false'))",
+            "        else:",
+            f"            out.append(sep + {literal!r})",
+            "            _write(v, out)",
+            "        sep = ','",
+        ]
+    lines += ["    out.append('{}' if sep == '{' else '}')"]
+    namespace: dict[str, Any] = {"_write": _write, "_encode_str": _encode_str}
+    exec(compile("\n".join(lines), f"<fastjson {cls.__qualname__}>", "exec"), namespace)
+    return namespace["write"]
+
+
+def _model_writer(cls: type) -> Writer:
+    writer = _MODEL_WRITERS.get(cls)
+    if writer is None:
+        with _WRITERS_LOCK:
+            writer = _MODEL_WRITERS.get(cls)
+            if writer is None:
+                writer = _MODEL_WRITERS[cls] = _compile_model(cls)
+    return writer
+
+
+# -----------------------------------------------------------------------------
+# Value dispatch
+# -----------------------------------------------------------------------------
+
+# str/int/bool/None encode identically in the stdlib C encoder; floats do not.
+_PLAIN_TYPES = frozenset({str, int, bool, type(None)})
+_encode_plain = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _write_list(v: Any, out: list) -> None:
+    if not v:
+        out.append("[]")
+        return
+    if set(map(type, v)) <= _PLAIN_TYPES:  # terms/ids/fields lists: C encoder
+        out.append(_encode_plain(v))
+        return
+    sep = "["
+    for item in v:
+        out.append(sep)
+        _write(item, out)
+        sep = ","
+    out.append("]")
+
+
+def _write_dict(v: dict, out: list) -> None:
+    if not v:
+        out.append("{}")
+        return
+    sep = "{"
+    for k, item in v.items():
+        out.append(sep + _encode_str(k if isinstance(k, str) else str(k)) + ":")
+        _write(item, out)
+        sep = ","
+    out.append("}")
+
+
+_SCALARS: dict[type, Callable[[Any], str]] = {
+    str: _encode_str,
+    int: int.__repr__,
+    float: _encode_float,
+    bool: lambda v: "true" if v else "false",
+    type(None): lambda v: "null",
+    datetime: _encode_datetime,
+    date: lambda v: f'"{v.isoformat()}"',
+    time: lambda v: f'"{v.isoformat()}"',
+}
+_CONTAINERS: dict[type, Writer] = {list: _write_list, tuple: _write_list, dict: _write_dict}
+
+
+def _write(v: Any, out: list) -> None:
+    cls = type(v)
+    scalar = _SCALARS.get(cls)
+    if scalar is not None:
+        out.append(scalar(v))
+        return
+    container = _CONTAINERS.get(cls)
+    if container is not None:
+        container(v, out)
+    elif isinstance(v, BaseModel):
+        _model_writer(cls)(v, out)
+    elif isinstance(v, timedelta):
+        raise TypeError("timedelta values are not part of the Query DSL")
+    else:
+        # Subclasses of the builtins (str enums, bool before int, ...).
+        for base, fn in _SCALARS.items():
+            if isinstance(v, base) and base is not type(None):
+                out.append(fn(v))
+                return
+        for base, fn in _CONTAINERS.items():
+            if isinstance(v, base):
+                fn(v, out)
+                return
+        raise TypeError(f"Cannot serialize {cls.__name__} to JSON")
+
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+def dump_json(model: BaseModel) -> bytes:
+    """
+    Compact JSON for a DSL model tree, byte-identical to
+    `model.model_dump_json(by_alias=True, exclude_none=True).encode()`.
+
+    Usage:
+      body = dump_json(SearchRequestWithAggs.model_validate(payload))
+      httpx.post(url, content=body, headers={"content-type": "application/json"})
+
+    Notes:
+      - One generated writer per model class; fields that are None are
+        skipped without building intermediate dicts.
+      - As in pydantic, None inside free-form dicts/lists is kept (`null`)
+        and non-finite floats become `null`.
+      - Unlike `model_dump_json`, very deep trees (e.g. 128 nested bools) do
+        not hit pydantic-core's serializer depth limit.
+    """
+    out: list[str] = []
+    _write(model, out)
+    return "".join(out).encode("utf-8")
+
+
+if __name__ == "__main__":
+    import timeit
+
+    from dsl_models import SearchRequestWithAggs
+
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"bool": {
+            "must": [{"match": {"message": {"query": "timeout", "operator": "and"}}}],
+            "filter": [{"range": {"@timestamp": {"gte": "now-30d/d", "lt": "now/d"}}},
+                       {"terms": {"service.name": [f"svc-{i}" for i in range(200)]}}],
+        }},
+        "size": 50,
+        "from": 0,
+        "aggs": {"svc": {"terms": {"field": "service.name", "size": 20},
+                         "aggs": {"lat": {"stats": {"field": "event.duration"}}}}},
+    })
+    assert dump_json(req) == req.model_dump_json(by_alias=True, exclude_none=True).encode()
+    n = 2000
+    for label, fn in (
+        ("model_dump_json", lambda: req.model_dump_json(by_alias=True, exclude_none=True)),
+        ("model_dump+dumps", lambda: json.dumps(req.model_dump(by_alias=True, exclude_none=True))),
+        ("dump_json", lambda: dump_json(req)),
+    ):
+        print(f"{label:>17}: {timeit.timeit(fn, number=n) / n * 1e6:8.1f} us")
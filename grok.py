@@ -0,0 +1,452 @@
+"""
+Grok compiler for the local ingest simulator (`grok` processor).
+
+`%{SYNTAX:field:type}` references expand recursively against the standard
+base library (GROK_BASE_PATTERNS, Elasticsearch's legacy set) plus the
+processor's `pattern_definitions`. Each pattern compiles once into its own
+regex, tried in order (`match` when anchored, `search` otherwise); with
+`alternation` (default GROK_ALTERNATION), consecutive anchored patterns
+instead share ONE regex in which each is a tagged branch `(?P<_b<i>>...)`,
+and the branch that matched is read off `match.lastgroup`.
+
+Usage:
+  grok = compile_grok(["^%{IP:client.ip} %{WORD:method} %{INT:status:int}$"])
+  grok.match("10.0.0.1 GET 200")    # (0, {"client.ip": "10.0.0.1", "method": "GET", "status": 200})
+  compile_grok(patterns, alternation=True)   # one regex per run of anchored patterns
+  grok.stats()                      # per-pattern matches, match rate, time
+  grok_cache_info()                 # CacheStats of the shared compiled-regex cache
+
+Notes:
+  - Grok's first-pattern-wins order is kept by both strategies. The
+    alternation is off by default. On the formats in test_bench_dsl.py
+    (`grok` group) it was 2% and 9% faster than pattern by pattern on the
+    two mixed lists, but 28% slower when every line hits the last of five
+    patterns: the outcome depends on which formats precede the matching
+    one, not on how many there are, so no pattern-count threshold picks
+    it reliably. The default gives up the small wins to avoid that case;
+    enable the alternation per list with `alternation=True` after measuring.
+  - Compiled regexes are cached by a content hash of the patterns,
+    definitions and strategy (`valcache.payload_key`), so every processor, pipeline and
+    document with the same grok body shares one compilation. Stats belong
+    to each `Grok` (one per processor), not to the shared cache entry.
+  - Unnamed groups in the library are rewritten as non-capturing, so the
+    engine only records the groups that become fields.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping
+
+from valcache import CacheStats, payload_key
+
+
+GROK_CACHE_SIZE = 512
+MAX_GROK_DEPTH = 64  # reference nesting before a definition is considered circular
+GROK_ALTERNATION = False  # share one regex between consecutive anchored patterns (see Notes)
+
+GROK_BASE_PATTERNS: dict[str, str] = {
+    "USERNAME": r"[a-zA-Z0-9._-]+",
+    "USER": r"%{USERNAME}",
+    "EMAILLOCALPART": r"[a-zA-Z0-9!#$%&'*+\-/=?^_`{|}~]{1,64}(?:\.[a-zA-Z0-9!#$%&'*+\-/=?^_`{|}~]{1,62}){0,63}",
+    "EMAILADDRESS": r"%{EMAILLOCALPART}@%{HOSTNAME}",
+    "INT": r"(?:[+-]?(?:[0-9]+))",
+    "BASE10NUM": r"(?<![0-9.+-])(?>[+-]?(?:(?:[0-9]+(?:\.[0-9]+)?)|(?:\.[0-9]+)))",
+    "NUMBER": r"(?:%{BASE10NUM})",
+    "BASE16NUM": r"(?<![0-9A-Fa-f])(?:[+-]?(?:0x)?(?:[0-9A-Fa-f]+))",
+    "BASE16FLOAT": r"\b(?<![0-9A-Fa-f.])(?:[+-]?(?:0x)?(?:(?:[0-9A-Fa-f]+(?:\.[0-9A-Fa-f]*)?)|(?:\.[0-9A-Fa-f]+)))\b",
+    "POSINT": r"\b(?:[1-9][0-9]*)\b",
+    "NONNEGINT": r"\b(?:[0-9]+)\b",
+    "WORD": r"\b\w+\b",
+    "NOTSPACE": r"\S+",
+    "SPACE": r"\s*",
+    "DATA": r".*?",
+    "GREEDYDATA": r".*",
+    "QUOTEDSTRING": r"""(?>(?<!\\)(?>"(?>\\.|[^\\"]+)+"|""|(?>'(?>\\.|[^\\']+)+')|''|(?>`(?>\\.|[^\\`]+)+`)|``))""",
+    "QS": r"%{QUOTEDSTRING}",
+    "UUID": r"[A-Fa-f0-9]{8}-(?:[A-Fa-f0-9]{4}-){3}[A-Fa-f0-9]{12}",
+    "URN": r"urn:[0-9A-Za-z][0-9A-Za-z-]{0,31}:(?:%[0-9a-fA-F]{2}|[0-9A-Za-z()+,.:=@;$_!*'/?#-])+",
+    # Networking
+    "CISCOMAC": r"(?:(?:[A-Fa-f0-9]{4}\.){2}[A-Fa-f0-9]{4})",
+    "WINDOWSMAC": r"(?:(?:[A-Fa-f0-9]{2}-){5}[A-Fa-f0-9]{2})",
+    "COMMONMAC": r"(?:(?:[A-Fa-f0-9]{2}:){5}[A-Fa-f0-9]{2})",
+    "MAC": r"(?:%{CISCOMAC}|%{WINDOWSMAC}|%{COMMONMAC})",
+    "IPV6": (
+        r"((([0-9A-Fa-f]{1,4}:){7}([0-9A-Fa-f]{1,4}|:))|(([0-9A-Fa-f]{1,4}:){6}(:[0-9A-Fa-f]{1,4}|"
+        r"((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3})|:))|(([0-9A-Fa-f]{1,4}:){5}"
+        r"(((:[0-9A-Fa-f]{1,4}){1,2})|:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3})|:))|"
+        r"(([0-9A-Fa-f]{1,4}:){4}(((:[0-9A-Fa-f]{1,4}){1,3})|((:[0-9A-Fa-f]{1,4})?:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+        r"(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}))|:))|(([0-9A-Fa-f]{1,4}:){3}(((:[0-9A-Fa-f]{1,4}){1,4})|"
+        r"((:[0-9A-Fa-f]{1,4}){0,2}:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}))|:))|"
+        r"(([0-9A-Fa-f]{1,4}:){2}(((:[0-9A-Fa-f]{1,4}){1,5})|((:[0-9A-Fa-f]{1,4}){0,3}:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+        r"(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}))|:))|(([0-9A-Fa-f]{1,4}:){1}(((:[0-9A-Fa-f]{1,4}){1,6})|"
+        r"((:[0-9A-Fa-f]{1,4}){0,4}:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}))|:))|"
+        r"(:(((:[0-9A-Fa-f]{1,4}){1,7})|((:[0-9A-Fa-f]{1,4}){0,5}:((25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+        r"(\.(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}))|:)))(%.+)?"
+    ),
+    "IPV4": (
+        r"(?<![0-9])(?:(?:[0-1]?[0-9]{1,2}|2[0-4][0-9]|25[0-5])[.](?:[0-1]?[0-9]{1,2}|2[0-4][0-9]|25[0-5])[.]"
+        r"(?:[0-1]?[0-9]{1,2}|2[0-4][0-9]|25[0-5])[.](?:[0-1]?[0-9]{1,2}|2[0-4][0-9]|25[0-5]))(?![0-9])"
+    ),
+    "IP": r"(?:%{IPV6}|%{IPV4})",
+    "HOSTNAME": r"\b(?:[0-9A-Za-z][0-9A-Za-z-]{0,62})(?:\.(?:[0-9A-Za-z][0-9A-Za-z-]{0,62}))*(\.?|\b)",
+    "IPORHOST": r"(?:%{IP}|%{HOSTNAME})",
+    "HOSTPORT": r"%{IPORHOST}:%{POSINT}",
+    # Paths and URIs
+    "UNIXPATH": r"(/[\w_%!$@:.,+~-]*)+",
+    "TTY": r"(?:/dev/(pts|tty([pq])?)(\w+)?/?(?:[0-9]+))",
+    "WINPATH": r"(?>[A-Za-z]+:|\\)(?:\\[^\\?*]*)+",
+    "PATH": r"(?:%{UNIXPATH}|%{WINPATH})",
+    "URIPROTO": r"[A-Za-z]([A-Za-z0-9+\-.]+)+",
+    "URIHOST": r"%{IPORHOST}(?::%{POSINT})?",
+    "URIPATH": r"(?:/[A-Za-z0-9$.+!*'(){},~:;=@#%&_\-]*)+",
+    "URIPARAM": r"\?[A-Za-z0-9$.+!*'|(){},~@#%&/=:;_?\-\[\]<>]*",
+    "URIPATHPARAM": r"%{URIPATH}(?:%{URIPARAM})?",
+    "URI": r"%{URIPROTO}://(?:%{USER}(?::[^@]*)?@)?(?:%{URIHOST})?(?:%{URIPATHPARAM})?",
+    # Dates and times
+    "MONTH": (
+        r"\b(?:[Jj]an(?:uary|uar)?|[Ff]eb(?:ruary|ruar)?|[Mm](?:a|ä)?r(?:ch|z)?|[Aa]pr(?:il)?|[Mm]a(?:y|i)?|"
+        r"[Jj]un(?:e|i)?|[Jj]ul(?:y|i)?|[Aa]ug(?:ust)?|[Ss]ep(?:tember)?|[Oo](?:c|k)?t(?:ober)?|[Nn]ov(?:ember)?|"
+        r"[Dd]e(?:c|z)(?:ember)?)\b"
+    ),
+    "MONTHNUM": r"(?:0?[1-9]|1[0-2])",
+    "MONTHNUM2": r"(?:0[1-9]|1[0-2])",
+    "MONTHDAY": r"(?:(?:0[1-9])|(?:[12][0-9])|(?:3[01])|[1-9])",
+    "DAY": r"(?:Mon(?:day)?|Tue(?:sday)?|Wed(?:nesday)?|Thu(?:rsday)?|Fri(?:day)?|Sat(?:urday)?|Sun(?:day)?)",
+    "YEAR": r"(?>\d\d){1,2}",
+    "HOUR": r"(?:2[0123]|[01]?[0-9])",
+    "MINUTE": r"(?:[0-5][0-9])",
+    "SECOND": r"(?:(?:[0-5]?[0-9]|60)(?:[:.,][0-9]+)?)",
+    "TIME": r"(?!<[0-9])%{HOUR}:%{MINUTE}(?::%{SECOND})(?![0-9])",
+    "DATE_US": r"%{MONTHNUM}[/-]%{MONTHDAY}[/-]%{YEAR}",
+    "DATE_EU": r"%{MONTHDAY}[./-]%{MONTHNUM}[./-]%{YEAR}",
+    "ISO8601_TIMEZONE": r"(?:Z|[+-]%{HOUR}(?::?%{MINUTE}))",
+    "ISO8601_SECOND": r"(?:%{SECOND}|60)",
+    "TIMESTAMP_ISO8601": r"%{YEAR}-%{MONTHNUM}-%{MONTHDAY}[T ]%{HOUR}:?%{MINUTE}(?::?%{SECOND})?%{ISO8601_TIMEZONE}?",
+    "DATE": r"%{DATE_US}|%{DATE_EU}",
+    "DATESTAMP": r"%{DATE}[- ]%{TIME}",
+    "TZ": r"(?:[APMCE][SD]T|UTC)",
+    "DATESTAMP_RFC822": r"%{DAY} %{MONTH} %{MONTHDAY} %{YEAR} %{TIME} %{TZ}",
+    "DATESTAMP_RFC2822": r"%{DAY}, %{MONTHDAY} %{MONTH} %{YEAR} %{TIME} %{ISO8601_TIMEZONE}",
+    "DATESTAMP_OTHER": r"%{DAY} %{MONTH} %{MONTHDAY} %{TIME} %{TZ} %{YEAR}",
+    "DATESTAMP_EVENTLOG": r"%{YEAR}%{MONTHNUM2}%{MONTHDAY}%{HOUR}%{MINUTE}%{SECOND}",
+    "HTTPDATE": r"%{MONTHDAY}/%{MONTH}/%{YEAR}:%{TIME} %{INT}",
+    # Syslog, Apache, levels
+    "SYSLOGTIMESTAMP": r"%{MONTH} +%{MONTHDAY} %{TIME}",
+    "PROG": r"[\x21-\x5a\x5c\x5e-\x7e]+",
+    "SYSLOGPROG": r"%{PROG:program}(?:\[%{POSINT:pid}\])?",
+    "SYSLOGHOST": r"%{IPORHOST}",
+    "SYSLOGFACILITY": r"<%{NONNEGINT:facility}.%{NONNEGINT:priority}>",
+    "SYSLOGBASE": r"%{SYSLOGTIMESTAMP:timestamp} (?:%{SYSLOGFACILITY} )?%{SYSLOGHOST:logsource} %{SYSLOGPROG}:",
+    "HTTPDUSER": r"%{EMAILADDRESS}|%{USER}",
+    "COMMONAPACHELOG": (
+        r"%{IPORHOST:clientip} %{HTTPDUSER:ident} %{USER:auth} \[%{HTTPDATE:timestamp}\] "
+        r'"(?:%{WORD:verb} %{NOTSPACE:request}(?: HTTP/%{NUMBER:httpversion})?|%{DATA:rawrequest})" '
+        r"%{NUMBER:response} (?:%{NUMBER:bytes}|-)"
+    ),
+    "COMBINEDAPACHELOG": r"%{COMMONAPACHELOG} %{QS:referrer} %{QS:agent}",
+    "LOGLEVEL": (
+        r"([Aa]lert|ALERT|[Tt]race|TRACE|[Dd]ebug|DEBUG|[Nn]otice|NOTICE|[Ii]nfo?(?:rmation)?|INFO?(?:RMATION)?|"
+        r"[Ww]arn?(?:ing)?|WARN?(?:ING)?|[Ee]rr?(?:or)?|ERR?(?:OR)?|[Cc]rit?(?:ical)?|CRIT?(?:ICAL)?|[Ff]atal|FATAL|"
+        r"[Ss]evere|SEVERE|EMERG(?:ENCY)?|[Ee]merg(?:ency)?)"
+    ),
+}
+
+GROK_TYPES: dict[str, Callable[[str], Any]] = {
+    "int": int, "long": int, "float": float, "double": float,
+    "boolean": lambda s: s.lower() == "true", "string": str,
+}
+
+_REF_RE = re.compile(r"%\{(\w+)(?::([\w.@\[\]-]+))?(?::(\w+))?\}")
+_INLINE_GROUP_RE = re.compile(r"\(\?<([A-Za-z][\w.@\[\]-]*)>")
+
+
+def _field_name(name: str) -> str:
+    """`[source][ip]` (ECS bracket syntax) -> `source.ip`."""
+    return ".".join(p for p in re.split(r"[\[\]]+", name) if p) if name.startswith("[") else name
+
+
+def _non_capturing(regex: str) -> str:
+    """Rewrite plain `(` groups as `(?:` (escapes and character classes left alone)."""
+    out, i, n, in_class = [], 0, len(regex), False
+    while i < n:
+        c = regex[i]
+        if c == "\\":
+            out.append(regex[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]" or (i > 0 and regex[i - 1] == "[")
+        elif c == "[":
+            in_class = True
+        elif c == "(" and not regex.startswith("?", i + 1):
+            out.append("(?:")
+            i += 1
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+
+# -----------------------------------------------------------------------------
+# Expansion
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class _Capture:
+    group: str  # regex group name (_g<n>)
+    field: str
+    convert: Callable[[str], Any] | None
+
+
+class _Expander:
+    """Expands one pattern list; group names are unique across all branches."""
+    __slots__ = ("definitions", "captures", "_plain")
+
+    def __init__(self, definitions: Mapping[str, str]) -> None:
+        self.definitions = definitions
+        self.captures: list[_Capture] = []
+        self._plain: dict[str, str] = {}  # uncaptured expansions, reused across references
+
+    def _capture(self, field: str, kind: str | None) -> str:
+        if kind is not None and kind not in GROK_TYPES:
+            raise ValueError(f"Unsupported grok conversion type [{kind}]")
+        group = f"_g{len(self.captures)}"
+        self.captures.append(_Capture(group, _field_name(field), GROK_TYPES[kind] if kind else None))
+        return group
+
+    def expand(self, pattern: str, capture: bool = True, depth: int = 0) -> str:
+        if depth > MAX_GROK_DEPTH:
+            raise ValueError("circular reference in grok pattern definitions")
+
+        def inline(m: re.Match[str]) -> str:  # Oniguruma (?<field>...) captures are fields too
+            return f"(?P<{self._capture(m[1], None)}>" if capture else "(?:"
+
+        def reference(m: re.Match[str]) -> str:
+            name, field, kind = m[1], m[2], m[3]
+            if name not in self.definitions:
+                raise ValueError(f"Unable to find pattern [{name}] in Grok's pattern dictionary")
+            if not (field and capture):
+                body = self._plain.get(name)
+                if body is None:
+                    body = self._plain[name] = self.expand(self.definitions[name], False, depth + 1)
+                return f"(?:{body})"
+            body = self.expand(self.definitions[name], True, depth + 1)
+            return f"(?P<{self._capture(field, kind)}>{body})"
+
+        pattern = _non_capturing(pattern)
+        pattern = _INLINE_GROUP_RE.sub(inline, pattern)
+        return _REF_RE.sub(reference, pattern)
+
+
+@dataclass(frozen=True, slots=True)
+class _Segment:
+    """One regex of a compiled pattern list: one pattern, or a run of anchored ones combined."""
+    scan: Callable[[str], re.Match[str] | None]  # bound `match` (anchored) or `search`
+    branches: dict[str, tuple[int, tuple[_Capture, ...], tuple[int, ...]]]  # group -> (pattern, captures, group numbers)
+
+
+@dataclass(frozen=True, slots=True)
+class _Compiled:
+    """Shared (cached) compilation of one pattern list."""
+    segments: tuple[_Segment, ...]
+
+
+def _regex(text: str) -> re.Pattern[str]:
+    try:
+        return re.compile(text)
+    except re.error as exc:
+        raise ValueError(f"Invalid grok pattern: {exc}") from None
+
+
+def _branch(
+    regex: re.Pattern[str], index: int, captures: tuple[_Capture, ...]
+) -> tuple[int, tuple[_Capture, ...], tuple[int, ...]]:
+    return index, captures, tuple(regex.groupindex[c.group] for c in captures)
+
+
+def _compile(patterns: tuple[str, ...], definitions: Mapping[str, str], alternation: bool) -> _Compiled:
+    """
+    One segment per pattern: `match` when anchored, `search` otherwise. With
+    `alternation`, consecutive anchored patterns become one tagged
+    alternation tried with `match`; an unanchored pattern still keeps its
+    own `search` (a lazy `.*?` prefix would preserve its order inside an
+    alternation but defeat the engine's literal/charset scan).
+    """
+    if not patterns:
+        raise ValueError("[patterns] must not be empty")
+    expander = _Expander({**GROK_BASE_PATTERNS, **definitions})
+    segments: list[_Segment] = []
+    run: list[tuple[int, str, tuple[_Capture, ...]]] = []
+
+    def flush() -> None:
+        if run:
+            regex = _regex("|".join(f"(?P<_b{i}>{body})" for i, body, _ in run))
+            segments.append(_Segment(regex.match, {f"_b{i}": _branch(regex, i, caps) for i, _, caps in run}))
+            run.clear()
+
+    for i, pattern in enumerate(patterns):
+        start = len(expander.captures)
+        body = expander.expand(pattern)
+        captures = tuple(expander.captures[start:])
+        anchored = pattern.startswith("^")
+        if anchored and alternation:
+            run.append((i, body, captures))
+            continue
+        flush()
+        regex = _regex(f"(?P<_b{i}>{body})")
+        segments.append(_Segment(regex.match if anchored else regex.search, {f"_b{i}": _branch(regex, i, captures)}))
+    flush()
+    return _Compiled(tuple(segments))
+
+
+# -----------------------------------------------------------------------------
+# Shared compiled-regex cache (content-hash keyed LRU)
+# -----------------------------------------------------------------------------
+
+_CACHE: OrderedDict[bytes, _Compiled] = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_cache_counts = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _cached(patterns: tuple[str, ...], definitions: Mapping[str, str], alternation: bool) -> _Compiled:
+    key = payload_key({"patterns": list(patterns), "pattern_definitions": dict(definitions), "alternation": alternation})
+    with _CACHE_LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None:
+            _CACHE.move_to_end(key)
+            _cache_counts["hits"] += 1
+            return entry
+        _cache_counts["misses"] += 1
+    entry = _compile(patterns, definitions, alternation)  # outside the lock; a racing duplicate is harmless
+    with _CACHE_LOCK:
+        entry = _CACHE.setdefault(key, entry)
+        while len(_CACHE) > GROK_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+            _cache_counts["evictions"] += 1
+    return entry
+
+
+def grok_cache_info() -> CacheStats:
+    with _CACHE_LOCK:
+        return CacheStats(size=len(_CACHE), maxsize=GROK_CACHE_SIZE, **_cache_counts)
+
+
+def grok_cache_clear() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+        _cache_counts.update(hits=0, misses=0, evictions=0)
+
+
+# -----------------------------------------------------------------------------
+# Matcher with per-pattern stats
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class GrokPatternStats:
+    """
+    One pattern's share of a `Grok`'s calls. `seconds` is the time of the
+    calls this pattern answered (earlier branches' failed attempts included).
+    """
+    pattern: str
+    matches: int
+    match_rate: float
+    seconds: float
+
+    @property
+    def mean_us(self) -> float:
+        return self.seconds / self.matches * 1e6 if self.matches else 0.0
+
+
+class Grok:
+    """
+    Matcher over one pattern list (see module docstring).
+
+    Usage:
+      grok = compile_grok(patterns, definitions)
+      grok.match(line) -> (pattern index, {field: value}) | None
+      grok.stats(), grok.misses, grok.miss_seconds
+    """
+    __slots__ = ("patterns", "_segments", "calls", "misses", "miss_seconds", "_matches", "_seconds")
+
+    def __init__(self, patterns: tuple[str, ...], compiled: _Compiled) -> None:
+        self.patterns = patterns
+        self._segments = compiled.segments
+        self.calls = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self._matches = [0] * len(patterns)
+        self._seconds = [0.0] * len(patterns)
+
+    def match(self, text: str) -> tuple[int, dict[str, Any]] | None:
+        started = time.perf_counter()
+        self.calls += 1
+        for segment in self._segments:
+            m = segment.scan(text)
+            if m is None:
+                continue
+            branch, captures, groups = segment.branches[m.lastgroup]
+            fields: dict[str, Any] = {}
+            values = m.group(*groups) if len(groups) > 1 else (m.group(groups[0]),) if groups else ()
+            for capture, value in zip(captures, values):
+                if value is not None and capture.field not in fields:
+                    fields[capture.field] = capture.convert(value) if capture.convert else value
+            self._matches[branch] += 1
+            self._seconds[branch] += time.perf_counter() - started
+            return branch, fields
+        self.misses += 1
+        self.miss_seconds += time.perf_counter() - started
+        return None
+
+    def stats(self) -> list[GrokPatternStats]:
+        calls = self.calls or 1
+        return [
+            GrokPatternStats(pattern, self._matches[i], self._matches[i] / calls, self._seconds[i])
+            for i, pattern in enumerate(self.patterns)
+        ]
+
+    def reset_stats(self) -> None:
+        self.calls = self.misses = 0
+        self.miss_seconds = 0.0
+        self._matches = [0] * len(self.patterns)
+        self._seconds = [0.0] * len(self.patterns)
+
+
+def compile_grok(
+    patterns: list[str] | tuple[str, ...],
+    definitions: Mapping[str, str] | None = None,
+    alternation: bool | None = None,
+) -> Grok:
+    """A fresh `Grok` (own stats) over the shared cached compilation of `patterns`."""
+    patterns = tuple(patterns)
+    alternation = GROK_ALTERNATION if alternation is None else alternation
+    return Grok(patterns, _cached(patterns, definitions or {}, alternation))
+
+
+if __name__ == "__main__":
+    import random
+
+    # throughput of both strategies: pytest test_bench_dsl.py -k grok --benchmark-only
+    rng = random.Random(7)
+    lines = []
+    for i in range(50_000):
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+        if i % 5 == 0:
+            lines.append(f"Jan  {rng.randrange(1, 29)} 10:{rng.randrange(60):02d}:00 host-{i % 40} sshd[{i}]: Accepted key for u{i}")
+        else:
+            lines.append(f'{ip} - - [10/Oct/2024:13:55:36 -0700] "GET /api/{i % 97}?q={i} HTTP/1.1" {rng.choice([200, 404, 500])} {i}')
+    patterns = ["^%{COMMONAPACHELOG}$", "^%{SYSLOGBASE} %{GREEDYDATA:message}$"]
+
+    t0 = time.perf_counter()
+    for _ in range(100):
+        compile_grok(patterns)
+    print(f"100 compiles (cached): {(time.perf_counter() - t0) * 1000:.1f} ms, {grok_cache_info()}")
+    grok = compile_grok(patterns)
+    for line in lines:
+        grok.match(line)
+    for s in grok.stats():
+        print(f"  {s.pattern[:40]:<40} matches {s.matches:>6} ({s.match_rate:.0%}), {s.mean_us:.1f} us/match")
+    print(f"  misses {grok.misses}")
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from localexec import Column, LogBatch, _epoch_ms, _flatten
+
+
+DEFAULT_DATE_FIELDS = ("@timestamp",)
+
+
+# -----------------------------------------------------------------------------
+# Column builders (one pass over the hits, no per-hit dicts kept)
+# -----------------------------------------------------------------------------
+
+def _parse_date_ms(value: Any) -> int:
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp() * 1000)  # fast path for ISO-8601
+        except ValueError:
+            pass
+    return int(_epoch_ms(value))
+
+
+class _Builder:
+    """Appends one field's values; keyword values are dictionary-encoded on the fly."""
+    __slots__ = ("name", "kind", "values", "present", "vocab")
+
+    def __init__(self, name: str, kind: str, rows_before: int) -> None:
+        self.name = name
+        self.kind = kind
+        self.present = bytearray(rows_before)
+        self.vocab: dict[str, int] = {}
+        if kind == "keyword":
+            self.values: Any = array("i", [-1]) * rows_before
+        elif kind == "number":
+            self.values = array("d", [0.0]) * rows_before
+        elif kind == "date":
+            self.values = array("q", [0]) * rows_before
+        elif kind == "bool":
+            self.values = bytearray(rows_before)
+        else:  # raw: multi-valued / object fields, kept as-is
+            self.values = [None] * rows_before
+
+    def add(self, v: Any) -> None:
+        if v is None:
+            self.present.append(0)
+            self.values.append(-1 if self.kind == "keyword" else (None if self.kind == "raw" else 0))
+            return
+        self.present.append(1)
+        kind = self.kind
+        if kind == "keyword":
+            key = v if isinstance(v, str) else ("true" if v is True else "false" if v is False else str(v))
+            code = self.vocab.get(key)
+            if code is None:
+                code = self.vocab[key] = len(self.vocab)
+            self.values.append(code)
+        elif kind == "number":
+            try:
+                self.values.append(float(v))
+            except (TypeError, ValueError):
+                raise ValueError(f"Field '{self.name}' mixes numbers and {type(v).__name__} values.") from None
+        elif kind == "date":
+            self.values.append(_parse_date_ms(v))
+        elif kind == "bool":
+            self.values.append(1 if v else 0)
+        else:
+            self.values.append(v)
+
+    def finish(self) -> Column | np.ndarray:
+        present = np.frombuffer(bytes(self.present), dtype=np.uint8).astype(bool)
+        if self.kind == "keyword":
+            return Column.from_codes(np.frombuffer(self.values, dtype=np.int32).copy(), self.vocab)
+        if self.kind == "number":
+            return Column("number", np.frombuffer(self.values, dtype=np.float64).copy(), present)
+        if self.kind == "date":
+            return Column("date", np.frombuffer(self.values, dtype=np.int64).copy(), present)
+        if self.kind == "bool":
+            return Column("bool", np.frombuffer(bytes(self.values), dtype=np.uint8).astype(bool), present)
+        out = np.empty(len(self.values), dtype=object)
+        out[:] = self.values
+        return out
+
+
+def _infer_kind(name: str, value: Any, date_fields: set[str]) -> str:
+    if isinstance(value, (list, tuple, dict)):
+        return "raw"
+    if name in date_fields or isinstance(value, datetime):
+        return "date"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "keyword"
+
+
+def _getter(path: str):
+    parts = path.split(".")
+
+    def get(source: dict[str, Any]) -> Any:
+        if path in source:  # flattened (dotted) keys as ES allows in `_source`
+            return source[path]
+        node: Any = source
+        for p in parts:
+            if not isinstance(node, dict):
+                return None
+            node = node.get(p)
+            if node is None:
+                return None
+        return node
+
+    return get
+
+
+# -----------------------------------------------------------------------------
+# HitBatch
+# -----------------------------------------------------------------------------
+
+class HitRow:
+    """Read-only view of one hit; values are materialized on access."""
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: HitBatch, i: int) -> None:
+        self._batch = batch
+        self._i = i
+
+    @property
+    def id(self) -> str:
+        return self._batch.ids[self._i]
+
+    @property
+    def index(self) -> str | None:
+        return self._batch.indices.value_at(self._i)
+
+    @property
+    def score(self) -> float | None:
+        s = self._batch.scores[self._i]
+        return None if np.isnan(s) else float(s)
+
+    def __getitem__(self, field: str) -> Any:
+        return self._batch.value(field, self._i)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        v = self._batch.value(field, self._i) if field in self._batch.fields else None
+        return default if v is None else v
+
+    def source(self) -> dict[str, Any]:
+        return self._batch.source(self._i)
+
+    def __repr__(self) -> str:
+        return f"HitRow(id={self.id!r}, score={self.score!r})"
+
+
+class HitBatch:
+    """
+    Columnar container for `_search` hits: typed NumPy columns per `_source`
+    field (keyword values dictionary-encoded, see `localexec.Column`) instead
+    of one dict tree per hit.
+
+    Usage:
+      hb = HitBatch.from_response(resp, fields=["@timestamp", "service.name", "log.level"])
+      with stream_search(url, body) as s:                      # bounded memory end to end
+          hb = HitBatch.from_hits(s.hits(), fields=[...])
+      hb.value_counts("log.level")        # {"error": 812, "info": 9011, ...}
+      errors = hb.take(hb.where("log.level", "error"))
+      hb.group_indices("service.name")    # {"api": array([0, 4, ...]), ...}
+      hb.to_log_batch()                   # run localexec queries/aggs on the hits
+
+    Notes:
+      - `fields=None` keeps every leaf field seen; a field's kind comes from
+        its first non-null value (`date_fields` are parsed to epoch ms).
+      - Multi-valued / object fields are kept as raw object columns.
+      - `to_hits()` rebuilds ES JSON (`_index`, `_id`, `_score`, `_source`,
+        `sort`); other per-hit keys (highlight, fields, ...) are not kept.
+    """
+    __slots__ = ("ids", "indices", "scores", "columns", "raw", "sort")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        indices: Column,
+        scores: np.ndarray,
+        columns: dict[str, Column],
+        raw: dict[str, np.ndarray] | None = None,
+        sort: np.ndarray | None = None,
+    ) -> None:
+        n = len(ids)
+        lengths = {len(indices), len(scores), *(len(c) for c in columns.values()), *(len(r) for r in (raw or {}).values())}
+        if lengths - {n}:
+            raise ValueError(f"All columns must have {n} rows (found {sorted(lengths)}).")
+        self.ids = ids
+        self.indices = indices
+        self.scores = scores
+        self.columns = columns
+        self.raw = raw or {}
+        self.sort = sort
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> HitRow:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return HitRow(self, i)
+
+    def __iter__(self) -> Iterator[HitRow]:
+        return (HitRow(self, i) for i in range(len(self)))
+
+    @property
+    def fields(self) -> list[str]:
+        return [*self.columns, *self.raw]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch (arrays + unique strings)."""
+        total = self.ids.nbytes + sum(len(s) + 49 for s in self.ids) + self.scores.nbytes
+        for col in (self.indices, *self.columns.values()):
+            total += col.values.nbytes + col.present.nbytes
+            if col.vocab is not None:
+                total += col.vocab.nbytes + sum(len(s) + 49 for s in col.vocab)
+        return total + sum(r.nbytes for r in self.raw.values())
+
+    # -- conversion -----------------------------------------------------------
+
+    @classmethod
+    def from_hits(
+        cls,
+        hits: Iterable[dict[str, Any]],
+        fields: Iterable[str] | None = None,
+        date_fields: Iterable[str] = DEFAULT_DATE_FIELDS,
+    ) -> HitBatch:
+        """Build from ES hit dicts (a list, or `SearchResponseStream.hits()`)."""
+        date_fields = set(date_fields)
+        wanted = list(fields) if fields is not None else None
+        getters = {name: _getter(name) for name in wanted} if wanted is not None else {}
+        builders: dict[str, _Builder] = {}
+        ids: list[str] = []
+        index = _Builder("_index", "keyword", 0)
+        scores = array("d")
+        sorts: list[Any] = []
+        n = 0
+        for hit in hits:
+            source = hit.get("_source") or {}
+            row = {name: get(source) for name, get in getters.items()} if wanted is not None else _flatten(source)
+            for name, v in row.items():
+                if v is not None and name not in builders:
+                    builders[name] = _Builder(name, _infer_kind(name, v, date_fields), n)
+            for name, b in builders.items():
+                b.add(row.get(name))
+            ids.append(hit.get("_id"))
+            index.add(hit.get("_index"))
+            score = hit.get("_score")
+            scores.append(np.nan if score is None else score)
+            sorts.append(hit.get("sort"))
+            n += 1
+        columns: dict[str, Column] = {}
+        raw: dict[str, np.ndarray] = {}
+        for name in (wanted if wanted is not None else list(builders)):
+            b = builders.get(name)
+            if b is None:  # requested but never present: an all-missing keyword column
+                columns[name] = Column("keyword", np.full(n, -1, dtype=np.int32), vocab=np.empty(0, dtype=object))
+                continue
+            built = b.finish()
+            if isinstance(built, Column):
+                columns[name] = built
+            else:
+                raw[name] = built
+        id_arr = np.empty(n, dtype=object)
+        id_arr[:] = ids
+        sort_arr = None
+        if any(s is not None for s in sorts):
+            sort_arr = np.empty(n, dtype=object)
+            sort_arr[:] = sorts
+        return cls(id_arr, index.finish(), np.frombuffer(scores, dtype=np.float64).copy(), columns, raw, sort_arr)
+
+    @classmethod
+    def from_response(
+        cls,
+        response: dict[str, Any],
+        fields: Iterable[str] | None = None,
+        date_fields: Iterable[str] = DEFAULT_DATE_FIELDS,
+    ) -> HitBatch:
+        return cls.from_hits(response["hits"]["hits"], fields, date_fields)
+
+    def value(self, field: str, i: int) -> Any:
+        col = self.columns.get(field)
+        if col is not None:
+            return col.value_at(i)
+        if field in self.raw:
+            return self.raw[field][i]
+        raise KeyError(field)
+
+    def source(self, i: int) -> dict[str, Any]:
+        """Rebuild the nested `_source` of hit `i` (selected fields only)."""
+        out: dict[str, Any] = {}
+        for name in self.fields:
+            v = self.value(name, i)
+            if v is None:
+                continue
+            node = out
+            *parents, leaf = name.split(".")
+            for p in parents:
+                node = node.setdefault(p, {})
+            node[leaf] = v
+        return out
+
+    def to_hits(self) -> list[dict[str, Any]]:
+        out = []
+        for i in range(len(self)):
+            score = self.scores[i]
+            hit = {
+                "_index": self.indices.value_at(i),
+                "_id": self.ids[i],
+                "_score": None if np.isnan(score) else float(score),
+                "_source": self.source(i),
+            }
+            if self.sort is not None and self.sort[i] is not None:
+                hit["sort"] = self.sort[i]
+            out.append(hit)
+        return out
+
+    def to_log_batch(self) -> LogBatch:
+        """Share the columns with a `LogBatch` (no copy) for localexec/localaggs."""
+        index = self.indices.vocab[0] if self.indices.vocab is not None and len(self.indices.vocab) == 1 else "local"
+        return LogBatch(dict(self.columns), self.ids, index)
+
+    # -- vectorized post-processing ------------------------------------------
+
+    def column(self, field: str) -> Column:
+        col = self.columns.get(field)
+        if col is None:
+            raise KeyError(f"{field!r} is not a typed column of this batch")
+        return col
+
+    def value_counts(self, field: str) -> dict[Any, int]:
+        """Counts per distinct value (missing excluded), most frequent first."""
+        col = self.column(field)
+        if col.kind == "keyword":
+            counts = np.bincount(col.values[col.present], minlength=len(col.vocab))
+            order = np.argsort(-counts, kind="stable")
+            return {col.vocab[i]: int(counts[i]) for i in order if counts[i]}
+        values, counts = np.unique(col.values[col.present], return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        return {values[i].item(): int(counts[i]) for i in order}
+
+    def group_indices(self, field: str) -> dict[Any, np.ndarray]:
+        """Row indices per distinct keyword value."""
+        col = self.column(field)
+        if col.kind != "keyword":
+            raise ValueError(f"group_indices needs a keyword column; {field!r} is {col.kind}")
+        rows = np.flatnonzero(col.present)
+        codes = col.values[rows]
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        groups = np.split(rows[order], bounds)
+        return {col.vocab[codes[order][g_start]]: g for g_start, g in zip([0, *bounds], groups) if len(g)}
+
+    def where(self, field: str, value: Any) -> np.ndarray:
+        """Boolean mask of rows whose `field` equals `value` (exact)."""
+        col = self.column(field)
+        if col.kind == "keyword":
+            return col.docs_for_vocab(np.isin(np.arange(len(col.vocab)), col.vocab_ids(value)))
+        return col.present & (col.values == value)
+
+    def take(self, rows: np.ndarray) -> HitBatch:
+        """Subset by row indices or a boolean mask (columns are sliced, vocabs shared)."""
+        rows = np.flatnonzero(rows) if rows.dtype == bool else rows
+
+        def cut(col: Column) -> Column:
+            return Column(col.kind, col.values[rows], col.present[rows], col.vocab)
+
+        return HitBatch(
+            self.ids[rows],
+            cut(self.indices),
+            self.scores[rows],
+            {k: cut(c) for k, c in self.columns.items()},
+            {k: r[rows] for k, r in self.raw.items()},
+            None if self.sort is None else self.sort[rows],
+        )
+
+
+if __name__ == "__main__":
+    import json
+    import time
+    import tracemalloc
+
+    import localexec
+    from streamjson import SearchResponseStream
+
+    batch = localexec.synthetic_batch(100_000, seed=11)
+    resp = localexec.search({"query": {"match_all": {}}, "size": 10_000}, batch)
+    body = json.dumps(resp).encode()
+    chunks = [body[i:i + 65536] for i in range(0, len(body), 65536)]
+
+    def measure(fn):
+        tracemalloc.start()
+        out = fn()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return out, current
+
+    dicts, dict_bytes = measure(lambda: json.loads(body)["hits"]["hits"])
+    hb, hb_bytes = measure(lambda: HitBatch.from_hits(SearchResponseStream(chunks).hits()))
+    print(f"10k hits as dicts: {dict_bytes / 2**20:5.1f} MiB   HitBatch: {hb_bytes / 2**20:5.1f} MiB "
+          f"({dict_bytes / hb_bytes:.0f}x smaller)")
+    assert hb.to_hits() == dicts
+
+    t0 = time.perf_counter()
+    counts: dict[str, int] = {}
+    for h in dicts:
+        svc = h["_source"]["service"]["name"]
+        counts[svc] = counts.get(svc, 0) + 1
+    t1 = time.perf_counter()
+    fast = hb.value_counts("service.name")
+    t2 = time.perf_counter()
+    assert fast == counts
+    print(f"count by service.name: dicts {(t1 - t0) * 1e3:.2f} ms, HitBatch {(t2 - t1) * 1e3:.2f} ms")
+    print(hb[0], hb[0]["log.level"], hb.value_counts("log.level"))
@@ -0,0 +1,601 @@
+"""
+Static cost analysis and safe reordering of ingest pipelines.
+
+Every top-level processor gets a cost class (COST_CLASSES), the fields it
+reads and writes (its `if` condition, templates and grok/dissect captures
+included), and whether it can fail or stop the pipeline. From that:
+
+  findings   dead writes (a value overwritten or removed before anything
+             reads it, e.g. remove-then-set), redundant repeats (lowercase
+             twice, the same constant set twice), processors unreachable
+             after an unconditional drop/fail, repeated gsub on one field
+  order      a reordering that keeps every data dependency: drops/fails and
+             what they need first, then cheap before expensive, otherwise
+             the original order; kept only when the cost model predicts it
+             saves at least MIN_REORDER_GAIN of the per-document weight
+
+Usage:
+  analysis = analyze_pipeline(pipeline)
+  analysis.report()                  # JSON: per-processor costs, findings, proposed order
+  better = optimize_pipeline(pipeline)
+  compare_throughput(pipeline, better, sources)   # docs/s before/after + result equality
+
+Notes:
+  - Two processors are only swapped when neither writes a field the other
+    reads or writes (`a` and `a.b` overlap), and (unless
+    `assume_no_failures`) not both of them can end the pipeline: a failing
+    processor and a drop in the other order would turn an error into a drop.
+    With a pipeline-level on_failure, a processor that can fail also keeps
+    its place relative to writers, since the handler sees partial results.
+  - Scripts, `pipeline` processors, processors the analyzer does not model,
+    and dynamic field names (templates, kv/json to root, dissect `*`/`&`)
+    read and write every field, so nothing moves across them.
+  - `if` conditions are assumed not to throw; their `ctx.a?.b` reads are
+    taken from the source text (anything else reads every field).
+  - Only the top-level processor list is reordered; per-processor on_failure
+    and foreach bodies are analyzed as part of their processor.
+  - The predicted gain (`expected_weight`) comes only from drops/fails that
+    run earlier, each assumed to stop ASSUMED_STOP_RATE of the documents
+    reaching it: every other processor runs on every document in any order,
+    so moving cheap processors first saves nothing and measured as noise.
+"""
+from __future__ import annotations
+
+import gc
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+from dissect import parse_pattern
+from dsl_models.ingest import IngestPipeline, Processor
+from grok import _INLINE_GROUP_RE, _REF_RE, _field_name
+from ingestsim import _TEMPLATE_RE, DEFAULT_DATE_TARGET, _processor_type, compile_pipeline
+
+
+ANY_FIELD = "*"
+COST_CLASSES = {"trivial": 1, "cheap": 4, "regex": 16, "expensive": 64}
+PROCESSOR_COSTS = {
+    **dict.fromkeys((
+        "set", "remove", "rename", "append", "drop", "fail", "lowercase", "uppercase", "trim",
+        "convert", "dot_expander", "join", "sort", "bytes", "reroute",
+    ), "trivial"),
+    **dict.fromkeys((
+        "dissect", "csv", "json", "date", "date_index_name", "fingerprint", "community_id",
+        "uri_parts", "registered_domain", "urldecode",
+    ), "cheap"),
+    **dict.fromkeys(("gsub", "kv", "split", "html_strip"), "regex"),
+}
+DEFAULT_COST_CLASS = "expensive"  # grok, script, foreach, pipeline, enrich, geoip, user_agent, ...
+CONDITION_WEIGHT = 2
+ASSUMED_STOP_RATE = 0.5  # share of the documents reaching a conditional drop/fail that it stops
+MIN_REORDER_GAIN = 0.05  # predicted weight saving below which the original order is kept
+
+# processors whose result lands in a fixed field unless `target_field` is set
+DEFAULT_TARGETS = {
+    "date": DEFAULT_DATE_TARGET,
+    "geoip": "geoip",
+    "user_agent": "user_agent",
+    "uri_parts": "url",
+    "attachment": "attachment",
+    "fingerprint": "fingerprint",
+    "community_id": "network.community_id",
+}
+# read `field`, write `target_field` (default: `field`) and nothing else
+IN_PLACE = frozenset({
+    "convert", "lowercase", "uppercase", "trim", "gsub", "split", "join", "sort", "bytes",
+    "html_strip", "urldecode", "dot_expander", "date", "geoip", "user_agent", "uri_parts",
+    "attachment", "fingerprint", "community_id", "enrich",
+})
+IDEMPOTENT = frozenset({"lowercase", "uppercase", "trim", "set"})
+
+_CTX_RE = re.compile(r"\bctx\b")
+_CTX_PATH_RE = re.compile(r"((?:\s*\??\.\s*[A-Za-z_@$][\w@$]*)+)(\s*\()?")
+
+
+# -----------------------------------------------------------------------------
+# Per-processor model
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class ProcessorCost:
+    index: int
+    type: str
+    tag: str | None
+    cost_class: str
+    weight: int
+    reads: frozenset[str]
+    writes: frozenset[str]
+    may_fail: bool
+    stops: bool  # drop/fail/pipeline/script: can end the pipeline without failing
+    conditional: bool
+
+    @property
+    def name(self) -> str:
+        return f"{self.type}#{self.tag}" if self.tag else f"{self.type}[{self.index}]"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "index": self.index, "processor": self.name, "cost_class": self.cost_class,
+            "weight": self.weight, "reads": sorted(self.reads), "writes": sorted(self.writes),
+            "may_fail": self.may_fail, "conditional": self.conditional,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Finding:
+    kind: str  # "dead_write" | "redundant" | "unreachable" | "repeated_gsub"
+    index: int
+    message: str
+    removable: bool  # dropping processor `index` keeps results (given its failure semantics)
+
+
+def _condition_reads(spec: str | dict[str, Any] | None) -> set[str]:
+    if spec is None:
+        return set()
+    source = spec.get("source", "") if isinstance(spec, dict) else spec
+    if not isinstance(source, str):
+        return {ANY_FIELD}
+    reads: set[str] = set()
+    for m in _CTX_RE.finditer(source):
+        path = _CTX_PATH_RE.match(source, m.end())
+        parts = [] if path is None else re.sub(r"[\s?]", "", path[1]).strip(".").split(".")
+        if path is not None and path[2]:  # ctx.a.b.startsWith(...): the last segment is a method
+            parts = parts[:-1]
+        reads.add(".".join(parts) if parts else ANY_FIELD)
+    return reads
+
+
+def _template_reads(value: Any) -> set[str]:
+    if isinstance(value, str):
+        return {(m[1] or m[2]).strip() for m in _TEMPLATE_RE.finditer(value)}
+    if isinstance(value, list):
+        return set().union(*map(_template_reads, value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*map(_template_reads, value.values())) if value else set()
+    return set()
+
+
+def _exact(name: str) -> str:
+    """`name` as a field path; templated names are dynamic (any field)."""
+    return ANY_FIELD if _TEMPLATE_RE.search(name) else name
+
+
+def _names(value: str | list[str] | None) -> list[str]:
+    return [] if value is None else [value] if isinstance(value, str) else list(value)
+
+
+def _grok_writes(body: Any) -> set[str]:
+    writes: set[str] = set()
+    for text in [*body.patterns, *(body.pattern_definitions or {}).values()]:
+        writes.update(_field_name(m[2]) for m in _REF_RE.finditer(text) if m[2])
+        writes.update(_field_name(name) for name in _INLINE_GROUP_RE.findall(text))
+    return writes
+
+
+def _dissect_writes(body: Any) -> set[str]:
+    try:
+        _, keys, _ = parse_pattern(body.pattern)
+    except ValueError:
+        return {ANY_FIELD}
+    if any(k.modifier in ("*", "&") for k in keys):
+        return {ANY_FIELD}
+    return {k.name for k in keys if k.name and k.modifier != "?"}
+
+
+def _fields(kind: str, body: Any) -> tuple[set[str], set[str]]:
+    """(reads, writes) of one processor body, without its condition or on_failure."""
+    target = getattr(body, "target_field", None)
+    if kind == "set":
+        reads = {body.copy_from} if body.copy_from is not None else _template_reads(body.value)
+        if body.override is False:
+            reads.add(_exact(body.field))
+        return reads, {_exact(body.field)}
+    if kind == "append":
+        reads = {body.copy_from} if body.copy_from is not None else _template_reads(body.value)
+        return reads | {_exact(body.field)}, {_exact(body.field)}
+    if kind == "remove":
+        if body.keep is not None:
+            return {ANY_FIELD}, {ANY_FIELD}
+        fields = {_exact(f) for f in _names(body.field)}
+        return set(fields), fields
+    if kind == "rename":
+        return {body.field}, {body.field, _exact(body.target_field)}
+    if kind in ("drop", "reroute"):
+        return set(), ({"_index"} if kind == "reroute" else set())
+    if kind == "fail":
+        return _template_reads(body.message), set()
+    if kind == "grok":
+        return {body.field}, _grok_writes(body)
+    if kind == "dissect":
+        return {body.field}, _dissect_writes(body)
+    if kind == "kv":
+        if target is not None:
+            return {body.field}, {target}
+        if body.include_keys:
+            return {body.field}, {f"{body.prefix or ''}{k}" for k in body.include_keys}
+        return {body.field}, {ANY_FIELD}
+    if kind == "json":
+        if body.add_to_root:
+            return {body.field}, {ANY_FIELD}
+        return {body.field}, {target or body.field}
+    if kind == "csv":
+        return {body.field}, set(_names(body.target_fields))
+    if kind == "foreach":
+        inner_kind, inner = _processor_type(body.processor)
+        reads, writes = _fields(inner_kind, inner)
+        reads |= _condition_reads(inner.if_)
+        outside = lambda names: {n for n in names if n != "_ingest" and not n.startswith("_ingest.")}
+        return outside(reads) | {body.field}, outside(writes) | {body.field}
+    if kind in IN_PLACE and getattr(body, "field", None) is not None:
+        return {body.field}, {target or DEFAULT_TARGETS.get(kind, body.field)}
+    return {ANY_FIELD}, {ANY_FIELD}  # script, pipeline and anything not modelled
+
+
+def _can_fail(kind: str, body: Any) -> bool:
+    """Whether the processor itself (ignoring ignore_failure / on_failure) can raise."""
+    if kind in ("drop", "reroute"):
+        return False
+    if kind in ("set", "append"):
+        return body.copy_from is not None
+    if kind == "remove":
+        return not body.ignore_missing or any(f in ("_index", "_version", "_version_type") for f in _names(body.field))
+    return True
+
+
+def _processor_cost(index: int, processor: Processor) -> ProcessorCost:
+    kind, body = _processor_type(processor)
+    reads, writes = _fields(kind, body)
+    reads |= _condition_reads(body.if_)
+    may_fail = _can_fail(kind, body)
+    for handler in body.on_failure or ():
+        inner = _processor_cost(index, handler)
+        reads |= inner.reads
+        writes |= inner.writes
+    if body.ignore_failure:
+        may_fail = False
+    elif body.on_failure:
+        may_fail = any(_processor_cost(index, h).may_fail for h in body.on_failure)
+    cost_class = PROCESSOR_COSTS.get(kind, DEFAULT_COST_CLASS)
+    weight = COST_CLASSES[cost_class] * (len(body.patterns) if kind == "grok" else 1)
+    return ProcessorCost(
+        index=index,
+        type=kind,
+        tag=body.tag,
+        cost_class=cost_class,
+        weight=weight + (CONDITION_WEIGHT if body.if_ is not None else 0),
+        reads=frozenset(reads),
+        writes=frozenset(writes),
+        may_fail=may_fail,
+        stops=kind in ("drop", "fail", "script", "pipeline"),
+        conditional=body.if_ is not None,
+    )
+
+
+def _overlaps(a: frozenset[str], b: frozenset[str]) -> bool:
+    if not a or not b:
+        return False
+    if ANY_FIELD in a or ANY_FIELD in b:
+        return True
+    return any(x == y or x.startswith(y + ".") or y.startswith(x + ".") for x in a for y in b)
+
+
+# -----------------------------------------------------------------------------
+# Ordering
+# -----------------------------------------------------------------------------
+
+def _must_precede(a: ProcessorCost, b: ProcessorCost, on_failure: bool, assume_no_failures: bool) -> bool:
+    """Whether `a` (earlier) has to stay before `b` (later)."""
+    if _overlaps(a.writes, b.reads) or _overlaps(a.reads, b.writes) or _overlaps(a.writes, b.writes):
+        return True
+    if assume_no_failures:
+        a_exits, b_exits = a.stops, b.stops
+    else:
+        a_exits, b_exits = a.may_fail or a.stops, b.may_fail or b.stops
+    if a_exits and b_exits and not (a.type == b.type == "drop"):
+        return True
+    if on_failure and not assume_no_failures:
+        return (a.may_fail and bool(b.writes)) or (b.may_fail and bool(a.writes))
+    return False
+
+
+def _propose_order(costs: list[ProcessorCost], on_failure: bool, assume_no_failures: bool) -> tuple[list[int], dict[int, list[int]]]:
+    """(new order of indexes, processors each one must follow)."""
+    n = len(costs)
+    before: dict[int, list[int]] = {
+        j: [i for i in range(j) if _must_precede(costs[i], costs[j], on_failure, assume_no_failures)]
+        for j in range(n)
+    }
+    gates = {c.index for c in costs if c.type in ("drop", "fail")}
+    stack = list(gates)
+    while stack:  # gates and everything they have to follow go first
+        for i in before[stack.pop()]:
+            if i not in gates:
+                gates.add(i)
+                stack.append(i)
+    waiting = {j: len(before[j]) for j in range(n)}
+    after: dict[int, list[int]] = {i: [] for i in range(n)}
+    for j, preds in before.items():
+        for i in preds:
+            after[i].append(j)
+    ready = {j for j, count in waiting.items() if count == 0}
+    order: list[int] = []
+    while ready:
+        i = min(ready, key=lambda k: (k not in gates, costs[k].weight, k))
+        ready.remove(i)
+        order.append(i)
+        for j in after[i]:
+            waiting[j] -= 1
+            if waiting[j] == 0:
+                ready.add(j)
+    return order, before
+
+
+def expected_weight(costs: list[ProcessorCost], order: Iterable[int]) -> float:
+    """Expected per-document weight of running `costs` in `order` (see ASSUMED_STOP_RATE)."""
+    reaching, total = 1.0, 0.0
+    for i in order:
+        cost = costs[i]
+        total += reaching * cost.weight
+        if cost.type in ("drop", "fail"):
+            reaching *= ASSUMED_STOP_RATE if cost.conditional else 0.0
+    return total
+
+
+def _predicted_gain(costs: list[ProcessorCost], order: list[int]) -> float:
+    """Share of the original order's expected weight that `order` saves."""
+    original = expected_weight(costs, range(len(costs)))
+    return 1 - expected_weight(costs, order) / original if original else 0.0
+
+
+# -----------------------------------------------------------------------------
+# Findings
+# -----------------------------------------------------------------------------
+
+def _body(processor: Processor) -> dict[str, Any]:
+    kind, body = _processor_type(processor)
+    dumped = body.model_dump(by_alias=True, exclude_none=True)
+    dumped.pop("tag", None)
+    dumped.pop("description", None)
+    return {kind: dumped}
+
+
+def _clobbers(processor: Processor, field: str, after_set: bool) -> bool:
+    """Whether `processor` always replaces or removes `field` (without reading it)."""
+    kind, body = _processor_type(processor)
+    if body.if_ is not None:
+        return False
+    if kind == "set":
+        target = _exact(body.field)
+        return (
+            target != ANY_FIELD and body.override is not False and body.copy_from is None
+            and not body.ignore_empty_value and (field == target or field.startswith(target + "."))
+            and not _overlaps(frozenset(_template_reads(body.value)), frozenset({field}))
+        )
+    if kind == "remove" and body.keep is None and (body.ignore_missing or after_set):
+        return any(field == f or field.startswith(f + ".") for f in _names(body.field))
+    return False
+
+
+def _findings(pipeline: IngestPipeline, costs: list[ProcessorCost], assume_no_failures: bool) -> list[Finding]:
+    processors = pipeline.processors
+    found: list[Finding] = []
+    on_failure = bool(pipeline.on_failure)
+
+    for i, c in enumerate(costs):
+        kind, body = _processor_type(processors[i])
+        if kind in ("drop", "fail") and not c.conditional and not body.ignore_failure and not body.on_failure:
+            for j in range(i + 1, len(costs)):
+                found.append(Finding("unreachable", j, f"{costs[j].name} never runs: {c.name} always ends the pipeline", True))
+            break
+
+    for i, a in enumerate(costs):
+        kind, body = _processor_type(processors[i])
+        if a.conditional or body.on_failure or len(a.writes) != 1 or ANY_FIELD in a.writes:
+            continue
+        if not (kind in ("set", "remove") or kind in IN_PLACE):
+            continue
+        (field,) = a.writes
+        target = frozenset({field})
+        for j in range(i + 1, len(costs)):
+            b = costs[j]
+            if _clobbers(processors[j], field, kind == "set") and _body(processors[j]) != _body(processors[i]):
+                safe = assume_no_failures or not a.may_fail
+                found.append(Finding(
+                    "dead_write", i,
+                    f"{a.name} writes [{field}], which {b.name} replaces before anything reads it", safe,
+                ))
+                break
+            if _overlaps(b.reads, target) or (on_failure and b.may_fail and not assume_no_failures):
+                break
+
+    for i, a in enumerate(costs):
+        kind, body = _processor_type(processors[i])
+        if kind not in IDEMPOTENT or a.conditional or body.ignore_failure or body.on_failure or ANY_FIELD in a.writes:
+            continue
+        if kind == "set" and (a.reads or body.override is False):
+            continue
+        if kind != "set" and (body.target_field or body.field) != body.field:
+            continue
+        same = _body(processors[i])
+        for j in range(i + 1, len(costs)):
+            b = costs[j]
+            if _body(processors[j]) == same or (
+                costs[j].type == kind and kind != "set" and _processor_type(processors[j])[1].field == body.field
+                and _processor_type(processors[j])[1].target_field in (None, body.field)
+                and (_processor_type(processors[j])[1].ignore_missing or not body.ignore_missing)
+            ):
+                found.append(Finding("redundant", j, f"{b.name} repeats {a.name} on [{next(iter(a.writes))}]", True))
+                break
+            if _overlaps(b.writes, a.writes):
+                break
+
+    gsubs: dict[str, list[int]] = {}
+    for i, c in enumerate(costs):
+        kind, body = _processor_type(processors[i])
+        if kind == "gsub" and (body.target_field or body.field) == body.field:
+            gsubs.setdefault(body.field, []).append(i)
+    for field, indexes in gsubs.items():
+        if len(indexes) > 1:
+            found.append(Finding(
+                "repeated_gsub", indexes[1],
+                f"{len(indexes)} gsub processors rewrite [{field}] ({', '.join(costs[i].name for i in indexes)}); "
+                f"each is a full regex pass, one pattern with alternation is usually cheaper", False,
+            ))
+    found.sort(key=lambda f: (f.index, f.kind))
+    return found
+
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class PipelineAnalysis:
+    costs: tuple[ProcessorCost, ...]
+    findings: tuple[Finding, ...]
+    order: tuple[int, ...]  # proposed order of the original processor indexes
+    constraints: dict[int, list[int]]  # index -> indexes it must stay after
+    predicted_gain: float  # share of expected weight `order` saves (0.0 when the original order is kept)
+
+    @property
+    def total_weight(self) -> int:
+        return sum(c.weight for c in self.costs)
+
+    def blockers(self, index: int) -> list[str]:
+        """Processors that keep `index` from moving further up."""
+        return [self.costs[i].name for i in self.constraints.get(index, [])]
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "processors": [c.as_dict() for c in self.costs],
+            "total_weight": self.total_weight,
+            "findings": [
+                {"kind": f.kind, "processor": self.costs[f.index].name, "message": f.message, "removable": f.removable}
+                for f in self.findings
+            ],
+            "proposed_order": [self.costs[i].name for i in self.order],
+            "predicted_gain": round(self.predicted_gain, 3),
+            "gates": {
+                self.costs[i].name: self.blockers(i)
+                for i in range(len(self.costs)) if self.costs[i].type in ("drop", "fail")
+            },
+        }
+
+
+def _model(pipeline: IngestPipeline | dict[str, Any]) -> IngestPipeline:
+    return IngestPipeline.model_validate(pipeline) if isinstance(pipeline, dict) else pipeline
+
+
+def analyze_pipeline(pipeline: IngestPipeline | dict[str, Any], assume_no_failures: bool = False) -> PipelineAnalysis:
+    """
+    Cost classes, findings and a dependency-safe order for `pipeline`.
+    `assume_no_failures` lets processors that can fail move across drops
+    (identical results only for documents on which nothing fails). The
+    order stays the original one unless it is predicted to save at least
+    MIN_REORDER_GAIN.
+    """
+    pipeline = _model(pipeline)
+    costs = [_processor_cost(i, p) for i, p in enumerate(pipeline.processors)]
+    order, constraints = _propose_order(costs, bool(pipeline.on_failure), assume_no_failures)
+    gain = _predicted_gain(costs, order)
+    if gain < MIN_REORDER_GAIN:
+        order, gain = list(range(len(costs))), 0.0
+    findings = _findings(pipeline, costs, assume_no_failures)
+    return PipelineAnalysis(tuple(costs), tuple(findings), tuple(order), constraints, gain)
+
+
+def optimize_pipeline(
+    pipeline: IngestPipeline | dict[str, Any],
+    remove_dead: bool = True,
+    assume_no_failures: bool = False,
+) -> IngestPipeline:
+    """`pipeline` with processors in the proposed order, minus removable dead/redundant ones."""
+    pipeline = _model(pipeline)
+    analysis = analyze_pipeline(pipeline, assume_no_failures)
+    dead = {f.index for f in analysis.findings if f.removable} if remove_dead else set()
+    processors = [pipeline.processors[i] for i in analysis.order if i not in dead]
+    return pipeline.model_copy(update={"processors": processors})
+
+
+def _outcome(result: Any) -> tuple:
+    error = result.error
+    return result.source, result.meta, result.dropped, None if error is None else (error.processor_type, error.tag)
+
+
+def compare_throughput(
+    before: IngestPipeline | dict[str, Any],
+    after: IngestPipeline | dict[str, Any],
+    sources: list[dict[str, Any]],
+    pipelines: Mapping[str, IngestPipeline | dict[str, Any]] | None = None,
+    repeat: int = 3,
+) -> dict[str, Any]:
+    """
+    Docs/s of both pipelines on `sources` through the local simulator (best
+    of `repeat`), and how many documents end differently (source, metadata,
+    dropped, or failing processor).
+
+    Runs alternate between the two pipelines and each result batch is
+    released before the next timed run, so neither side pays for garbage
+    collection over the other's results.
+    """
+    sims = {"before": compile_pipeline(_model(before), pipelines), "after": compile_pipeline(_model(after), pipelines)}
+    best = dict.fromkeys(sims, float("inf"))
+    outcomes = {label: [_outcome(r) for r in sim.run_batch(sources)] for label, sim in sims.items()}
+    for _ in range(max(1, repeat)):
+        for label, sim in sims.items():
+            gc.collect()
+            t0 = time.perf_counter()
+            sim.run_batch(sources)
+            best[label] = min(best[label], time.perf_counter() - t0)
+    runs = {label: len(sources) / seconds if seconds else float("inf") for label, seconds in best.items()}
+    mismatches = sum(a != b for a, b in zip(outcomes["before"], outcomes["after"]))
+    return {
+        "docs": len(sources),
+        "before_docs_per_s": round(runs["before"]),
+        "after_docs_per_s": round(runs["after"]),
+        "speedup": round(runs["after"] / runs["before"], 2) if runs["before"] else None,
+        "mismatches": mismatches,
+    }
+
+
+def _example_sources(n: int) -> Iterable[dict[str, Any]]:
+    import localexec
+
+    batch = localexec.synthetic_batch(n, seed=11)
+    for i in range(len(batch.ids)):
+        row = batch.source(i)
+        path = "/health" if i % 4 == 0 else f"/api/{row['service']['name']}"
+        yield {"message": f"10.0.{i % 256}.{i % 7} GET {path} {row['http']['response']['status_code']} "
+                          f"{row['event']['duration']}ms env={row['env'].upper()} host={row['host']['name']}"}
+
+
+if __name__ == "__main__":
+    import json
+
+    pipeline = IngestPipeline.model_validate({
+        "processors": [
+            {"grok": {"field": "message", "tag": "parse", "ignore_failure": True, "patterns": [
+                r"%{IP:client.ip} %{WORD:http.method} %{URIPATHPARAM:url.path} %{INT:http.status:int} "
+                r"%{NUMBER:event.duration:float}ms %{GREEDYDATA:rest}",
+            ]}},
+            {"kv": {"field": "rest", "field_split": " ", "value_split": "=", "target_field": "labels",
+                    "ignore_missing": True, "tag": "labels", "ignore_failure": True}},
+            {"lowercase": {"field": "labels.env", "ignore_missing": True, "tag": "env"}},
+            {"gsub": {"field": "message", "pattern": "\\d+\\.\\d+\\.\\d+\\.\\d+", "replacement": "<ip>", "tag": "mask-ip"}},
+            {"gsub": {"field": "message", "pattern": "env=\\w+", "replacement": "", "tag": "strip-env"}},
+            {"remove": {"field": "event.outcome", "ignore_missing": True, "tag": "reset-outcome"}},
+            {"lowercase": {"field": "labels.env", "ignore_missing": True, "tag": "env-again"}},
+            {"set": {"field": "event.outcome", "value": "unknown", "tag": "outcome"}},
+            {"drop": {"if": "ctx.url?.path == '/health'", "tag": "drop-health"}},
+        ],
+    })
+    analysis = analyze_pipeline(pipeline)
+    report = analysis.report()
+    print(json.dumps({k: report[k] for k in ("total_weight", "findings", "proposed_order", "predicted_gain", "gates")},
+                     indent=1))
+    sources = list(_example_sources(20_000))
+    for assume in (False, True):
+        better = optimize_pipeline(pipeline, assume_no_failures=assume)
+        print(f"assume_no_failures={assume}:", [_processor_type(p)[1].tag for p in better.processors])
+        print(json.dumps(compare_throughput(pipeline, better, sources)))
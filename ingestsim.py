@@ -0,0 +1,1130 @@
+"""
+Local ingest pipeline simulator: runs `IngestPipeline` models in-process,
+as `POST _ingest/pipeline/_simulate` would, without a cluster round trip.
+
+Processors (SUPPORTED_PROCESSORS):
+  set rename remove convert lowercase uppercase trim gsub split join kv csv
+  json date dissect grok drop fail append dot_expander foreach pipeline
+
+Every processor honours `if` (Painless subset, see painless.py), `tag`,
+`ignore_failure` and `on_failure` (with `_ingest.on_failure_message`,
+`_processor_type`, `_processor_tag` and `_pipeline` set while it runs), and
+`ignore_missing` where the processor has it. Pipeline-level `on_failure`
+handles anything the processors did not.
+
+Usage:
+  sim = compile_pipeline(IngestPipeline.model_validate(body), pipelines={"geo": other})
+  result = sim.run({"message": "GET /a 200"})       # IngestResult(source, meta, dropped, error)
+  results = sim.run_batch(sources)                  # one IngestResult per source
+  simulate(body, [{"_source": {...}}])              # `_simulate`-shaped response
+
+Notes:
+  - A pipeline compiles once into a list of closures (field paths, templates,
+    regexes and conditions resolved up front), so per-document work is the
+    processors themselves; `run_batch` reuses one ingest timestamp.
+  - Field paths use the `classic` access pattern: "a.b" walks objects and
+    list indices; a flat "a.b" key needs `dot_expander` first, as in ES.
+  - Dissect patterns compile through dissect.py (delimiter plan, no regex).
+  - Grok patterns compile through grok.py (shared content-hashed cache,
+    one regex per pattern); `grok_stats()` reports per-pattern match rates
+    and time.
+  - Processors the simulator does not implement (geoip, enrich, script, ...)
+    and Painless outside the supported subset raise ValueError at compile
+    time rather than being skipped.
+"""
+from __future__ import annotations
+
+import csv
+import ipaddress
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Mapping
+
+from datemath import format_date, get_zone, parse_date
+from dissect import compile_dissect
+from dsl_models.ingest import IngestPipeline, Processor
+from grok import Grok, GrokPatternStats, compile_grok
+from painless import _java_str, compile_condition
+
+
+SUPPORTED_PROCESSORS = frozenset({
+    "set", "rename", "remove", "convert", "lowercase", "uppercase", "trim", "gsub", "split",
+    "join", "kv", "csv", "json", "date", "dissect", "grok", "drop", "fail", "append",
+    "dot_expander", "foreach", "pipeline",
+})
+METADATA_FIELDS = ("_index", "_id", "_routing", "_version", "_version_type", "_op_type")
+DEFAULT_DATE_TARGET = "@timestamp"
+DEFAULT_DATE_OUTPUT_FORMAT = "yyyy-MM-dd'T'HH:mm:ss.SSSXXX"
+SIMULATE_PIPELINE_NAME = "_simulate_pipeline"
+
+_MISSING = object()
+
+
+class ProcessorFailure(ValueError):
+    """
+    A processor failed on a document. `processor_type`, `tag` and `pipeline`
+    name it (what `_ingest.on_failure_processor_*` report); `reason` is the
+    underlying message.
+    """
+
+    def __init__(self, reason: str, processor_type: str, tag: str | None, pipeline: str) -> None:
+        super().__init__(f"[{processor_type}{'#' + tag if tag else ''}] {reason}")
+        self.reason = reason
+        self.processor_type = processor_type
+        self.tag = tag
+        self.pipeline = pipeline
+
+
+class _Dropped(Exception):
+    """Raised by `drop`; unwinds the whole pipeline (nested ones included)."""
+
+
+@dataclass(frozen=True, slots=True)
+class IngestResult:
+    """
+    Outcome of one document. `source` is None when the document was dropped
+    (`dropped`) or failed without a pipeline-level on_failure (`error`).
+    """
+    source: dict[str, Any] | None
+    meta: dict[str, Any]
+    dropped: bool = False
+    error: ProcessorFailure | None = None
+
+
+# -----------------------------------------------------------------------------
+# Documents and field paths
+# -----------------------------------------------------------------------------
+
+class IngestDocument:
+    """
+    `ctx` is the source map with metadata fields (`_index`, `_id`, ...) mixed
+    in, as Painless sees it; `ingest` holds `_ingest.*` (timestamp, `_value`
+    inside foreach, on_failure metadata).
+    """
+    __slots__ = ("ctx", "ingest", "pipelines")
+
+    def __init__(self, ctx: dict[str, Any], ingest: dict[str, Any]) -> None:
+        self.ctx = ctx
+        self.ingest = ingest
+        self.pipelines: list[str] = []
+
+
+def _copy(value: Any) -> Any:
+    """Deep copy of JSON-shaped data (several times faster than copy.deepcopy)."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _path(field: str) -> tuple[bool, tuple[str, ...]]:
+    """(targets `_ingest`, path segments) of a field name."""
+    if field.startswith("_source."):
+        field = field[len("_source."):]
+    parts = tuple(field.split("."))
+    if parts[0] == "_ingest":
+        return True, parts[1:]
+    return False, parts
+
+
+def _root(doc: IngestDocument, field: str) -> tuple[Any, tuple[str, ...]]:
+    ingest, parts = _path(field)
+    return (doc.ingest if ingest else doc.ctx), parts
+
+
+def _step_into(node: Any, part: str) -> Any:
+    if isinstance(node, dict):
+        return node.get(part, _MISSING)
+    if isinstance(node, list) and part.isdigit() and int(part) < len(node):
+        return node[int(part)]
+    return _MISSING
+
+
+def _get(doc: IngestDocument, field: str) -> Any:
+    """Value at `field`, or _MISSING."""
+    ingest, parts = _path(field)
+    node = doc.ingest if ingest else doc.ctx
+    for part in parts:
+        node = node.get(part, _MISSING) if type(node) is dict else _step_into(node, part)
+        if node is _MISSING:
+            return node
+    return node
+
+
+def _set(doc: IngestDocument, field: str, value: Any) -> None:
+    ingest, parts = _path(field)
+    node = doc.ingest if ingest else doc.ctx
+    for i in range(len(parts) - 1):
+        part = parts[i]
+        child = node.get(part, _MISSING) if type(node) is dict else _step_into(node, part)
+        if child is _MISSING or child is None:
+            if not isinstance(node, dict):
+                raise ValueError(f"cannot set [{part}] with parent object of type [{_type_name(node)}] as part of path [{field}]")
+            child = node[part] = {}
+        elif not isinstance(child, (dict, list)):
+            raise ValueError(f"cannot set [{parts[i + 1]}] with parent object of type [{_type_name(child)}] as part of path [{field}]")
+        node = child
+    last = parts[-1]
+    if isinstance(node, dict):
+        node[last] = value
+    elif isinstance(node, list) and last.isdigit() and int(last) < len(node):
+        node[int(last)] = value
+    else:
+        raise ValueError(f"cannot set [{last}] with parent object of type [{_type_name(node)}] as part of path [{field}]")
+
+
+def _remove(doc: IngestDocument, field: str) -> bool:
+    node, parts = _root(doc, field)
+    for part in parts[:-1]:
+        node = _step_into(node, part)
+        if node is _MISSING:
+            return False
+    last = parts[-1]
+    if isinstance(node, dict) and last in node:
+        del node[last]
+        return True
+    if isinstance(node, list) and last.isdigit() and int(last) < len(node):
+        del node[int(last)]
+        return True
+    return False
+
+
+def _type_name(value: Any) -> str:
+    return {
+        str: "java.lang.String", int: "java.lang.Integer", float: "java.lang.Double", bool: "java.lang.Boolean",
+        dict: "java.util.HashMap", list: "java.util.ArrayList", type(None): "null",
+    }.get(type(value), type(value).__name__)
+
+
+def _not_present(field: str) -> ValueError:
+    return ValueError(f"field [{field.split('.')[-1]}] not present as part of path [{field}]")
+
+
+def _required(doc: IngestDocument, field: str, ignore_missing: bool, what: str = "process it") -> Any:
+    """Value at `field`; _MISSING when absent/null and `ignore_missing`, else ValueError."""
+    value = _get(doc, field)
+    if value is _MISSING or value is None:
+        if ignore_missing:
+            return _MISSING
+        if value is _MISSING:
+            raise _not_present(field)
+        raise ValueError(f"field [{field}] is null, cannot {what}.")
+    return value
+
+
+# -----------------------------------------------------------------------------
+# Templates ({{field}} / {{{field}}} in values, field names, messages)
+# -----------------------------------------------------------------------------
+
+_TEMPLATE_RE = re.compile(r"\{\{\{\s*([^{}]+?)\s*\}\}\}|\{\{\s*([^{}#^/!>]+?)\s*\}\}")
+
+Template = Callable[[IngestDocument], Any]
+
+
+def _render(doc: IngestDocument, field: str) -> str:
+    value = _get(doc, field)
+    if value is _MISSING or value is None:
+        return ""
+    return value if isinstance(value, str) else _java_str(value)
+
+
+def _template(text: str) -> Template:
+    """Compiled mustache-lite template; plain strings compile to a constant."""
+    pieces: list[str | tuple[str]] = []
+    pos = 0
+    for m in _TEMPLATE_RE.finditer(text):
+        pieces.append(text[pos:m.start()])
+        pieces.append((m[1] or m[2],))
+        pos = m.end()
+    if not pos:
+        return lambda doc: text
+    pieces.append(text[pos:])
+    parts = [p for p in pieces if p != ""]
+    return lambda doc: "".join(p if isinstance(p, str) else _render(doc, p[0]) for p in parts)
+
+
+def _value_template(value: Any) -> Template:
+    """Templates applied to every string inside `value` (lists/maps included); the rest copied."""
+    if isinstance(value, str):
+        return _template(value)
+    if isinstance(value, list):
+        items = [_value_template(v) for v in value]
+        return lambda doc: [t(doc) for t in items]
+    if isinstance(value, dict):
+        entries = [(k, _value_template(v)) for k, v in value.items()]
+        return lambda doc: {k: t(doc) for k, t in entries}
+    return lambda doc: value
+
+
+# -----------------------------------------------------------------------------
+# Java regex / replacement syntax
+# -----------------------------------------------------------------------------
+
+_JAVA_NAMED_GROUP_RE = re.compile(r"\(\?<([A-Za-z][A-Za-z0-9_]*)>")
+_JAVA_REPLACEMENT_RE = re.compile(r"\\(.)|\$\{([A-Za-z][A-Za-z0-9_]*)\}|\$(\d+)")
+
+
+@lru_cache(maxsize=1024)
+def _java_regex(pattern: str) -> re.Pattern[str]:
+    """Compile a Java regex (named groups `(?<n>...)`, `\\p{...}` rejected)."""
+    if "\\p{" in pattern or "\\P{" in pattern:
+        raise ValueError(f"Unicode property classes are not supported in {pattern!r}")
+    return re.compile(_JAVA_NAMED_GROUP_RE.sub(r"(?P<\1>", pattern))
+
+
+def _java_replacement(replacement: str) -> str:
+    """Java `Matcher.replaceAll` replacement ($1, ${name}, \\$) -> Python `re.sub` template."""
+    def sub(m: re.Match[str]) -> str:
+        if m[1] is not None:
+            return m[1].replace("\\", "\\\\")
+        return f"\\g<{m[2] or m[3]}>"
+    return _JAVA_REPLACEMENT_RE.sub(sub, replacement.replace("\\\\", "\x00")).replace("\x00", "\\\\")
+
+
+# -----------------------------------------------------------------------------
+# Processors: model -> run(doc)
+# -----------------------------------------------------------------------------
+
+Run = Callable[[IngestDocument], None]
+
+
+def _string_op(p: Any, fn: Callable[[str], str], what: str) -> Run:
+    field, target, ignore_missing = p.field, p.target_field or p.field, bool(p.ignore_missing)
+
+    def convert(value: Any) -> str:
+        if not isinstance(value, str):
+            raise ValueError(f"field [{field}] of type [{_type_name(value)}] cannot be cast to [java.lang.String]")
+        return fn(value)
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing, f"be converted to {what}")
+        if value is _MISSING:
+            return
+        _set(doc, target, [convert(v) for v in value] if isinstance(value, list) else convert(value))
+
+    return run
+
+
+def _set_processor(p: Any, c: _Compiler) -> Run:
+    field = _template(p.field)
+    override, ignore_empty = p.override is not False, bool(p.ignore_empty_value)
+    if p.copy_from is not None:
+        source = p.copy_from
+
+        def value_of(doc: IngestDocument) -> Any:
+            value = _get(doc, source)
+            if value is _MISSING:
+                raise _not_present(source)
+            return _copy(value)
+    else:
+        value_of = _value_template(p.value)
+
+    def run(doc: IngestDocument) -> None:
+        name = field(doc)
+        if not override and _get(doc, name) not in (_MISSING, None):
+            return
+        value = value_of(doc)
+        if ignore_empty and (value is None or value == ""):
+            return
+        _set(doc, name, value)
+
+    return run
+
+
+def _append_processor(p: Any, c: _Compiler) -> Run:
+    field = _template(p.field)
+    allow_duplicates = p.allow_duplicates is not False
+    if p.copy_from is not None:
+        source = p.copy_from
+
+        def values_of(doc: IngestDocument) -> list[Any]:
+            value = _get(doc, source)
+            if value is _MISSING:
+                raise _not_present(source)
+            return _copy(value) if isinstance(value, list) else [_copy(value)]
+    else:
+        template = _value_template(p.value)
+
+        def values_of(doc: IngestDocument) -> list[Any]:
+            value = template(doc)
+            return value if isinstance(value, list) else [value]
+
+    def run(doc: IngestDocument) -> None:
+        name = field(doc)
+        current = _get(doc, name)
+        values = values_of(doc)
+        if current is _MISSING:
+            if not allow_duplicates:
+                values = [v for i, v in enumerate(values) if v not in values[:i]]
+            _set(doc, name, values)
+            return
+        if not isinstance(current, list):
+            current = [current]
+            _set(doc, name, current)
+        for v in values:
+            if allow_duplicates or v not in current:
+                current.append(v)
+
+    return run
+
+
+def _rename_processor(p: Any, c: _Compiler) -> Run:
+    field, target, ignore_missing = p.field, _template(p.target_field), bool(p.ignore_missing)
+
+    def run(doc: IngestDocument) -> None:
+        value = _get(doc, field)
+        if value is _MISSING:
+            if ignore_missing:
+                return
+            raise ValueError(f"field [{field}] doesn't exist")
+        name = target(doc)
+        if _get(doc, name) is not _MISSING:
+            raise ValueError(f"field [{name}] already exists")
+        _remove(doc, field)
+        _set(doc, name, value)
+
+    return run
+
+
+def _remove_processor(p: Any, c: _Compiler) -> Run:
+    ignore_missing = bool(p.ignore_missing)
+    if p.keep is not None:
+        keep = [p.keep] if isinstance(p.keep, str) else list(p.keep)
+
+        def run_keep(doc: IngestDocument) -> None:
+            saved = {k: v for k in keep if (v := _get(doc, k)) is not _MISSING}
+            for key in [k for k in doc.ctx if k not in METADATA_FIELDS]:
+                del doc.ctx[key]
+            for k, v in saved.items():
+                _set(doc, k, v)
+
+        return run_keep
+    fields = [_template(f) for f in ([p.field] if isinstance(p.field, str) else p.field)]
+
+    def run(doc: IngestDocument) -> None:
+        for field in fields:
+            name = field(doc)
+            if name in ("_index", "_version", "_version_type"):
+                raise ValueError(f"cannot remove metadata field [{name}]")
+            if not _remove(doc, name) and not ignore_missing:
+                raise _not_present(name)
+
+    return run
+
+
+def _convert_value(value: Any, kind: str, field: str) -> Any:
+    if isinstance(value, list):
+        return [_convert_value(v, kind, field) for v in value]
+    text = value if isinstance(value, str) else _java_str(value)
+    try:
+        if kind in ("integer", "long"):
+            if isinstance(value, float):
+                raise ValueError
+            return int(text, 16) if text.lower().startswith(("0x", "-0x")) else int(text)
+        if kind in ("float", "double"):
+            return float(text)
+        if kind == "boolean":
+            if text.lower() not in ("true", "false"):
+                raise ValueError
+            return text.lower() == "true"
+        if kind == "ip":
+            ipaddress.ip_address(text)
+            return text
+        if kind == "string":
+            return text
+    except ValueError:
+        raise ValueError(f"unable to convert [{text}] to {kind}") from None
+    if not isinstance(value, str):  # auto
+        return value
+    for attempt in (int, float):
+        try:
+            return attempt(value)
+        except ValueError:
+            pass
+    return value.lower() == "true" if value.lower() in ("true", "false") else value
+
+
+def _convert_processor(p: Any, c: _Compiler) -> Run:
+    field, target, kind, ignore_missing = p.field, p.target_field or p.field, p.type, bool(p.ignore_missing)
+
+    def run(doc: IngestDocument) -> None:
+        value = _get(doc, field)
+        if value is _MISSING or value is None:
+            if ignore_missing:
+                return
+            raise _not_present(field) if value is _MISSING else ValueError(f"Field [{field}] is null, cannot be converted to type [{kind}]")
+        _set(doc, target, _convert_value(value, kind, field))
+
+    return run
+
+
+def _gsub_processor(p: Any, c: _Compiler) -> Run:
+    regex, replacement = _java_regex(p.pattern), _java_replacement(p.replacement)
+    return _string_op(p, lambda s: regex.sub(replacement, s), "gsub")
+
+
+def _split_processor(p: Any, c: _Compiler) -> Run:
+    regex = _java_regex(p.separator)
+    field, target = p.field, p.target_field or p.field
+    ignore_missing = bool(getattr(p, "ignore_missing", False))
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing, "split it")
+        if value is _MISSING:
+            return
+        if not isinstance(value, str):
+            raise ValueError(f"field [{field}] of type [{_type_name(value)}] cannot be cast to [java.lang.String]")
+        parts = regex.split(value)
+        while parts and parts[-1] == "":  # Java String.split drops trailing empty strings
+            parts.pop()
+        _set(doc, target, parts)
+
+    return run
+
+
+def _join_processor(p: Any, c: _Compiler) -> Run:
+    field, target, separator = p.field, p.target_field or p.field, p.separator
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, False, "join it")
+        if not isinstance(value, list):
+            raise ValueError(f"field [{field}] of type [{_type_name(value)}] cannot be cast to [java.util.List]")
+        _set(doc, target, separator.join(v if isinstance(v, str) else _java_str(v) for v in value))
+
+    return run
+
+
+def _kv_processor(p: Any, c: _Compiler) -> Run:
+    if p.field_split is None:
+        raise ValueError("[field_split] required property is missing")
+    field_split, value_split = _java_regex(p.field_split), _java_regex(p.value_split)
+    field, prefix, ignore_missing = p.field, p.prefix or "", bool(p.ignore_missing)
+    include = set(p.include_keys) if p.include_keys is not None else None
+    exclude = set(p.exclude_keys or ())
+    trim_key = p.trim_key or None
+    trim_value = p.trim_value or None
+    target = p.target_field
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing)
+        if value is _MISSING:
+            return
+        for pair in field_split.split(value):
+            kv = value_split.split(pair, maxsplit=1)
+            if len(kv) != 2:
+                raise ValueError(f"field [{field}] does not contain value_split [{p.value_split}]")
+            key, val = kv
+            if trim_key:
+                key = key.strip(trim_key)
+            if trim_value:
+                val = val.strip(trim_value)
+            if (include is not None and key not in include) or key in exclude:
+                continue
+            name = f"{target}.{prefix}{key}" if target else f"{prefix}{key}"
+            current = _get(doc, name)
+            if current is _MISSING:
+                _set(doc, name, val)
+            elif isinstance(current, list):
+                current.append(val)
+            else:
+                _set(doc, name, [current, val])
+
+    return run
+
+
+def _csv_processor(p: Any, c: _Compiler) -> Run:
+    field, ignore_missing = p.field, bool(p.ignore_missing)
+    targets = [p.target_fields] if isinstance(p.target_fields, str) else list(p.target_fields)
+    separator, quote, trim = p.separator or ",", p.quote or '"', bool(p.trim)
+    if len(separator) != 1 or len(quote) != 1:
+        raise ValueError("csv [separator] and [quote] must be single characters")
+    has_empty, empty_value = "empty_value" in p.model_fields_set, p.empty_value
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing)
+        if value is _MISSING:
+            return
+        if not isinstance(value, str):
+            raise ValueError(f"field [{field}] of type [{_type_name(value)}] cannot be cast to [java.lang.String]")
+        try:
+            row = next(csv.reader([value], delimiter=separator, quotechar=quote, strict=True), [])
+        except csv.Error as exc:
+            raise ValueError(f"invalid csv in field [{field}]: {exc}") from None
+        for name, cell in zip(targets, row):
+            if trim:
+                cell = cell.strip(" \t")
+            if cell == "":
+                if has_empty:
+                    _set(doc, name, empty_value)
+                continue
+            _set(doc, name, cell)
+
+    return run
+
+
+def _single_quotes_to_json(text: str) -> str:
+    """Rewrite 'single-quoted' strings as JSON strings (allow_single_quotes)."""
+    out, i, n = [], 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "'\"":
+            j, buf = i + 1, []
+            while j < n and text[j] != ch:
+                if text[j] == "\\" and j + 1 < n:
+                    buf.append(text[j:j + 2])
+                    j += 2
+                    continue
+                buf.append('\\"' if text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(buf).replace("\\'", "'") + '"')
+            i = j + 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _merge_into(target: dict[str, Any], source: dict[str, Any]) -> None:
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge_into(target[key], value)
+        else:
+            target[key] = value
+
+
+def _json_processor(p: Any, c: _Compiler) -> Run:
+    field, target, add_to_root = p.field, p.target_field, bool(p.add_to_root)
+    if add_to_root and target:
+        raise ValueError("Cannot set a target field while also setting `add_to_root` to true")
+    merge, single_quotes = p.add_to_root_conflict_strategy == "merge", bool(p.allow_single_quotes)
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, False)
+        try:
+            parsed = json.loads(value) if isinstance(value, str) else value
+        except json.JSONDecodeError as exc:
+            if not single_quotes:
+                raise ValueError(f"field [{field}] does not contain valid JSON: {exc.msg}") from None
+            parsed = json.loads(_single_quotes_to_json(value))
+        if not add_to_root:
+            _set(doc, target or field, parsed)
+        elif not isinstance(parsed, dict):
+            raise ValueError(f"cannot add non-map fields to root of document (field [{field}])")
+        elif merge:
+            _merge_into(doc.ctx, parsed)
+        else:
+            doc.ctx.update(parsed)
+
+    return run
+
+
+def _date_parser(fmt: str, zone_name: str) -> Callable[[Any], datetime]:
+    zone = get_zone(zone_name)
+    if fmt == "ISO8601":
+        def parse(value: Any) -> datetime:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00") if str(value).endswith("Z") else str(value))
+            return dt if dt.tzinfo else dt.replace(tzinfo=zone)
+        return parse
+    if fmt in ("UNIX", "UNIX_MS"):
+        scale = 1 if fmt == "UNIX" else 1000
+        return lambda value: datetime.fromtimestamp(float(value) / scale, tz=timezone.utc).astimezone(zone)
+    if fmt == "TAI64N":
+        def parse(value: Any) -> datetime:
+            text = str(value).lstrip("@")
+            seconds, nanos = int(text[:16], 16) - 0x4000000000000000 - 10, int(text[16:24], 16)
+            return datetime.fromtimestamp(seconds + nanos / 1e9, tz=timezone.utc).astimezone(zone)
+        return parse
+    has_year = "y" in fmt or "u" in fmt
+
+    def parse(value: Any) -> datetime:
+        dt = parse_date(str(value), fmt, zone_name)
+        return dt if has_year else dt.replace(year=datetime.now(dt.tzinfo).year)
+
+    return parse
+
+
+def _date_processor(p: Any, c: _Compiler) -> Run:
+    field, target = p.field, p.target_field or DEFAULT_DATE_TARGET
+    output = p.output_format or DEFAULT_DATE_OUTPUT_FORMAT
+    parsers = [_date_parser(fmt, p.timezone or "UTC") for fmt in p.formats]
+    format_date(datetime(2000, 1, 1, tzinfo=timezone.utc), output)  # reject bad output formats at compile time
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, False)
+        for parse in parsers:
+            try:
+                dt = parse(value)
+            except (ValueError, OverflowError, IndexError):
+                continue
+            _set(doc, target, format_date(dt, output))
+            return
+        raise ValueError(f"unable to parse date [{value}]")
+
+    return run
+
+
+def _dissect_processor(p: Any, c: _Compiler) -> Run:
+    match = compile_dissect(p.pattern, p.append_separator or "").match
+    field, pattern, ignore_missing = p.field, p.pattern, bool(p.ignore_missing)
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing)
+        if value is _MISSING:
+            return
+        fields = match(value) if isinstance(value, str) else None
+        if fields is None:
+            raise ValueError(f"Unable to find match for dissect pattern: {pattern} against source: {value}")
+        for name, v in fields.items():
+            _set(doc, name, v)
+
+    return run
+
+
+def _grok_processor(p: Any, c: _Compiler) -> Run:
+    if p.ecs_compatibility == "v1":
+        raise ValueError("grok ecs_compatibility [v1] pattern names are not simulated; use [disabled]")
+    grok = compile_grok(p.patterns, p.pattern_definitions)
+    c.groks.append((p.tag, grok))
+    field, ignore_missing, trace = p.field, bool(p.ignore_missing), bool(p.trace_match)
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing)
+        if value is _MISSING:
+            return
+        found = grok.match(value) if isinstance(value, str) else None
+        if found is None:
+            raise ValueError(f"Provided Grok expressions do not match field value: [{value}]")
+        index, fields = found
+        for name, v in fields.items():
+            _set(doc, name, v)
+        if trace:
+            doc.ingest["_grok_match_index"] = str(index)
+
+    return run
+
+
+def _drop_processor(p: Any, c: _Compiler) -> Run:
+    def run(doc: IngestDocument) -> None:
+        raise _Dropped()
+    return run
+
+
+def _fail_processor(p: Any, c: _Compiler) -> Run:
+    message = _template(p.message)
+
+    def run(doc: IngestDocument) -> None:
+        raise ValueError(message(doc))
+
+    return run
+
+
+def _dot_expander_processor(p: Any, c: _Compiler) -> Run:
+    field, path = p.field, p.path
+    if field != "*" and "." not in field:
+        raise ValueError(f"field [{field}] does not contain a dot and is not a wildcard")
+
+    def expand(parent: dict[str, Any], key: str) -> None:
+        if key not in parent:
+            return
+        *parents, last = key.split(".")
+        node = parent
+        for part in parents:
+            child = node.setdefault(part, {})
+            if not isinstance(child, dict):
+                raise ValueError(f"cannot expand [{key}], because [{part}] is not an object field")
+            node = child
+        value = parent.pop(key)
+        if last in node:
+            existing = node[last]
+            node[last] = (existing if isinstance(existing, list) else [existing]) + (value if isinstance(value, list) else [value])
+        else:
+            node[last] = value
+
+    def run(doc: IngestDocument) -> None:
+        parent = doc.ctx if path is None else _get(doc, path)
+        if not isinstance(parent, dict):
+            return
+        for key in [k for k in parent if "." in k] if field == "*" else [field]:
+            expand(parent, key)
+
+    return run
+
+
+def _foreach_processor(p: Any, c: _Compiler) -> Run:
+    field, ignore_missing = p.field, bool(p.ignore_missing)
+    inner = c.step(p.processor)
+
+    def run(doc: IngestDocument) -> None:
+        value = _required(doc, field, ignore_missing, "be iterated")
+        if value is _MISSING:
+            return
+        saved = {k: doc.ingest[k] for k in ("_value", "_key") if k in doc.ingest}
+        try:
+            if isinstance(value, list):
+                out = []
+                for item in value:
+                    doc.ingest["_value"] = item
+                    c.execute([inner], doc)
+                    out.append(doc.ingest.get("_value"))
+            elif isinstance(value, dict):
+                out = {}
+                for key, item in value.items():
+                    doc.ingest["_key"], doc.ingest["_value"] = key, item
+                    c.execute([inner], doc)
+                    out[doc.ingest.get("_key")] = doc.ingest.get("_value")
+            else:
+                raise ValueError(f"field [{field}] of type [{_type_name(value)}] cannot be cast to a list or map")
+        finally:
+            doc.ingest.pop("_value", None)
+            doc.ingest.pop("_key", None)
+            doc.ingest.update(saved)
+        _set(doc, field, out)
+
+    return run
+
+
+def _pipeline_processor(p: Any, c: _Compiler) -> Run:
+    name, ignore_missing_pipeline = _template(p.name), bool(p.ignore_missing_pipeline)
+
+    def run(doc: IngestDocument) -> None:
+        target = name(doc)
+        pipeline = c.resolve(target)
+        if pipeline is None:
+            if ignore_missing_pipeline:
+                return
+            raise ValueError(f"Pipeline processor configured for non-existent pipeline [{target}]")
+        if target in doc.pipelines:
+            raise ValueError(f"Cycle detected for pipeline: {target}")
+        pipeline.execute(doc)
+
+    return run
+
+
+_PROCESSORS: dict[str, Callable[[Any, _Compiler], Run]] = {
+    "set": _set_processor,
+    "rename": _rename_processor,
+    "remove": _remove_processor,
+    "convert": _convert_processor,
+    "lowercase": lambda p, c: _string_op(p, str.lower, "lowercase"),
+    "uppercase": lambda p, c: _string_op(p, str.upper, "uppercase"),
+    "trim": lambda p, c: _string_op(p, str.strip, "trim"),
+    "gsub": _gsub_processor,
+    "split": _split_processor,
+    "join": _join_processor,
+    "kv": _kv_processor,
+    "csv": _csv_processor,
+    "json": _json_processor,
+    "date": _date_processor,
+    "dissect": _dissect_processor,
+    "grok": _grok_processor,
+    "drop": _drop_processor,
+    "fail": _fail_processor,
+    "append": _append_processor,
+    "dot_expander": _dot_expander_processor,
+    "foreach": _foreach_processor,
+    "pipeline": _pipeline_processor,
+}
+
+
+# -----------------------------------------------------------------------------
+# Compilation and execution
+# -----------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class _Step:
+    type: str
+    tag: str | None
+    run: Run
+    condition: Callable[..., bool] | None
+    ignore_failure: bool
+    on_failure: list[_Step] | None
+
+
+def _processor_type(processor: Processor) -> tuple[str, Any]:
+    for name in type(processor).model_fields:
+        body = getattr(processor, name)
+        if body is not None:
+            return name, body
+    raise ValueError("Exactly one processor type must be set in a Processor object.")
+
+
+def _condition(spec: str | dict[str, Any] | None) -> Callable[..., bool] | None:
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        if spec.get("lang", "painless") != "painless" or "source" not in spec:
+            raise ValueError("only inline painless `if` scripts ({'source': ...}) are simulated")
+        return compile_condition(spec["source"], spec.get("params"))
+    return compile_condition(spec)
+
+
+class _Compiler:
+    """Compiles one pipeline's processors; shares the registry of named pipelines."""
+    __slots__ = ("name", "registry", "groks")
+
+    def __init__(self, name: str, registry: _Registry) -> None:
+        self.name = name
+        self.registry = registry
+        self.groks: list[tuple[str | None, Grok]] = []  # (tag, matcher) per grok processor
+
+    def step(self, processor: Processor) -> _Step:
+        kind, body = _processor_type(processor)
+        build = _PROCESSORS.get(kind)
+        if build is None:
+            raise ValueError(f"processor [{kind}] is not supported by the local simulator")
+        return _Step(
+            type=kind,
+            tag=body.tag,
+            run=build(body, self),
+            condition=_condition(body.if_),
+            ignore_failure=bool(body.ignore_failure),
+            on_failure=[self.step(p) for p in body.on_failure] if body.on_failure else None,
+        )
+
+    def resolve(self, name: str) -> CompiledPipeline | None:
+        return self.registry.get(name)
+
+    def execute(self, steps: list[_Step], doc: IngestDocument) -> None:
+        for step in steps:
+            try:
+                if step.condition is not None and not step.condition(doc.ctx):
+                    continue
+                step.run(doc)
+            except (_Dropped, ProcessorFailure) as exc:
+                if isinstance(exc, _Dropped) or not (step.ignore_failure or step.on_failure):
+                    raise
+                self._recover(step, doc, exc)
+            except Exception as exc:
+                failure = ProcessorFailure(str(exc), step.type, step.tag, self.name)
+                if not (step.ignore_failure or step.on_failure):
+                    raise failure from exc
+                self._recover(step, doc, failure)
+
+    def _recover(self, step: _Step, doc: IngestDocument, failure: ProcessorFailure) -> None:
+        if step.on_failure:
+            self.handle(step.on_failure, doc, failure)
+        # else ignore_failure: carry on with the next processor
+
+    def handle(self, handlers: list[_Step], doc: IngestDocument, failure: ProcessorFailure) -> None:
+        metadata = {
+            "on_failure_message": failure.reason,
+            "on_failure_processor_type": failure.processor_type,
+            "on_failure_processor_tag": failure.tag,
+            "on_failure_pipeline": failure.pipeline,
+        }
+        saved = {k: doc.ingest[k] for k in metadata if k in doc.ingest}
+        doc.ingest.update(metadata)
+        try:
+            self.execute(handlers, doc)
+        finally:
+            for key in metadata:
+                doc.ingest.pop(key, None)
+            doc.ingest.update(saved)
+
+
+class _Registry:
+    """Named pipelines for `pipeline` processors, compiled on first use."""
+    __slots__ = ("models", "compiled")
+
+    def __init__(self, models: Mapping[str, IngestPipeline | dict[str, Any]] | None) -> None:
+        self.models = dict(models or {})
+        self.compiled: dict[str, CompiledPipeline] = {}
+
+    def get(self, name: str) -> CompiledPipeline | None:
+        pipeline = self.compiled.get(name)
+        if pipeline is None and name in self.models:
+            pipeline = self.compiled[name] = CompiledPipeline(self.models[name], name, self)
+        return pipeline
+
+
+class CompiledPipeline:
+    """
+    An `IngestPipeline` compiled for repeated in-process runs.
+
+    Usage:
+      sim = compile_pipeline(pipeline)
+      sim.run(source, meta={"_index": "logs-app"}) -> IngestResult
+      sim.run_batch(sources) -> list[IngestResult]
+    """
+    __slots__ = ("name", "model", "_compiler", "_steps", "_on_failure")
+
+    def __init__(
+        self,
+        pipeline: IngestPipeline | dict[str, Any],
+        name: str = SIMULATE_PIPELINE_NAME,
+        registry: _Registry | None = None,
+    ) -> None:
+        if isinstance(pipeline, dict):
+            pipeline = IngestPipeline.model_validate(pipeline)
+        if pipeline.field_access_pattern == "flexible":
+            raise ValueError("field_access_pattern [flexible] is not simulated; use [classic]")
+        self.name = name
+        self.model = pipeline
+        registry = registry if registry is not None else _Registry(None)
+        registry.compiled.setdefault(name, self)
+        self._compiler = _Compiler(name, registry)
+        self._steps = [self._compiler.step(p) for p in pipeline.processors]
+        self._on_failure = [self._compiler.step(p) for p in pipeline.on_failure] if pipeline.on_failure else None
+
+    def execute(self, doc: IngestDocument) -> None:
+        """Run over `doc` in place (raises _Dropped / ProcessorFailure)."""
+        doc.pipelines.append(self.name)
+        previous = doc.ingest.get("pipeline")
+        doc.ingest["pipeline"] = self.name
+        try:
+            self._compiler.execute(self._steps, doc)
+        except ProcessorFailure as failure:
+            if self._on_failure is None:
+                raise
+            self._compiler.handle(self._on_failure, doc, failure)
+        finally:
+            doc.pipelines.pop()
+            if previous is None:
+                doc.ingest.pop("pipeline", None)
+            else:
+                doc.ingest["pipeline"] = previous
+
+    def grok_stats(self) -> dict[str, list[GrokPatternStats]]:
+        """Per-pattern grok stats of this pipeline's grok processors, keyed by tag (or `grok#<n>`)."""
+        return {tag or f"grok#{i}": grok.stats() for i, (tag, grok) in enumerate(self._compiler.groks)}
+
+    def run(
+        self,
+        source: dict[str, Any],
+        meta: dict[str, Any] | None = None,
+        timestamp: str | None = None,
+        copy: bool = True,
+    ) -> IngestResult:
+        """
+        Run over one document. `source` is deep-copied unless `copy=False`
+        (then it is modified in place); `meta` supplies `_index`, `_id`, ...
+        """
+        ctx = _copy(source) if copy else source
+        if meta:
+            ctx.update(meta)
+        doc = IngestDocument(ctx, {"timestamp": timestamp or _now_iso()})
+        try:
+            self.execute(doc)
+        except _Dropped:
+            return IngestResult(None, _split_meta(ctx), dropped=True)
+        except ProcessorFailure as failure:
+            return IngestResult(None, _split_meta(ctx), error=failure)
+        return IngestResult(ctx, _split_meta(ctx))
+
+    def run_batch(
+        self,
+        sources: Iterable[dict[str, Any]],
+        meta: dict[str, Any] | None = None,
+        copy: bool = True,
+    ) -> list[IngestResult]:
+        """`run` over every source with one shared ingest timestamp."""
+        timestamp = _now_iso()
+        run = self.run
+        return [run(source, meta, timestamp, copy) for source in sources]
+
+
+def _now_iso() -> str:
+    return format_date(datetime.now(timezone.utc), DEFAULT_DATE_OUTPUT_FORMAT)
+
+
+def _split_meta(ctx: dict[str, Any]) -> dict[str, Any]:
+    """Pop metadata fields out of `ctx` (leaving the source) and return them."""
+    return {k: ctx.pop(k) for k in METADATA_FIELDS if k in ctx}
+
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+def compile_pipeline(
+    pipeline: IngestPipeline | dict[str, Any],
+    pipelines: Mapping[str, IngestPipeline | dict[str, Any]] | None = None,
+    name: str = SIMULATE_PIPELINE_NAME,
+) -> CompiledPipeline:
+    """
+    Compile `pipeline` for local runs. `pipelines` maps names to the
+    pipelines its `pipeline` processors call (compiled on first call).
+    """
+    return CompiledPipeline(pipeline, name, _Registry(pipelines))
+
+
+def simulate(
+    pipeline: IngestPipeline | dict[str, Any],
+    docs: list[dict[str, Any]],
+    pipelines: Mapping[str, IngestPipeline | dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """
+    `POST _ingest/pipeline/_simulate` locally.
+
+    JSON shape (in):  docs = [{"_index": "...", "_id": "...", "_source": {...}}, ...]
+    JSON shape (out): {"docs": [{"doc": {"_index", "_id", "_source", "_ingest": {"timestamp"}}}
+                                | {"error": {"type", "reason", "processor_type", "processor_tag"}}
+                                | null (dropped), ...]}
+    """
+    sim = compile_pipeline(pipeline, pipelines)
+    timestamp = _now_iso()
+    out: list[dict[str, Any] | None] = []
+    for d in docs:
+        meta = {k: d[k] for k in METADATA_FIELDS if k in d}
+        out.append(_simulate_doc(sim.run(d.get("_source", {}), meta, timestamp), timestamp))
+    return {"docs": out}
+
+
+def _simulate_doc(result: IngestResult, timestamp: str) -> dict[str, Any] | None:
+    """One `docs[]` entry of a `_simulate` response."""
+    if result.dropped:
+        return None
+    if result.error is not None:
+        return {"error": {
+            "type": "illegal_argument_exception",
+            "reason": result.error.reason,
+            "processor_type": result.error.processor_type,
+            "processor_tag": result.error.tag,
+        }}
+    return {"doc": {**result.meta, "_source": result.source, "_ingest": {"timestamp": timestamp}}}
+
+
+if __name__ == "__main__":
+    import time
+
+    import localexec
+
+    pipeline = IngestPipeline.model_validate({
+        "processors": [
+            {"drop": {"if": "ctx.message != null && ctx.message.startsWith('GET /health')", "tag": "drop-health"}},
+            {"grok": {
+                "field": "message", "tag": "parse-access",
+                "patterns": [r"%{IPORHOST:client.ip} %{WORD:http.method} %{URIPATHPARAM:url.path} "
+                             r"%{INT:http.status:int} %{NUMBER:event.duration:float}ms %{GREEDYDATA:rest}"],
+            }},
+            {"kv": {"field": "rest", "field_split": " ", "value_split": "=", "target_field": "labels",
+                    "ignore_missing": True}},
+            {"date": {"field": "ts", "formats": ["ISO8601", "UNIX_MS"], "tag": "ts"}},
+            {"lowercase": {"field": "labels.env", "ignore_missing": True}},
+            {"set": {"field": "event.outcome", "value": "failure", "if": "ctx.http?.status >= 500"}},
+            {"remove": {"field": ["rest", "ts"]}},
+        ],
+        "on_failure": [{"set": {"field": "error.message", "value": "{{ _ingest.on_failure_message }}"}}],
+    })
+    batch = localexec.synthetic_batch(20_000, seed=3)
+    sources = []
+    for i in range(len(batch.ids)):
+        row = batch.source(i)
+        path = "/health" if i % 10 == 0 else f"/api/{row['service']['name']}?id={i}"
+        sources.append({
+            "ts": row["@timestamp"],
+            "message": f"10.0.{i % 256}.{i % 7} GET {path} {row['http']['response']['status_code']} "
+                       f"{row['event']['duration']}ms env={row['env'].upper()} host={row['host']['name']}",
+        })
+    sim = compile_pipeline(pipeline)
+    t0 = time.perf_counter()
+    results = sim.run_batch(sources)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(sources) / elapsed:,.0f} docs/s "
+          f"({sum(r.dropped for r in results)} dropped, {sum(r.error is not None for r in results)} failed)")
+    print(json.dumps(results[1].source, indent=1))
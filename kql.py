@@ -0,0 +1,723 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Literal
+
+from dsl_models import (
+    BoolBody,
+    BoolQuery,
+    ExistsQuery,
+    MatchAllQuery,
+    MatchFieldOptions,
+    MatchQuery,
+    MultiMatchQuery,
+    RangeOps,
+    RangeQuery,
+    SearchRequestWithAggs,
+    TermQuery,
+    TermsQuery,
+    TermValue,
+)
+from valcache import freeze
+
+
+# Analyzed (full-text) fields; everything else is treated as keyword/numeric/date
+# and compiled to non-scoring exact clauses in `bool.filter`.
+DEFAULT_TEXT_FIELDS = frozenset({"message", "@message", "error.message", "event.original"})
+# Fields searched by bare terms (no `field:` prefix).
+DEFAULT_SEARCH_FIELDS = ("message",)
+
+
+class KqlSyntaxError(ValueError):
+    """Malformed search-box input; `pos` is the character offset of the problem."""
+
+    def __init__(self, message: str, pos: int) -> None:
+        super().__init__(f"{message} (at position {pos})")
+        self.pos = pos
+
+
+class KqlUnsupportedError(ValueError):
+    """
+    Valid syntax with no structured equivalent in the Query DSL models
+    (wildcards, regexes, nested scopes). Callers fall back to `query_string`.
+    """
+
+
+# -----------------------------------------------------------------------------
+# Lexer
+# -----------------------------------------------------------------------------
+
+TokenKind = Literal[
+    "LPAREN", "RPAREN", "LBRACKET", "RBRACKET", "LBRACE", "RBRACE",
+    "COLON", "CMP", "AND", "OR", "NOT", "PLUS", "MINUS", "TO",
+    "BOOST", "FUZZY", "TERM", "PHRASE", "EOF",
+]
+
+_PUNCT: dict[str, TokenKind] = {
+    "(": "LPAREN", ")": "RPAREN", "[": "LBRACKET", "]": "RBRACKET",
+    "{": "LBRACE", "}": "RBRACE", ":": "COLON",
+}
+_KEYWORDS: dict[str, TokenKind] = {"and": "AND", "or": "OR", "not": "NOT"}
+# Characters that end an unquoted term (unless backslash-escaped).
+_TERM_STOP = frozenset(' \t\r\n()[]{}:"<>^~')
+# After these a leading sign belongs to a number ("status >= -1"), not to a clause.
+_VALUE_START = frozenset({"CMP", "COLON", "LBRACKET", "LBRACE", "TO"})
+
+
+@dataclass(slots=True)
+class Token:
+    kind: TokenKind
+    text: str
+    pos: int
+    wildcard: bool = False
+
+
+def tokenize(text: str) -> list[Token]:
+    """Single left-to-right scan; each character is examined once."""
+    out: list[Token] = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in " \t\r\n":
+            i += 1
+            continue
+        if c in _PUNCT:
+            out.append(Token(_PUNCT[c], c, i))
+            i += 1
+        elif c in "<>":
+            j = i + 2 if text.startswith("=", i + 1) else i + 1
+            out.append(Token("CMP", text[i:j], i))
+            i = j
+        elif c == "&" and text.startswith("&&", i):
+            out.append(Token("AND", "&&", i))
+            i += 2
+        elif c == "|" and text.startswith("||", i):
+            out.append(Token("OR", "||", i))
+            i += 2
+        elif c == "!":
+            out.append(Token("NOT", "!", i))
+            i += 1
+        elif c in "+-" and not (
+            out and out[-1].kind in _VALUE_START and i + 1 < n and text[i + 1].isdigit()
+        ):
+            out.append(Token("PLUS" if c == "+" else "MINUS", c, i))
+            i += 1
+        elif c in "^~":
+            j = i + 1
+            while j < n and (text[j].isdigit() or text[j] == "."):
+                j += 1
+            out.append(Token("BOOST" if c == "^" else "FUZZY", text[i + 1:j], i))
+            i = j
+        elif c == '"':
+            j, buf = i + 1, []
+            while j < n and text[j] != '"':
+                if text[j] == "\\" and j + 1 < n:
+                    j += 1
+                buf.append(text[j])
+                j += 1
+            if j >= n:
+                raise KqlSyntaxError("Unterminated quoted phrase", i)
+            out.append(Token("PHRASE", "".join(buf), i))
+            i = j + 1
+        else:
+            j, buf, wildcard = i, [], False
+            while j < n and text[j] not in _TERM_STOP:
+                ch = text[j]
+                if ch == "\\" and j + 1 < n:
+                    j += 1
+                    ch = text[j]
+                elif ch in "*?":
+                    wildcard = True
+                buf.append(ch)
+                j += 1
+            word = "".join(buf)
+            kind = _KEYWORDS.get(word.lower()) if not wildcard else None
+            if word == "TO":
+                kind = "TO"
+            out.append(Token(kind or "TERM", word, i, wildcard))
+            i = j
+    out.append(Token("EOF", "", n))
+    return out
+
+
+# -----------------------------------------------------------------------------
+# AST
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Term:
+    field: str | None
+    value: str
+    phrase: bool = False
+    boost: float | None = None
+    fuzziness: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Range:
+    field: str
+    ops: tuple[tuple[str, str], ...]  # (("gte", "500"), ("lt", "600"))
+    boost: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Exists:
+    field: str
+
+
+@dataclass(frozen=True, slots=True)
+class MatchAll:
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Not:
+    item: Node
+
+
+@dataclass(frozen=True, slots=True)
+class And:
+    items: tuple[Node, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Or:
+    items: tuple[Node, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Clauses:
+    """Lucene `+a -b c` group: required / prohibited / optional clauses."""
+    must: tuple[Node, ...] = ()
+    must_not: tuple[Node, ...] = ()
+    should: tuple[Node, ...] = ()
+
+
+Node = Term | Range | Exists | MatchAll | Not | And | Or | Clauses
+
+_CMP_OPS = {">": "gt", ">=": "gte", "<": "lt", "<=": "lte"}
+
+
+# -----------------------------------------------------------------------------
+# Parser (precedence climbing: OR < AND < NOT/+/- < primary)
+# -----------------------------------------------------------------------------
+
+class _Parser:
+    __slots__ = ("tokens", "i", "default_operator")
+
+    def __init__(self, tokens: list[Token], default_operator: Literal["and", "or"]) -> None:
+        self.tokens = tokens
+        self.i = 0
+        self.default_operator = default_operator
+
+    def peek(self) -> Token:
+        return self.tokens[self.i]
+
+    def take(self, kind: TokenKind | None = None) -> Token:
+        tok = self.tokens[self.i]
+        if tok.kind == "EOF":
+            raise KqlSyntaxError(f"Expected {kind or 'a value'}, found end of input", tok.pos)
+        if kind is not None and tok.kind != kind:
+            raise KqlSyntaxError(f"Expected {kind}, found {tok.text or tok.kind!r}", tok.pos)
+        self.i += 1
+        return tok
+
+    def parse(self) -> Node:
+        if self.peek().kind == "EOF":
+            return MatchAll()
+        node = self.or_expr(None)
+        tok = self.peek()
+        if tok.kind != "EOF":
+            raise KqlSyntaxError(f"Unexpected {tok.text!r}", tok.pos)
+        return node
+
+    def _starts_operand(self) -> bool:
+        return self.peek().kind in ("TERM", "PHRASE", "LPAREN", "NOT", "PLUS", "MINUS")
+
+    def or_expr(self, fld: str | None) -> Node:
+        # Juxtaposed operands ("a b") join with the default operator; "+"/"-"
+        # prefixed operands turn the group into Lucene required/prohibited clauses.
+        groups: list[list[tuple[str, Node]]] = [[]]
+        groups[-1].append(self.and_expr(fld))
+        while True:
+            kind = self.peek().kind
+            if kind == "OR":
+                self.take()
+                groups.append([self.and_expr(fld)])
+            elif self._starts_operand():
+                if self.default_operator == "and":
+                    groups[-1].append(self.and_expr(fld))
+                else:
+                    groups.append([self.and_expr(fld)])
+            else:
+                break
+        items = [g[0] if len(g) == 1 else _and(x for x in g) for g in groups]
+        return _group(items)
+
+    def and_expr(self, fld: str | None) -> Any:
+        first = self.unary(fld)
+        items = [first]
+        while self.peek().kind == "AND":
+            self.take()
+            items.append(self.unary(fld))
+        if len(items) == 1:
+            return first
+        return ("", _and(_strip(x) for x in items))
+
+    def unary(self, fld: str | None) -> Any:
+        kind = self.peek().kind
+        if kind == "NOT":
+            self.take()
+            return ("", Not(_strip(self.unary(fld))))
+        if kind in ("PLUS", "MINUS"):
+            self.take()
+            return ("+" if kind == "PLUS" else "-", _strip(self.unary(fld)))
+        return ("", self.primary(fld))
+
+    def primary(self, fld: str | None) -> Node:
+        tok = self.peek()
+        if tok.kind == "LPAREN":
+            self.take()
+            node = self.or_expr(fld)
+            self.take("RPAREN")
+            return self._boosted(node)
+        if tok.kind == "TERM" and fld is None:
+            nxt = self.tokens[self.i + 1]
+            if nxt.kind == "COLON":
+                self.i += 2
+                return self.field_value(tok.text)
+            if nxt.kind == "CMP":
+                self.i += 2
+                return self.comparison(tok.text, nxt)
+        if tok.kind in ("TERM", "PHRASE"):
+            return self.value(fld)
+        raise KqlSyntaxError(f"Unexpected {tok.text or 'end of input'!r}", tok.pos)
+
+    def field_value(self, fld: str) -> Node:
+        if fld == "_exists_":
+            return Exists(self.take("TERM").text)
+        tok = self.peek()
+        if tok.kind == "LPAREN":
+            self.take()
+            node = self.or_expr(fld)
+            self.take("RPAREN")
+            return self._boosted(node)
+        if tok.kind == "LBRACE" and self.tokens[min(self.i + 2, len(self.tokens) - 1)].kind != "TO":
+            raise KqlUnsupportedError(f"Nested field scope on {fld!r} is not supported.")
+        if tok.kind in ("LBRACKET", "LBRACE"):
+            return self.bracket_range(fld)
+        if tok.kind == "CMP":  # Lucene "status:>=500"
+            self.take()
+            return self.comparison(fld, tok)
+        if tok.kind == "TERM" and tok.text == "*":
+            self.take()
+            return Exists(fld)
+        return self.value(fld)
+
+    def comparison(self, fld: str, op: Token) -> Node:
+        bound = self.take()
+        if bound.kind not in ("TERM", "PHRASE"):
+            raise KqlSyntaxError("Expected a value after comparison", bound.pos)
+        return Range(fld, ((_CMP_OPS[op.text], bound.text),))
+
+    def bracket_range(self, fld: str) -> Node:
+        open_ = self.take()
+        lo = self.take()
+        self.take("TO")
+        hi = self.take()
+        close = self.take()
+        if close.kind not in ("RBRACKET", "RBRACE"):
+            raise KqlSyntaxError("Expected ] or } to close range", close.pos)
+        ops = []
+        if lo.text != "*":
+            ops.append(("gte" if open_.kind == "LBRACKET" else "gt", lo.text))
+        if hi.text != "*":
+            ops.append(("lte" if close.kind == "RBRACKET" else "lt", hi.text))
+        if not ops:
+            return self._boosted(Exists(fld))
+        node = Range(fld, tuple(ops))
+        boost = self._boost()
+        return Range(fld, node.ops, boost) if boost is not None else node
+
+    def value(self, fld: str | None) -> Node:
+        tok = self.take()
+        if tok.kind == "TERM" and tok.wildcard:
+            if tok.text == "*" and fld is None:
+                return MatchAll()
+            raise KqlUnsupportedError(f"Wildcard {tok.text!r} has no structured equivalent.")
+        if tok.kind == "TERM" and tok.text.startswith("/"):
+            raise KqlUnsupportedError(f"Regular expression {tok.text!r} is not supported.")
+        fuzziness = None
+        boost = None
+        while self.peek().kind in ("BOOST", "FUZZY"):
+            mod = self.take()
+            if mod.kind == "BOOST":
+                boost = _number(mod, float)
+            else:
+                fuzziness = _number(mod, int) if mod.text else 2
+        return Term(fld, tok.text, tok.kind == "PHRASE", boost, fuzziness)
+
+    def _boost(self) -> float | None:
+        if self.peek().kind == "BOOST":
+            return _number(self.take(), float)
+        return None
+
+    def _boosted(self, node: Node) -> Node:
+        if self.peek().kind == "BOOST":
+            raise KqlUnsupportedError("Boosting a group is not supported; boost its terms.")
+        return node
+
+
+def _number(tok: Token, kind: type) -> Any:
+    try:
+        return kind(tok.text)
+    except ValueError:
+        raise KqlSyntaxError(f"Bad number {tok.text!r}", tok.pos) from None
+
+
+def _strip(item: Any) -> Node:
+    """Drop a `+`/`-` marker outside a juxtaposition group (`-` still negates)."""
+    if isinstance(item, tuple):
+        mark, node = item
+        return Not(node) if mark == "-" else node
+    return item
+
+
+def _and(items: Iterable[Any]) -> Node:
+    flat: list[Node] = []
+    for item in items:
+        item = _strip(item)
+        flat.extend(item.items if isinstance(item, And) else (item,))
+    return flat[0] if len(flat) == 1 else And(tuple(flat))
+
+
+def _group(items: list[Any]) -> Node:
+    marked = [x if isinstance(x, tuple) else ("", x) for x in items]
+    if any(mark for mark, _ in marked):
+        return Clauses(
+            must=tuple(n for m, n in marked if m == "+"),
+            must_not=tuple(n for m, n in marked if m == "-"),
+            should=tuple(n for m, n in marked if m == ""),
+        )
+    flat: list[Node] = []
+    for _, node in marked:
+        flat.extend(node.items if isinstance(node, Or) else (node,))
+    return flat[0] if len(flat) == 1 else Or(tuple(flat))
+
+
+def parse(text: str, default_operator: Literal["and", "or"] = "or") -> Node:
+    """Parse KQL / Lucene query-string syntax into an AST."""
+    return _Parser(tokenize(text), default_operator).parse()
+
+
+# -----------------------------------------------------------------------------
+# Compiler: AST -> Query DSL models
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class _Options:
+    text_fields: frozenset[str]
+    default_fields: tuple[str, ...]
+
+
+@dataclass(slots=True)
+class _Compiled:
+    query: Any
+    exact: bool  # non-scoring; belongs in `bool.filter`
+    negated: Any = None  # set for NOT x: the query to place in `must_not`
+    match: tuple[str, str] | None = None  # (field, token) mergeable into one `match`
+
+
+def _scalar(text: str) -> Any:
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _compile_term(node: Term, opts: _Options) -> _Compiled:
+    fields = (node.field,) if node.field is not None else opts.default_fields
+    if len(fields) > 1:
+        mm = MultiMatchQuery.build(
+            node.value, list(fields),
+            type="phrase" if node.phrase else None,
+            boost=node.boost,
+            **({"fuzziness": node.fuzziness} if node.fuzziness is not None else {}),
+        )
+        return _Compiled(mm, exact=False)
+    fld = fields[0]
+    if fld not in opts.text_fields:
+        if node.fuzziness is not None:
+            raise KqlUnsupportedError(f"Fuzzy matching on exact field {fld!r} is not supported.")
+        value: Any = TermValue(value=node.value, boost=node.boost) if node.boost else node.value
+        return _Compiled(TermQuery(term={fld: value}), exact=True)
+    if node.phrase:
+        return _Compiled(
+            MultiMatchQuery.build(node.value, [fld], type="phrase", boost=node.boost), exact=False
+        )
+    if node.boost is not None or node.fuzziness is not None:
+        opts_ = MatchFieldOptions(query=node.value, boost=node.boost, fuzziness=node.fuzziness)
+        return _Compiled(MatchQuery(match={fld: opts_}), exact=False)
+    single = " " not in node.value.strip()
+    return _Compiled(
+        MatchQuery(match={fld: node.value}), exact=False, match=(fld, node.value) if single else None
+    )
+
+
+def _compile(node: Node, opts: _Options) -> _Compiled:
+    if isinstance(node, Term):
+        return _compile_term(node, opts)
+    if isinstance(node, Range):
+        ops = RangeOps(**{op: _scalar(v) for op, v in node.ops}, boost=node.boost)
+        return _Compiled(RangeQuery(range={node.field: ops}), exact=node.boost is None)
+    if isinstance(node, Exists):
+        return _Compiled(ExistsQuery(exists={"field": node.field}), exact=True)
+    if isinstance(node, MatchAll):
+        return _Compiled(MatchAllQuery(), exact=True)
+    if isinstance(node, Not):
+        inner = _compile(node.item, opts)
+        return _Compiled(BoolQuery(bool=BoolBody(must_not=[inner.query])), exact=True, negated=inner.query)
+    if isinstance(node, And):
+        return _compile_and([_compile(x, opts) for x in node.items])
+    if isinstance(node, Or):
+        return _compile_or([_compile(x, opts) for x in node.items])
+    must = [_compile(x, opts) for x in node.must]
+    must_not = [_compile(x, opts).query for x in node.must_not]
+    should = [_compile(x, opts) for x in node.should]
+    if not must:
+        base = _compile_or(should) if should else _Compiled(MatchAllQuery(), exact=True)
+        return _with_must_not(base, must_not)
+    base = _compile_and(must)
+    if not should:
+        return _with_must_not(base, must_not)
+    # Required clauses present: optional ones only contribute to the score.
+    body = _body_of(base)
+    body.should = [c.query for c in _merge_or(should)]
+    if body.must is None and body.filter is None:
+        body.minimum_should_match = 0
+    if must_not:
+        body.must_not = (body.must_not or []) + must_not
+    return _Compiled(BoolQuery(bool=body), exact=False)
+
+
+def _body_of(c: _Compiled) -> BoolBody:
+    q = c.query
+    if isinstance(q, MatchAllQuery):
+        return BoolBody()
+    if isinstance(q, BoolQuery) and q.bool.should is None and q.bool.boost is None:
+        return q.bool.model_copy()
+    return BoolBody(filter=[q]) if c.exact else BoolBody(must=[q])
+
+
+def _with_must_not(c: _Compiled, must_not: list[Any]) -> _Compiled:
+    if not must_not:
+        return c
+    body = _body_of(c)
+    body.must_not = (body.must_not or []) + must_not
+    return _Compiled(BoolQuery(bool=body), exact=c.exact)
+
+
+def _merge_ranges(clauses: list[_Compiled]) -> list[_Compiled]:
+    """AND of ranges on one field -> one range with the combined bounds."""
+    merged: dict[str, RangeOps] = {}
+    out: list[_Compiled] = []
+    for c in clauses:
+        q = c.query
+        if c.exact and isinstance(q, RangeQuery):
+            (fld, ops), = q.range.items()
+            prev = merged.get(fld)
+            if prev is not None and not any(
+                getattr(prev, k) is not None and getattr(ops, k) is not None
+                for k in ("gte", "gt", "lte", "lt")
+            ):
+                for k in ("gte", "gt", "lte", "lt"):
+                    if getattr(ops, k) is not None:
+                        setattr(prev, k, getattr(ops, k))
+                continue
+            ops = ops.model_copy()
+            q = RangeQuery(range={fld: ops})
+            merged.setdefault(fld, ops)
+            c = _Compiled(q, exact=True)
+        out.append(c)
+    return out
+
+
+def _compile_and(clauses: list[_Compiled]) -> _Compiled:
+    clauses = [c for c in clauses if not isinstance(c.query, MatchAllQuery)] or clauses[:1]
+    clauses = _merge_ranges(clauses)
+    if len(clauses) == 1:
+        return clauses[0]
+    body = BoolBody()
+    for c in clauses:
+        if c.negated is not None:
+            body.must_not = (body.must_not or []) + [c.negated]
+        elif c.exact:
+            body.filter = (body.filter or []) + [c.query]
+        else:
+            body.must = (body.must or []) + [c.query]
+    return _Compiled(BoolQuery(bool=body), exact=body.must is None)
+
+
+def _merge_text(clauses: list[_Compiled]) -> list[_Compiled]:
+    """
+    OR of single-token matches on one text field -> one `match`.
+
+    Only sound under OR: the analyzer may split a token ("foo-bar" -> foo,
+    bar), and one `match` ORs every token, so merging ANDed matches with
+    `operator: "and"` would require foo AND bar where the query asked for
+    either.
+    """
+    tokens: dict[str, list[str]] = {}
+    for c in clauses:
+        if c.match is not None:
+            tokens.setdefault(c.match[0], []).append(c.match[1])
+    if all(len(v) < 2 for v in tokens.values()):
+        return clauses
+    out: list[_Compiled] = []
+    done: set[str] = set()
+    for c in clauses:
+        if c.match is None or len(tokens[c.match[0]]) < 2:
+            out.append(c)
+            continue
+        fld = c.match[0]
+        if fld in done:
+            continue
+        done.add(fld)
+        words = list(dict.fromkeys(tokens[fld]))
+        out.append(_Compiled(MatchQuery(match={fld: " ".join(words)}), exact=False))
+    return out
+
+
+def _merge_or(clauses: list[_Compiled]) -> list[_Compiled]:
+    """OR of exact terms on one field -> one `terms`; OR of text tokens -> one `match`."""
+    clauses = _merge_text(clauses)
+    values: dict[str, list[Any]] = {}
+    for c in clauses:
+        if isinstance(c.query, TermQuery):
+            (fld, v), = c.query.term.items()
+            if not isinstance(v, TermValue):
+                values.setdefault(fld, []).append(v)
+    out: list[_Compiled] = []
+    emitted: set[str] = set()
+    for c in clauses:
+        if isinstance(c.query, TermQuery):
+            (fld, v), = c.query.term.items()
+            if not isinstance(v, TermValue) and len(values[fld]) > 1:
+                if fld not in emitted:
+                    emitted.add(fld)
+                    uniq = list(dict.fromkeys(values[fld]))
+                    out.append(_Compiled(TermsQuery(terms={fld: uniq}), exact=True))
+                continue
+        out.append(c)
+    return out
+
+
+def _compile_or(clauses: list[_Compiled]) -> _Compiled:
+    clauses = _merge_or(clauses)
+    if len(clauses) == 1:
+        return clauses[0]
+    body = BoolBody(should=[c.query for c in clauses], minimum_should_match=1)
+    return _Compiled(BoolQuery(bool=body), exact=all(c.exact for c in clauses))
+
+
+@lru_cache(maxsize=2048)
+def _compile_cached(
+    text: str,
+    default_operator: Literal["and", "or"],
+    text_fields: frozenset[str],
+    default_fields: tuple[str, ...],
+) -> Any:
+    compiled = _compile(parse(text, default_operator), _Options(text_fields, default_fields))
+    query = compiled.query
+    if compiled.exact and not isinstance(query, MatchAllQuery):
+        if not (isinstance(query, BoolQuery) and query.bool.must is None and query.bool.should is None):
+            query = BoolQuery(bool=BoolBody(filter=[query]))
+    return freeze(query)
+
+
+def compile_kql(
+    text: str,
+    default_operator: Literal["and", "or"] = "or",
+    text_fields: Iterable[str] = DEFAULT_TEXT_FIELDS,
+    default_fields: Iterable[str] = DEFAULT_SEARCH_FIELDS,
+) -> Any:
+    """
+    Compile a KQL / Lucene query string to a Query DSL model tree (cached).
+
+    Usage:
+      compile_kql('@message:(error OR timeout) AND service:payments AND env:prod')
+      # -> {"bool": {"must": [{"match": {"@message": "error timeout"}}],
+      #              "filter": [{"term": {"service": "payments"}}, {"term": {"env": "prod"}}]}}
+
+    Notes:
+      - Fields outside `text_fields` are exact: they compile to `term`/`terms`/
+        `range`/`exists` clauses placed in `bool.filter` (cacheable, no scoring).
+      - Supported: AND/OR/NOT (any case), &&/||/!, +/- prefixes, grouping,
+        field:(a OR b), "phrases", field >= v, field:[a TO b}, field:*,
+        _exists_:field, term^boost, term~fuzziness.
+      - Wildcards, regexes and nested scopes raise `KqlUnsupportedError`.
+      - Returned models are shared and frozen (see `valcache.freeze`).
+    """
+    return _compile_cached(
+        text.strip(), default_operator, frozenset(text_fields), tuple(default_fields)
+    )
+
+
+def compile_cache_info() -> Any:
+    """Hit/miss counters of the `compile_kql` cache."""
+    return _compile_cached.cache_info()
+
+
+# -----------------------------------------------------------------------------
+# Search box -> _search body
+# -----------------------------------------------------------------------------
+
+def search_box_request(
+    text: str,
+    from_iso: str | None = None,
+    to_iso: str | None = None,
+    size: int | None = None,
+    time_field: str = "@timestamp",
+    **options: Any,
+) -> SearchRequestWithAggs:
+    """
+    Build a `_search` body from the search tab: "ES DSL or KQL" plus a time window.
+
+    JSON input (starting with "{") is taken as a Query DSL container; anything
+    else is compiled with `compile_kql`. The window goes into `bool.filter`.
+    """
+    text = text.strip()
+    if text.startswith("{"):
+        query = SearchRequestWithAggs.model_validate({"query": json.loads(text)}).query
+    else:
+        query = compile_kql(text, **options)
+    if from_iso or to_iso:
+        window = RangeQuery(range={time_field: RangeOps(gte=from_iso, lte=to_iso)})
+        if isinstance(query, BoolQuery) and query.bool.boost is None:
+            # Cached trees are frozen: build a new body around the shared clauses.
+            body = BoolBody(**{**dict(query.bool), "filter": (query.bool.filter or []) + [window]})
+        elif isinstance(query, MatchAllQuery):
+            body = BoolBody(filter=[window])
+        else:
+            body = BoolBody(must=[query], filter=[window])
+        query = BoolQuery(bool=body)
+    return SearchRequestWithAggs(query=query, size=size)
+
+
+if __name__ == "__main__":
+    for q in (
+        "@message:(error OR timeout) AND service:payments AND env:prod",
+        'service:(payments or billing) and not log.level:debug and "connection reset"',
+        "http.response.status_code >= 500 and http.response.status_code < 600",
+        "+env:prod -host.name:web-1 message:timeout^2",
+        "status:[400 TO 499] || _exists_:error.message",
+    ):
+        print(q)
+        print("  ", json.dumps(compile_kql(q).model_dump(by_alias=True, exclude_none=True)))
+    print(compile_cache_info())
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import copy
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Collection, Literal, Protocol
+
+from pydantic import BaseModel
+
+from dsl_models import MAX_TERMS_VALUES, SearchRequest, SearchRequestWithAggs
+from slicing import SearchFn, _gateway_search, _slice_aggs, merge_responses
+
+
+TERMS_CHUNK_THRESHOLD = MAX_TERMS_VALUES  # lists within the cluster's max_terms_count go out in one request
+TERMS_CHUNK_SIZE = 16_384
+SINGLE_VALUED_FIELDS = frozenset({"_id"})  # fields a chunk split can never match twice
+MAX_TERMS_CHUNKS = 16  # "auto" prefers a terms lookup over more chunks than this
+DEFAULT_MAX_CONCURRENCY = 4
+LOOKUP_INDEX = "mcp-terms-lookup"
+LOOKUP_PATH = "values"
+LARGE_TERMS_STRATEGY: Literal["auto", "chunk", "lookup"] = "auto"
+GATEWAY_LOOKUP_STORE = False  # opt in to indexing/deleting lookup documents through the gateway
+
+ClausePath = tuple[str | int, ...]
+
+
+# -----------------------------------------------------------------------------
+# Finding large clauses
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class LargeTerms:
+    """
+    One `terms` clause above the threshold.
+
+    `path` addresses the clause inside the dumped query (e.g.
+    ("bool", "filter", 0)); `conjunctive` is True when every enclosing clause
+    is a `must`/`filter`, i.e. a document can only match through this clause
+    and splitting its values splits the matches.
+    """
+    field: str
+    values: list[Any]
+    path: ClausePath
+    conjunctive: bool
+
+
+def _dump(obj: Any) -> dict[str, Any]:
+    return obj.model_dump(by_alias=True, exclude_none=True) if isinstance(obj, BaseModel) else obj
+
+
+def find_large_terms(query: Any, threshold: int = TERMS_CHUNK_THRESHOLD) -> list[LargeTerms]:
+    """`terms` clauses with more than `threshold` values, in document order."""
+    out: list[LargeTerms] = []
+    stack: list[tuple[dict[str, Any], ClausePath, bool]] = [(_dump(query), (), True)]
+    while stack:
+        node, path, conjunctive = stack.pop()
+        terms = node.get("terms")
+        if isinstance(terms, dict):
+            for field, values in terms.items():
+                if isinstance(values, list) and len(values) > threshold:
+                    out.append(LargeTerms(field, values, path, conjunctive))
+        body = node.get("bool")
+        if isinstance(body, dict):
+            for occur in ("must_not", "should", "filter", "must"):  # popped in reverse
+                children = body.get(occur) or []
+                for i in reversed(range(len(children))):
+                    stack.append((children[i], (*path, "bool", occur, i), conjunctive and occur in ("must", "filter")))
+    return out
+
+
+def _replace(query: dict[str, Any], path: ClausePath, clause: dict[str, Any]) -> dict[str, Any]:
+    """Copy of `query` with the clause at `path` replaced (only the path is copied)."""
+    if not path:
+        return clause
+    head, *rest = path
+    node = copy.copy(query)
+    node[head] = _replace(query[head], tuple(rest), clause)
+    return node
+
+
+def _with_aggs(request: SearchRequest) -> SearchRequestWithAggs:
+    if isinstance(request, SearchRequestWithAggs):
+        return request
+    return SearchRequestWithAggs.model_validate(request.model_dump(by_alias=True, exclude_none=True))
+
+
+# -----------------------------------------------------------------------------
+# Rewrites
+# -----------------------------------------------------------------------------
+
+def _chunkable(large: list[LargeTerms], single_valued: Collection[str]) -> list[LargeTerms]:
+    return [t for t in large if t.conjunctive and t.field in single_valued]
+
+
+def chunk_bodies(
+    request: SearchRequest,
+    threshold: int = TERMS_CHUNK_THRESHOLD,
+    chunk_size: int = TERMS_CHUNK_SIZE,
+    single_valued: Collection[str] = SINGLE_VALUED_FIELDS,
+) -> list[dict[str, Any]]:
+    """
+    Split the largest conjunctive `terms` clause into `chunk_size` pieces, one
+    `_search` body per piece (merge with `slicing.merge_responses`).
+
+    Notes:
+      - Only clauses on `single_valued` fields are split: a document then
+        matches exactly one chunk, so merged hits, totals and aggregations
+        are those of the unsplit query. A document holding several values of
+        a field (tags, host.ip, ...) could match several chunks and be
+        returned and counted once per chunk.
+      - Like time slices, each chunk fetches `from + size` hits and
+        merge-friendly aggregations (see `slicing._slice_aggs`).
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    body = _dump(request)
+    candidates = _chunkable(find_large_terms(body["query"], threshold), single_valued)
+    if not candidates:
+        raise ValueError(
+            f"No `terms` clause above {threshold} values on a single-valued field "
+            f"({', '.join(sorted(single_valued))}) that every match must satisfy; only such must/filter "
+            "clauses can be chunked without counting documents twice (use a terms lookup instead)."
+        )
+    target = max(candidates, key=lambda t: len(t.values))
+    base = dict(body)
+    base["size"] = base.pop("from", 0) + base.get("size", 10)
+    if base.get("aggs"):
+        base["aggs"] = _slice_aggs(base["aggs"])
+    out = []
+    for i in range(0, len(target.values), chunk_size):
+        part = dict(base)
+        part["query"] = _replace(body["query"], target.path, {"terms": {target.field: target.values[i:i + chunk_size]}})
+        out.append(part)
+    return out
+
+
+def lookup_body(
+    request: SearchRequest,
+    threshold: int = TERMS_CHUNK_THRESHOLD,
+    lookup_index: str = LOOKUP_INDEX,
+    path: str = LOOKUP_PATH,
+) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """
+    Rewrite every large `terms` clause to a terms lookup.
+
+    Returns (body, documents): `documents` maps a fresh document ID to the
+    `{path: values}` document the caller must index into `lookup_index`
+    (refreshed) before sending `body`.
+    """
+    body = _dump(request)
+    query = body["query"]
+    documents: dict[str, dict[str, Any]] = {}
+    for t in find_large_terms(query, threshold):
+        doc_id = f"terms-{uuid.uuid4().hex}"
+        documents[doc_id] = {path: t.values}
+        query = _replace(query, t.path, {"terms": {t.field: {"index": lookup_index, "id": doc_id, "path": path}}})
+    return {**body, "query": query}, documents
+
+
+# -----------------------------------------------------------------------------
+# Execution
+# -----------------------------------------------------------------------------
+
+class LookupStore(Protocol):
+    def put(self, index: str, doc_id: str, document: dict[str, Any]) -> None: ...
+    def delete(self, index: str, doc_id: str) -> None: ...
+
+
+class GatewayLookupStore:
+    """Lookup documents indexed through the gateway (visible before the search runs)."""
+
+    def put(self, index: str, doc_id: str, document: dict[str, Any]) -> None:
+        from server import _post  # deferred: pulls in the MCP server stack
+
+        _post(f"/{index}/_doc/{doc_id}?refresh=wait_for", document)
+
+    def delete(self, index: str, doc_id: str) -> None:
+        from server import _delete
+
+        _delete(f"/{index}/_doc/{doc_id}")
+
+
+def run_large_terms(
+    request: SearchRequest,
+    index: str | None = None,
+    search: SearchFn | None = None,
+    strategy: Literal["auto", "chunk", "lookup"] | None = None,
+    threshold: int = TERMS_CHUNK_THRESHOLD,
+    chunk_size: int = TERMS_CHUNK_SIZE,
+    max_chunks: int = MAX_TERMS_CHUNKS,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    store: LookupStore | None = None,
+    lookup_index: str = LOOKUP_INDEX,
+    single_valued: Collection[str] = SINGLE_VALUED_FIELDS,
+) -> dict[str, Any]:
+    """
+    Run a search whose `terms` clauses may be too large for one request.
+
+    Strategies (default LARGE_TERMS_STRATEGY):
+      chunk   split the largest must/filter `terms` clause on a
+              `single_valued` field into `chunk_size` pieces, run them
+              `max_concurrency` at a time, merge the responses
+      lookup  index the values as a temporary document and query it with a
+              terms lookup (one request; the document is deleted afterwards)
+      auto    chunk when that is possible in at most `max_chunks` requests,
+              else lookup when a store is available, else chunk when
+              possible, else send the request as is
+
+    Usage:
+      run_large_terms(req, index="logs-*")
+      run_large_terms(req, search=lambda body: localexec.search(body, batch), strategy="chunk")
+
+    Notes:
+      - Requests whose `terms` lists all fit under `threshold` (by default
+        the cluster's max_terms_count) are sent unchanged, as one request.
+      - `index` defaults `search` to the gateway. Lookup documents are only
+        written when a `store` is passed, or through GatewayLookupStore when
+        GATEWAY_LOOKUP_STORE is set; otherwise "auto" chunks or sends as is.
+    """
+    if search is None:
+        if index is None:
+            raise ValueError("Pass either `index` (gateway search) or a `search` callable.")
+        search = _gateway_search(index)
+        if store is None and GATEWAY_LOOKUP_STORE:
+            store = GatewayLookupStore()
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be > 0")
+    strategy = strategy or LARGE_TERMS_STRATEGY
+    large = find_large_terms(request.query, threshold)
+    if not large:
+        return search(_dump(request))
+
+    chunkable = _chunkable(large, single_valued)
+    if strategy == "auto":
+        chunks = math.ceil(max((len(t.values) for t in chunkable), default=0) / chunk_size)
+        if chunkable and (chunks <= max_chunks or store is None):
+            strategy = "chunk"
+        elif store is not None:
+            strategy = "lookup"
+        else:
+            return search(_dump(request))  # nothing to rewrite with exactly; let the cluster decide
+
+    if strategy == "lookup":
+        if store is None:
+            raise ValueError(
+                "The lookup strategy needs a LookupStore (or `index` with GATEWAY_LOOKUP_STORE enabled)."
+            )
+        body, documents = lookup_body(request, threshold, lookup_index)
+        try:
+            for doc_id, document in documents.items():
+                store.put(lookup_index, doc_id, document)
+            return search(body)
+        finally:
+            for doc_id in documents:
+                store.delete(lookup_index, doc_id)
+
+    started = time.perf_counter()
+    bodies = chunk_bodies(request, threshold, chunk_size, single_valued)
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(bodies))) as pool:
+        responses = list(pool.map(search, bodies))
+    return merge_responses(_with_aggs(request), responses, int((time.perf_counter() - started) * 1000))
+
+
+if __name__ == "__main__":
+    import json
+
+    import localexec
+    from fastjson import dump_json
+
+    batch = localexec.synthetic_batch(100_000, seed=3)
+    ids = [f"doc-{i}" for i in range(0, 100_000, 7)] * 2  # pasted twice, as agents do
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"bool": {
+            "must": [{"match": {"message": "timeout"}}],
+            "filter": [{"terms": {"_id": ids}}],
+        }},
+        "size": 5,
+        "aggs": {"svc": {"terms": {"field": "service.name", "size": 3}}},
+    })
+    local = lambda body: localexec.search(body, batch)  # noqa: E731
+    print(f"terms values: {len(ids)} pasted -> {len(req.query.bool.filter[0].terms['_id'])} after dedupe")
+    whole = local(req)
+    chunked = run_large_terms(req, search=local, strategy="chunk", threshold=1024, chunk_size=2000)
+    print("hits equal:", [h["_id"] for h in whole["hits"]["hits"]] == [h["_id"] for h in chunked["hits"]["hits"]],
+          "total equal:", whole["hits"]["total"] == chunked["hits"]["total"],
+          "aggs equal:", whole["aggregations"]["svc"]["buckets"] == chunked["aggregations"]["svc"]["buckets"])
+    body, docs = lookup_body(req, 1024)
+    print(f"body bytes: inline {len(dump_json(req))}, per chunk <= "
+          f"{max(len(json.dumps(b)) for b in chunk_bodies(req, 1024, 2000))}, lookup {len(json.dumps(body))}")
@@ -0,0 +1,683 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import numpy as np
+
+from datemath import parse_interval, parse_offset, tz_offsets
+from dsl_models import (
+    Aggregation,
+    CompositeAgg,
+    DateHistogramAgg,
+    FiltersAgg,
+    HistogramAgg,
+    PercentileRanksAgg,
+    PercentilesAgg,
+    RandomSamplerAgg,
+    RangeAgg,
+    SamplerAgg,
+    TermsAgg,
+    resolve_bound,
+)
+from localexec import Column, ExecContext, LogBatch, _keyword_text, compile_query
+from sketches import DEFAULT_HDR_DIGITS, DEFAULT_TDIGEST_COMPRESSION, HdrHistogram, Sketch, TDigest
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+def aggregate(
+    aggs: dict[str, Aggregation],
+    batch: LogBatch,
+    mask: np.ndarray | None = None,
+    ctx: ExecContext | None = None,
+) -> dict[str, Any]:
+    """
+    Compute an `aggs` tree over the rows of `batch` selected by `mask`.
+
+    Output matches the `aggregations` object of an ES `_search` response.
+
+    Usage:
+      mask, _ = compile_query(req.query)(batch)
+      aggregate(req.aggs, batch, mask)["by_host"]["buckets"][0]["doc_count"]
+    """
+    ctx = ctx or ExecContext()
+    rows = np.arange(len(batch)) if mask is None else np.flatnonzero(mask)
+    return _run_aggs(aggs, batch, rows, ctx)
+
+
+def _run_aggs(
+    aggs: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    return {name: _run_node(node, batch, rows, ctx) for name, node in (aggs or {}).items()}
+
+
+def _run_node(node: Aggregation, batch: LogBatch, rows: np.ndarray, ctx: ExecContext) -> dict[str, Any]:
+    if node.terms is not None:
+        return _terms(node.terms, node.aggs, batch, rows, ctx)
+    if node.date_histogram is not None:
+        return _date_histogram(node.date_histogram, node.aggs, batch, rows, ctx)
+    if node.histogram is not None:
+        return _histogram(node.histogram, node.aggs, batch, rows, ctx)
+    if node.range is not None:
+        return _range(node.range, node.aggs, batch, rows, ctx)
+    if node.filters is not None:
+        return _filters(node.filters, node.aggs, batch, rows, ctx)
+    if node.composite is not None:
+        return _composite(node.composite, node.aggs, batch, rows, ctx)
+    if node.sampler is not None:
+        return _sampler(node.sampler, node.aggs, batch, rows, ctx)
+    if node.random_sampler is not None:
+        return _random_sampler(node.random_sampler, node.aggs, batch, rows, ctx)
+    for metric in ("avg", "sum", "min", "max", "stats"):
+        spec = getattr(node, metric)
+        if spec is not None:
+            return _metric(metric, spec["field"], batch, rows)
+    if node.cardinality is not None:
+        return _cardinality(node.cardinality, batch, rows)
+    for kind in ("percentiles", "percentile_ranks"):
+        spec = getattr(node, kind)
+        if spec is not None:
+            return _percentiles_response(spec, _new_sketch(spec).add(_metric_values(spec.field, batch, rows)))
+    raise ValueError("Aggregation node defines no aggregation type.")
+
+
+# -----------------------------------------------------------------------------
+# Grouping helpers
+# -----------------------------------------------------------------------------
+
+def _group_rows(rows: np.ndarray, group: np.ndarray, n_groups: int) -> list[np.ndarray]:
+    """Split `rows` by `group` ids (0..n_groups-1) using one stable sort."""
+    order = np.argsort(group, kind="stable")
+    counts = np.bincount(group, minlength=n_groups)
+    return np.split(rows[order], np.cumsum(counts)[:-1])
+
+
+def _bucket(
+    base: dict[str, Any],
+    rows: np.ndarray | None,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    if sub:
+        base.update(_run_aggs(sub, batch, rows if rows is not None else np.empty(0, np.int64), ctx))
+    return base
+
+
+def _present_rows(col: Column, rows: np.ndarray) -> np.ndarray:
+    return rows[col.present[rows]]
+
+
+def _iso(ms: float, offset_ms: int = 0) -> str:
+    dt = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=float(ms) + offset_ms)
+    text = dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}"
+    if offset_ms == 0:
+        return text + "Z"
+    sign = "+" if offset_ms > 0 else "-"
+    minutes = abs(offset_ms) // 60_000
+    return f"{text}{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _num(v: float) -> float | int:
+    return int(v) if float(v).is_integer() else float(v)
+
+
+# -----------------------------------------------------------------------------
+# terms
+# -----------------------------------------------------------------------------
+
+def _terms_keys(col: Column, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray, list[Any]]:
+    """(group id per present row, the present rows, key per group)."""
+    rows = _present_rows(col, rows)
+    if col.kind == "keyword":
+        used, group = np.unique(col.values[rows], return_inverse=True)
+        return group, rows, [col.vocab[i] for i in used]
+    keys, group = np.unique(col.values[rows], return_inverse=True)
+    return group, rows, list(keys)
+
+
+def _terms_key_fields(col: Column, key: Any) -> dict[str, Any]:
+    if col.kind == "keyword":
+        return {"key": key}
+    if col.kind == "bool":
+        return {"key": int(key), "key_as_string": "true" if key else "false"}
+    if col.kind == "date":
+        return {"key": int(key), "key_as_string": _iso(key)}
+    return {"key": _num(key)}
+
+
+def _include_filter(spec: str | list[str] | None, keys: list[Any], include: bool) -> np.ndarray:
+    if spec is None:
+        return np.ones(len(keys), dtype=bool)
+    if isinstance(spec, str):
+        rx = re.compile(spec)
+        hit = np.array([rx.fullmatch(str(k)) is not None for k in keys], dtype=bool)
+    else:
+        wanted = {str(s) for s in spec}
+        hit = np.array([str(k) in wanted for k in keys], dtype=bool)
+    return hit if include else ~hit
+
+
+def _terms_missing_key(agg: TermsAgg, col: Column | None, ctx: ExecContext) -> Any:
+    """`agg.missing` as a key of `col`'s kind; ValueError when the field cannot hold it."""
+    value = agg.missing
+    if col is None or col.kind == "keyword":
+        return _keyword_text(value)
+    if col.kind == "bool":
+        if isinstance(value, bool) or (isinstance(value, str) and value in ("true", "false")):
+            return value is True or value == "true"
+    elif col.kind == "date":
+        ms = resolve_bound(value, ctx.now_ms)
+        if ms is not None:
+            return float(ms)
+    elif not isinstance(value, bool):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    raise ValueError(f"terms.missing [{value}] is not a valid value for {col.kind} field [{agg.field}].")
+
+
+def _check_terms_order(agg: TermsAgg, sub: dict[str, Aggregation] | None) -> dict[str, str]:
+    """`agg.order` (default `_count` desc); ValueError when a path names no sub-aggregation."""
+    order = agg.order or {"_count": "desc"}
+    for key in order:
+        if key in ("_count", "_key"):
+            continue
+        name = key.partition(".")[0]
+        if not sub or name not in sub:
+            raise ValueError(
+                f"terms.order path [{key}] on field [{agg.field}] must be _count, _key "
+                f"or a sub-aggregation (found: {sorted(sub or {})})."
+            )
+    return order
+
+
+def _terms(
+    agg: TermsAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    if agg.script is not None:
+        raise ValueError("terms.script is not supported by the local aggregation engine.")
+    col = batch.column(agg.field)
+    order = _check_terms_order(agg, sub)
+    missing_key = None if agg.missing is None else _terms_missing_key(agg, col, ctx)
+    size = 10 if agg.size is None else agg.size
+    min_doc_count = 1 if agg.min_doc_count is None else agg.min_doc_count
+    if col is None:
+        group, present, keys = np.empty(0, np.int64), np.empty(0, np.int64), []
+    else:
+        group, present, keys = _terms_keys(col, rows)
+    counts = np.bincount(group, minlength=len(keys))
+    if missing_key is not None:
+        missing_rows = rows if col is None else rows[~col.present[rows]]
+        if len(missing_rows):
+            # Like ES, a missing value equal to an existing key joins that bucket.
+            g = keys.index(missing_key) if missing_key in keys else len(keys)
+            if g == len(keys):
+                keys = keys + [missing_key]
+                counts = np.append(counts, 0)
+            counts[g] += len(missing_rows)
+            group = np.append(group, np.full(len(missing_rows), g))
+            present = np.append(present, missing_rows)
+    keep = (counts >= max(min_doc_count, 0)) & _include_filter(agg.include, keys, True) \
+        & _include_filter(agg.exclude, keys, False)
+    candidates = np.flatnonzero(keep)
+
+    groups = _group_rows(present, group, len(keys)) if sub else None
+    sub_results: dict[int, dict[str, Any]] = {}
+    if any(k not in ("_count", "_key") for k in order):
+        # Ordering by a sub-aggregation needs it for every candidate bucket.
+        for g in candidates:
+            sub_results[int(g)] = _run_aggs(sub, batch, groups[g], ctx)
+
+    def sort_value(g: int, key: str) -> Any:
+        if key == "_count":
+            return int(counts[g])
+        if key == "_key":
+            return keys[g]
+        name, _, prop = key.partition(".")
+        result = sub_results[g][name]
+        v = result.get(prop or "value")
+        return float("-inf") if v is None else v
+
+    ranked = [int(g) for g in candidates]
+    # Stable multi-key sort: apply criteria from last to first; ties fall back to key asc.
+    ranked.sort(key=lambda g: keys[g])
+    for key, direction in reversed(list(order.items())):
+        ranked.sort(key=lambda g: sort_value(g, key), reverse=direction == "desc")
+    top = ranked[:size]
+
+    buckets = []
+    for g in top:
+        base = _terms_key_fields(col, keys[g]) if col is not None else {"key": keys[g]}
+        base["doc_count"] = int(counts[g])
+        if sub:
+            base.update(sub_results.get(g) or _run_aggs(sub, batch, groups[g], ctx))
+        buckets.append(base)
+    out: dict[str, Any] = {
+        "doc_count_error_upper_bound": 0,
+        "sum_other_doc_count": int(counts.sum() - sum(int(counts[g]) for g in top)),
+        "buckets": buckets,
+    }
+    return out
+
+
+# -----------------------------------------------------------------------------
+# date_histogram
+# -----------------------------------------------------------------------------
+
+def _date_histogram(
+    agg: DateHistogramAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    col = batch.column(agg.field)
+    if col is None or col.kind != "date":
+        return {"buckets": []}
+    if agg.fixed_interval:
+        interval = parse_interval(agg.fixed_interval, calendar=False)
+    else:
+        interval = parse_interval(agg.calendar_interval or "", calendar=True)
+    shift = parse_offset(agg.offset)
+    tz = agg.time_zone
+    rows = _present_rows(col, rows)
+    ts = col.values[rows]
+    if agg.hard_bounds:
+        lo = resolve_bound(agg.hard_bounds.get("min"), ctx.now_ms, tz)
+        hi = resolve_bound(agg.hard_bounds.get("max"), ctx.now_ms, tz, round_up=True)
+        keep = np.ones(len(ts), dtype=bool)
+        if lo is not None:
+            keep &= ts >= lo
+        if hi is not None:
+            keep &= ts <= hi
+        rows, ts = rows[keep], ts[keep]
+    keys, group = np.unique(interval.round_down(ts, tz, shift), return_inverse=True)
+    counts = np.bincount(group, minlength=len(keys))
+    groups = _group_rows(rows, group, len(keys)) if sub else None
+    per_key = {int(k): i for i, k in enumerate(keys)}
+
+    min_doc_count = 0 if agg.min_doc_count is None else agg.min_doc_count
+    all_keys = keys
+    if min_doc_count == 0:
+        lo_key = int(keys[0]) if len(keys) else None
+        hi_key = int(keys[-1]) if len(keys) else None
+        if agg.extended_bounds:
+            e_lo = resolve_bound(agg.extended_bounds.get("min"), ctx.now_ms, tz)
+            e_hi = resolve_bound(agg.extended_bounds.get("max"), ctx.now_ms, tz, round_up=True)
+            if e_lo is not None:
+                lo_key = int(e_lo) if lo_key is None else min(lo_key, int(e_lo))
+            if e_hi is not None:
+                hi_key = int(e_hi) if hi_key is None else max(hi_key, int(e_hi))
+        if lo_key is not None and hi_key is not None:
+            all_keys = interval.boundaries(lo_key, hi_key, tz, shift)
+    offsets = tz_offsets(np.asarray(all_keys, dtype=np.int64), tz)
+
+    buckets = []
+    for utc_key, off in zip(all_keys.tolist(), offsets.tolist()):
+        i = per_key.get(utc_key)
+        count = int(counts[i]) if i is not None else 0
+        if count < min_doc_count:
+            continue
+        base = {"key_as_string": _iso(utc_key, off), "key": utc_key, "doc_count": count}
+        buckets.append(_bucket(base, groups[i] if i is not None and groups else None, sub, batch, ctx))
+    if agg.order and agg.order.get("_count"):
+        buckets.sort(key=lambda b: b["doc_count"], reverse=agg.order["_count"] == "desc")
+    elif agg.order and agg.order.get("_key") == "desc":
+        buckets.reverse()
+    return {"buckets": buckets}
+
+
+# -----------------------------------------------------------------------------
+# histogram
+# -----------------------------------------------------------------------------
+
+def _histogram(
+    agg: HistogramAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    col = batch.column(agg.field)
+    if col is None or col.kind not in ("number", "date"):
+        return {"buckets": []}
+    rows = _present_rows(col, rows)
+    values = col.values[rows].astype(np.float64)
+    if agg.hard_bounds:
+        keep = np.ones(len(values), dtype=bool)
+        if agg.hard_bounds.get("min") is not None:
+            keep &= values >= agg.hard_bounds["min"]
+        if agg.hard_bounds.get("max") is not None:
+            keep &= values <= agg.hard_bounds["max"]
+        rows, values = rows[keep], values[keep]
+    offset = agg.offset or 0.0
+    slot = np.floor((values - offset) / agg.interval).astype(np.int64)
+    slots, group = np.unique(slot, return_inverse=True)
+    counts = np.bincount(group, minlength=len(slots))
+    groups = _group_rows(rows, group, len(slots)) if sub else None
+    per_slot = {int(s): i for i, s in enumerate(slots)}
+
+    min_doc_count = 0 if agg.min_doc_count is None else agg.min_doc_count
+    wanted = [int(s) for s in slots]
+    if min_doc_count == 0 and (wanted or agg.extended_bounds):
+        lo = wanted[0] if wanted else None
+        hi = wanted[-1] if wanted else None
+        ext = agg.extended_bounds or {}
+        if ext.get("min") is not None:
+            s = int(np.floor((ext["min"] - offset) / agg.interval))
+            lo = s if lo is None else min(lo, s)
+        if ext.get("max") is not None:
+            s = int(np.floor((ext["max"] - offset) / agg.interval))
+            hi = s if hi is None else max(hi, s)
+        wanted = list(range(lo, hi + 1)) if lo is not None and hi is not None else []
+
+    buckets = []
+    for s in wanted:
+        i = per_slot.get(s)
+        count = int(counts[i]) if i is not None else 0
+        if count < min_doc_count:
+            continue
+        base = {"key": float(s * agg.interval + offset), "doc_count": count}
+        buckets.append(_bucket(base, groups[i] if i is not None and groups else None, sub, batch, ctx))
+    return {"buckets": buckets}
+
+
+# -----------------------------------------------------------------------------
+# range / filters
+# -----------------------------------------------------------------------------
+
+def _range_key(lo: Any, hi: Any) -> str:
+    def fmt(v: Any) -> str:
+        if v is None:
+            return "*"
+        return str(float(v)) if isinstance(v, (int, float)) else str(v)
+    return f"{fmt(lo)}-{fmt(hi)}"
+
+
+def _range(
+    agg: RangeAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    col = batch.column(agg.field)
+    buckets = []
+    values = None
+    if col is not None and col.kind in ("number", "date"):
+        rows = _present_rows(col, rows)
+        values = col.values[rows]
+    for spec in agg.ranges:
+        lo = resolve_bound(spec.from_, ctx.now_ms)
+        hi = resolve_bound(spec.to, ctx.now_ms)
+        if values is None:
+            in_range = np.empty(0, dtype=np.int64)
+        else:
+            keep = np.ones(len(values), dtype=bool)
+            if lo is not None:
+                keep &= values >= lo
+            if hi is not None:
+                keep &= values < hi
+            in_range = rows[keep]
+        base: dict[str, Any] = {"key": spec.key or _range_key(spec.from_, spec.to)}
+        if lo is not None:
+            base["from"] = float(lo)
+            if col is not None and col.kind == "date":
+                base["from_as_string"] = _iso(lo)
+        if hi is not None:
+            base["to"] = float(hi)
+            if col is not None and col.kind == "date":
+                base["to_as_string"] = _iso(hi)
+        base["doc_count"] = int(len(in_range))
+        buckets.append(_bucket(base, in_range, sub, batch, ctx))
+    return {"buckets": buckets}
+
+
+def _filters(
+    agg: FiltersAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    buckets: dict[str, Any] = {}
+    for name, query in agg.filters.items():
+        mask, _ = compile_query(query, ctx)(batch)
+        matched = rows[mask[rows]]
+        buckets[name] = _bucket({"doc_count": int(len(matched))}, matched, sub, batch, ctx)
+    return {"buckets": buckets}
+
+
+# -----------------------------------------------------------------------------
+# sampler / random_sampler
+# -----------------------------------------------------------------------------
+
+DEFAULT_SAMPLER_SHARD_SIZE = 100  # ES default of `sampler.shard_size`
+
+
+def _sampler(
+    agg: SamplerAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    # A batch is one shard and aggregations see no scores: rows are taken in batch order.
+    kept = rows[: agg.shard_size or DEFAULT_SAMPLER_SHARD_SIZE]
+    return _bucket({"doc_count": int(len(kept))}, kept, sub, batch, ctx)
+
+
+def _random_sampler(
+    agg: RandomSamplerAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    """
+    Bernoulli sample of `rows`: each document is kept with `probability`.
+
+    Draws are per batch row (not per matched row), so one seed selects the same
+    documents whatever the query. Counts are those of the sample, unscaled,
+    as in Elasticsearch (see sampling.scale_sampled).
+    """
+    if agg.probability == "auto":
+        raise ValueError('random_sampler.probability "auto" must be resolved first (see sampling.resolve_sampling).')
+    seed = agg.seed if agg.seed is not None else int(np.random.SeedSequence().entropy % 2**31)
+    kept = rows
+    if agg.probability < 1:
+        draws = np.random.default_rng(seed).random(len(batch))
+        kept = rows[draws[rows] < agg.probability]
+    base = {"seed": seed, "probability": agg.probability, "doc_count": int(len(kept))}
+    return _bucket(base, kept, sub, batch, ctx)
+
+
+# -----------------------------------------------------------------------------
+# composite
+# -----------------------------------------------------------------------------
+
+def _composite_source(source: Any, batch: LogBatch, rows: np.ndarray, ctx: ExecContext):
+    """(present mask, float sort key per row, key renderer, after-value -> sort key) of one source."""
+    spec = source.terms or source.histogram or source.date_histogram
+    col = batch.column(spec.field)
+    if col is None:
+        return np.zeros(len(rows), dtype=bool), np.zeros(len(rows)), lambda v: None, lambda v: 0.0
+    present = col.present[rows]
+    values = col.values[rows]
+    if source.histogram is not None:
+        keys = np.floor(values.astype(np.float64) / spec.interval) * spec.interval
+        return present, keys, float, float
+    if source.date_histogram is not None:
+        if spec.fixed_interval:
+            interval = parse_interval(spec.fixed_interval, calendar=False)
+        else:
+            interval = parse_interval(spec.calendar_interval or "", calendar=True)
+        keys = interval.round_down(values, spec.time_zone, parse_offset(spec.offset)).astype(np.float64)
+        return present, keys, int, lambda v: resolve_bound(v, ctx.now_ms, spec.time_zone) or 0.0
+    if col.kind == "keyword":
+        vocab = col.vocab
+
+        def after_code(v: Any) -> float:
+            key = str(v)
+            i = int(np.searchsorted(vocab, key))
+            return float(i) if i < len(vocab) and vocab[i] == key else i - 0.5  # between neighbours
+        return present, values.astype(np.float64), lambda c: vocab[int(c)], after_code
+    if col.kind == "bool":
+        return present, values.astype(np.float64), bool, lambda v: float(bool(v))
+    if col.kind == "date":
+        return present, values.astype(np.float64), int, lambda v: resolve_bound(v, ctx.now_ms) or 0.0
+    return present, values.astype(np.float64), _num, float
+
+
+def _composite(
+    agg: CompositeAgg,
+    sub: dict[str, Aggregation] | None,
+    batch: LogBatch,
+    rows: np.ndarray,
+    ctx: ExecContext,
+) -> dict[str, Any]:
+    """
+    One page of composite buckets in key order, after `agg.after`.
+
+    Each source contributes two sort columns: a present flag (nulls first
+    for asc, last for desc, as in ES) and the key, both negated for desc.
+    """
+    names = [name for part in agg.sources for name in part]
+    sources = [source for part in agg.sources for source in part.values()]
+    specs = [s.terms or s.histogram or s.date_histogram for s in sources]
+    signs = [-1.0 if spec.order == "desc" else 1.0 for spec in specs]
+    parsed = [_composite_source(source, batch, rows, ctx) for source in sources]
+    keep = np.ones(len(rows), dtype=bool)
+    for spec, (present, *_) in zip(specs, parsed):
+        if not spec.missing_bucket:
+            keep &= present
+    rows = rows[keep]
+
+    columns: list[np.ndarray] = []
+    after: list[float] = []
+    for name, sign, (present, keys, _, to_sort) in zip(names, signs, parsed):
+        present = present[keep]
+        columns.append(present * sign)
+        columns.append(np.where(present, keys[keep] * sign, 0.0))
+        if agg.after is not None:
+            v = agg.after[name]
+            after += [0.0, 0.0] if v is None else [sign, to_sort(v) * sign]
+    matrix = np.stack(columns, axis=1) if len(rows) else np.empty((0, len(columns)))
+    uniq, inverse = np.unique(matrix, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    candidates = np.arange(len(uniq))
+    if agg.after is not None and len(uniq):
+        greater = np.zeros(len(uniq), dtype=bool)
+        equal = np.ones(len(uniq), dtype=bool)
+        for c, a in enumerate(after):
+            greater |= equal & (uniq[:, c] > a)
+            equal &= uniq[:, c] == a
+        candidates = np.flatnonzero(greater)
+    page = candidates[: 10 if agg.size is None else agg.size]
+    counts = np.bincount(inverse, minlength=len(uniq))
+    groups = _group_rows(rows, inverse, len(uniq)) if sub else None
+
+    buckets = []
+    for g in page.tolist():
+        key = {
+            name: render(uniq[g, 2 * i + 1] * sign) if uniq[g, 2 * i] != 0 else None
+            for i, (name, sign, (_, _, render, _)) in enumerate(zip(names, signs, parsed))
+        }
+        buckets.append(_bucket({"key": key, "doc_count": int(counts[g])}, groups[g] if groups else None, sub, batch, ctx))
+    if not buckets:
+        return {"buckets": []}
+    return {"after_key": buckets[-1]["key"], "buckets": buckets}
+
+
+# -----------------------------------------------------------------------------
+# Metrics
+# -----------------------------------------------------------------------------
+
+def _metric_values(field: str, batch: LogBatch, rows: np.ndarray) -> np.ndarray:
+    col = batch.column(field)
+    if col is None or col.kind not in ("number", "date", "bool"):
+        return np.empty(0, dtype=np.float64)
+    return col.values[_present_rows(col, rows)].astype(np.float64)
+
+
+def _metric(kind: str, field: str, batch: LogBatch, rows: np.ndarray) -> dict[str, Any]:
+    values = _metric_values(field, batch, rows)
+    col = batch.column(field)
+    is_date = col is not None and col.kind == "date"
+    n = len(values)
+
+    def single(v: float | None) -> dict[str, Any]:
+        out: dict[str, Any] = {"value": v}
+        if is_date and v is not None:
+            out["value_as_string"] = _iso(v)
+        return out
+
+    if kind == "sum":
+        return {"value": float(values.sum())}
+    if kind == "avg":
+        return single(float(values.mean()) if n else None)
+    if kind == "min":
+        return single(float(values.min()) if n else None)
+    if kind == "max":
+        return single(float(values.max()) if n else None)
+    out = {
+        "count": n,
+        "min": float(values.min()) if n else None,
+        "max": float(values.max()) if n else None,
+        "avg": float(values.mean()) if n else None,
+        "sum": float(values.sum()),
+    }
+    if is_date and n:
+        out.update(min_as_string=_iso(out["min"]), max_as_string=_iso(out["max"]),
+                   avg_as_string=_iso(out["avg"]))
+    return out
+
+
+def _cardinality(spec: dict[str, Any], batch: LogBatch, rows: np.ndarray) -> dict[str, Any]:
+    """Exact distinct count (ES approximates above `precision_threshold`)."""
+    col = batch.column(spec.get("field", ""))
+    if col is None:
+        return {"value": 0}
+    return {"value": int(len(np.unique(col.values[_present_rows(col, rows)])))}
+
+
+# -----------------------------------------------------------------------------
+# percentiles / percentile_ranks
+# -----------------------------------------------------------------------------
+
+DEFAULT_PERCENTS = (1.0, 5.0, 25.0, 50.0, 75.0, 95.0, 99.0)  # ES default `percents`
+
+
+def _new_sketch(agg: PercentilesAgg | PercentileRanksAgg) -> Sketch:
+    if agg.hdr is not None:
+        digits = agg.hdr.number_of_significant_value_digits
+        return HdrHistogram(DEFAULT_HDR_DIGITS if digits is None else digits)
+    compression = agg.tdigest.compression if agg.tdigest is not None else None
+    return TDigest(compression or DEFAULT_TDIGEST_COMPRESSION)
+
+
+def _percentiles_response(agg: PercentilesAgg | PercentileRanksAgg, sketch: Sketch) -> dict[str, Any]:
+    """ES shape: {"values": {"99.0": v}} (keyed) or {"values": [{"key": 99.0, "value": v}]}."""
+    if isinstance(agg, PercentilesAgg):
+        keys = np.asarray(agg.percents or DEFAULT_PERCENTS, dtype=np.float64)
+        values = sketch.quantiles(keys / 100)
+    else:
+        keys = np.asarray(agg.values, dtype=np.float64)
+        values = sketch.ranks(keys) * 100
+    pairs = [(float(k), None if np.isnan(v) else float(v)) for k, v in zip(keys, values)]
+    if agg.keyed is False:
+        return {"values": [{"key": k, "value": v} for k, v in pairs]}
+    return {"values": {str(k): v for k, v in pairs}}
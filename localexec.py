@@ -0,0 +1,770 @@
+from __future__ import annotations
+
+import fnmatch
+import math
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Literal
+
+import numpy as np
+
+from datemath import TimeWindow, resolve_range
+from dsl_models import (
+    BoolQuery,
+    ExistsQuery,
+    IdsQuery,
+    MatchAllQuery,
+    MatchFieldOptions,
+    MatchQuery,
+    MultiMatchQuery,
+    RangeQuery,
+    SearchRequest,
+    SearchRequestWithAggs,
+    TermQuery,
+    TermsLookup,
+    TermsQuery,
+    TermValue,
+    resolve_bound,
+)
+
+
+ColumnKind = Literal["keyword", "number", "date", "bool"]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def analyze(text: Any) -> list[str]:
+    """Standard-analyzer approximation: lowercase word tokens."""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+# -----------------------------------------------------------------------------
+# Columnar storage
+# -----------------------------------------------------------------------------
+
+class Column:
+    """
+    One field of a `LogBatch`.
+
+    Storage per kind:
+      - keyword: int32 codes into a sorted `vocab` (object array), -1 = missing
+      - number:  float64 values + `present` mask
+      - date:    int64 epoch millis + `present` mask
+      - bool:    bool values + `present` mask
+
+    Keyword columns lazily build a token index (token -> vocab ids), so text
+    matching costs one Python pass over the UNIQUE values, not the documents.
+    """
+    __slots__ = ("kind", "values", "present", "vocab", "_tokens", "_vocab_tokens")
+
+    def __init__(
+        self,
+        kind: ColumnKind,
+        values: np.ndarray,
+        present: np.ndarray | None = None,
+        vocab: np.ndarray | None = None,
+    ) -> None:
+        self.kind = kind
+        self.values = values
+        self.vocab = vocab
+        if present is None:
+            present = values >= 0 if kind == "keyword" else np.ones(len(values), dtype=bool)
+        self.present = present
+        self._tokens: dict[str, np.ndarray] | None = None
+        self._vocab_tokens: list[list[str]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    # -- constructors ---------------------------------------------------------
+
+    @classmethod
+    def keyword(cls, values: Iterable[Any]) -> Column:
+        arr = np.asarray(list(values), dtype=object)
+        present = np.not_equal(arr, None)
+        codes = np.full(len(arr), -1, dtype=np.int32)
+        vocab, inverse = np.unique(arr[present].astype(str), return_inverse=True)
+        codes[present] = inverse
+        return cls("keyword", codes, present, vocab.astype(object))
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, vocab: Iterable[str]) -> Column:
+        """Dictionary-encoded column from precomputed codes (vocab need not be sorted)."""
+        vocab_arr = np.asarray(list(vocab), dtype=object)
+        order = np.argsort(vocab_arr.astype(str), kind="stable")
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        codes = np.asarray(codes, dtype=np.int32)
+        out = np.where(codes >= 0, remap[np.clip(codes, 0, None)], -1).astype(np.int32)
+        return cls("keyword", out, vocab=vocab_arr[order])
+
+    @classmethod
+    def number(cls, values: Iterable[Any]) -> Column:
+        arr = np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+        return cls("number", arr, ~np.isnan(arr))
+
+    @classmethod
+    def boolean(cls, values: Iterable[Any]) -> Column:
+        raw = list(values)
+        present = np.asarray([v is not None for v in raw], dtype=bool)
+        return cls("bool", np.asarray([bool(v) for v in raw], dtype=bool), present)
+
+    @classmethod
+    def dates(cls, values: Iterable[Any]) -> Column:
+        raw = list(values)
+        present = np.asarray([v is not None for v in raw], dtype=bool)
+        ms = np.zeros(len(raw), dtype=np.int64)
+        for i, v in enumerate(raw):
+            if v is not None:
+                ms[i] = int(_epoch_ms(v))
+        return cls("date", ms, present)
+
+    @classmethod
+    def from_array(cls, arr: np.ndarray) -> Column:
+        """Infer the kind from a NumPy dtype (datetime64, bool, numeric, else keyword)."""
+        arr = np.asarray(arr)
+        if np.issubdtype(arr.dtype, np.datetime64):
+            present = ~np.isnat(arr)
+            return cls("date", arr.astype("datetime64[ms]").astype(np.int64), present)
+        if arr.dtype == np.bool_:
+            return cls("bool", arr, np.ones(len(arr), dtype=bool))
+        if np.issubdtype(arr.dtype, np.number):
+            values = arr.astype(np.float64)
+            return cls("number", values, ~np.isnan(values))
+        return cls.keyword(arr)
+
+    # -- keyword helpers ------------------------------------------------------
+
+    def vocab_ids(self, value: Any) -> np.ndarray:
+        """Vocab ids equal to `value` (exact, non-analyzed)."""
+        key = _keyword_text(value)
+        i = int(np.searchsorted(self.vocab, key))
+        if i < len(self.vocab) and self.vocab[i] == key:
+            return np.array([i], dtype=np.int64)
+        return np.empty(0, dtype=np.int64)
+
+    def token_ids(self, token: str) -> np.ndarray:
+        if self._tokens is None:
+            index: dict[str, list[int]] = {}
+            vocab_tokens: list[list[str]] = []
+            for i, text in enumerate(self.vocab):
+                toks = analyze(text)
+                vocab_tokens.append(toks)
+                for tok in set(toks):
+                    index.setdefault(tok, []).append(i)
+            self._tokens = {tok: np.asarray(ids, dtype=np.int64) for tok, ids in index.items()}
+            self._vocab_tokens = vocab_tokens
+        return self._tokens.get(token, np.empty(0, dtype=np.int64))
+
+    def vocab_tokens(self, vocab_id: int) -> list[str]:
+        if self._vocab_tokens is None:
+            self.token_ids("")
+        return self._vocab_tokens[vocab_id]  # type: ignore[index]
+
+    def docs_for_vocab(self, vocab_mask: np.ndarray) -> np.ndarray:
+        """Lift a per-vocab boolean mask to a per-document mask."""
+        lut = np.zeros(len(self.vocab) + 1, dtype=vocab_mask.dtype)  # slot -1 = missing
+        lut[:-1] = vocab_mask
+        return lut[self.values]
+
+    def value_at(self, i: int) -> Any:
+        if not self.present[i]:
+            return None
+        if self.kind == "keyword":
+            return self.vocab[self.values[i]]
+        if self.kind == "date":
+            return _iso_ms(int(self.values[i]))
+        if self.kind == "bool":
+            return bool(self.values[i])
+        v = float(self.values[i])
+        return int(v) if v.is_integer() else v
+
+
+class LogBatch:
+    """
+    In-memory columnar batch of log documents (dotted field names).
+
+    Usage:
+      batch = LogBatch.from_documents(docs)                  # ES `_source` dicts
+      batch = LogBatch.from_columns({"@timestamp": ts, ...}) # NumPy arrays
+      batch = synthetic_batch(1_000_000)
+    """
+    __slots__ = ("columns", "ids", "index")
+
+    def __init__(self, columns: dict[str, Column], ids: np.ndarray, index: str = "local") -> None:
+        lengths = {len(c) for c in columns.values()} | {len(ids)}
+        if len(lengths) > 1:
+            raise ValueError(f"All columns must have the same length (found {sorted(lengths)}).")
+        self.columns = columns
+        self.ids = ids
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(
+        cls,
+        docs: Iterable[dict[str, Any]],
+        ids: Iterable[str] | None = None,
+        date_fields: Iterable[str] = ("@timestamp",),
+        index: str = "local",
+    ) -> LogBatch:
+        rows = [_flatten(d) for d in docs]
+        names: dict[str, None] = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        date_fields = set(date_fields)
+        columns: dict[str, Column] = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            sample = next((v for v in values if v is not None), None)
+            if isinstance(sample, (list, tuple, dict)):
+                raise TypeError(f"Field '{name}' is multi-valued; only scalar fields are supported.")
+            if name in date_fields or isinstance(sample, (datetime, date)):
+                columns[name] = Column.dates(values)
+            elif isinstance(sample, bool):
+                columns[name] = Column.boolean(values)
+            elif isinstance(sample, (int, float)):
+                columns[name] = Column.number(values)
+            else:
+                columns[name] = Column.keyword(values)
+        id_arr = (
+            np.asarray([str(i) for i in ids], dtype=object)
+            if ids is not None
+            else np.asarray([str(i) for i in range(len(rows))], dtype=object)
+        )
+        return cls(columns, id_arr, index)
+
+    @classmethod
+    def from_columns(
+        cls,
+        arrays: dict[str, np.ndarray | Column],
+        ids: np.ndarray | None = None,
+        index: str = "local",
+    ) -> LogBatch:
+        columns = {
+            name: arr if isinstance(arr, Column) else Column.from_array(arr)
+            for name, arr in arrays.items()
+        }
+        n = len(next(iter(columns.values()))) if columns else 0
+        id_arr = np.asarray(ids, dtype=object) if ids is not None else np.arange(n).astype(str).astype(object)
+        return cls(columns, id_arr, index)
+
+    def column(self, name: str) -> Column | None:
+        return self.columns.get(name)
+
+    def source(self, i: int) -> dict[str, Any]:
+        """Rebuild the nested `_source` of row `i`."""
+        out: dict[str, Any] = {}
+        for name, col in self.columns.items():
+            v = col.value_at(i)
+            if v is None:
+                continue
+            node = out
+            *parents, leaf = name.split(".")
+            for p in parents:
+                node = node.setdefault(p, {})
+            node[leaf] = v
+        return out
+
+
+def _flatten(doc: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    stack = [(prefix, doc)]
+    while stack:
+        pre, node = stack.pop()
+        for k, v in node.items():
+            key = f"{pre}{k}"
+            if isinstance(v, dict):
+                stack.append((key + ".", v))
+            else:
+                out[key] = v
+    return out
+
+
+def _keyword_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _epoch_ms(value: Any, now_ms: float = 0.0) -> float:
+    v = resolve_bound(value, now_ms)
+    if v is None:
+        raise ValueError(f"Cannot interpret {value!r} as a date.")
+    return v
+
+
+def _iso_ms(ms: int) -> str:
+    dt = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=ms)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+# -----------------------------------------------------------------------------
+# Query compilation: each clause -> fn(batch) -> (mask, score)
+# -----------------------------------------------------------------------------
+
+MaskScore = tuple[np.ndarray, np.ndarray]
+CompiledQuery = Callable[["LogBatch"], MaskScore]
+
+
+class ExecContext:
+    """Per-search settings shared by compiled clauses."""
+    __slots__ = ("now_ms",)
+
+    def __init__(self, now: datetime | None = None) -> None:
+        now = now or datetime.now(timezone.utc)
+        self.now_ms = resolve_bound(now, 0.0) or 0.0
+
+
+def _empty(n: int) -> MaskScore:
+    return np.zeros(n, dtype=bool), np.zeros(n, dtype=np.float32)
+
+
+def _scored(mask: np.ndarray, boost: float | None) -> MaskScore:
+    return mask, mask.astype(np.float32) * np.float32(1.0 if boost is None else boost)
+
+
+def minimum_should_match(spec: int | str | None, optional: int, default: int) -> int:
+    """Resolve ES `minimum_should_match` (int, negative int, "75%", "-25%")."""
+    if spec is None:
+        return default
+    text = str(spec).strip()
+    if text.endswith("%"):
+        pct = float(text[:-1])
+        n = math.floor(optional * abs(pct) / 100)
+        need = optional - n if pct < 0 else n
+    else:
+        need = int(text)
+        if need < 0:
+            need = optional + need
+    return max(0, min(optional, need))
+
+
+def _match_tokens(
+    col: Column,
+    tokens: list[str],
+    operator: str | None,
+    msm: int | str | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Per-vocab (matched, fraction-matched) for analyzed tokens on a keyword column."""
+    counts = np.zeros(len(col.vocab), dtype=np.int32)
+    for tok in dict.fromkeys(tokens):
+        counts[col.token_ids(tok)] += 1
+    distinct = len(dict.fromkeys(tokens))
+    if operator == "and":
+        need = distinct
+    else:
+        need = max(1, minimum_should_match(msm, distinct, 1))
+    return counts >= need, counts / max(distinct, 1)
+
+
+def _phrase_vocab(col: Column, tokens: list[str], prefix: bool) -> np.ndarray:
+    """Per-vocab mask for a phrase (contiguous tokens); verifies candidates only."""
+    if not tokens:
+        return np.zeros(len(col.vocab), dtype=bool)
+    exact = tokens if not prefix else tokens[:-1]
+    cand = np.ones(len(col.vocab), dtype=bool)
+    for tok in exact:
+        hit = np.zeros(len(col.vocab), dtype=bool)
+        hit[col.token_ids(tok)] = True
+        cand &= hit
+    out = np.zeros(len(col.vocab), dtype=bool)
+    k = len(tokens)
+    for vid in np.flatnonzero(cand):
+        toks = col.vocab_tokens(int(vid))
+        for i in range(len(toks) - k + 1):
+            window = toks[i:i + k]
+            if window[:-1] == tokens[:-1] and (
+                window[-1].startswith(tokens[-1]) if prefix else window[-1] == tokens[-1]
+            ):
+                out[vid] = True
+                break
+    return out
+
+
+def _field_match(
+    batch: LogBatch,
+    field: str,
+    query: Any,
+    operator: str | None = None,
+    msm: int | str | None = None,
+    phrase: Literal["phrase", "phrase_prefix"] | None = None,
+) -> MaskScore:
+    n = len(batch)
+    col = batch.column(field)
+    if col is None:
+        return _empty(n)
+    if col.kind == "keyword":
+        tokens = analyze(query)
+        if phrase:
+            vmask = _phrase_vocab(col, tokens, prefix=phrase == "phrase_prefix")
+            mask = col.docs_for_vocab(vmask)
+            return mask, mask.astype(np.float32)
+        vmask, frac = _match_tokens(col, tokens, operator, msm)
+        return col.docs_for_vocab(vmask), col.docs_for_vocab(np.where(vmask, frac, 0.0).astype(np.float32))
+    # Non-text columns: match degrades to an exact comparison, like ES on numeric/date fields.
+    return _exact(batch, col, query, None)
+
+
+def _exact(batch: LogBatch, col: Column, value: Any, now_ms: float | None) -> MaskScore:
+    n = len(batch)
+    if col.kind == "keyword":
+        vmask = np.zeros(len(col.vocab), dtype=bool)
+        vmask[col.vocab_ids(value)] = True
+        mask = col.docs_for_vocab(vmask)
+    elif col.kind == "bool":
+        target = value if isinstance(value, bool) else str(value).lower() == "true"
+        mask = col.present & (col.values == target)
+    else:
+        v = resolve_bound(value, now_ms or 0.0)
+        if v is None:
+            return _empty(n)
+        mask = col.present & (col.values == v)
+    return mask, mask.astype(np.float32)
+
+
+def compile_query(query: Any, ctx: ExecContext | None = None) -> CompiledQuery:
+    """
+    Compile a validated Query DSL container to a vectorized evaluator.
+
+    Scoring is deliberately simple (not BM25): a matching clause scores its
+    boost (match/multi_match: boost * fraction of query tokens matched) and
+    `bool` sums its `must`/`should` scores. `filter`/`must_not` never score.
+    """
+    ctx = ctx or ExecContext()
+
+    if isinstance(query, MatchAllQuery):
+        boost = query.match_all.get("boost")
+        return lambda b: _scored(np.ones(len(b), dtype=bool), boost)
+
+    if isinstance(query, MatchQuery):
+        (field, spec), = query.match.items()
+        if isinstance(spec, MatchFieldOptions):
+            opts = spec
+            boost = 1.0 if spec.boost is None else spec.boost
+
+            def run_match(b: LogBatch) -> MaskScore:
+                mask, score = _field_match(b, field, opts.query, opts.operator, opts.minimum_should_match)
+                return mask, score * np.float32(boost)
+            return run_match
+        return lambda b: _field_match(b, field, spec)
+
+    if isinstance(query, MultiMatchQuery):
+        return _compile_multi_match(query)
+
+    if isinstance(query, TermQuery):
+        (field, spec), = query.term.items()
+        value, boost = (spec.value, spec.boost) if isinstance(spec, TermValue) else (spec, None)
+
+        def run_term(b: LogBatch) -> MaskScore:
+            col = b.column(field)
+            if col is None:
+                return _empty(len(b))
+            mask, _ = _exact(b, col, value, ctx.now_ms)
+            return _scored(mask, boost)
+        return run_term
+
+    if isinstance(query, TermsQuery):
+        (field, values), = query.terms.items()
+        if isinstance(values, TermsLookup):
+            raise TypeError("Terms lookups need the lookup index; resolve them before local execution.")
+
+        def run_terms(b: LogBatch) -> MaskScore:
+            col = b.column(field)
+            if col is None:
+                return _empty(len(b))
+            if col.kind == "keyword":
+                keys = np.asarray(sorted({_keyword_text(v) for v in values}), dtype=object)
+                vmask = np.isin(col.vocab, keys)
+                return _scored(col.docs_for_vocab(vmask), None)
+            if col.kind == "bool":
+                targets = {v if isinstance(v, bool) else str(v).lower() == "true" for v in values}
+                return _scored(col.present & np.isin(col.values, list(targets)), None)
+            nums = [x for x in (resolve_bound(v, ctx.now_ms) for v in values) if x is not None]
+            return _scored(col.present & np.isin(col.values, nums), None)
+        return run_terms
+
+    if isinstance(query, RangeQuery):
+        (field, ops), = query.range.items()
+
+        window: list[TimeWindow] = []  # resolved once per compiled query, on first date column
+
+        def run_range(b: LogBatch) -> MaskScore:
+            col = b.column(field)
+            if col is None or col.kind not in ("number", "date"):
+                return _empty(len(b))
+            if col.kind == "date":
+                if not window:
+                    try:
+                        window.append(resolve_range(
+                            ops.gte, ops.gt, ops.lte, ops.lt, ops.time_zone, ops.format, ctx.now_ms
+                        ))
+                    except (ValueError, KeyError) as exc:
+                        raise ValueError(f"Cannot resolve the range on '{field}': {exc}") from exc
+                return _scored(col.present & window[0].contains(col.values), ops.boost)
+            mask = col.present.copy()
+            for bound, cmp in ((ops.gte, np.greater_equal), (ops.gt, np.greater),
+                               (ops.lte, np.less_equal), (ops.lt, np.less)):
+                if bound is None:
+                    continue
+                v = resolve_bound(bound, ctx.now_ms)
+                if v is None:
+                    raise ValueError(f"Cannot interpret range bound {bound!r} on '{field}' as a number.")
+                mask &= cmp(col.values, v)
+            return _scored(mask, ops.boost)
+        return run_range
+
+    if isinstance(query, ExistsQuery):
+        field = query.exists["field"]
+
+        def run_exists(b: LogBatch) -> MaskScore:
+            col = b.column(field)
+            if col is not None:
+                return _scored(col.present.copy(), None)
+            prefix = field + "."
+            mask = np.zeros(len(b), dtype=bool)
+            for name, sub in b.columns.items():
+                if name.startswith(prefix):
+                    mask |= sub.present
+            return _scored(mask, None)
+        return run_exists
+
+    if isinstance(query, IdsQuery):
+        wanted = np.asarray(query.ids["values"], dtype=object)
+        return lambda b: _scored(np.isin(b.ids, wanted), None)
+
+    if isinstance(query, BoolQuery):
+        return _compile_bool(query, ctx)
+
+    raise TypeError(f"Unsupported query container: {type(query).__name__}")
+
+
+def _resolve_fields(batch: LogBatch, patterns: list[str]) -> list[tuple[str, float]]:
+    out: list[tuple[str, float]] = []
+    for pattern in patterns:
+        name, _, boost = pattern.partition("^")
+        weight = float(boost) if boost else 1.0
+        if any(ch in name for ch in "*?["):
+            out.extend((f, weight) for f in batch.columns if fnmatch.fnmatchcase(f, name))
+        else:
+            out.append((name, weight))
+    return out
+
+
+def _compile_multi_match(query: MultiMatchQuery) -> CompiledQuery:
+    opts = query.multi_match
+    text = opts.get("query", "")
+    patterns = opts.get("fields") or ["*"]
+    mm_type = opts.get("type", "best_fields")
+    operator = opts.get("operator")
+    msm = opts.get("minimum_should_match")
+    tie_breaker = float(opts.get("tie_breaker", 0.0))
+    boost = float(opts.get("boost", 1.0))
+
+    def run_multi_match(b: LogBatch) -> MaskScore:
+        fields = _resolve_fields(b, patterns)
+        n = len(b)
+        if not fields:
+            return _empty(n)
+        if mm_type == "cross_fields":
+            # Each token may be satisfied by any field.
+            tokens = list(dict.fromkeys(analyze(text)))
+            per_tok = [
+                np.logical_or.reduce([_field_match(b, f, tok)[0] for f, _ in fields])
+                for tok in tokens
+            ]
+            counts = np.sum(per_tok, axis=0) if per_tok else np.zeros(n, dtype=np.int64)
+            need = len(tokens) if operator == "and" else max(1, minimum_should_match(msm, len(tokens), 1))
+            mask = counts >= need
+            return mask, (counts / max(len(tokens), 1)).astype(np.float32) * mask * np.float32(boost)
+        phrase = mm_type if mm_type in ("phrase", "phrase_prefix") else None
+        mask = np.zeros(n, dtype=bool)
+        scores = []
+        for f, weight in fields:
+            m, s = _field_match(b, f, text, operator, msm, phrase)
+            mask |= m
+            scores.append(s * np.float32(weight))
+        stacked = np.vstack(scores)
+        if mm_type == "most_fields":
+            score = stacked.sum(axis=0)
+        else:
+            best = stacked.max(axis=0)
+            score = best + np.float32(tie_breaker) * (stacked.sum(axis=0) - best)
+        return mask, score * np.float32(boost)
+    return run_multi_match
+
+
+def _compile_bool(query: BoolQuery, ctx: ExecContext) -> CompiledQuery:
+    body = query.bool
+    must = [compile_query(q, ctx) for q in body.must or ()]
+    filt = [compile_query(q, ctx) for q in body.filter or ()]
+    should = [compile_query(q, ctx) for q in body.should or ()]
+    must_not = [compile_query(q, ctx) for q in body.must_not or ()]
+    # ES default: at least one `should` only when there is no must/filter.
+    default_msm = 0 if (must or filt) else 1
+    need = minimum_should_match(body.minimum_should_match, len(should), default_msm) if should else 0
+    boost = np.float32(1.0 if body.boost is None else body.boost)
+
+    def run_bool(b: LogBatch) -> MaskScore:
+        n = len(b)
+        mask = np.ones(n, dtype=bool)
+        score = np.zeros(n, dtype=np.float32)
+        for clause in must:
+            m, s = clause(b)
+            mask &= m
+            score += s
+        for clause in filt:
+            mask &= clause(b)[0]
+        for clause in must_not:
+            mask &= ~clause(b)[0]
+        if should:
+            hits = np.zeros(n, dtype=np.int32)
+            for clause in should:
+                m, s = clause(b)
+                hits += m
+                score += s
+            if need:
+                mask &= hits >= need
+        return mask, np.where(mask, score * boost, np.float32(0.0))
+    return run_bool
+
+
+# -----------------------------------------------------------------------------
+# Search API (ES-shaped response)
+# -----------------------------------------------------------------------------
+
+def top_hits(mask: np.ndarray, score: np.ndarray, offset: int, size: int) -> np.ndarray:
+    """Row indices of hits [offset, offset+size) ordered by score desc, then row."""
+    matched = np.flatnonzero(mask)
+    k = offset + size
+    if size <= 0 or offset >= len(matched):
+        return np.empty(0, dtype=np.int64)
+    s = score[matched]
+    if k < len(matched):
+        # Everything above the k-th score, then the lowest rows among its ties.
+        kth = -np.partition(-s, k - 1)[k - 1]
+        above = s > kth
+        ties = np.flatnonzero(s == kth)[: k - int(above.sum())]
+        part = np.concatenate([np.flatnonzero(above), ties])
+        matched, s = matched[part], s[part]
+    order = np.lexsort((matched, -s))
+    return matched[order][offset:k]
+
+
+def search(
+    request: SearchRequest | dict[str, Any],
+    batch: LogBatch,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Execute a `_search` body against a `LogBatch` and return an ES-shaped response
+    (`aggregations` included when the request has `aggs`, see localaggs).
+
+    Usage:
+      resp = search({"query": {"term": {"log.level": "error"}}, "size": 5}, batch)
+      resp["hits"]["total"]["value"], resp["hits"]["hits"][0]["_source"]
+    """
+    started = time.perf_counter()
+    if isinstance(request, dict):
+        request = SearchRequestWithAggs.model_validate(request)
+    ctx = ExecContext(now)
+    mask, score = compile_query(request.query, ctx)(batch)
+    size = 10 if request.size is None else request.size
+    offset = request.from_ or 0
+    rows = top_hits(mask, score, offset, size)
+    total = int(mask.sum())
+    aggs = getattr(request, "aggs", None)
+    hits = [
+        {
+            "_index": batch.index,
+            "_id": str(batch.ids[i]),
+            "_score": float(score[i]),
+            "_source": batch.source(int(i)),
+        }
+        for i in rows
+    ]
+    response: dict[str, Any] = {
+        "took": 0,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": total, "relation": "eq"},
+            "max_score": float(score[mask].max()) if total else None,
+            "hits": hits,
+        },
+    }
+    if aggs:
+        from localaggs import aggregate  # localaggs imports this module
+
+        response["aggregations"] = aggregate(aggs, batch, mask, ctx)
+    response["took"] = int((time.perf_counter() - started) * 1000)
+    return response
+
+
+# -----------------------------------------------------------------------------
+# Synthetic data (tests, benchmarks, local stand-in)
+# -----------------------------------------------------------------------------
+
+_SERVICES = ["payments", "checkout", "auth", "search", "gateway", "inventory", "billing", "notifications"]
+_ENVS = ["prod", "staging", "dev"]
+_LEVELS = ["info", "warn", "error", "debug"]
+_TEMPLATES = [
+    "request completed in {n} ms",
+    "connection timeout after {n} ms",
+    "user login succeeded for session {n}",
+    "payment declined code {n}",
+    "cache miss for key item-{n}",
+    "upstream error status {n}",
+    "retrying job {n} after failure",
+    "disk usage at {n} percent",
+]
+
+
+def synthetic_batch(
+    n: int,
+    seed: int = 0,
+    start: datetime | None = None,
+    span: timedelta = timedelta(days=30),
+    hosts: int = 200,
+) -> LogBatch:
+    """Vectorized generator of `n` log documents spread uniformly over `span`."""
+    rng = np.random.default_rng(seed)
+    start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    start_ms = int(start.timestamp() * 1000)
+    ts = start_ms + np.sort(rng.integers(0, int(span.total_seconds() * 1000), n))
+    per_template = 50
+    messages = [t.format(n=i) for t in _TEMPLATES for i in range(per_template)]
+    columns = {
+        "@timestamp": Column("date", ts.astype(np.int64)),
+        "service.name": Column.from_codes(rng.integers(0, len(_SERVICES), n), _SERVICES),
+        "env": Column.from_codes(rng.choice(len(_ENVS), n, p=[0.6, 0.3, 0.1]), _ENVS),
+        "log.level": Column.from_codes(rng.choice(len(_LEVELS), n, p=[0.7, 0.15, 0.1, 0.05]), _LEVELS),
+        "host.name": Column.from_codes(rng.integers(0, hosts, n), [f"host-{i:04d}" for i in range(hosts)]),
+        "http.response.status_code": Column(
+            "number", rng.choice([200, 201, 204, 301, 400, 404, 500, 503], n).astype(np.float64)
+        ),
+        "event.duration": Column("number", np.round(rng.lognormal(4.0, 1.0, n), 3)),
+        "message": Column.from_codes(rng.integers(0, len(messages), n), messages),
+    }
+    return LogBatch(columns, np.char.add("doc-", np.arange(n).astype(str)).astype(object))
+
+
+if __name__ == "__main__":
+    batch = synthetic_batch(1_000_000)
+    body = {
+        "query": {
+            "bool": {
+                "must": [{"match": {"message": "timeout"}}],
+                "filter": [
+                    {"term": {"service.name": "payments"}},
+                    {"range": {"@timestamp": {"gte": "2025-01-10", "lt": "2025-01-20"}}},
+                ],
+                "should": [{"terms": {"log.level": ["error", "warn"]}}],
+            }
+        },
+        "size": 3,
+    }
+    resp = search(body, batch)
+    print(resp["took"], "ms", resp["hits"]["total"], resp["hits"]["hits"][:1])
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import re
+import warnings
+from typing import Any, Iterator
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from datemath import parse_interval
+from dsl_models import Aggregation, ClientPipeline, PipelineStep
+
+
+DEFAULT_EWMA_ALPHA = 0.3  # ES moving_fn ewma default
+
+# name, optional ['bucket'] / [99.0] selector, optional .property
+_SEGMENT_RE = re.compile(r"""^(?P<name>[^\[\]>.]+)(?:\[['"]?(?P<key>[^\]'"]+)['"]?\])?(?:\.(?P<prop>\w+))?$""")
+
+
+# -----------------------------------------------------------------------------
+# buckets_path lookups
+# -----------------------------------------------------------------------------
+
+def _parse_segment(segment: str) -> tuple[str, str | None, str | None]:
+    m = _SEGMENT_RE.match(segment)
+    if m is None:
+        raise ValueError(f"Invalid buckets_path segment {segment!r}.")
+    return m["name"], m["key"], m["prop"]
+
+
+def _select(node: dict[str, Any], key: str) -> Any:
+    """`node[key]` for keyed filters/percentiles objects, else the list entry whose key matches."""
+    entries = node.get("buckets", node.get("values"))
+    if isinstance(entries, dict):
+        if key in entries:
+            return entries[key]
+        entries = [{"key": k, "value": v} for k, v in entries.items()]
+    for entry in entries or ():
+        k = entry.get("key")
+        if str(k) == key or (_is_number(str(k)) and _is_number(key) and float(k) == float(key)):
+            return entry if "doc_count" in entry else entry.get("value")
+    return None
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def lookup(bucket: dict[str, Any], path: str) -> float | None:
+    """
+    Value of `path` in one histogram bucket (ES buckets_path syntax).
+
+    Usage:
+      lookup(b, "_count"), lookup(b, "lat"), lookup(b, "lat.avg"),
+      lookup(b, "lat[99.0]"), lookup(b, "level['error']>_count")
+    """
+    *parents, last = path.split(">")
+    node: Any = bucket
+    for segment in parents:
+        name, key, _ = _parse_segment(segment)
+        node = node.get(name) if isinstance(node, dict) else None
+        if node is not None and key is not None:
+            node = _select(node, key)
+        if node is None:
+            return None
+    if last == "_count":
+        return node.get("doc_count")
+    if last == "_key":
+        return node.get("key")
+    name, key, prop = _parse_segment(last)
+    value = node.get(name)
+    if not isinstance(value, dict):
+        return value
+    if key is not None:
+        value = _select(value, key)
+        return value.get("doc_count") if isinstance(value, dict) else value
+    if prop is not None:
+        return value.get(prop)
+    return value["value"] if "value" in value else value.get("doc_count")
+
+
+def series(buckets: list[dict[str, Any]], path: str) -> np.ndarray:
+    """`path` across `buckets` as float64 (missing/None -> NaN)."""
+    values = [lookup(b, path) for b in buckets]
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+# -----------------------------------------------------------------------------
+# Vectorized steps (NaN marks a gap)
+# -----------------------------------------------------------------------------
+
+def _gaps(x: np.ndarray, policy: str | None) -> np.ndarray:
+    return np.nan_to_num(x, nan=0.0) if policy == "insert_zeros" else x
+
+
+def derivative(x: np.ndarray) -> np.ndarray:
+    return np.r_[np.nan, np.diff(x)] if len(x) else x
+
+
+def moving_avg(
+    x: np.ndarray,
+    window: int,
+    model: str = "simple",
+    alpha: float = DEFAULT_EWMA_ALPHA,
+    shift: int = 0,
+) -> np.ndarray:
+    """
+    Per bucket i, `simple` mean or `ewma` of x[i - window + shift : i + shift]
+    (shift 0: the previous `window` buckets, as ES moving_fn). Gaps are skipped.
+    """
+    n = len(x)
+    padded = np.r_[np.full(window, np.nan), x, np.full(shift, np.nan)]
+    windows = sliding_window_view(padded, window)[shift:shift + n]
+    if model == "simple":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-gap windows -> NaN
+            return np.nanmean(windows, axis=1)
+    avg = np.full(n, np.nan)
+    for column in windows.T:  # oldest to newest; loop over the window, vectorized over buckets
+        blend = alpha * column + (1 - alpha) * avg
+        avg = np.where(np.isnan(avg), column, np.where(np.isnan(column), avg, blend))
+    return avg
+
+
+def cumulative_sum(x: np.ndarray) -> np.ndarray:
+    return np.nancumsum(x)
+
+
+def ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float | None = None) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(denominator != 0, numerator / denominator, np.nan)
+    return out * scale if scale is not None else out
+
+
+def rate_of_change(x: np.ndarray, scale: float | None = None) -> np.ndarray:
+    previous = np.r_[np.nan, x[:-1]]
+    return ratio(x - previous, np.abs(previous), scale)
+
+
+def _run_step(step: PipelineStep, buckets: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """{"value": ...} (plus "normalized_value" for a derivative with `unit`) over `buckets`."""
+    if step.derivative is not None:
+        d = step.derivative
+        out = {"value": derivative(_gaps(series(buckets, d.buckets_path), d.gap_policy))}
+        if d.unit is not None:
+            unit_ms = parse_interval(d.unit, calendar=False).min_length_ms
+            out["normalized_value"] = out["value"] / (derivative(series(buckets, "_key")) / unit_ms)
+        return out
+    if step.moving_avg is not None:
+        m = step.moving_avg
+        x = _gaps(series(buckets, m.buckets_path), m.gap_policy)
+        alpha = m.alpha if m.alpha is not None else DEFAULT_EWMA_ALPHA
+        return {"value": moving_avg(x, m.window, m.model or "simple", alpha, m.shift or 0)}
+    if step.cumulative_sum is not None:
+        return {"value": cumulative_sum(series(buckets, step.cumulative_sum.buckets_path))}
+    if step.bucket_ratio is not None:
+        r = step.bucket_ratio
+        num = _gaps(series(buckets, r.numerator), r.gap_policy)
+        return {"value": ratio(num, _gaps(series(buckets, r.denominator), r.gap_policy), r.scale)}
+    c = step.rate_of_change
+    return {"value": rate_of_change(_gaps(series(buckets, c.buckets_path), c.gap_policy), c.scale)}
+
+
+# -----------------------------------------------------------------------------
+# Applying pipelines to a response
+# -----------------------------------------------------------------------------
+
+def _histogram_buckets(container: dict[str, Any], parts: list[str]) -> Iterator[list[dict[str, Any]]]:
+    """Bucket lists of the histogram at `parts`, once per enclosing parent bucket."""
+    name, key, _ = _parse_segment(parts[0])
+    node = container.get(name)
+    if node is None:
+        return
+    if key is not None:
+        node = _select(node, key)
+        if not isinstance(node, dict):
+            return
+    buckets = node.get("buckets")
+    if len(parts) == 1:
+        yield list(buckets.values()) if isinstance(buckets, dict) else list(buckets or ())
+        return
+    if buckets is None:  # single-bucket parent (sampler, filters['x'])
+        buckets = [node]
+    for bucket in buckets.values() if isinstance(buckets, dict) else buckets:
+        yield from _histogram_buckets(bucket, parts[1:])
+
+
+def apply_pipelines(aggregations: dict[str, Any], pipelines: list[ClientPipeline]) -> dict[str, Any]:
+    """
+    Add every pipeline's step results to its histogram buckets IN PLACE
+    (`bucket[step] = {"value": ...}`, None for gaps) and return `aggregations`.
+
+    Usage:
+      resp = localexec.search(req, batch)
+      apply_pipelines(resp["aggregations"], [ClientPipeline.model_validate({...})])
+    """
+    for pipeline in pipelines:
+        for buckets in _histogram_buckets(aggregations, pipeline.histogram.split(">")):
+            for name, step in pipeline.steps.items():
+                results = _run_step(step, buckets)
+                columns = {k: [None if np.isnan(v) else float(v) for v in col] for k, col in results.items()}
+                for i, bucket in enumerate(buckets):
+                    bucket[name] = {k: col[i] for k, col in columns.items()}
+    return aggregations
+
+
+def _step_paths(step: PipelineStep) -> list[str]:
+    if step.bucket_ratio is not None:
+        return [step.bucket_ratio.numerator, step.bucket_ratio.denominator]
+    body = next(v for v in step.__dict__.values() if v is not None)
+    return [body.buckets_path]
+
+
+def check_pipelines(aggs: dict[str, Aggregation] | None, pipelines: list[ClientPipeline]) -> None:
+    """
+    Fail fast (ValueError) on pipelines that cannot apply to `aggs`: the path
+    must end at a date_histogram/histogram, and every buckets_path must start
+    at `_count`, `_key`, one of its sub-aggregations or an earlier step.
+    """
+    for pipeline in pipelines:
+        level, node = aggs or {}, None
+        for segment in pipeline.histogram.split(">"):
+            name, _, _ = _parse_segment(segment)
+            node = level.get(name)
+            if node is None:
+                raise ValueError(f"Pipeline histogram path {pipeline.histogram!r}: no aggregation {name!r}.")
+            level = node.aggs or {}
+        if node.date_histogram is None and node.histogram is None:
+            raise ValueError(f"Pipeline histogram path {pipeline.histogram!r} must end at a (date_)histogram.")
+        known = {"_count", "_key", *(node.aggs or {})}
+        for name, step in pipeline.steps.items():
+            for path in _step_paths(step):
+                first = path.split(">")[0]
+                if first not in known and _parse_segment(first)[0] not in known:
+                    raise ValueError(
+                        f"Step {name!r}: buckets_path {path!r} must start at one of {sorted(known)}."
+                    )
+            known.add(name)
+
+
+if __name__ == "__main__":
+    import time
+
+    import localexec
+    from dsl_models import SearchRequestWithAggs
+
+    batch = localexec.synthetic_batch(500_000, seed=6)
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"range": {"@timestamp": {"gte": "2025-01-01", "lt": "2025-01-08"}}},
+        "size": 0,
+        "aggs": {"per_hour": {
+            "date_histogram": {"field": "@timestamp", "fixed_interval": "1h"},
+            "aggs": {
+                "level": {"filters": {"filters": {"error": {"term": {"log.level": "error"}}}}},
+                "lat": {"percentiles": {"field": "event.duration", "percents": [99]}},
+            },
+        }},
+    })
+    pipelines = [ClientPipeline.model_validate({
+        "histogram": "per_hour",
+        "steps": {
+            "error_pct": {"bucket_ratio": {"numerator": "level['error']>_count", "denominator": "_count", "scale": 100}},
+            "error_pct_6h": {"moving_avg": {"buckets_path": "error_pct", "window": 6, "model": "ewma"}},
+            "p99_change": {"rate_of_change": {"buckets_path": "lat[99.0]", "scale": 100}},
+            "docs_per_s": {"derivative": {"buckets_path": "_count", "unit": "1s"}},
+            "total": {"cumulative_sum": {"buckets_path": "_count"}},
+        },
+    })]
+    check_pipelines(req.aggs, pipelines)
+    resp = localexec.search(req, batch)
+    t0 = time.perf_counter()
+    apply_pipelines(resp["aggregations"], pipelines)
+    buckets = resp["aggregations"]["per_hour"]["buckets"]
+    print(f"{len(buckets)} buckets, pipelines in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    for b in buckets[5:8]:
+        print({k: (v if not isinstance(v, dict) else {kk: vv for kk, vv in v.items() if kk != "buckets"})
+               for k, v in b.items() if k not in ("key", "level")})
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import copy
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import NormalDist
+from typing import Any, Callable
+
+from dsl_models import Aggregation, SearchRequestWithAggs
+from dsl_models.aggs import MAX_SAMPLING_PROBABILITY, query_window, resolve_bound
+from slicing import DEFAULT_TIME_FIELD, SearchFn, _gateway_search
+
+
+DEFAULT_TARGET_SAMPLE_DOCS = 100_000  # docs a sampled aggregation should still see
+MIN_SAMPLING_PROBABILITY = 1e-6
+DEFAULT_CONFIDENCE = 0.95
+SAMPLE_WRAPPER = "sampled"  # name of the random_sampler added around unsampled aggs
+
+# 1-2-5 steps: repeated questions map to the same probability (and request cache entry).
+PROBABILITY_STEPS = tuple(
+    round(m * 10.0 ** e, 12) for e in range(round(math.log10(MIN_SAMPLING_PROBABILITY)), 0) for m in (1, 2, 5)
+)
+
+CountFn = Callable[[dict[str, Any]], int]
+
+
+# -----------------------------------------------------------------------------
+# Choosing the probability
+# -----------------------------------------------------------------------------
+
+def estimate_docs(
+    query: Any,
+    docs_per_second: float,
+    field: str = DEFAULT_TIME_FIELD,
+    now_ms: float | None = None,
+) -> float | None:
+    """
+    Docs matching `query` at an ingest rate of `docs_per_second`, from the
+    time window its required `range` clauses put on `field`.
+
+    None when the window has no lower bound (nothing to multiply the rate by).
+    The rate ignores the other clauses, so this is an upper bound.
+    """
+    now_ms = time.time() * 1000 if now_ms is None else now_ms
+    lo, hi = query_window(query, field, now_ms)
+    if lo is None:
+        return None
+    hi = now_ms if hi is None else min(hi, now_ms)
+    return max(hi - lo, 0.0) / 1000 * docs_per_second
+
+
+def choose_probability(expected_docs: float | None, target_docs: int = DEFAULT_TARGET_SAMPLE_DOCS) -> float:
+    """
+    Smallest PROBABILITY_STEPS value that still samples about `target_docs`
+    of `expected_docs`; 1.0 (exact) when that would exceed the ES maximum of
+    0.5 or the doc count is unknown.
+    """
+    if target_docs <= 0:
+        raise ValueError("target_docs must be > 0")
+    if expected_docs is None or expected_docs * MAX_SAMPLING_PROBABILITY <= target_docs:
+        return 1.0
+    wanted = target_docs / expected_docs
+    return next((p for p in PROBABILITY_STEPS if p >= wanted), MAX_SAMPLING_PROBABILITY)
+
+
+@dataclass(frozen=True, slots=True)
+class SampledRequest:
+    """
+    A request whose "auto" probabilities are resolved.
+
+    `wrapper` names the random_sampler added around the original top-level
+    aggregations (None when the request sampled itself or runs exactly);
+    `scale_sampled` removes it from the response again.
+    """
+    request: SearchRequestWithAggs
+    probability: float
+    expected_docs: float | None
+    wrapper: str | None
+
+
+def resolve_sampling(
+    request: SearchRequestWithAggs,
+    expected_docs: float | None,
+    target_docs: int = DEFAULT_TARGET_SAMPLE_DOCS,
+    wrap: bool = True,
+    seed: int | None = None,
+) -> SampledRequest:
+    """
+    Replace `"probability": "auto"` with `choose_probability(expected_docs)`.
+
+    With `wrap`, a request without any top-level sampler gets its aggregations
+    (composite excepted, ES allows it no parent) wrapped in one random_sampler
+    named SAMPLE_WRAPPER when sampling pays off.
+
+    Usage:
+      sampled = resolve_sampling(req, expected_docs=42_000_000)
+      sampled.request.aggs["sampled"].random_sampler.probability   # 0.005
+    """
+    p = choose_probability(expected_docs, target_docs)
+    body = request.model_dump(by_alias=True, exclude_none=True)
+    aggs = body.get("aggs") or {}
+    wrapper = None
+    for node in aggs.values():
+        sampler = node.get("random_sampler")
+        if sampler is not None and sampler["probability"] == "auto":
+            node["random_sampler"] = {**({"seed": seed} if seed is not None else {}), **sampler, "probability": p}
+    samplers = [n for n, node in aggs.items() if "random_sampler" in node or "sampler" in node]
+    inner = {n: node for n, node in aggs.items() if "composite" not in node}
+    if wrap and p < 1 and inner and not samplers:
+        wrapper = SAMPLE_WRAPPER
+        while wrapper in aggs:
+            wrapper = f"_{wrapper}"
+        sampler = {"probability": p, **({"seed": seed} if seed is not None else {})}
+        outer = {n: node for n, node in aggs.items() if n not in inner}
+        body["aggs"] = {**outer, wrapper: {"random_sampler": sampler, "aggs": inner}}
+    return SampledRequest(SearchRequestWithAggs.model_validate(body), p, expected_docs, wrapper)
+
+
+# -----------------------------------------------------------------------------
+# Scaling responses back up
+# -----------------------------------------------------------------------------
+
+def count_interval(sampled: int, probability: float, confidence: float = DEFAULT_CONFIDENCE) -> tuple[int, int]:
+    """
+    Confidence interval on the true count behind `sampled` Bernoulli(probability) hits.
+
+    Normal approximation of the binomial, floored at `sampled` (those docs
+    exist); for zero hits, the largest count that shows none with
+    probability 1 - confidence.
+    """
+    if probability >= 1:
+        return sampled, sampled
+    if sampled == 0:
+        return 0, math.floor(math.log(1 - confidence) / math.log1p(-probability))
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    estimate = sampled / probability
+    half = z * math.sqrt(sampled * (1 - probability)) / probability
+    return max(sampled, math.floor(estimate - half)), math.ceil(estimate + half)
+
+
+def _scale_bucket(spec: Aggregation, bucket: dict[str, Any], p: float, confidence: float) -> None:
+    sampled = bucket["doc_count"]
+    lower, upper = count_interval(sampled, p, confidence)
+    bucket["doc_count"] = round(sampled / p)
+    bucket["doc_count_interval"] = {"lower": lower, "upper": upper}
+    if bucket.get("doc_count_error_upper_bound"):
+        bucket["doc_count_error_upper_bound"] = round(bucket["doc_count_error_upper_bound"] / p)
+    _scale_aggs(spec.aggs, bucket, p, confidence)
+
+
+def _scale_aggs(aggs: dict[str, Aggregation] | None, resp: dict[str, Any], p: float, confidence: float) -> None:
+    """Scale, IN PLACE, the results of `aggs` found in `resp` as if every doc had been seen."""
+    for name, spec in (aggs or {}).items():
+        out = resp.get(name)
+        if out is None:
+            continue
+        if spec.is_sampler:
+            _scale_bucket(spec, out, p, confidence)
+        elif "buckets" in out:
+            buckets = out["buckets"]
+            for bucket in buckets.values() if isinstance(buckets, dict) else buckets:
+                _scale_bucket(spec, bucket, p, confidence)
+            for key in ("sum_other_doc_count", "doc_count_error_upper_bound"):
+                if out.get(key):
+                    out[key] = round(out[key] / p)
+        elif spec.sum is not None and out.get("value") is not None:
+            out["value"] /= p
+        elif spec.stats is not None:
+            out["count"] = round(out["count"] / p)
+            out["sum"] /= p
+        # avg/min/max/percentiles need no scaling; cardinality stays a lower bound
+
+
+def scale_sampled(
+    sampled: SampledRequest,
+    response: dict[str, Any],
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> dict[str, Any]:
+    """
+    Copy of `response` with counts under every random_sampler divided by its
+    probability and a `doc_count_interval` ({"lower", "upper"} at
+    `confidence`) on each scaled bucket.
+
+    Scaled: bucket doc counts, `sum_other_doc_count`, `sum`, stats count/sum.
+    Unchanged: avg/min/max/percentiles (unbiased as is) and cardinality (a lower bound).
+    The SAMPLE_WRAPPER level is removed; its probability and sample size are
+    reported under the response's `sampling` key.
+    """
+    aggregations = response.get("aggregations")
+    if not aggregations:
+        return response
+    aggregations = copy.deepcopy(aggregations)
+    for name, spec in (sampled.request.aggs or {}).items():
+        node = spec.random_sampler
+        if node is None or node.probability >= 1 or name not in aggregations:
+            continue
+        out = aggregations[name]
+        sample_size = out["doc_count"]
+        _scale_bucket(spec, out, node.probability, confidence)
+        if name == sampled.wrapper:
+            del aggregations[name]
+            aggregations.update({n: out[n] for n in spec.aggs if n in out})
+            response = {**response, "sampling": {
+                "probability": node.probability,
+                "seed": out.get("seed"),
+                "sampled_docs": sample_size,
+                "doc_count": out["doc_count"],
+                "doc_count_interval": out["doc_count_interval"],
+                "confidence": confidence,
+            }}
+    return {**response, "aggregations": aggregations}
+
+
+# -----------------------------------------------------------------------------
+# Execution
+# -----------------------------------------------------------------------------
+
+def _gateway_count(index: str) -> CountFn:
+    from server import _post  # deferred: pulls in the MCP server stack
+
+    return lambda body: int(_post(f"/{index}/_count", body)["count"])
+
+
+def run_sampled(
+    request: SearchRequestWithAggs,
+    index: str | None = None,
+    search: SearchFn | None = None,
+    count: CountFn | None = None,
+    docs_per_second: float | None = None,
+    target_docs: int = DEFAULT_TARGET_SAMPLE_DOCS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    wrap: bool = True,
+    seed: int | None = None,
+    field: str = DEFAULT_TIME_FIELD,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """
+    Run an aggregation on a random sample sized for `target_docs`, then scale
+    the counts back up (see `scale_sampled`).
+
+    The expected doc count comes from `docs_per_second` over the query's time
+    window when given (no extra request), else from `count` (a `_count` on
+    the query).
+
+    Usage:
+      run_sampled(req, index="logs-*")                       # gateway _count + _search
+      run_sampled(req, search=local, docs_per_second=2_000)  # rate-based estimate
+
+    Notes:
+      - Requests without aggregations, or whose window holds fewer than
+        2 * target_docs docs, run exactly.
+      - `index` defaults `search` and `count` to the gateway.
+    """
+    if search is None:
+        if index is None:
+            raise ValueError("Pass either `index` (gateway search) or a `search` callable.")
+        search = _gateway_search(index)
+        count = count or _gateway_count(index)
+    if not request.aggs:
+        return search(request.model_dump(by_alias=True, exclude_none=True))
+    query = request.model_dump(by_alias=True, exclude_none=True)["query"]
+    expected: float | None = None
+    if docs_per_second is not None:
+        now_ms = resolve_bound(now, 0.0) if now is not None else None
+        expected = estimate_docs(request.query, docs_per_second, field, now_ms)
+    elif count is not None:
+        expected = count({"query": query})
+    sampled = resolve_sampling(request, expected, target_docs, wrap, seed)
+    response = search(sampled.request.model_dump(by_alias=True, exclude_none=True))
+    return scale_sampled(sampled, response, confidence)
+
+
+if __name__ == "__main__":
+    import localexec
+
+    batch = localexec.synthetic_batch(1_000_000, seed=5)
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"bool": {"filter": [{"range": {"@timestamp": {"gte": "2025-01-01", "lt": "2025-01-08"}}}]}},
+        "size": 0,
+        "aggs": {
+            "levels": {"terms": {"field": "log.level"}},
+            "per_service": {"terms": {"field": "service.name", "size": 3},
+                            "aggs": {"latency": {"avg": {"field": "event.duration"}}}},
+        },
+    })
+    local = lambda body: localexec.search(body, batch)  # noqa: E731
+    count = lambda body: local({**body, "size": 0})["hits"]["total"]["value"]  # noqa: E731
+    t0 = time.perf_counter()
+    exact = local(req)["aggregations"]
+    t1 = time.perf_counter()
+    approx = run_sampled(req, search=local, count=count, target_docs=20_000, seed=7)
+    t2 = time.perf_counter()
+    print(f"exact {t1 - t0:.3f}s, sampled {t2 - t1:.3f}s (incl. count), sampling {approx['sampling']}")
+    rate = len(batch) / (30 * 86_400)
+    print(f"rate-based estimate: {estimate_docs(req.query, rate):.0f} docs in the window "
+          f"-> probability {choose_probability(estimate_docs(req.query, rate), 20_000)}")
+    truth = {b["key"]: b["doc_count"] for b in exact["levels"]["buckets"]}
+    for b in approx["aggregations"]["levels"]["buckets"]:
+        ci = b["doc_count_interval"]
+        inside = ci["lower"] <= truth[b["key"]] <= ci["upper"]
+        print(f"  {b['key']:>6}: ~{b['doc_count']} [{ci['lower']}, {ci['upper']}] exact {truth[b['key']]} inside={inside}")
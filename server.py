@@ -1,20 +1,43 @@
 # mcp_server.py
+import logging
 import os
+import anyio
 import httpx
 from typing import Optional, List
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from pydantic import BaseModel
+
+from composite import composite_agg_name, iter_composite_pages
+from dsl_models import ClientPipeline, SearchRequest, SearchRequestWithAggs
+from fastjson import dump_json
+from largeterms import run_large_terms
+from postaggs import apply_pipelines, check_pipelines
+from sampling import run_sampled
+from toolschema import compact_schema, tool_costs
 
 GATEWAY = os.environ.get("GATEWAY_URL", "http://localhost:8080")
+COMPACT_TOOL_SCHEMAS = os.environ.get("COMPACT_TOOL_SCHEMAS", "1") != "0"
 
 mcp = FastMCP("LaaS Talk-with-your-logs")
+logger = logging.getLogger(__name__)
 
-def _post(path: str, payload: dict):
+def _post(path: str, payload: dict | BaseModel):
     url = f"{GATEWAY}{path}"
     with httpx.Client(timeout=20) as client:
-        r = client.post(url, json=payload)
+        if isinstance(payload, BaseModel):
+            # DSL models go out as pre-encoded bytes (no model_dump + json.dumps round trip)
+            r = client.post(url, content=dump_json(payload), headers={"content-type": "application/json"})
+        else:
+            r = client.post(url, json=payload)
         r.raise_for_status()
         return r.json()
 
+def _delete(path: str):
+    with httpx.Client(timeout=20) as client:
+        r = client.delete(f"{GATEWAY}{path}")
+        if r.status_code != 404:
+            r.raise_for_status()
+
 @mcp.tool()
 def search_logs(
     search_query: SearchRequest,
@@ -26,21 +49,12 @@ def search_logs(
     Parameters
     ----------
     search_query : SearchRequest
-        A Pydantic v2 model representing the `_search` payload **or** (if you’ve chosen
-        to pass only the `query` container) the object placed under the `"query"` key.
-        When providing a full `SearchRequest`, call:
-            `search_query.model_dump(by_alias=True, exclude_none=True)`
-        before sending over the wire (or ensure `_post` knows how to serialize Pydantic models).
-
-        Common usage patterns:
-          • Full body:
+        A Pydantic v2 model representing the full `_search` payload, e.g.:
               SearchRequest(
                   query=BoolQuery(...),
                   size=100,
                   **{"from": 0}
               )
-          • Query-only (if your gateway expects just the `query` block):
-              BoolQuery(...) or MatchQuery(...)
 
     index : str
         Target index name, data stream, or pattern (e.g., `"logs-2025.10.15"`,
@@ -54,12 +68,9 @@ def search_logs(
 
     Request Body
     ------------
-    The function currently wraps the provided object as:
-        {"query": search_query}
-    If `search_query` is a `SearchRequest`, consider pre-serializing and passing its
-    `.model_dump(...)` **and** adjusting the body to avoid nesting a full request
-    under `"query"`. If `search_query` is already a query container (e.g., `BoolQuery`),
-    this shape is correct.
+    `search_query` dumped with `by_alias`/`exclude_none` is the body, the same
+    shape whether or not its `terms` lists need chunking (see
+    `largeterms.run_large_terms`, which sends small requests unchanged).
 
     Returns
     -------
@@ -71,11 +82,81 @@ def search_logs(
     • Use `size`/`from` responsibly; gateways may cap them.
     • Prefer filters (`terms`, `range` in `bool.filter`) for non-scoring constraints.
     • Redact/avoid PII in queries; logs may be persisted for auditing.
+    • `terms` lists are deduplicated; a list within the cluster's
+      max_terms_count goes out in this one request. Only larger `_id` lists
+      are chunked (or rewritten to a terms lookup when
+      `largeterms.GATEWAY_LOOKUP_STORE` is enabled).
     """
-    return _post(
-        f"{index}/_search",
-        {"query": search_query},
-    )
+    return run_large_terms(search_query, index=index)
+
+
+@mcp.tool()
+async def aggregate_all_buckets(
+    search_query: SearchRequestWithAggs,
+    index: str,
+    ctx: Context,
+    agg_name: Optional[str] = None,
+    max_buckets: int = 10_000,
+):
+    """
+    Exhaustive breakdown over high-cardinality fields ("error counts for every
+    host") with a top-level `composite` aggregation, paged via `after_key`.
+
+    Each page is one bounded gateway request; pages are streamed to the client
+    as progress notifications while they arrive. Returns the collected buckets,
+    `complete` (False when `max_buckets` stopped the scan) and `after_key` to
+    resume from (`composite.after`).
+    """
+    name = composite_agg_name(search_query, agg_name)
+    pages = iter_composite_pages(search_query, index=index, name=name)
+    buckets: list[dict] = []
+    after_key = None
+    complete = True
+    while True:
+        page = await anyio.to_thread.run_sync(next, pages, None)  # blocking HTTP off the event loop
+        if page is None:
+            break
+        buckets.extend(page.buckets)
+        after_key = page.after_key
+        await ctx.report_progress(page.buckets_seen)
+        await ctx.info(f"{name} page {page.number}: {len(page.buckets)} buckets, after_key={page.after_key}")
+        if len(buckets) >= max_buckets:
+            complete = False
+            break
+    return {"aggregation": name, "buckets": buckets, "complete": complete, "after_key": after_key}
+
+
+@mcp.tool()
+def aggregate_logs(
+    search_query: SearchRequestWithAggs,
+    index: str,
+    exact: bool = True,
+    pipelines: Optional[List[ClientPipeline]] = None,
+):
+    """
+    Aggregations over LaaS ("error mix over the last week").
+
+    Exact by default. With `exact=False` the query is first `_count`ed and,
+    when the window holds more than twice `sampling.DEFAULT_TARGET_SAMPLE_DOCS`
+    docs, the aggregations run on a random sample of about that many, so long
+    windows come back in a fraction of the time; counts are scaled back up
+    and every bucket carries a 95% `doc_count_interval`. The response's
+    `sampling` key reports the probability used (absent when the window was
+    small enough to run exactly). See `sampling.run_sampled`.
+
+    `pipelines` compute derivatives, moving averages, cumulative sums, ratios
+    and rates of change over `date_histogram`/`histogram` buckets client-side
+    (see `postaggs.apply_pipelines`) instead of as Elasticsearch pipeline aggs.
+    """
+    if pipelines:
+        check_pipelines(search_query.aggs, pipelines)
+    if exact:
+        response = _post(f"/{index}/_search", search_query)
+    else:
+        response = run_sampled(search_query, index=index)
+    if pipelines and response.get("aggregations"):
+        apply_pipelines(response["aggregations"], pipelines)
+    return response
 
 
 @mcp.tool()
@@ -107,7 +188,32 @@ def change_window_snapshot(service: str, env: str, change_id: str, pre_min: int
 def anomalies_resource(service: str, env: str) -> str:
     return f"Anomalies for {service} {env}. Use show_anomalies(tool) with a time window."
 
+def _registered_tools() -> list:
+    """
+    The server's tool objects, whose `parameters` schema is what clients see.
+
+    FastMCP has no public API to edit a registered tool's schema, so this is
+    the one place that touches its private tool manager; an SDK without it
+    yields no tools (schemas are then advertised uncompacted).
+    """
+    manager = getattr(mcp, "_tool_manager", None)
+    list_tools = getattr(manager, "list_tools", None)
+    if list_tools is None:
+        logger.warning("FastMCP exposes no tool manager; tool schemas are not compacted")
+        return []
+    return [t for t in list_tools() if isinstance(getattr(t, "parameters", None), dict)]
+
+def _compact_tool_schemas():
+    """Advertise compacted parameter schemas; arguments are still validated by the pydantic models."""
+    tools = _registered_tools()
+    for cost in tool_costs({t.name: t.parameters for t in tools}):
+        logger.info("tool schema %s: %d -> %d tokens", cost.tool, cost.full_tokens, cost.compact_tokens)
+    for tool in tools:
+        tool.parameters = compact_schema(tool.parameters)
+
 def main():
+    if COMPACT_TOOL_SCHEMAS:
+        _compact_tool_schemas()
     # STDIO is perfect for local/desktop hosts; for remote/prod, you can use streamable-http.
     mcp.run(transport="streamable-http")  # or: mcp.run(transport="streamable-http")
 
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import copy
+import heapq
+import math
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from aggstate import merge_partials, partial_percentiles, percentiles_count, terms_shard_size
+from dsl_models import (
+    SearchRequestWithAggs,
+    query_window,
+    resolve_bound,
+)
+
+
+DEFAULT_TIME_FIELD = "@timestamp"
+DEFAULT_SLICES = 8
+DEFAULT_MAX_CONCURRENCY = 4
+
+SearchFn = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+# -----------------------------------------------------------------------------
+# Slicing
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class TimeSlice:
+    """
+    One `[start, end)` piece of the request window (epoch ms).
+
+    The first slice has no lower and the last no upper cut: the original
+    query's own range still bounds them, so slices partition its matches exactly.
+    """
+    index: int
+    start: int | None
+    end: int | None
+    body: dict[str, Any]
+
+
+@dataclass(frozen=True, slots=True)
+class SliceProgress:
+    done: int
+    total: int
+    slice: TimeSlice
+    took_ms: int
+
+
+def _slice_aggs(aggs: dict[str, Any]) -> dict[str, Any]:
+    """
+    Rewrite a dumped `aggs` tree so per-slice partials can be merged exactly:
+    avg -> stats (needs count), terms over-fetch candidates,
+    min_doc_count thresholds are applied after the merge instead, and
+    percentiles report a fixed percent grid plus their value count.
+    """
+    out: dict[str, Any] = {}
+    for name, node in aggs.items():
+        node = dict(node)
+        if "percentiles" in node or "percentile_ranks" in node:
+            out.update(partial_percentiles(name, node))
+            continue
+        if "avg" in node:
+            node["stats"] = node.pop("avg")
+        if "terms" in node:
+            terms = dict(node["terms"])
+            terms["size"] = terms_shard_size(terms.get("size"), terms.pop("shard_size", None))
+            terms["min_doc_count"] = min(terms.get("min_doc_count", 1), 1)
+            node["terms"] = terms
+        for kind in ("date_histogram", "histogram"):
+            if kind in node and node[kind].get("min_doc_count", 0) > 1:
+                node[kind] = {**node[kind], "min_doc_count": 1}
+        if node.get("aggs"):
+            node["aggs"] = _slice_aggs(node["aggs"])
+        out[name] = node
+    return out
+
+
+def slice_request(
+    request: SearchRequestWithAggs,
+    slices: int = DEFAULT_SLICES,
+    field: str = DEFAULT_TIME_FIELD,
+    now: datetime | None = None,
+    min_slice_ms: int = 60_000,
+) -> list[TimeSlice]:
+    """
+    Split the `field` window of a validated request into `slices` `_search` bodies.
+
+    The window comes from the `range` clauses the query requires on `field`
+    (top level, bool.must, bool.filter); both ends must be bounded. Slices are
+    never narrower than `min_slice_ms`, so short windows get fewer slices.
+
+    Usage:
+      for s in slice_request(req, slices=6):
+          post(f"/{index}/_search", s.body)
+    """
+    now_ms = resolve_bound(now or datetime.now().astimezone(), 0.0)
+    lo, hi = query_window(request.query, field, now_ms)
+    if lo is None or hi is None:
+        raise ValueError(f"Slicing needs a bounded range on {field!r} in the query.")
+    span = max(hi - lo, 0.0)
+    n = max(1, min(slices, int(span // max(min_slice_ms, 1)) or 1))
+    step = math.ceil(span / n / 1000) * 1000  # whole seconds keep cut points readable
+    cuts = [int(lo) + i * step for i in range(1, n) if int(lo) + i * step < hi]
+
+    body = request.model_dump(by_alias=True, exclude_none=True)
+    size = body.pop("size", 10)
+    offset = body.pop("from", 0)
+    if body.get("aggs"):
+        body["aggs"] = _slice_aggs(body["aggs"])
+    edges: list[int | None] = [None, *cuts, None]
+    out = []
+    for i in range(len(edges) - 1):
+        start, end = edges[i], edges[i + 1]
+        ops: dict[str, Any] = {"format": "epoch_millis"}
+        if start is not None:
+            ops["gte"] = start
+        if end is not None:
+            ops["lt"] = end
+        part = copy.copy(body)
+        part["query"] = {"bool": {"must": [body["query"]], "filter": [{"range": {field: ops}}]}} \
+            if len(ops) > 1 else body["query"]
+        part["size"] = offset + size  # every slice may own the whole requested page
+        out.append(TimeSlice(i, start, end, part))
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Merging partial responses
+# -----------------------------------------------------------------------------
+
+def _hit_key(hit: dict[str, Any]) -> tuple:
+    if "sort" in hit:
+        return tuple(hit["sort"])
+    return (-(hit.get("_score") or 0.0),)
+
+
+def merge_responses(
+    request: SearchRequestWithAggs,
+    responses: list[dict[str, Any]],
+    took_ms: int | None = None,
+) -> dict[str, Any]:
+    """
+    Combine per-slice `_search` responses into one response for `request`.
+
+    Hits are k-way merged by sort key (score desc when unsorted; earlier
+    slices win ties), then `from`/`size` is applied.
+    """
+    size = 10 if request.size is None else request.size
+    offset = request.from_ or 0
+    merged_hits = list(heapq.merge(*(r["hits"]["hits"] for r in responses), key=_hit_key))
+    total = sum(r["hits"]["total"]["value"] for r in responses)
+    relation = "gte" if any(r["hits"]["total"].get("relation") == "gte" for r in responses) else "eq"
+    scores = [r["hits"].get("max_score") for r in responses if r["hits"].get("max_score") is not None]
+    out: dict[str, Any] = {
+        "took": took_ms if took_ms is not None else max((r.get("took", 0) for r in responses), default=0),
+        "timed_out": any(r.get("timed_out") for r in responses),
+        "hits": {
+            "total": {"value": total, "relation": relation},
+            "max_score": max(scores) if scores else None,
+            "hits": merged_hits[offset:offset + size],
+        },
+    }
+    shards = [r["_shards"] for r in responses if "_shards" in r]
+    if shards:
+        out["_shards"] = {k: sum(s.get(k, 0) for s in shards) for k in shards[0]}
+    if request.aggs:
+        out["aggregations"] = {
+            name: merge_partials(
+                spec,
+                [r["aggregations"][name] for r in responses],
+                counts=[percentiles_count(r["aggregations"], name) for r in responses],
+            )
+            for name, spec in request.aggs.items()
+        }
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Execution
+# -----------------------------------------------------------------------------
+
+def _gateway_search(index: str) -> SearchFn:
+    from server import _post  # deferred: pulls in the MCP server stack
+
+    return lambda body: _post(f"/{index}/_search", body)
+
+
+def run_sliced(
+    request: SearchRequestWithAggs,
+    index: str | None = None,
+    search: SearchFn | None = None,
+    slices: int = DEFAULT_SLICES,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    field: str = DEFAULT_TIME_FIELD,
+    now: datetime | None = None,
+    on_progress: Callable[[SliceProgress], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Run a long-range search as `slices` time-sliced sub-searches, at most
+    `max_concurrency` in flight, and merge them into one ES-shaped response.
+
+    Usage:
+      run_sliced(req, index="logs-*", slices=12, max_concurrency=3,
+                 on_progress=lambda p: print(f"{p.done}/{p.total}"))
+      run_sliced(req, search=lambda body: localexec.search(body, batch))
+
+    Notes:
+      - More slices = smaller, faster requests; `max_concurrency` caps how many
+        hit the cluster at once (shard pressure vs. latency).
+      - Partials are merged with `aggstate` (see `merge_partials`): `terms`
+        fetch ES's `shard_size` candidates per slice and the merged
+        `doc_count_error_upper_bound` reports the remaining uncertainty.
+      - `cardinality` responses carry no sketch: the merge is the per-slice
+        maximum (a lower bound).
+      - `percentiles`/`percentile_ranks` slices report a fixed percent grid
+        plus a value count, and the merged sketch is rebuilt from those
+        (see `aggstate.partial_percentiles`).
+      - The first failing slice cancels the queued ones and re-raises.
+    """
+    if search is None:
+        if index is None:
+            raise ValueError("Pass either `index` (gateway search) or a `search` callable.")
+        search = _gateway_search(index)
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be > 0")
+    started = time.perf_counter()
+    parts = slice_request(request, slices, field, now)
+    responses: list[dict[str, Any] | None] = [None] * len(parts)
+
+    def run(s: TimeSlice) -> tuple[TimeSlice, dict[str, Any], int]:
+        t0 = time.perf_counter()
+        resp = search(s.body)
+        return s, resp, int((time.perf_counter() - t0) * 1000)
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(parts))) as pool:
+        pending = {pool.submit(run, s) for s in parts}
+        done_count = 0
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_EXCEPTION)
+            for fut in finished:
+                if fut.exception() is not None:
+                    for other in pending:
+                        other.cancel()
+                    raise fut.exception()
+                s, resp, took = fut.result()
+                responses[s.index] = resp
+                done_count += 1
+                if on_progress is not None:
+                    on_progress(SliceProgress(done_count, len(parts), s, took))
+    ordered = [r for r in responses if r is not None]
+    return merge_responses(request, ordered, int((time.perf_counter() - started) * 1000))
+
+
+if __name__ == "__main__":
+    import localexec
+
+    batch = localexec.synthetic_batch(200_000, seed=7)
+    req = SearchRequestWithAggs.model_validate({
+        "query": {"bool": {
+            "must": [{"match": {"message": "timeout"}}],
+            "filter": [{"range": {"@timestamp": {"gte": "2025-01-01T00:00:00Z", "lt": "2025-01-08T00:00:00Z"}}}],
+        }},
+        "size": 5,
+        "aggs": {
+            "svc": {"terms": {"field": "service.name", "size": 3},
+                    "aggs": {"lat": {"avg": {"field": "event.duration"}}}},
+            "per_day": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d"}},
+        },
+    })
+    whole = localexec.search(req, batch)
+    sliced = run_sliced(
+        req, search=lambda body: localexec.search(body, batch), slices=7, max_concurrency=3,
+        on_progress=lambda p: print(f"slice {p.slice.index} done ({p.done}/{p.total}, {p.took_ms} ms)"),
+    )
+    for key in ("svc", "per_day"):
+        counts = [[(b["key"], b["doc_count"]) for b in r["aggregations"][key]["buckets"]] for r in (whole, sliced)]
+        print(key, counts[0] == counts[1])
+    print([h["_id"] for h in whole["hits"]["hits"]], [h["_id"] for h in sliced["hits"]["hits"]])
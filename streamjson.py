@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+_WS = " \t\r\n"
+_DELIMS = ",}]" + _WS
+_STRUCT_RE = re.compile(r'[\[\]{}"]')  # outside strings
+_STRING_RE = re.compile(r'["\\]')  # inside strings
+_SCALAR_END_RE = re.compile(r"[,}\]\s]")
+
+StreamEvent = tuple[str, Any]
+
+_raw_decode = json.JSONDecoder().raw_decode
+
+
+class StreamJSONError(ValueError):
+    def __init__(self, message: str, offset: int) -> None:
+        super().__init__(f"{message} (at char {offset})")
+        self.offset = offset
+
+
+# -----------------------------------------------------------------------------
+# Incremental reader
+# -----------------------------------------------------------------------------
+
+class _Reader:
+    """
+    Pull reader over text chunks. Values that are complete in the buffer are
+    decoded in place with the C `raw_decode`; a value cut by a chunk boundary
+    is located with a resumable bracket/string scan (each char scanned once,
+    regex-driven) and decoded when complete, so only the value being read is
+    ever buffered.
+    """
+
+    def __init__(self, chunks: Iterable[bytes | str]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._consumed = 0  # chars dropped from the front of the buffer
+        self._eof = False
+
+    # -- buffer ------------------------------------------------------------
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        try:
+            for chunk in self._chunks:
+                if isinstance(chunk, bytes):
+                    chunk = self._decoder.decode(chunk)
+                if chunk:
+                    if self._pos > len(self._buf) // 2:
+                        self._consumed += self._pos
+                        self._buf, self._pos = self._buf[self._pos:], 0
+                    self._buf += chunk
+                    return True
+            self._buf += self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as exc:  # invalid bytes, or input cut inside a character
+            raise StreamJSONError(f"invalid UTF-8: {exc.reason}", self._consumed + len(self._buf)) from None
+        self._eof = True
+        return False
+
+    def _error(self, message: str) -> StreamJSONError:
+        return StreamJSONError(message, self._consumed + self._pos)
+
+    def peek(self) -> str:
+        """Next non-whitespace char (consumed whitespace), '' at end of input."""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise self._error(f"expected {ch!r}")
+        self._pos += 1
+
+    # -- values ------------------------------------------------------------
+
+    def _value_end(self) -> int:
+        """Index just past the value starting at `self._pos` (refilling as needed)."""
+        first = self.peek()
+        start = self._pos
+        if not first:
+            raise self._error("unexpected end of input")
+        if first not in '{["':
+            while True:
+                m = _SCALAR_END_RE.search(self._buf, self._pos)  # scalars are short: rescan
+                if m:
+                    return m.start()
+                if not self._fill():
+                    return len(self._buf)
+        depth, in_str, scan = 0, False, start
+        while True:
+            buf = self._buf
+            while True:
+                if in_str:
+                    m = _STRING_RE.search(buf, scan)
+                    if m is None:
+                        scan = len(buf)
+                        break
+                    if m.group() == "\\":
+                        if m.end() >= len(buf):
+                            scan = m.start()  # escape split across chunks: rescan it
+                            break
+                        scan = m.end() + 1
+                        continue
+                    in_str, scan = False, m.end()
+                    if depth == 0:
+                        return scan
+                    continue
+                m = _STRUCT_RE.search(buf, scan)
+                if m is None:
+                    scan = len(buf)
+                    break
+                ch, scan = m.group(), m.end()
+                if ch == '"':
+                    in_str = True
+                elif ch in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return scan
+            rel = scan - self._pos
+            start_rel = start - self._pos
+            if not self._fill():
+                raise self._error("unexpected end of input inside a value")
+            # the buffer may have been compacted: re-anchor on the current position
+            scan, start = self._pos + rel, self._pos + start_rel
+
+    def value(self, decode: bool = True) -> Any:
+        """Read one complete value; `decode=False` discards it."""
+        first = self.peek()
+        try:
+            value, end = _raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            pass  # usually cut by the chunk boundary: locate the end, then decode
+        else:
+            # containers/strings are self-delimiting; a number ("1." + "25") may
+            # continue in the next chunk unless a delimiter follows it
+            if first in '{["' or self._eof or (end < len(self._buf) and self._buf[end] in _DELIMS):
+                self._pos = end
+                return value if decode else None
+        end = self._value_end()
+        text = self._buf[self._pos:end]
+        self._pos = end
+        if not decode:
+            return None
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise self._error(f"invalid JSON value: {exc.msg}") from None
+
+    def key(self) -> str:
+        if self.peek() != '"':
+            raise self._error("expected an object key")
+        k = self.value()
+        self.expect(":")
+        return k
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object at the cursor; the caller reads each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            yield self.key()
+            ch = self.peek()
+            self._pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise self._error("expected ',' or '}'")
+
+    def items(self) -> Iterator[None]:
+        """Positions the cursor on each element of the array at the cursor."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            ch = self.peek()
+            self._pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise self._error("expected ',' or ']'")
+
+
+# -----------------------------------------------------------------------------
+# _search responses
+# -----------------------------------------------------------------------------
+
+def iter_search_events(chunks: Iterable[bytes | str], max_hits: int | None = None) -> Iterator[StreamEvent]:
+    """
+    Parse an ES `_search` response incrementally.
+
+    Events, in document order:
+      ("hit", {...})                       one per element of `hits.hits`
+      ("hits.<key>", value)                other `hits` members (total, max_score)
+      ("<key>", value)                     every other top-level member, once
+                                           complete (took, _shards, aggregations, ...)
+
+    Hits past `max_hits` are parsed and dropped, never yielded.
+    """
+    r = _Reader(chunks)
+    seen = 0
+    for key in r.members():
+        if key != "hits" or r.peek() != "{":
+            yield key, r.value()
+            continue
+        for hkey in r.members():
+            if hkey != "hits" or r.peek() != "[":
+                yield f"hits.{hkey}", r.value()
+                continue
+            for _ in r.items():
+                keep = max_hits is None or seen < max_hits
+                hit = r.value(decode=keep)
+                if keep:
+                    seen += 1
+                    yield "hit", hit
+    if r.peek():
+        raise r._error("trailing data after the response object")
+
+
+class SearchResponseStream:
+    """
+    Bounded-memory view of a streamed `_search` response.
+
+    Usage:
+      stream = SearchResponseStream(resp.iter_bytes())
+      for batch in stream.hits(batch_size=500):
+          sink(project(batch))
+      stream.response()["aggregations"]      # rest of the body, hits excluded
+
+    Notes:
+      - Iterate `hits()` once; `response()` drains whatever is left.
+      - `on_progress(bytes_read, hits_seen)` fires after every hit/batch.
+      - ES writes `aggregations` after `hits`, so it is available once the hits
+        have been consumed (or after `response()`).
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes | str],
+        max_hits: int | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> None:
+        self._reader_events = iter_search_events(_Counted(chunks, self), max_hits)
+        self._meta: dict[str, Any] = {}
+        self._hits_meta: dict[str, Any] = {}
+        self._on_progress = on_progress
+        self.bytes_read = 0
+        self.hits_seen = 0
+        self._done = False
+
+    def _events(self) -> Iterator[StreamEvent]:
+        for kind, value in self._reader_events:
+            if kind == "hit":
+                self.hits_seen += 1
+            elif kind.startswith("hits."):
+                self._hits_meta[kind[5:]] = value
+            else:
+                self._meta[kind] = value
+            yield kind, value
+        self._done = True
+
+    def hits(self, batch_size: int | None = None) -> Iterator[Any]:
+        """Hits one at a time, or lists of up to `batch_size` hits."""
+        batch: list[dict[str, Any]] = []
+        for kind, value in self._events():
+            if kind != "hit":
+                continue
+            if batch_size is None:
+                yield value
+                self._progress()
+                continue
+            batch.append(value)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                self._progress()
+        if batch:
+            yield batch
+            self._progress()
+
+    def _progress(self) -> None:
+        if self._on_progress is not None:
+            self._on_progress(self.bytes_read, self.hits_seen)
+
+    @property
+    def meta(self) -> dict[str, Any]:
+        """Top-level members parsed so far (took, _shards, aggregations, ...)."""
+        return self._meta
+
+    def response(self) -> dict[str, Any]:
+        """Drain the stream; the ES-shaped response without `hits.hits`."""
+        if not self._done:
+            for _ in self._events():
+                pass
+        out = dict(self._meta)
+        out["hits"] = dict(self._hits_meta)
+        return out
+
+
+class _Counted:
+    def __init__(self, chunks: Iterable[bytes | str], owner: SearchResponseStream) -> None:
+        self._chunks = chunks
+        self._owner = owner
+
+    def __iter__(self) -> Iterator[bytes | str]:
+        for chunk in self._chunks:
+            self._owner.bytes_read += len(chunk)
+            yield chunk
+
+
+@contextmanager
+def stream_search(url: str, payload: Any, timeout: float = 60, **options: Any) -> Iterator[SearchResponseStream]:
+    """
+    POST a `_search` body and read the response as a `SearchResponseStream`.
+
+    Usage:
+      with stream_search(f"{GATEWAY}/logs-*/_search", body, max_hits=10_000) as s:
+          for hit in s.hits():
+              ...
+    """
+    import httpx
+
+    from fastjson import dump_json
+    from pydantic import BaseModel
+
+    if isinstance(payload, BaseModel):
+        kwargs: dict[str, Any] = {"content": dump_json(payload), "headers": {"content-type": "application/json"}}
+    else:
+        kwargs = {"json": payload}
+    with httpx.Client(timeout=timeout) as client:
+        with client.stream("POST", url, **kwargs) as r:
+            r.raise_for_status()
+            yield SearchResponseStream(r.iter_bytes(DEFAULT_CHUNK_BYTES), **options)
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    import tracemalloc
+
+    import localexec
+
+    batch = localexec.synthetic_batch(200_000, seed=5)
+    resp = localexec.search({
+        "query": {"match_all": {}}, "size": 20_000,
+        "aggs": {"svc": {"terms": {"field": "service.name"}}},
+    }, batch)
+    body = json.dumps(resp).encode()
+    rng = random.Random(1)
+    chunks, i = [], 0
+    while i < len(body):
+        n = rng.randint(1, 64 * 1024)
+        chunks.append(body[i:i + n])
+        i += n
+
+    stream = SearchResponseStream(chunks)
+    hits = [h for b in stream.hits(batch_size=1000) for h in b]
+    rest = stream.response()
+    assert hits == resp["hits"]["hits"]
+    assert rest["aggregations"] == resp["aggregations"] and rest["hits"]["total"] == resp["hits"]["total"]
+
+    def peak(fn) -> tuple[int, float]:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        took = time.perf_counter() - t0
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak_bytes, took
+
+    def streamed() -> None:
+        for _ in SearchResponseStream(chunks).hits():
+            pass
+
+    for label, fn in (("json.loads", lambda: json.loads(b"".join(chunks))), ("streamed", streamed)):
+        peak_bytes, took = peak(fn)
+        print(f"{label:>10}: peak {peak_bytes / 2**20:6.1f} MiB, {took * 1000:7.1f} ms "
+              f"({len(body) / 2**20:.1f} MiB body)")
@@ -0,0 +1,137 @@
+"""
+Mergeable aggregation states: HyperLogLog++ accuracy and merges, the terms
+error bound across partials, StatsState merges, and states collected over
+row partitions rendering what `localaggs` computes over all rows.
+"""
+from datetime import datetime, timezone
+from functools import reduce
+
+import numpy as np
+import pytest
+
+import localaggs
+from aggstate import (
+    AggState,
+    HyperLogLog,
+    StatsState,
+    TermsState,
+    _splitmix64,
+    collect,
+    merge_states,
+    render,
+)
+from dsl_models import SearchRequestWithAggs
+from localexec import ExecContext, synthetic_batch
+
+
+CTX = ExecContext(datetime(2025, 2, 1, tzinfo=timezone.utc))
+
+
+def _hashes(start: int, stop: int) -> np.ndarray:
+    return _splitmix64(np.arange(start, stop, dtype=np.uint64))
+
+
+def _aggs(aggs):
+    return SearchRequestWithAggs.model_validate({"query": {"match_all": {}}, "aggs": aggs}).aggs
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return synthetic_batch(60_000, seed=5, hosts=400)
+
+
+def test_agg_state_is_abstract():
+    with pytest.raises(TypeError):
+        AggState()
+
+
+# -----------------------------------------------------------------------------
+# HyperLogLog++
+# -----------------------------------------------------------------------------
+
+def test_hll_exact_below_threshold():
+    hll = HyperLogLog(threshold=1000).add_hashes(_hashes(0, 800)).add_hashes(_hashes(400, 900))
+    assert hll.is_exact and hll.estimate() == 900
+
+
+@pytest.mark.parametrize("distinct", [5_000, 50_000, 400_000])
+def test_hll_dense_estimate_error(distinct):
+    hll = HyperLogLog(p=14, threshold=100).add_hashes(_hashes(0, distinct))
+    assert not hll.is_exact
+    assert hll.estimate() == pytest.approx(distinct, rel=4 * 1.04 / 2 ** 7)  # 4 sigma at p=14
+
+
+@pytest.mark.parametrize("threshold", [100, 10_000])
+def test_hll_merge_equals_union(threshold):
+    parts = [HyperLogLog(threshold=threshold).add_hashes(_hashes(i * 3_000, i * 3_000 + 5_000)) for i in range(4)]
+    union = HyperLogLog(threshold=threshold).add_hashes(_hashes(0, 14_000))
+    merged = reduce(lambda a, b: a.merge(b), parts)
+    assert merged.estimate() == union.estimate()
+
+
+def test_hll_precision_checks():
+    with pytest.raises(ValueError, match="precision"):
+        HyperLogLog(p=3)
+    with pytest.raises(ValueError, match="different precision"):
+        HyperLogLog(p=10, threshold=0).add_hashes(_hashes(0, 10)).merge(
+            HyperLogLog(p=12, threshold=0).add_hashes(_hashes(0, 10)))
+
+
+# -----------------------------------------------------------------------------
+# StatsState
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("cuts", [[], [1], [0, 0, 5], [3, 3, 7]])
+def test_stats_merge_matches_whole(cuts):
+    values = np.array([4.0, -1.5, 9.25, 0.0, 3.0, 7.5, -6.0, 2.0])
+    parts = [StatsState.from_values(p) for p in np.split(values, cuts)]
+    merged = reduce(lambda a, b: a.merge(b), parts, StatsState())
+    whole = StatsState.from_values(values)
+    assert (merged.count, merged.min, merged.max) == (whole.count, whole.min, whole.max)
+    assert merged.sum == pytest.approx(whole.sum) and merged.sum_sq == pytest.approx(whole.sum_sq)
+
+
+def test_stats_merge_drops_unknown_sum_of_squares():
+    merged = StatsState.from_values(np.array([1.0])).merge(StatsState(count=1, sum=2.0, min=2.0, max=2.0, sum_sq=None))
+    assert merged.sum_sq is None and merged.count == 2
+
+
+def test_stats_empty_is_identity():
+    spec = _aggs({"s": {"stats": {"field": "x"}}})["s"]
+    assert StatsState().to_response(spec) == {"count": 0, "min": None, "max": None, "avg": None, "sum": 0.0}
+
+
+# -----------------------------------------------------------------------------
+# terms error bound
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("parts", [2, 5, 9])
+def test_terms_error_bound_holds(batch, parts):
+    aggs = _aggs({"hosts": {"terms": {"field": "host.name", "size": 10, "show_term_doc_count_error": True}}})
+    truth = {b["key"]: b["doc_count"] for b in localaggs.aggregate(
+        _aggs({"hosts": {"terms": {"field": "host.name", "size": 1000}}}), batch, None, CTX,
+    )["hosts"]["buckets"]}
+    states = [collect(aggs, batch, rows, CTX) for rows in np.array_split(np.arange(len(batch)), parts)]
+    merged = reduce(merge_states, states)
+    response = render(aggs, merged)["hosts"]
+    assert isinstance(merged["hosts"], TermsState)
+    for bucket in response["buckets"]:
+        assert bucket["doc_count"] <= truth[bucket["key"]] <= bucket["doc_count"] + bucket["doc_count_error_upper_bound"]
+        assert bucket["doc_count_error_upper_bound"] <= response["doc_count_error_upper_bound"]
+    listed = {b["key"] for b in response["buckets"]}
+    smallest = min(b["doc_count"] for b in response["buckets"])
+    missed = max(v for k, v in truth.items() if k not in listed)
+    assert missed <= smallest + response["doc_count_error_upper_bound"]
+
+
+def test_terms_exact_when_partials_return_every_key(batch):
+    aggs = _aggs({"svc": {"terms": {"field": "service.name", "size": 3},
+                          "aggs": {"lat": {"stats": {"field": "event.duration"}}}}})
+    merged = reduce(merge_states, (collect(aggs, batch, rows, CTX) for rows in np.array_split(np.arange(len(batch)), 4)))
+    local = localaggs.aggregate(aggs, batch, None, CTX)
+    rendered = render(aggs, merged)
+    assert rendered["svc"]["doc_count_error_upper_bound"] == 0
+    assert [b["key"] for b in rendered["svc"]["buckets"]] == [b["key"] for b in local["svc"]["buckets"]]
+    for got, want in zip(rendered["svc"]["buckets"], local["svc"]["buckets"]):
+        assert got["doc_count"] == want["doc_count"]
+        assert got["lat"] == pytest.approx(want["lat"])
@@ -0,0 +1,428 @@
+"""
+Validation / serialization benchmarks for `SearchRequestWithAggs`, and
+line-parsing benchmarks for the ingest simulator's grok and dissect engines.
+
+Throughput (pytest-benchmark, wired up in conftest.py):
+  # benchmark run: fails when a mean regresses by more than 25% against bench_throughput.json
+  pytest test_bench_dsl.py --benchmark-only
+  # re-record the baseline (on the machine that runs the comparison)
+  DSL_BENCH_UPDATE=1 pytest test_bench_dsl.py --benchmark-only
+  Plain `pytest` runs each benchmarked function once, untimed.
+
+Schema size (approximate prompt tokens of the tool schema, full and compact):
+  Baseline lives in `bench_baseline.json` next to the memory peaks; a case
+  fails if it grows by more than SCHEMA_TOLERANCE.
+
+Speed ratios (benchmark run only; wall-clock ratios are too noisy for unit runs):
+  Measured in the same process, interleaved, so roughly machine independent;
+  a case fails if its ratio drops by more than SPEED_TOLERANCE below the
+  baseline in `bench_baseline.json` (re-recorded by the DSL_BENCH_UPDATE run).
+
+Grok strategy (pattern by pattern vs one alternation, `grok` group):
+  `grok_default_speedup` is the default strategy's throughput over the
+  other's. At the last recording the default (pattern by pattern) was 0.98x
+  on access_syslog and 0.92x on six_formats, i.e. slightly slower, and 1.38x
+  on ip_port_last, the alternation's worst case.
+
+Dissect vs grok (`dissect:<case>` groups):
+  `dissect_speedup_over_grok` is dissect's throughput over the equivalent
+  grok pattern's. At the last recording dissect was 1.12x a grok pattern
+  with typed captures (IP, HTTPDATE, ...) and 0.84x a loose
+  NOTSPACE/DATA one: it is not faster than a loose grok pattern.
+
+Memory (tracemalloc peak per validate, machine independent):
+  Baseline lives in `bench_baseline.json`; a case fails if its peak grows by
+  more than MEMORY_TOLERANCE (plus a small fixed slack). Regenerate with
+  DSL_BENCH_UPDATE=1 after an intentional change.
+"""
+import json
+import os
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from dsl_models import MAX_AGG_NESTING, MAX_BUCKETS, SearchRequestWithAggs
+from dsl_models import SearchRequest
+import grok
+from dissect import compile_dissect
+from fastjson import dump_json
+from toolschema import compact_schema, token_cost
+from fxx import (  # noqa: F401  (fixtures are registered by import)
+    VALID_FIXTURE_NAMES,
+    fx_bool_must_should,
+    fx_date_hist_calendar,
+    fx_date_hist_fixed,
+    fx_exists,
+    fx_filters_named,
+    fx_histogram_numeric,
+    fx_ids,
+    fx_match_all_with_size_from,
+    fx_match_simple,
+    fx_multi_match,
+    fx_nested_depth3,
+    fx_range_agg_three,
+    fx_range_date,
+    fx_term_verbose,
+    fx_terms_agg_basic,
+    fx_terms_list,
+)
+
+
+BASELINE_PATH = Path(__file__).with_name("bench_baseline.json")
+MEMORY_TOLERANCE = 0.25
+MEMORY_SLACK_BYTES = 4096  # absorbs allocator noise on the tiny fixtures
+SCHEMA_TOLERANCE = 0.10
+SPEED_TOLERANCE = 0.25
+GENERATED_CORPUS_SIZE = 300  # deterministic hypothesis payloads (dslstrategies.sample_payloads)
+
+
+# ------------------------------
+# Generated payload families
+# ------------------------------
+
+def gen_nested_bool(depth: int) -> dict:
+    """bool -> must[bool -> must[...]] `depth` levels deep, with a filter at each level."""
+    query: dict = {"term": {"env": "prod"}}
+    for i in range(depth):
+        query = {
+            "bool": {
+                "must": [query],
+                "filter": [{"range": {"@timestamp": {"gte": f"now-{i + 1}d/d"}}}],
+            }
+        }
+    return {"query": query, "size": 10}
+
+
+def gen_wide_filters(n: int = MAX_BUCKETS) -> dict:
+    big = {f"k{i}": {"term": {"service.name": f"svc-{i}"}} for i in range(n)}
+    return {"query": {"match_all": {}}, "size": 0, "aggs": {"f": {"filters": {"filters": big}}}}
+
+
+def gen_wide_terms(n: int = 10_000) -> dict:
+    return {"query": {"terms": {"host.name": [f"host-{i:05d}" for i in range(n)]}}, "size": 0}
+
+
+def gen_agg_nesting(depth: int = MAX_AGG_NESTING, fanout: int = 8) -> dict:
+    """`fanout` sibling aggs per level, each nesting `depth` levels (leaf is `stats`)."""
+    def level(d: int) -> dict:
+        if d == depth:
+            return {f"s{i}": {"stats": {"field": f"m{i}"}} for i in range(fanout)}
+        return {
+            f"t{i}": {"terms": {"field": f"f{d}_{i}", "size": 10}, "aggs": level(d + 1)}
+            for i in range(fanout)
+        }
+    return {"query": {"match_all": {}}, "size": 0, "aggs": level(1)}
+
+
+GENERATED = {
+    "bool_depth_8": lambda: gen_nested_bool(8),
+    "bool_depth_32": lambda: gen_nested_bool(32),
+    "bool_depth_128": lambda: gen_nested_bool(128),
+    "filters_1000": gen_wide_filters,
+    "terms_10k": gen_wide_terms,
+    "aggs_nest_2x8": lambda: gen_agg_nesting(2, 8),
+    "aggs_nest_3x8": lambda: gen_agg_nesting(3, 8),
+}
+
+
+@pytest.fixture(params=VALID_FIXTURE_NAMES + list(GENERATED))
+def bench_payload(request):
+    name = request.param
+    if name in GENERATED:
+        return name, GENERATED[name]()
+    return name, request.getfixturevalue(name)
+
+
+# ------------------------------
+# Throughput
+# ------------------------------
+
+def test_bench_validate(benchmark, bench_payload):
+    name, payload = bench_payload
+    benchmark.group = "validate"
+    benchmark.extra_info["case"] = name
+    benchmark.extra_info["payload_bytes"] = len(json.dumps(payload))
+    model = benchmark(SearchRequestWithAggs.model_validate, payload)
+    assert model.query is not None
+
+
+def test_bench_dump(benchmark, bench_payload):
+    name, payload = bench_payload
+    model = SearchRequestWithAggs.model_validate(payload)
+    benchmark.group = "dump"
+    benchmark.extra_info["case"] = name
+    dumped = benchmark(model.model_dump, by_alias=True, exclude_none=True)
+    assert "query" in dumped
+
+
+def test_bench_dump_json(benchmark, bench_payload):
+    name, payload = bench_payload
+    model = SearchRequestWithAggs.model_validate(payload)
+    benchmark.group = "dump_json"
+    benchmark.extra_info["case"] = name
+    body = benchmark(dump_json, model)
+    assert body.startswith(b"{")
+
+
+@pytest.fixture(scope="module")
+def generated_corpus():
+    from dslstrategies import sample_payloads  # hypothesis is only needed here
+
+    return sample_payloads(GENERATED_CORPUS_SIZE)
+
+
+def test_bench_validate_generated_corpus(benchmark, generated_corpus):
+    benchmark.group = "validate"
+    benchmark.extra_info["case"] = f"hypothesis_corpus_{len(generated_corpus)}"
+    benchmark.extra_info["payload_bytes"] = sum(len(json.dumps(p)) for p in generated_corpus)
+    models = benchmark(lambda: [SearchRequestWithAggs.model_validate(p) for p in generated_corpus])
+    assert len(models) == len(generated_corpus)
+
+
+# ------------------------------
+# Memory
+# ------------------------------
+
+def _peak_validate_bytes(payload: dict) -> int:
+    SearchRequestWithAggs.model_validate(payload)  # warm schema caches
+    tracemalloc.start()
+    try:
+        SearchRequestWithAggs.model_validate(payload)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _load_baseline() -> dict:
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+def test_validate_memory_within_baseline(bench_payload):
+    name, payload = bench_payload
+    peak = _peak_validate_bytes(payload)
+    baseline = _load_baseline()
+    if os.environ.get("DSL_BENCH_UPDATE"):
+        baseline.setdefault("validate_peak_bytes", {})[name] = peak
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        return
+    expected = baseline.get("validate_peak_bytes", {}).get(name)
+    if expected is None:
+        pytest.skip(f"no memory baseline for {name!r}; run with DSL_BENCH_UPDATE=1")
+    assert peak <= expected * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK_BYTES, (
+        f"{name}: validate peak {peak} B exceeds baseline {expected} B by more than "
+        f"{MEMORY_TOLERANCE:.0%}"
+    )
+
+
+# ------------------------------
+# Tool schema size
+# ------------------------------
+
+SCHEMA_MODELS = {"SearchRequest": SearchRequest, "SearchRequestWithAggs": SearchRequestWithAggs}
+
+
+@pytest.mark.parametrize("model_name", list(SCHEMA_MODELS))
+def test_schema_tokens_within_baseline(model_name):
+    full = SCHEMA_MODELS[model_name].model_json_schema(by_alias=True)
+    sizes = {"full": token_cost(full), "compact": token_cost(compact_schema(full))}
+    assert sizes["compact"] < sizes["full"]
+    baseline = _load_baseline()
+    if os.environ.get("DSL_BENCH_UPDATE"):
+        baseline.setdefault("schema_tokens", {})[model_name] = sizes
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        return
+    expected = baseline.get("schema_tokens", {}).get(model_name)
+    if expected is None:
+        pytest.skip(f"no schema baseline for {model_name!r}; run with DSL_BENCH_UPDATE=1")
+    for kind, tokens in sizes.items():
+        assert tokens <= expected[kind] * (1 + SCHEMA_TOLERANCE), (
+            f"{model_name} ({kind}): schema costs {tokens} tokens, baseline {expected[kind]}"
+        )
+
+
+# ------------------------------
+# Grok strategies
+# ------------------------------
+
+BENCH_LINES = 20_000
+SPEED_LINES = 5_000
+SPEED_REPEATS = 5
+
+
+def _access_line(rng: random.Random, i: int) -> str:
+    ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+    return (f'{ip} - - [10/Oct/2024:13:55:36 -0700] "GET /api/{i % 97}?q={i} HTTP/1.1" '
+            f"{rng.choice([200, 404, 500])} {i}")
+
+
+def _syslog_line(rng: random.Random, i: int) -> str:
+    return f"Jan  {rng.randrange(1, 29)} 10:{rng.randrange(60):02d}:00 host-{i % 40} sshd[{i}]: Accepted key for u{i}"
+
+
+def _iso_line(rng: random.Random, i: int) -> str:
+    return f"2025-01-02T03:04:{i % 60:02d}Z INFO [main-{i % 5}] started job {i}"
+
+
+def _logfmt_line(rng: random.Random, i: int) -> str:
+    return f"level=warn ts=2025-01-0{i % 9 + 1} msg=slow request {i}"
+
+
+def _ip_port_line(rng: random.Random, i: int) -> str:
+    return f"10.0.0.{i % 250}:{8000 + i % 100} GET {200 + i % 3}"
+
+
+ISO_PATTERN = "^%{TIMESTAMP_ISO8601:ts} %{LOGLEVEL:level} \\[%{DATA:thread}\\] %{GREEDYDATA:msg}$"
+LOGFMT_PATTERN = "^level=%{WORD:level} ts=%{NOTSPACE:ts} msg=%{GREEDYDATA:msg}$"
+IP_PORT_PATTERN = "^%{IP:ip}:%{INT:port} %{WORD:verb} %{INT:status}$"
+ACCESS_PATTERN = "^%{COMMONAPACHELOG}$"
+SYSLOG_PATTERN = "^%{SYSLOGBASE} %{GREEDYDATA:message}$"
+
+# (patterns, line makers, share of lines per maker)
+GROK_FORMATS = {
+    "access_syslog": ([ACCESS_PATTERN, SYSLOG_PATTERN], [_access_line, _syslog_line], [4, 1]),
+    "six_formats": (
+        [ISO_PATTERN, LOGFMT_PATTERN, IP_PORT_PATTERN, "^%{UUID:id} %{NUMBER:duration:float}ms$",
+         SYSLOG_PATTERN, ACCESS_PATTERN],
+        [_iso_line, _logfmt_line, _ip_port_line,
+         lambda rng, i: f"123e4567-e89b-12d3-a456-{i:012d} {i / 7:.2f}ms", _syslog_line, _access_line],
+        [1, 1, 1, 1, 1, 5],
+    ),
+    # every line answered by the last of five patterns: the alternation's worst case here
+    "ip_port_last": (
+        [ACCESS_PATTERN, SYSLOG_PATTERN, ISO_PATTERN, LOGFMT_PATTERN, IP_PORT_PATTERN],
+        [_ip_port_line], [1],
+    ),
+}
+
+
+def grok_lines(case: str, n: int) -> list[str]:
+    """`n` deterministic lines of `case`, its formats mixed by their shares."""
+    _, makers, shares = GROK_FORMATS[case]
+    rng = random.Random(7)
+    return [rng.choices(makers, shares)[0](rng, i) for i in range(n)]
+
+
+@pytest.fixture(params=list(GROK_FORMATS), scope="module")
+def grok_case(request):
+    return request.param, grok_lines(request.param, BENCH_LINES)
+
+
+@pytest.mark.parametrize("alternation", [False, True], ids=["per_pattern", "alternation"])
+def test_bench_grok(benchmark, grok_case, alternation):
+    name, lines = grok_case
+    matcher = grok.compile_grok(GROK_FORMATS[name][0], alternation=alternation)
+    benchmark.group = "grok"
+    benchmark.extra_info["case"] = name
+    benchmark.extra_info["lines"] = len(lines)
+    results = benchmark(lambda: [matcher.match(line) for line in lines])
+    assert results == [grok.compile_grok(GROK_FORMATS[name][0], alternation=not alternation).match(line)
+                       for line in lines]
+    assert all(r is not None for r in results)
+
+
+def _lines_per_second(match: Callable[[str], Any], lines: list[str]) -> float:
+    t0 = time.perf_counter()
+    for line in lines:
+        match(line)
+    return len(lines) / (time.perf_counter() - t0)
+
+
+def _speedup(fast: Callable[[str], Any], slow: Callable[[str], Any], lines: list[str]) -> float:
+    """Best-of lines/s of `fast` over `slow`, runs interleaved so machine load hits both alike."""
+    best = [0.0, 0.0]
+    for _ in range(SPEED_REPEATS):
+        best[0] = max(best[0], _lines_per_second(fast, lines))
+        best[1] = max(best[1], _lines_per_second(slow, lines))
+    return best[0] / best[1]
+
+
+def _measure_speedup(benchmark, fast: Callable[[str], Any], slow: Callable[[str], Any], lines: list[str]) -> float:
+    """`_speedup` as a one-round benchmark; the test is skipped outside the benchmark run."""
+    if benchmark.disabled:
+        pytest.skip("speed ratios are checked in the benchmark run (--benchmark-only)")
+    benchmark.group = "speedup"
+    return benchmark.pedantic(_speedup, args=(fast, slow, lines), rounds=1, iterations=1)
+
+
+def _check_speedup(section: str, case: str, speedup: float, what: str) -> None:
+    baseline = _load_baseline()
+    if os.environ.get("DSL_BENCH_UPDATE"):
+        baseline.setdefault(section, {})[case] = round(speedup, 3)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        return
+    expected = baseline.get(section, {}).get(case)
+    if expected is None:
+        pytest.skip(f"no {section} baseline for {case!r}; run with DSL_BENCH_UPDATE=1")
+    assert speedup >= expected * (1 - SPEED_TOLERANCE), (
+        f"{case}: {what} runs at {speedup:.2f}x, baseline {expected:.2f}x"
+    )
+
+
+@pytest.mark.parametrize("case", list(GROK_FORMATS))
+def test_grok_default_strategy_within_baseline(benchmark, case):
+    patterns, lines = GROK_FORMATS[case][0], grok_lines(case, SPEED_LINES)
+    default = grok.compile_grok(patterns)
+    other = grok.compile_grok(patterns, alternation=not grok.GROK_ALTERNATION)
+    _check_speedup("grok_default_speedup", case, _measure_speedup(benchmark, default.match, other.match, lines),
+                   "the default grok strategy over the other")
+
+
+# ------------------------------
+# Dissect vs grok
+# ------------------------------
+
+# (dissect pattern, equivalent grok patterns) over `_access_line`
+DISSECT_FORMATS = {
+    "access": (
+        '%{client.ip} %{?ident} %{?auth} [%{ts}] "%{verb} %{path} %{?proto}" %{status} %{bytes}',
+        ['^%{IP:client.ip} %{USER} %{USER} \\[%{HTTPDATE:ts}\\] "%{WORD:verb} %{NOTSPACE:path} '
+         'HTTP/%{NUMBER}" %{INT:status} %{INT:bytes}$'],
+    ),
+    "access_loose_grok": (
+        '%{client.ip} %{} %{} [%{ts}] "%{verb} %{path} %{}" %{status} %{bytes}',
+        ['^%{NOTSPACE:client.ip} %{NOTSPACE} %{NOTSPACE} \\[%{DATA:ts}\\] "%{WORD:verb} %{NOTSPACE:path} '
+         '%{NOTSPACE}" %{NOTSPACE:status} %{NOTSPACE:bytes}$'],
+    ),
+}
+
+
+def access_lines(n: int) -> list[str]:
+    rng = random.Random(7)
+    return [_access_line(rng, i) for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def dissect_lines():
+    return access_lines(BENCH_LINES)
+
+
+@pytest.mark.parametrize("case", list(DISSECT_FORMATS))
+@pytest.mark.parametrize("engine", ["grok", "dissect", "dissect_batch"])
+def test_bench_dissect(benchmark, dissect_lines, case, engine):
+    pattern, grok_patterns = DISSECT_FORMATS[case]
+    d, g = compile_dissect(pattern), grok.compile_grok(grok_patterns)
+    run = {
+        "grok": lambda: [g.match(line)[1] for line in dissect_lines],
+        "dissect": lambda: [d.match(line) for line in dissect_lines],
+        "dissect_batch": lambda: d.match_many(dissect_lines),
+    }[engine]
+    benchmark.group = f"dissect:{case}"
+    benchmark.extra_info["lines"] = len(dissect_lines)
+    results = benchmark(run)
+    assert results == [g.match(line)[1] for line in dissect_lines]
+
+
+@pytest.mark.parametrize("case", list(DISSECT_FORMATS))
+def test_dissect_speedup_over_grok_within_baseline(benchmark, case):
+    pattern, grok_patterns = DISSECT_FORMATS[case]
+    d, g = compile_dissect(pattern), grok.compile_grok(grok_patterns)
+    _check_speedup("dissect_speedup_over_grok", case,
+                   _measure_speedup(benchmark, d.match, g.match, access_lines(SPEED_LINES)), "dissect over grok")
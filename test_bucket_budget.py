@@ -0,0 +1,107 @@
+"""
+Global bucket budget: requests Elasticsearch accepts are not rejected on a
+guessed histogram window, open-ended date ranges end at `now`, and the
+"reduce" policy shrinks a copy of the tree.
+"""
+import warnings
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from dsl_models import SearchRequestWithAggs
+from dsl_models.aggs import (
+    MAX_TOTAL_BUCKETS,
+    BucketBudgetWarning,
+    estimate_total_buckets,
+    reduce_to_bucket_budget,
+)
+
+
+NOW = datetime(2025, 1, 8, tzinfo=timezone.utc)
+NOW_MS = NOW.timestamp() * 1000
+
+
+def _histogram(interval: dict) -> dict:
+    return {"date_histogram": {"field": "@timestamp", **interval}}
+
+
+def _validate(body: dict, **context):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", BucketBudgetWarning)
+        return SearchRequestWithAggs.model_validate(body, context={"now": NOW, "bucket_policy": "reject", **context})
+
+
+# (body, expected estimate): all three were rejected under the old 10k budget.
+ACCEPTED = {
+    "terms20_daily_match_all": (
+        {"query": {"match_all": {}},
+         "aggs": {"hosts": {"terms": {"field": "host", "size": 20},
+                            "aggs": {"days": _histogram({"calendar_interval": "1d"})}}}},
+        20 + 20 * 1000,
+    ),
+    "last_7d_per_minute": (
+        {"query": {"range": {"@timestamp": {"gte": "now-7d", "lte": "now"}}},
+         "aggs": {"minutes": _histogram({"fixed_interval": "1m"})}},
+        7 * 24 * 60 + 1,
+    ),
+    "last_hour_open_ended_terms50": (
+        {"query": {"range": {"@timestamp": {"gte": "now-1h"}}},
+         "aggs": {"hosts": {"terms": {"field": "host", "size": 50},
+                            "aggs": {"minutes": _histogram({"fixed_interval": "1m"})}}}},
+        50 + 50 * 61,
+    ),
+}
+
+
+def test_default_budget_is_search_max_buckets():
+    assert MAX_TOTAL_BUCKETS == 65_536
+
+
+@pytest.mark.parametrize("name", list(ACCEPTED))
+def test_reject_policy_accepts(name):
+    body, expected = ACCEPTED[name]
+    model = _validate(body)
+    assert estimate_total_buckets(model.aggs, model.query, NOW_MS) == expected
+    assert model.model_dump(by_alias=True, exclude_none=True)["aggs"] == body["aggs"]
+
+
+def test_guessed_window_warns_instead_of_rejecting():
+    body, _ = ACCEPTED["terms20_daily_match_all"]
+    with pytest.warns(BucketBudgetWarning):
+        model = SearchRequestWithAggs.model_validate(
+            body, context={"now": NOW, "bucket_policy": "reject", "bucket_budget": 10_000}
+        )
+    assert model.aggs["hosts"].terms.size == 20
+
+
+def test_provable_excess_is_rejected():
+    body = {"query": {"range": {"@timestamp": {"gte": "now-30d"}}},
+            "aggs": {"hosts": {"terms": {"field": "host", "size": 100},
+                               "aggs": {"minutes": _histogram({"fixed_interval": "1m"})}}}}
+    with pytest.raises(ValidationError, match="buckets \\(budget"):
+        _validate(body)
+
+
+def test_reduce_policy_shrinks_a_copy():
+    body = {"query": {"range": {"@timestamp": {"gte": "now-7d"}}},
+            "aggs": {"hosts": {"terms": {"field": "host", "size": 100},
+                               "aggs": {"minutes": _histogram({"fixed_interval": "1m"})}}}}
+    model = _validate(body, bucket_policy="reduce")
+    assert estimate_total_buckets(model.aggs, model.query, NOW_MS) <= MAX_TOTAL_BUCKETS
+    assert body["aggs"]["hosts"]["terms"]["size"] == 100
+
+    original = _validate(body, bucket_budget=10**9).aggs
+    query = _validate(body, bucket_budget=10**9).query
+    reduced = reduce_to_bucket_budget(original, query, 1_000, NOW_MS)
+    assert reduced is not original and reduced["hosts"] is not original["hosts"]
+    assert original["hosts"].terms.size == 100
+    assert original["hosts"].aggs["minutes"].date_histogram.fixed_interval == "1m"
+    assert estimate_total_buckets(reduced, query, NOW_MS) <= 1_000
+
+
+def test_reduce_leaves_guessed_windows_alone():
+    aggs = _validate({"query": {"match_all": {}}, "aggs": {"minutes": _histogram({"fixed_interval": "1m"})}}).aggs
+    with pytest.warns(BucketBudgetWarning):
+        reduced = reduce_to_bucket_budget(aggs, None, 100, NOW_MS)
+    assert reduced["minutes"].date_histogram.fixed_interval == "1m"
@@ -0,0 +1,160 @@
+"""
+Bulk file runs: chunk ranges tile the file exactly on line boundaries, and
+ordered and unordered runs over a process pool agree on output and stats.
+"""
+import io
+import json
+
+import pytest
+
+from bulksim import BulkStats, iter_file, simulate_file, split_lines
+
+
+PIPELINE = {
+    "processors": [
+        {"drop": {"if": "ctx.message != null && ctx.message.startsWith('GET /health')"}},
+        {"dissect": {"field": "message", "pattern": "%{verb} %{path} %{status}", "tag": "parse"}},
+        {"convert": {"field": "status", "type": "integer", "tag": "status"}},
+        {"set": {"field": "event.outcome", "value": "failure", "if": "ctx.status >= 500"}},
+    ],
+}
+
+CONTENTS = {
+    "trailing_newline": b"a\nbb\nccc\ndddd\n",
+    "no_trailing_newline": b"a\nbb\nccc\ndddd",
+    "crlf": b"a\r\nbb\r\nccc\r\ndddd\r\n",
+    "crlf_no_trailing": b"a\r\nbb\r\nccc\r\ndddd",
+    "blank_lines": b"\n\na\n\n\nbb\n",
+    "one_long_line": b"x" * 50,
+    "long_and_short": b"x" * 40 + b"\ny\n" + b"z" * 30,
+    "utf8": "é\nñandú\n日本語\n".encode(),
+}
+
+
+def _write(tmp_path, data: bytes, name="in.log"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+# -----------------------------------------------------------------------------
+# split_lines
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 7, 16, 1 << 20])
+@pytest.mark.parametrize("name", list(CONTENTS))
+def test_split_lines_tiles_the_file_on_line_boundaries(tmp_path, name, chunk_bytes):
+    data = CONTENTS[name]
+    ranges = split_lines(_write(tmp_path, data), chunk_bytes)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(start < end for start, end in ranges)
+    for start, end in ranges[:-1]:
+        assert data[end - 1:end] == b"\n"                # never splits a line (nor a CRLF pair)
+        assert end - start >= chunk_bytes
+    assert [line for s, e in ranges for line in data[s:e].splitlines()] == data.splitlines()
+
+
+def test_split_lines_of_an_empty_file(tmp_path):
+    assert split_lines(_write(tmp_path, b""), 4) == []
+
+
+def test_split_lines_rejects_empty_chunks(tmp_path):
+    with pytest.raises(ValueError):
+        split_lines(_write(tmp_path, b"a\n"), 0)
+
+
+# -----------------------------------------------------------------------------
+# iter_file / simulate_file
+# -----------------------------------------------------------------------------
+
+def _lines(n: int, newline: str = "\n") -> str:
+    statuses = [200, 404, 500, "x"]  # "x" fails the convert processor
+    out = []
+    for i in range(n):
+        if i % 11 == 0:
+            out.append("GET /health 200")
+        elif i % 13 == 0:
+            out.append("garbage")                  # fails dissect
+        else:
+            out.append(f"GET /api/{i % 17} {statuses[i % 4]}")
+    return newline.join(out)
+
+
+@pytest.fixture(scope="module")
+def log_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bulk") / "day.log"
+    path.write_text(_lines(2_000), encoding="utf-8")
+    return path
+
+
+def _run(path, **options):
+    chunks = list(iter_file(PIPELINE, path, fmt="lines", workers=3, chunk_bytes=1_000, **options))
+    stats = BulkStats()
+    for chunk in chunks:
+        stats.merge(chunk.stats)
+    return chunks, stats
+
+
+def _docs(output: bytes) -> list:
+    """Output entries without the per-chunk ingest timestamp."""
+    docs = [json.loads(line) for line in output.splitlines()]
+    for d in docs:
+        if d and "doc" in d:
+            del d["doc"]["_ingest"]
+    return docs
+
+
+def test_ordered_and_unordered_runs_agree(log_file):
+    ordered, ordered_stats = _run(log_file, ordered=True)
+    unordered, unordered_stats = _run(log_file, ordered=False)
+    assert len(ordered) > 10
+    assert [c.index for c in ordered] == list(range(len(ordered)))
+    assert sorted(c.index for c in unordered) == list(range(len(ordered)))
+    assert ordered_stats.summary() == unordered_stats.summary()
+    by_index = {c.index: c.output for c in unordered}
+    assert [_docs(c.output) for c in ordered] == [_docs(by_index[i]) for i in range(len(ordered))]
+
+
+def test_stats_count_every_line(log_file):
+    _, stats = _run(log_file)
+    summary = stats.summary()
+    lines = _lines(2_000).split("\n")
+    assert summary["docs"] == len(lines)
+    assert summary["dropped"] == sum(line.startswith("GET /health") for line in lines)
+    assert summary["failures_by_tag"] == {
+        "parse": sum(line == "garbage" for line in lines),
+        "status": sum(line.endswith(" x") for line in lines),
+    }
+    assert summary["failed"] == sum(summary["failures_by_tag"].values())
+    assert summary["field_cardinality"]["path"] == 17
+    assert summary["bytes"] == log_file.stat().st_size
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_simulate_file_writes_one_entry_per_line(tmp_path, newline):
+    path = _write(tmp_path, _lines(300, newline).encode())
+    sink = io.BytesIO()
+    stats = simulate_file(PIPELINE, path, output=sink, fmt="lines", workers=2, chunk_bytes=512)
+    docs = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert len(docs) == stats.docs == 300
+    sources = [d["doc"]["_source"] for d in docs if d and "doc" in d]
+    assert sources and all(not s["message"].endswith("\r") for s in sources)
+
+
+def test_ndjson_input_with_meta_and_invalid_lines(tmp_path):
+    lines = [
+        json.dumps({"message": "GET /a 200"}),
+        json.dumps({"_index": "logs", "_id": "7", "_source": {"message": "GET /b 500"}}),
+        "not json",
+        "[1, 2]",
+        "",
+    ]
+    sink = io.BytesIO()
+    stats = simulate_file(PIPELINE, _write(tmp_path, "\n".join(lines).encode()), output=sink, workers=1)
+    first, second, *invalid = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert first["doc"]["_source"]["status"] == 200
+    assert second["doc"]["_index"] == "logs" and second["doc"]["_id"] == "7"
+    assert second["doc"]["_source"]["event"] == {"outcome": "failure"}
+    assert [d["error"]["type"] for d in invalid] == ["parse_exception", "parse_exception"]
+    assert (stats.docs, stats.invalid) == (4, 2)
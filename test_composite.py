@@ -0,0 +1,207 @@
+"""
+Composite paging over a `LogBatch`: pages run in key order until exhausted,
+resume from an `after_key`, stop at `max_pages`, place missing-value buckets
+as Elasticsearch does, and their doc counts add up to the query total.
+"""
+import pytest
+
+import localexec
+from composite import CompositePage, composite_agg_name, iter_composite_pages
+from dsl_models import SearchRequestWithAggs
+from localexec import LogBatch
+
+
+QUERY = {"bool": {"filter": [{"terms": {"log.level": ["error", "warn"]}}]}}
+DOCS = [
+    {"host": "b", "status": 500},
+    {"host": "a", "status": 200},
+    {"host": "c"},
+    {"status": 404},
+    {"host": "a", "status": 500},
+    {},
+]
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return localexec.synthetic_batch(20_000, seed=4, hosts=40)
+
+
+@pytest.fixture(scope="module")
+def small():
+    return LogBatch.from_documents(DOCS)
+
+
+def _local(batch):
+    return lambda body: localexec.search(body, batch)
+
+
+def _request(sources, size=25, query=QUERY, after=None, **siblings):
+    composite = {"size": size, "sources": sources, **({"after": after} if after else {})}
+    return SearchRequestWithAggs.model_validate({
+        "query": query,
+        "aggs": {"per_host": {"composite": composite, "aggs": {"latency": {"max": {"field": "event.duration"}}}},
+                 **siblings},
+    })
+
+
+HOST_LEVEL = [{"host": {"terms": {"field": "host.name"}}}, {"level": {"terms": {"field": "log.level"}}}]
+
+
+def _keys(pages):
+    return [b["key"] for p in pages for b in p.buckets]
+
+
+def _sort_key(key):
+    return tuple((v is not None, v) for v in key.values())
+
+
+# -----------------------------------------------------------------------------
+# Paging
+# -----------------------------------------------------------------------------
+
+def test_pages_until_exhausted(batch):
+    pages = list(iter_composite_pages(_request(HOST_LEVEL), search=_local(batch)))
+    keys = _keys(pages)
+    assert len(keys) == 80  # 40 hosts x 2 levels
+    assert [len(p.buckets) for p in pages] == [25, 25, 25, 5]
+    assert [p.number for p in pages] == [1, 2, 3, 4]
+    assert [p.buckets_seen for p in pages] == [25, 50, 75, 80]
+    assert keys == sorted(keys, key=_sort_key)
+    assert len({tuple(k.values()) for k in keys}) == len(keys)
+    assert all(p.after_key == p.buckets[-1]["key"] for p in pages)
+    assert all("latency" in b for p in pages for b in p.buckets)
+
+
+def test_bucket_counts_sum_to_the_query_total(batch):
+    request = _request(HOST_LEVEL, size=7)
+    total = sum(b["doc_count"] for p in iter_composite_pages(request, search=_local(batch)) for b in p.buckets)
+    matched = localexec.search({"query": QUERY, "size": 0}, batch)["hits"]["total"]["value"]
+    assert total == matched > 0
+
+
+def test_paged_buckets_match_a_single_page(batch):
+    paged = [b for p in iter_composite_pages(_request(HOST_LEVEL, size=9), search=_local(batch)) for b in p.buckets]
+    whole = localexec.search(_request(HOST_LEVEL, size=1000), batch)["aggregations"]["per_host"]["buckets"]
+    assert paged == whole
+
+
+@pytest.mark.parametrize("sources", [
+    [{"h": {"terms": {"field": "host.name", "order": "desc"}}}],
+    [{"code": {"histogram": {"field": "http.response.status_code", "interval": 100}}},
+     {"svc": {"terms": {"field": "service.name"}}}],
+    [{"day": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d"}}},
+     {"level": {"terms": {"field": "log.level", "order": "desc"}}}],
+])
+def test_every_source_kind_pages_without_gaps_or_repeats(batch, sources):
+    pages = list(iter_composite_pages(_request(sources, size=6), search=_local(batch)))
+    whole = localexec.search(_request(sources, size=1000), batch)["aggregations"]["per_host"]["buckets"]
+    assert _keys(pages) == [b["key"] for b in whole]
+
+
+def test_each_page_request_carries_only_the_composite(batch):
+    bodies = []
+
+    def search(body):
+        bodies.append(body)
+        return localexec.search(body, batch)
+
+    request = _request(HOST_LEVEL, size=50, levels={"terms": {"field": "log.level"}})
+    pages = list(iter_composite_pages(request, search=search))
+    assert len(pages) == 2 and len(bodies) == 3  # the third, empty page ends the iteration
+    assert all(body["size"] == 0 and list(body["aggs"]) == ["per_host"] for body in bodies)
+    assert "after" not in bodies[0]["aggs"]["per_host"]["composite"]
+    assert [b["aggs"]["per_host"]["composite"]["after"] for b in bodies[1:]] == [p.after_key for p in pages]
+
+
+# -----------------------------------------------------------------------------
+# Resuming / max_pages
+# -----------------------------------------------------------------------------
+
+def test_max_pages_stops_and_the_last_after_key_resumes(batch):
+    request = _request(HOST_LEVEL, size=10)
+    everything = _keys(iter_composite_pages(request, search=_local(batch)))
+    first = list(iter_composite_pages(request, search=_local(batch), max_pages=3))
+    assert len(first) == 3
+    rest = list(iter_composite_pages(request, search=_local(batch), resume_after=first[-1].after_key))
+    assert _keys(first) + _keys(rest) == everything
+    assert [p.number for p in rest] == list(range(1, len(rest) + 1))
+
+
+def test_resume_from_the_requests_own_after(batch):
+    everything = _keys(iter_composite_pages(_request(HOST_LEVEL), search=_local(batch)))
+    resumed = _keys(iter_composite_pages(_request(HOST_LEVEL, after=everything[40]), search=_local(batch)))
+    assert resumed == everything[41:]
+    # an explicit resume_after wins over the request's `after`
+    overridden = iter_composite_pages(
+        _request(HOST_LEVEL, after=everything[40]), search=_local(batch), resume_after=everything[70],
+    )
+    assert _keys(overridden) == everything[71:]
+
+
+def test_resume_after_a_key_that_is_not_in_the_data(batch):
+    keys = _keys(iter_composite_pages(_request(HOST_LEVEL), search=_local(batch)))
+    resumed = _keys(iter_composite_pages(
+        _request(HOST_LEVEL), search=_local(batch), resume_after={"host": "host-0010x", "level": "error"},
+    ))
+    assert resumed == [k for k in keys if k["host"] > "host-0010x"]
+
+
+def test_resume_after_the_last_key_yields_nothing(batch):
+    keys = _keys(iter_composite_pages(_request(HOST_LEVEL), search=_local(batch)))
+    assert list(iter_composite_pages(_request(HOST_LEVEL), search=_local(batch), resume_after=keys[-1])) == []
+
+
+def test_max_pages_none_is_unbounded(batch):
+    pages = list(iter_composite_pages(_request(HOST_LEVEL, size=1), search=_local(batch), max_pages=None))
+    assert len(pages) == 80
+    assert all(isinstance(p, CompositePage) for p in pages)
+
+
+# -----------------------------------------------------------------------------
+# Missing buckets
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("order, expected", [
+    ("asc", [None, "a", "b", "c"]),     # nulls first ascending
+    ("desc", ["c", "b", "a", None]),    # and last descending, as in ES
+])
+def test_missing_bucket_ordering(small, order, expected):
+    sources = [{"host": {"terms": {"field": "host", "order": order, "missing_bucket": True}}}]
+    pages = list(iter_composite_pages(_request(sources, size=1, query={"match_all": {}}), search=_local(small)))
+    assert [k["host"] for k in _keys(pages)] == expected
+    assert sum(b["doc_count"] for p in pages for b in p.buckets) == len(DOCS)
+
+
+def test_missing_bucket_pages_through_null_keys(small):
+    sources = [{"host": {"terms": {"field": "host", "missing_bucket": True}}},
+               {"status": {"histogram": {"field": "status", "interval": 100, "missing_bucket": True}}}]
+    pages = list(iter_composite_pages(_request(sources, size=2, query={"match_all": {}}), search=_local(small)))
+    assert [(k["host"], k["status"]) for k in _keys(pages)] == [
+        (None, None), (None, 400.0), ("a", 200.0), ("a", 500.0), ("b", 500.0), ("c", None),
+    ]
+    assert pages[0].after_key == {"host": None, "status": 400.0}
+
+
+def test_without_missing_bucket_docs_lacking_the_field_are_left_out(small):
+    sources = [{"host": {"terms": {"field": "host"}}}]
+    pages = list(iter_composite_pages(_request(sources, query={"match_all": {}}), search=_local(small)))
+    assert [(b["key"]["host"], b["doc_count"]) for p in pages for b in p.buckets] == [("a", 2), ("b", 1), ("c", 1)]
+
+
+# -----------------------------------------------------------------------------
+# Arguments
+# -----------------------------------------------------------------------------
+
+def test_composite_agg_name():
+    request = _request(HOST_LEVEL, other={"composite": {"sources": HOST_LEVEL[:1]}})
+    with pytest.raises(ValueError, match="exactly one"):
+        composite_agg_name(request)
+    assert composite_agg_name(request, "other") == "other"
+    with pytest.raises(ValueError, match="not a top-level composite"):
+        composite_agg_name(request, "latency")
+
+
+def test_search_or_index_is_required():
+    with pytest.raises(ValueError, match="`index`"):
+        next(iter_composite_pages(_request(HOST_LEVEL)))
@@ -0,0 +1,155 @@
+"""
+Date math and range resolution with ES semantics: `now` / `||` arithmetic,
+rounding per range operator (including plain dates filled out by `gt` /
+`lte`), `time_zone` and DST, `format`, and histogram interval keys.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from datemath import TimeWindow, format_date, parse_date, parse_date_math, parse_interval, resolve_date, resolve_range
+
+
+NOW = datetime(2025, 3, 30, 14, 25, 10, 123000, tzinfo=timezone.utc)
+
+
+def ms(text: str) -> int:
+    return int(datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+# -----------------------------------------------------------------------------
+# Arithmetic
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("expr, expected", [
+    ("now", "2025-03-30T14:25:10.123Z"),
+    ("now-7d", "2025-03-23T14:25:10.123Z"),
+    ("now+1h-30m", "2025-03-30T14:55:10.123Z"),
+    ("now-1M", "2025-02-28T14:25:10.123Z"),     # clamped to the month's last day
+    ("now-1y+2w", "2024-04-13T14:25:10.123Z"),
+    ("now/d", "2025-03-30T00:00:00Z"),
+    ("now-1d/w", "2025-03-24T00:00:00Z"),       # weeks start on Monday
+    ("2025-01-31||+1M", "2025-02-28T00:00:00Z"),
+    ("2024-02-29||+1y", "2025-02-28T00:00:00Z"),
+    ("2025-01-01T10:00:00Z||-90s/m", "2025-01-01T09:58:00Z"),
+])
+def test_arithmetic(expr, expected):
+    assert resolve_date(expr, now=NOW) == ms(expected)
+
+
+@pytest.mark.parametrize("expr", ["now-", "now-1x", "yesterday", "now/dd", "2025-01-01||+1q"])
+def test_not_date_math(expr):
+    assert parse_date_math(expr) is None
+
+
+def test_compiled_expressions_are_shared():
+    assert parse_date_math("now-1d/d") is parse_date_math("now-1d/d")
+
+
+# -----------------------------------------------------------------------------
+# Rounding per operator
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("bounds, window", [
+    ({"gte": "now/d"}, ("2025-03-30T00:00:00Z", None)),
+    ({"gt": "now/d"}, ("2025-03-31T00:00:00Z", None)),
+    ({"lt": "now/d"}, (None, "2025-03-30T00:00:00Z")),
+    ({"lte": "now/d"}, (None, "2025-03-31T00:00:00Z")),
+    ({"gte": "now-1M/M", "lt": "now/M"}, ("2025-02-01T00:00:00Z", "2025-03-01T00:00:00Z")),
+    # plain dates: gte/lt take the first millisecond, gt/lte fill out the date
+    ({"gte": "2025-01-01", "lte": "2025-01-01"}, ("2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z")),
+    ({"gt": "2025-01-01", "lt": "2025-01-03"}, ("2025-01-02T00:00:00Z", "2025-01-03T00:00:00Z")),
+    ({"lte": "2025-02"}, (None, "2025-03-01T00:00:00Z")),
+    ({"lte": "2024"}, (None, "2025-01-01T00:00:00Z")),
+    ({"lte": "2025-01-01T10"}, (None, "2025-01-01T11:00:00Z")),
+    ({"lte": "2025-01-01T10:30"}, (None, "2025-01-01T10:31:00Z")),
+    ({"lte": "2025-01-01T10:30:05Z"}, (None, "2025-01-01T10:30:06Z")),
+    ({"lte": "2025-01-01T10:30:05.250Z"}, (None, "2025-01-01T10:30:05.251Z")),
+    ({"gt": "2025-01-01T10:30:05.250Z"}, ("2025-01-01T10:30:05.251Z", None)),
+    # the anchor of `||` math is read as is; only an explicit /unit rounds
+    ({"lte": "2025-01-01||+1d"}, (None, "2025-01-02T00:00:00.001Z")),
+    ({"lte": "2025-01-01||+1d/d"}, (None, "2025-01-03T00:00:00Z")),
+    ({"lte": 1_735_689_600_000}, (None, "2025-01-01T00:00:00.001Z")),
+    ({"gte": "now-1d", "gt": "now-2d"}, ("2025-03-29T14:25:10.123Z", None)),  # tighter bound wins
+])
+def test_rounding(bounds, window):
+    start, end = window
+    expected = TimeWindow(start and ms(start), end and ms(end))
+    assert resolve_range(**bounds, now=NOW) == expected
+
+
+def test_window_is_half_open():
+    window = resolve_range(gte="2025-01-01", lte="2025-01-01")
+    inside = np.array([ms("2025-01-01T00:00:00Z"), ms("2025-01-01T23:59:59.999Z"), ms("2025-01-02T00:00:00Z")])
+    assert window.contains(inside).tolist() == [True, True, False]
+
+
+# -----------------------------------------------------------------------------
+# time_zone / DST / format
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("bounds, window", [
+    ({"gte": "now/d", "time_zone": "+01:00"}, ("2025-03-29T23:00:00Z", None)),
+    ({"gte": "2025-01-01", "time_zone": "-05:00"}, ("2025-01-01T05:00:00Z", None)),
+    ({"gte": "2025-01-01T00:00:00Z", "time_zone": "-05:00"}, ("2025-01-01T00:00:00Z", None)),  # explicit zone wins
+    # 2025-03-30 is 23 hours long in Paris
+    ({"gte": "2025-03-30", "lte": "2025-03-30", "time_zone": "Europe/Paris"},
+     ("2025-03-29T23:00:00Z", "2025-03-30T22:00:00Z")),
+    ({"gte": "now/d", "lt": "now+1d/d", "time_zone": "Europe/Paris"}, ("2025-03-29T23:00:00Z", "2025-03-30T22:00:00Z")),
+    ({"gte": "2025-10-26||/d", "lt": "2025-10-26||+1d/d", "time_zone": "Europe/Paris"},
+     ("2025-10-25T22:00:00Z", "2025-10-26T23:00:00Z")),   # 25 hours
+    ({"gte": "01/02/2025", "lte": "01/02/2025", "format": "dd/MM/yyyy"}, ("2025-02-01T00:00:00Z", "2025-02-02T00:00:00Z")),
+    ({"lte": "2025-02", "format": "yyyy-MM"}, (None, "2025-03-01T00:00:00Z")),
+    ({"lte": "2025-01-01 10:30", "format": "yyyy-MM-dd HH:mm"}, (None, "2025-01-01T10:31:00Z")),
+    ({"gte": "1735689600", "format": "epoch_second"}, ("2025-01-01T00:00:00Z", None)),
+    ({"gte": "1735689600000"}, ("2025-01-01T00:00:00Z", None)),   # epoch_millis fallback
+])
+def test_time_zone_and_format(bounds, window):
+    start, end = window
+    assert resolve_range(**bounds, now=NOW) == TimeWindow(start and ms(start), end and ms(end))
+
+
+def test_unparseable_date_raises():
+    with pytest.raises(ValueError, match="Cannot parse date"):
+        resolve_range(gte="01/02/2025")
+    with pytest.raises(ValueError, match="Unsupported date format token"):
+        resolve_range(gte="2025", format="yyyy QQ")
+
+
+def test_format_date_round_trips():
+    dt = parse_date("2025-01-02T03:04:05.678+01:00")
+    assert format_date(dt, "yyyy-MM-dd'T'HH:mm:ss.SSSXXX") == "2025-01-02T03:04:05.678+01:00"
+    assert format_date(dt, "d/M/yy H:m") == "2/1/25 3:4"
+
+
+# -----------------------------------------------------------------------------
+# Histogram intervals
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("interval, calendar, tz, start, end, keys", [
+    ("1d", True, None, "2025-01-01T05:00:00Z", "2025-01-03T00:00:00Z",
+     ["2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z", "2025-01-03T00:00:00Z"]),
+    ("1d", True, "Europe/Paris", "2025-03-29T12:00:00Z", "2025-03-31T12:00:00Z",
+     ["2025-03-28T23:00:00Z", "2025-03-29T23:00:00Z", "2025-03-30T22:00:00Z"]),
+    ("1w", True, None, "2025-01-01T00:00:00Z", "2025-01-10T00:00:00Z",
+     ["2024-12-30T00:00:00Z", "2025-01-06T00:00:00Z"]),
+    ("month", True, None, "2025-01-15T00:00:00Z", "2025-03-01T00:00:00Z",
+     ["2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z", "2025-03-01T00:00:00Z"]),
+    ("quarter", True, None, "2025-02-01T00:00:00Z", "2025-07-01T00:00:00Z",
+     ["2025-01-01T00:00:00Z", "2025-04-01T00:00:00Z", "2025-07-01T00:00:00Z"]),
+    ("6h", False, "+02:00", "2025-01-01T00:00:00Z", "2025-01-01T12:00:00Z",
+     ["2024-12-31T22:00:00Z", "2025-01-01T04:00:00Z", "2025-01-01T10:00:00Z"]),
+])
+def test_interval_boundaries(interval, calendar, tz, start, end, keys):
+    compiled = parse_interval(interval, calendar)
+    expected = [ms(k) for k in keys]
+    assert compiled.boundaries(ms(start), ms(end), tz=tz).tolist() == expected
+    assert compiled.round_down(np.array([ms(start), ms(end)]), tz=tz).tolist() == [expected[0], expected[-1]]
+    assert compiled.bucket_count(ms(start), ms(end)) >= len(expected)
+
+
+@pytest.mark.parametrize("text, calendar", [("2d", True), ("1M", False), ("0h", False), ("1.5h", False)])
+def test_unsupported_intervals(text, calendar):
+    with pytest.raises(ValueError):
+        parse_interval(text, calendar)
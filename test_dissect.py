@@ -0,0 +1,78 @@
+"""
+Dissect engine: keys split at the first occurrence of each delimiter, and the
+`+` (append, with `/n` order), `?` / `%{}` (skip), `*` / `&` (reference) and
+`->` (right padding) modifiers assemble fields as Elasticsearch does.
+"""
+import pytest
+
+from dissect import compile_dissect, parse_pattern
+
+
+@pytest.mark.parametrize("pattern, separator, text, expected", [
+    # plain keys, literals around them
+    ("%{a} %{b}", "", "x y", {"a": "x", "b": "y"}),
+    ("[%{a}] %{b}!", "", "[x] y!", {"a": "x", "b": "y"}),
+    ("%{a} %{b}", "", "x y z", {"a": "x", "b": "y z"}),               # the last key takes the rest
+    ("%{a},%{b},%{c}", "", ",,", {"a": "", "b": "", "c": ""}),
+    ("%{a}:%{b}", "", "k:v:w", {"a": "k", "b": "v:w"}),                # first occurrence, no backtracking
+    # + appends in pattern order, or by /n
+    ("%{a} %{+a} %{+a}", "-", "x y z", {"a": "x-y-z"}),
+    ("%{+a} %{+a}", " ", "x y", {"a": "x y"}),
+    ("%{+a/2} %{+a/1}", " ", "x y", {"a": "y x"}),
+    ("%{a} %{+a/3} %{+a/2}", ".", "x y z", {"a": "x.z.y"}),
+    ("%{+a} %{b}", "", "x y", {"a": "x", "b": "y"}),
+    # ? and %{} skip
+    ("%{?ident} %{b}", "", "x y", {"b": "y"}),
+    ("%{} %{b} %{}", "", "x y z", {"b": "y"}),
+    ("%{?a} %{?a} %{b}", "", "x y z", {"b": "z"}),
+    # * names the field, & gives its value
+    ("%{*k}=%{&k}", "", "level=warn", {"level": "warn"}),
+    ("%{*k1}=%{&k1} %{*k2}=%{&k2}", "", "a=1 b=2", {"a": "1", "b": "2"}),
+    ("%{&k}<-%{*k}", "", "1<-a", {"a": "1"}),
+    ("%{*k}=%{&k} %{+msg} %{+msg}", "_", "level=warn hi there", {"level": "warn", "msg": "hi_there"}),
+    # -> skips repeated delimiters after its key
+    ("%{ts->} %{level}", "", "12:00      INFO", {"ts": "12:00", "level": "INFO"}),
+    ("%{ts} %{level}", "", "12:00      INFO", {"ts": "12:00", "level": "     INFO"}),
+    ("%{a->}, %{b}", "", "x, , , y", {"a": "x", "b": "y"}),
+    ("%{?pad->} %{b}", "", "x   y", {"b": "y"}),
+])
+def test_match(pattern, separator, text, expected):
+    d = compile_dissect(pattern, separator)
+    assert d.match(text) == expected
+    assert d.match_many([text, text]) == [expected, expected]
+
+
+@pytest.mark.parametrize("pattern, text", [
+    ("%{a} %{b}", "xy"),                # delimiter missing
+    ("[%{a}] %{b}", "x] y"),            # leading literal missing
+    ("%{a} %{b}!", "x y"),              # trailing literal missing
+    ("%{a}::%{b}::", "x::"),            # trailing literal overlaps the previous delimiter
+])
+def test_no_match(pattern, text):
+    d = compile_dissect(pattern)
+    assert d.match(text) is None
+    assert d.match_many([text, "unused"])[0] is None
+
+
+def test_values_are_raw_per_key():
+    assert compile_dissect("%{a} %{?b} %{+a}").values("x y z") == ["x", "y", "z"]
+
+
+@pytest.mark.parametrize("pattern", ["no keys here", "%{*k}=%{v}", "%{&k} %{v}", "%{*a}=%{&b}"])
+def test_invalid_patterns(pattern):
+    with pytest.raises(ValueError):
+        compile_dissect(pattern)
+
+
+def test_parse_pattern_reports_modifiers():
+    prefix, keys, delimiters = parse_pattern("<%{+a/2}|%{?b->}|%{c}>")
+    assert prefix == "<"
+    assert [(k.name, k.modifier, k.order, k.right_pad) for k in keys] == [
+        ("a", "+", 2, False), ("b", "?", 1, True), ("c", "", 2, False),
+    ]
+    assert delimiters == ("|", "|", ">")
+
+
+def test_compiled_patterns_are_shared():
+    assert compile_dissect("%{a} %{b}") is compile_dissect("%{a} %{b}")
+    assert compile_dissect("%{a} %{b}") is not compile_dissect("%{a} %{b}", "-")
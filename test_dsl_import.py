@@ -0,0 +1,104 @@
+"""
+Import-time budget for the shared `dsl_models` package.
+
+Each case runs in a fresh interpreter (pydantic itself is imported first and
+not counted) and checks:
+  - what the import pulls in: no extras, no datemath/numpy, no built schemas;
+  - wall time and tracemalloc-traced memory against the budgets below;
+  - that the legacy module names re-export the same classes.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+IMPORT_BUDGET_MS = 100  # measured ~30 ms; budget absorbs slow CI runners
+IMPORT_BUDGET_BYTES = 2 * 1024 * 1024  # measured ~1.1 MiB
+EXTRAS = ("dsl_models.aggs", "dsl_models.ingest", "dsl_models.watcher")
+
+_PROBE = """
+import json, sys, time, tracemalloc
+import pydantic, pydantic.main
+
+if TRACE:
+    tracemalloc.start()
+t0 = time.perf_counter()
+import dsl_models
+import_ms = (time.perf_counter() - t0) * 1000
+import_bytes = tracemalloc.get_traced_memory()[0]
+
+from dsl_models._base import DslModel
+def subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        yield from subclasses(sub)
+
+print(json.dumps({
+    "import_ms": import_ms,
+    "import_bytes": import_bytes,
+    "modules": sorted(m for m in sys.modules if m.startswith(("dsl_models", "datemath", "numpy"))),
+    "built": sorted(c.__name__ for c in subclasses(DslModel) if c.__pydantic_complete__),
+}))
+"""
+
+
+def _run(code: str) -> str:
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+    )
+    return out.stdout.strip().splitlines()[-1]
+
+
+@pytest.fixture(scope="module")
+def probe() -> dict:
+    # time without tracing (tracemalloc slows imports several-fold), memory with it
+    timed = json.loads(_run("TRACE = False" + _PROBE))
+    traced = json.loads(_run("TRACE = True" + _PROBE))
+    return {**timed, "import_bytes": traced["import_bytes"]}
+
+
+def test_core_import_loads_no_extras(probe):
+    assert not set(EXTRAS) & set(probe["modules"])
+    assert "datemath" not in probe["modules"]
+    assert not any(m == "numpy" or m.startswith("numpy.") for m in probe["modules"])
+
+
+def test_core_import_builds_no_schemas(probe):
+    assert probe["built"] == []
+
+
+def test_core_import_within_budget(probe):
+    assert probe["import_ms"] <= IMPORT_BUDGET_MS, f"import took {probe['import_ms']:.1f} ms"
+    assert probe["import_bytes"] <= IMPORT_BUDGET_BYTES, f"import traced {probe['import_bytes']} B"
+
+
+def test_extras_load_on_first_access():
+    loaded = _run(
+        "import sys, dsl_models; dsl_models.SearchRequestWithAggs; "
+        "print(sorted(m for m in sys.modules if m.startswith('dsl_models.')))"
+    )
+    assert "dsl_models.aggs" in loaded
+    assert "dsl_models.ingest" not in loaded and "dsl_models.watcher" not in loaded
+
+
+def test_legacy_modules_share_one_copy():
+    import importlib.util
+
+    import dsl_models
+    import ipppp
+    import mods
+    import trm
+    import wwww
+
+    spec = importlib.util.spec_from_file_location("trm_2", Path(__file__).with_name("trm-2.py"))
+    trm_2 = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(trm_2)
+
+    assert trm.BoolQuery is mods.BoolQuery is trm_2.BoolQuery is dsl_models.BoolQuery
+    assert trm_2.SearchRequestWithAggs is dsl_models.SearchRequestWithAggs
+    assert ipppp.IngestPipeline is dsl_models.IngestPipeline
+    assert wwww.WatcherWatch is dsl_models.WatcherWatch
@@ -0,0 +1,102 @@
+"""
+Property-based tests for `SearchRequestWithAggs` (strategies in dslstrategies.py).
+
+Correctness:
+  - generated valid payloads validate, round-trip byte-for-byte and stay
+    within the nesting/bucket limits the models enforce;
+  - every targeted mutation is rejected with the message of its rule.
+
+Pathological shapes:
+  - validation memory is steered (hypothesis `target`) towards the worst
+    peak-bytes-per-payload-byte ratio (beyond a fixed slack); the test fails
+    when it exceeds MAX_MEMORY_AMPLIFICATION, and hypothesis shrinks to the
+    smallest such shape.
+
+Examples per test follow the hypothesis profile named by DSL_HYPOTHESIS_PROFILE
+(default: hypothesis' own); for a longer hunt:
+  DSL_HYPOTHESIS_PROFILE=hunt pytest test_dsl_properties.py
+"""
+import json
+import os
+import tracemalloc
+
+import pytest
+from hypothesis import HealthCheck, given, settings, target
+from pydantic import ValidationError
+
+from dsl_models import MAX_AGG_NESTING, MAX_BUCKETS, SearchRequestWithAggs
+from dsl_models.aggs import MAX_TOTAL_BUCKETS, AggregationsRoot, estimate_total_buckets, node_bucket_count
+from dslstrategies import INVALID_RULES, invalid_search_requests, search_requests
+from fastjson import dump_json
+
+
+MAX_MEMORY_AMPLIFICATION = 25  # traced peak bytes per payload byte; worst found ~13
+MEMORY_SLACK_BYTES = 4096  # fixed per-validate overhead (dominates tiny payloads)
+
+settings.register_profile("hunt", max_examples=5_000, deadline=None)
+settings.load_profile(os.environ.get("DSL_HYPOTHESIS_PROFILE", "default"))
+FAST = settings(deadline=None, suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large])
+
+
+def _walk(aggs):
+    stack = list(aggs.values())
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend((node.aggs or {}).values())
+
+
+# ------------------------------
+# Valid trees
+# ------------------------------
+
+@FAST
+@given(search_requests())
+def test_valid_payload_round_trips(payload):
+    model = SearchRequestWithAggs.model_validate(payload)
+    assert model.model_dump(by_alias=True, exclude_none=True, mode="json") == payload
+    assert dump_json(model) == model.model_dump_json(by_alias=True, exclude_none=True).encode()
+    again = SearchRequestWithAggs.model_validate_json(dump_json(model))
+    assert again == model
+
+
+@FAST
+@given(search_requests(with_aggs=True))
+def test_valid_aggs_stay_within_limits(payload):
+    model = SearchRequestWithAggs.model_validate(payload)
+    assert max(AggregationsRoot._compute_depth(node) for node in model.aggs.values()) <= MAX_AGG_NESTING
+    assert all(node_bucket_count(node, model.query) <= MAX_BUCKETS for node in _walk(model.aggs))
+    assert estimate_total_buckets(model.aggs, model.query) <= MAX_TOTAL_BUCKETS
+
+
+# ------------------------------
+# Targeted invalid mutations
+# ------------------------------
+
+@FAST
+@given(invalid_search_requests())
+def test_invalid_mutation_is_rejected(case):
+    rule, payload = case
+    with pytest.raises(ValidationError) as exc:
+        SearchRequestWithAggs.model_validate(payload)
+    assert INVALID_RULES[rule] in str(exc.value), rule
+
+
+# ------------------------------
+# Pathological shapes
+# ------------------------------
+
+@FAST
+@given(search_requests())
+def test_validation_memory_is_linear_in_payload_size(payload):
+    SearchRequestWithAggs.model_validate(payload)  # warm schema caches
+    size = len(json.dumps(payload))
+    tracemalloc.start()
+    try:
+        SearchRequestWithAggs.model_validate(payload)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    ratio = (peak - MEMORY_SLACK_BYTES) / size
+    target(ratio, label="validate peak bytes per payload byte")
+    assert ratio <= MAX_MEMORY_AMPLIFICATION, json.dumps(payload)[:500]
@@ -0,0 +1,102 @@
+"""
+Byte-equivalence of `fastjson.dump_json` with
+`model_dump_json(by_alias=True, exclude_none=True)` over the `fxx.py`
+fixtures, the generated benchmark families and scalar edge cases.
+"""
+import json
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic_core import PydanticSerializationError
+
+from dsl_models import SearchRequestWithAggs
+from fastjson import _encode_float, dump_json
+from fxx import (  # noqa: F401  (fixtures are registered by import)
+    VALID_FIXTURE_NAMES,
+    fx_bool_must_should,
+    fx_date_hist_calendar,
+    fx_date_hist_fixed,
+    fx_exists,
+    fx_filters_named,
+    fx_histogram_numeric,
+    fx_ids,
+    fx_match_all_with_size_from,
+    fx_match_simple,
+    fx_multi_match,
+    fx_nested_depth3,
+    fx_range_agg_three,
+    fx_range_date,
+    fx_term_verbose,
+    fx_terms_agg_basic,
+    fx_terms_list,
+)
+from test_bench_dsl import GENERATED
+from valcache import validate_search_request
+
+
+def _reference(model) -> bytes:
+    try:
+        return model.model_dump_json(by_alias=True, exclude_none=True).encode()
+    except PydanticSerializationError:
+        # pydantic-core's JSON writer has a fixed depth limit (bool_depth_128);
+        # its python-mode dump plus compact json.dumps is the same encoding.
+        dumped = model.model_dump(mode="json", by_alias=True, exclude_none=True)
+        return json.dumps(dumped, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+@pytest.mark.parametrize("name", VALID_FIXTURE_NAMES)
+def test_fixture_bytes_match(request, name):
+    model = SearchRequestWithAggs.model_validate(request.getfixturevalue(name))
+    assert dump_json(model) == _reference(model)
+
+
+@pytest.mark.parametrize("name", list(GENERATED))
+def test_generated_bytes_match(name):
+    model = SearchRequestWithAggs.model_validate(GENERATED[name]())
+    assert dump_json(model) == _reference(model)
+
+
+def test_frozen_cached_tree_matches():
+    payload = GENERATED["aggs_nest_2x8"]()
+    model = validate_search_request(payload)
+    assert dump_json(model) == _reference(model)
+
+
+@pytest.mark.parametrize("value", [
+    "naïve ☃ \"quoted\" \\ back\tslash\n", "emoji 🚀", " \x00\x1f",
+])
+def test_string_escapes_match(value):
+    model = SearchRequestWithAggs.model_validate({"query": {"match": {"message": value}}})
+    assert dump_json(model) == _reference(model)
+
+
+@pytest.mark.parametrize("value", [
+    0.0, -0.0, 1.5, 1e16, 1.5e300, 1e-5, 2.5e-05, -3.25e-6, 1e-7, 5e-324, 123456.789,
+    math.inf, -math.inf, math.nan,
+])
+def test_float_formatting_matches(value):
+    model = SearchRequestWithAggs.model_validate({"query": {"range": {"latency": {"gte": value}}}})
+    assert dump_json(model) == _reference(model)
+
+
+def test_random_floats_match_pydantic():
+    import random
+
+    from pydantic import TypeAdapter
+
+    rng = random.Random(7)
+    ta = TypeAdapter(float)
+    for _ in range(5000):
+        v = rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30)
+        assert _encode_float(v).encode() == ta.dump_json(v)
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    datetime(2025, 1, 2, 3, 4, 5, 120, tzinfo=timezone(timedelta(hours=-5, minutes=-30))),
+    datetime(2025, 1, 2, 3, 4, 5),
+])
+def test_datetime_formatting_matches(value):
+    model = SearchRequestWithAggs.model_validate({"query": {"range": {"@timestamp": {"gte": value}}}})
+    assert dump_json(model) == _reference(model)
@@ -0,0 +1,106 @@
+"""
+`HitBatch` conversion to and from ES hits: `from_response(...).to_hits()`
+gives back the hits (dates in ES millisecond ISO form), field selection and
+missing values behave per column, and the vectorized helpers agree with a
+plain loop over the hit dicts.
+"""
+import json
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import localexec
+from hitbatch import HitBatch
+from streamjson import SearchResponseStream
+
+
+HITS = [
+    {"_index": "logs-a", "_id": "1", "_score": 2.0, "sort": [1735689600000, "1"],
+     "_source": {"@timestamp": "2025-01-01T00:00:00.000Z", "service": {"name": "auth"}, "level": "error",
+                 "latency": 12.5, "ok": False, "tags": ["x", "y"], "labels": {"team": "core"}}},
+    {"_index": "logs-a", "_id": "2", "_score": None, "sort": [1735693200000, "2"],
+     "_source": {"@timestamp": "2025-01-01T01:00:00.000Z", "service": {"name": "payments"}, "level": "info",
+                 "latency": 3, "ok": True}},
+    {"_index": "logs-b", "_id": "3", "_score": 0.5, "sort": [1735696800000, "3"],
+     "_source": {"@timestamp": "2025-01-01T02:00:00.000Z", "service.name": "auth", "level": "error"}},
+]
+RESPONSE = {"took": 1, "hits": {"total": {"value": 3, "relation": "eq"}, "max_score": 2.0, "hits": HITS}}
+
+
+def _nested(source):
+    """`_source` with dotted keys expanded, as `HitBatch.source` rebuilds it."""
+    out = {}
+    for key, value in source.items():
+        node = out
+        *parents, leaf = key.split(".")
+        for p in parents:
+            node = node.setdefault(p, {})
+        node[leaf] = value
+    return out
+
+
+def test_round_trip_of_hits():
+    hb = HitBatch.from_response(RESPONSE)
+    assert len(hb) == 3
+    assert hb.to_hits() == [{**h, "_source": _nested(h["_source"])} for h in HITS]
+
+
+def test_column_kinds_and_raw_fields():
+    hb = HitBatch.from_response(RESPONSE)
+    kinds = {name: col.kind for name, col in hb.columns.items()}
+    assert kinds == {"@timestamp": "date", "service.name": "keyword", "level": "keyword",
+                     "latency": "number", "ok": "bool", "labels.team": "keyword"}
+    assert set(hb.raw) == {"tags"}
+    assert hb[1]["latency"] == 3 and hb[2]["ok"] is None and hb[2].get("ok", "n/a") == "n/a"
+    assert (hb[0].id, hb[0].index, hb[1].score) == ("1", "logs-a", None)
+
+
+def test_selected_fields_only():
+    hb = HitBatch.from_response(RESPONSE, fields=["service.name", "absent"])
+    assert hb.fields == ["service.name", "absent"]
+    assert hb.value_counts("absent") == {}
+    assert [h["_source"] for h in hb.to_hits()] == [{"service": {"name": n}} for n in ("auth", "payments", "auth")]
+
+
+def test_mixed_number_field_is_rejected():
+    hits = [{"_id": "1", "_source": {"n": 1}}, {"_id": "2", "_source": {"n": "many"}}]
+    with pytest.raises(ValueError, match="mixes numbers"):
+        HitBatch.from_hits(hits)
+
+
+@pytest.fixture(scope="module")
+def search_response():
+    batch = localexec.synthetic_batch(3_000, seed=2)
+    return localexec.search({"query": {"term": {"env": "prod"}}, "size": 1_000}, batch)
+
+
+def test_round_trip_of_localexec_response(search_response):
+    assert HitBatch.from_response(search_response).to_hits() == search_response["hits"]["hits"]
+
+
+def test_streamed_hits_match_parsed_response(search_response):
+    body = json.dumps(search_response).encode()
+    stream = SearchResponseStream(body[i:i + 4096] for i in range(0, len(body), 4096))
+    streamed = HitBatch.from_hits(stream.hits())
+    assert streamed.to_hits() == search_response["hits"]["hits"]
+
+
+def test_vectorized_helpers_match_dict_loops(search_response):
+    hits = search_response["hits"]["hits"]
+    hb = HitBatch.from_response(search_response)
+    levels = [h["_source"]["log"]["level"] for h in hits]
+    assert hb.value_counts("log.level") == dict(Counter(levels).most_common())
+    errors = hb.take(hb.where("log.level", "error"))
+    assert [h["_id"] for h in errors.to_hits()] == [h["_id"] for h in hits if h["_source"]["log"]["level"] == "error"]
+    groups = hb.group_indices("service.name")
+    assert {k: len(v) for k, v in groups.items()} == Counter(h["_source"]["service"]["name"] for h in hits)
+    rows = np.array([5, 0, 7])
+    assert hb.take(rows).to_hits() == [hits[i] for i in rows]
+
+
+def test_to_log_batch_runs_local_queries(search_response):
+    hb = HitBatch.from_response(search_response)
+    local = localexec.search({"query": {"range": {"event.duration": {"gte": 100}}}, "size": 0}, hb.to_log_batch())
+    expected = sum(1 for h in search_response["hits"]["hits"] if h["_source"]["event"]["duration"] >= 100)
+    assert local["hits"]["total"]["value"] == expected
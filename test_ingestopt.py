@@ -0,0 +1,144 @@
+"""
+Pipeline optimizer: the expected-weight model, reordering only above
+MIN_REORDER_GAIN, and reordered / trimmed pipelines ending every document
+exactly as the original does, `if`, on_failure and ignore_failure included.
+"""
+import pytest
+
+import ingestopt
+from ingestopt import _outcome, analyze_pipeline, expected_weight, optimize_pipeline
+from ingestsim import compile_pipeline
+
+
+SOURCES = [
+    {"message": "GET /health 1", "level": "DEBUG", "env": "prod", "service": "api", "status": "200",
+     "ts": "2025-01-01T00:00:00Z", "labels": "a=1,b=2"},
+    {"message": "POST /x  22", "level": "info", "env": "dev", "status": "x", "ts": "bad", "labels": "oops"},
+    {"message": "GET /health", "level": "debug", "env": "prod"},
+    {"message": 5, "service": "db", "status": 500, "labels": "a=1"},
+    {"message": "GET /api/7 3", "service": None, "level": "WARN", "env": "prod", "status": "404"},
+    {"level": "debug"},
+    {},
+]
+
+IF_PIPELINE = {"processors": [
+    {"gsub": {"field": "message", "pattern": "\\d+", "replacement": "N", "ignore_missing": True,
+              "ignore_failure": True}},
+    {"uppercase": {"field": "service", "ignore_missing": True, "if": "ctx.env == 'prod'"}},
+    {"set": {"field": "tier", "value": "gold", "if": "ctx.service != null"}},
+    {"set": {"field": "seen", "value": True}},
+    {"drop": {"if": "ctx.level == 'debug'"}},
+]}
+
+ON_FAILURE_PIPELINE = {"processors": [
+    {"convert": {"field": "status", "type": "integer", "tag": "status",
+                 "on_failure": [{"set": {"field": "status_error", "value": "{{_ingest.on_failure_message}}"}}]}},
+    {"gsub": {"field": "message", "pattern": "\\s+", "replacement": " ", "ignore_missing": True,
+              "on_failure": [{"set": {"field": "gsub_failed", "value": True}}]}},
+    {"lowercase": {"field": "level", "ignore_missing": True}},
+    {"drop": {"if": "ctx.level == 'debug'"}},
+    {"fail": {"message": "no service", "tag": "need-service", "if": "ctx.service == null"}},
+]}
+
+IGNORE_FAILURE_PIPELINE = {"processors": [
+    {"grok": {"field": "message", "patterns": ["%{WORD:verb} %{NOTSPACE:path}"], "ignore_failure": True}},
+    {"date": {"field": "ts", "formats": ["ISO8601"], "ignore_failure": True}},
+    {"kv": {"field": "labels", "field_split": ",", "value_split": "=", "target_field": "l",
+            "ignore_failure": True}},
+    {"lowercase": {"field": "env", "ignore_missing": True}},
+    {"lowercase": {"field": "env", "ignore_missing": True}},
+    {"drop": {"if": "ctx.level != null && ctx.level.toLowerCase() == 'debug'"}},
+    {"remove": {"field": "labels", "ignore_missing": True}},
+]}
+
+PIPELINES = {
+    "if": IF_PIPELINE,
+    "on_failure": ON_FAILURE_PIPELINE,
+    "pipeline_on_failure": {**ON_FAILURE_PIPELINE, "on_failure": [
+        {"set": {"field": "error", "value": "{{_ingest.on_failure_processor_tag}}"}},
+    ]},
+    "ignore_failure": IGNORE_FAILURE_PIPELINE,
+}
+
+
+def _outcomes(pipeline):
+    sim = compile_pipeline(pipeline)
+    return [_outcome(sim.run(source, timestamp="2025-01-01T00:00:00.000Z")) for source in SOURCES]
+
+
+# -----------------------------------------------------------------------------
+# Cost model
+# -----------------------------------------------------------------------------
+
+def test_expected_weight_discounts_after_gates():
+    costs = analyze_pipeline({"processors": [
+        {"set": {"field": "a", "value": 1}},
+        {"drop": {"if": "ctx.b == 1"}},
+        {"set": {"field": "c", "value": 1}},
+        {"drop": {}},
+        {"set": {"field": "d", "value": 1}},
+    ]}).costs
+    drop = 1 + ingestopt.CONDITION_WEIGHT
+    assert expected_weight(list(costs), range(5)) == 1 + drop + ingestopt.ASSUMED_STOP_RATE * (1 + 1)
+
+
+def test_order_without_gates_is_kept():
+    analysis = analyze_pipeline({"processors": [
+        {"grok": {"field": "message", "patterns": ["%{WORD:verb}"], "ignore_failure": True}},
+        {"set": {"field": "x", "value": 1}},
+    ]})
+    assert analysis.order == (0, 1)
+    assert analysis.predicted_gain == 0.0
+
+
+def test_small_predicted_gain_keeps_the_original_order(monkeypatch):
+    pipeline = {"processors": [
+        {"grok": {"field": "message", "patterns": ["%{WORD:verb}"], "ignore_failure": True}},
+        {"set": {"field": "x", "value": 1}},
+        {"drop": {"if": "ctx.verb == 'GET'"}},
+    ]}
+    assert analyze_pipeline(pipeline).order == (0, 1, 2)
+    monkeypatch.setattr(ingestopt, "MIN_REORDER_GAIN", 0.0)
+    analysis = analyze_pipeline(pipeline)
+    assert analysis.order == (0, 2, 1)
+    assert 0 < analysis.predicted_gain < 0.05
+
+
+def test_early_drop_is_worth_a_reorder():
+    analysis = analyze_pipeline(IF_PIPELINE)
+    assert analysis.order.index(4) < analysis.order.index(0)  # the drop runs before the gsub
+    assert analysis.predicted_gain >= ingestopt.MIN_REORDER_GAIN
+    assert analysis.report()["predicted_gain"] == round(analysis.predicted_gain, 3)
+
+
+# -----------------------------------------------------------------------------
+# Reordering never changes results
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("remove_dead", [False, True])
+@pytest.mark.parametrize("name", list(PIPELINES))
+def test_optimized_pipeline_ends_every_document_the_same(monkeypatch, name, remove_dead):
+    monkeypatch.setattr(ingestopt, "MIN_REORDER_GAIN", float("-inf"))  # apply whatever order is proposed
+    pipeline = PIPELINES[name]
+    optimized = optimize_pipeline(pipeline, remove_dead=remove_dead)
+    assert _outcomes(optimized) == _outcomes(pipeline)
+
+
+@pytest.mark.parametrize("name", ["if", "on_failure", "ignore_failure"])
+def test_proposed_orders_actually_move_processors(monkeypatch, name):
+    monkeypatch.setattr(ingestopt, "MIN_REORDER_GAIN", float("-inf"))
+    order = analyze_pipeline(PIPELINES[name]).order
+    assert list(order) != sorted(order)
+
+
+def test_pipeline_on_failure_pins_the_order(monkeypatch):
+    monkeypatch.setattr(ingestopt, "MIN_REORDER_GAIN", float("-inf"))
+    analysis = analyze_pipeline(PIPELINES["pipeline_on_failure"])
+    assert analysis.order == tuple(range(5))  # which processor fails first decides the handler's output
+
+
+def test_compare_throughput_reports_no_mismatches():
+    optimized = optimize_pipeline(IF_PIPELINE)
+    report = ingestopt.compare_throughput(IF_PIPELINE, optimized, SOURCES * 10, repeat=1)
+    assert report["docs"] == len(SOURCES) * 10
+    assert report["mismatches"] == 0
@@ -0,0 +1,227 @@
+"""
+Local ingest simulator: each processor's output on a small document, and the
+`ignore_missing`, `ignore_failure`, `on_failure` (with `_ingest` metadata and
+`tag`) and `if` paths every processor shares.
+"""
+import pytest
+
+from ingestsim import SUPPORTED_PROCESSORS, ProcessorFailure, compile_pipeline, simulate
+
+
+SOURCE = {
+    "message": "GET /a 200",
+    "name": "  Ada  ",
+    "level": "WARN",
+    "tags": ["a", "b"],
+    "count": "42",
+    "csv": 'x,"y, z",',
+    "kv": "k1=v1 k2=v2",
+    "json": '{"a": {"b": 1}}',
+    "ts": "2025-01-02T03:04:05Z",
+    "nested": {"x": 1},
+    "dotted": {"a.b": 1},
+}
+
+
+def _run(processors, source=SOURCE, **pipeline):
+    return compile_pipeline({"processors": processors, **pipeline}).run(source, timestamp="2025-01-01T00:00:00.000Z")
+
+
+def _changes(result):
+    """Fields `result` added or changed relative to SOURCE, plus removed ones as None."""
+    out = {k: v for k, v in result.source.items() if SOURCE.get(k) != v}
+    return {**out, **{k: None for k in SOURCE if k not in result.source}}
+
+
+# -----------------------------------------------------------------------------
+# One processor at a time
+# -----------------------------------------------------------------------------
+
+PROCESSOR_CASES = [
+    ({"set": {"field": "a.b", "value": "{{level}}-{{nested.x}}"}}, {"a": {"b": "WARN-1"}}),
+    ({"set": {"field": "level", "value": "x", "override": False}}, {}),
+    ({"set": {"field": "copy", "copy_from": "nested"}}, {"copy": {"x": 1}}),
+    ({"set": {"field": "e", "value": "", "ignore_empty_value": True}}, {}),
+    ({"rename": {"field": "level", "target_field": "log.level"}}, {"log": {"level": "WARN"}, "level": None}),
+    ({"remove": {"field": ["csv", "kv"]}}, {"csv": None, "kv": None}),
+    ({"convert": {"field": "count", "type": "integer"}}, {"count": 42}),
+    ({"convert": {"field": "count", "type": "auto", "target_field": "n"}}, {"n": 42}),
+    ({"convert": {"field": "tags", "type": "string"}}, {}),
+    ({"lowercase": {"field": "level"}}, {"level": "warn"}),
+    ({"uppercase": {"field": "tags"}}, {"tags": ["A", "B"]}),
+    ({"trim": {"field": "name", "target_field": "clean"}}, {"clean": "Ada"}),
+    ({"gsub": {"field": "message", "pattern": "(?<n>\\d+)", "replacement": "<${n}>"}}, {"message": "GET /a <200>"}),
+    ({"split": {"field": "message", "separator": "\\s+"}}, {"message": ["GET", "/a", "200"]}),
+    ({"join": {"field": "tags", "separator": "|"}}, {"tags": "a|b"}),
+    ({"kv": {"field": "kv", "field_split": " ", "value_split": "=", "target_field": "p"}},
+     {"p": {"k1": "v1", "k2": "v2"}}),
+    ({"kv": {"field": "kv", "field_split": " ", "value_split": "=", "include_keys": ["k2"], "prefix": "x_"}},
+     {"x_k2": "v2"}),
+    ({"csv": {"field": "csv", "target_fields": ["c1", "c2", "c3"]}}, {"c1": "x", "c2": "y, z"}),
+    ({"csv": {"field": "csv", "target_fields": ["c1", "c2", "c3"], "empty_value": "-"}},
+     {"c1": "x", "c2": "y, z", "c3": "-"}),
+    ({"json": {"field": "json", "target_field": "parsed"}}, {"parsed": {"a": {"b": 1}}}),
+    ({"json": {"field": "json", "add_to_root": True}}, {"a": {"b": 1}}),
+    ({"date": {"field": "ts", "formats": ["ISO8601"]}}, {"@timestamp": "2025-01-02T03:04:05.000Z"}),
+    # first format fails, the second parses; the value's own zone wins over `timezone`
+    ({"date": {"field": "ts", "formats": ["yyyy-MM-dd", "ISO8601"], "timezone": "Europe/Paris",
+               "target_field": "local", "output_format": "yyyy-MM-dd HH:mm"}}, {"local": "2025-01-02 03:04"}),
+    ({"dissect": {"field": "message", "pattern": "%{verb} %{path} %{status}"}},
+     {"verb": "GET", "path": "/a", "status": "200"}),
+    ({"grok": {"field": "message", "patterns": ["%{WORD:verb} %{NOTSPACE:path} %{INT:status:int}"]}},
+     {"verb": "GET", "path": "/a", "status": 200}),
+    ({"append": {"field": "tags", "value": ["b", "c"], "allow_duplicates": False}}, {"tags": ["a", "b", "c"]}),
+    ({"append": {"field": "level", "value": "{{name}}"}}, {"level": ["WARN", "  Ada  "]}),
+    ({"dot_expander": {"field": "a.b", "path": "dotted"}}, {"dotted": {"a": {"b": 1}}}),
+    ({"foreach": {"field": "tags", "processor": {"uppercase": {"field": "_ingest._value"}}}}, {"tags": ["A", "B"]}),
+]
+
+
+@pytest.mark.parametrize("processor, changes", PROCESSOR_CASES)
+def test_processor_output(processor, changes):
+    result = _run([processor])
+    assert result.error is None
+    assert _changes(result) == changes
+
+
+def test_every_supported_processor_is_covered():
+    covered = {next(iter(p)) for p, _ in PROCESSOR_CASES}
+    assert covered | {"drop", "fail", "pipeline"} == SUPPORTED_PROCESSORS
+
+
+def test_drop_and_fail():
+    assert _run([{"drop": {}}]).dropped
+    result = _run([{"fail": {"message": "bad {{level}}", "tag": "f1"}}])
+    assert result.source is None
+    assert (result.error.reason, result.error.processor_type, result.error.tag) == ("bad WARN", "fail", "f1")
+
+
+def test_pipeline_processor_runs_the_named_pipeline():
+    inner = {"processors": [{"set": {"field": "inner", "value": "{{_ingest.pipeline}}"}}]}
+    sim = compile_pipeline({"processors": [{"pipeline": {"name": "geo"}}]}, pipelines={"geo": inner})
+    assert sim.run({}).source == {"inner": "geo"}
+    cycle = compile_pipeline({"processors": [{"pipeline": {"name": "self"}}]}, name="self")
+    assert "Cycle detected" in cycle.run({}).error.reason
+
+
+# -----------------------------------------------------------------------------
+# ignore_missing / ignore_failure / on_failure / if
+# -----------------------------------------------------------------------------
+
+MISSING_FIELD = [
+    {"rename": {"field": "absent", "target_field": "x"}},
+    {"remove": {"field": "absent"}},
+    {"convert": {"field": "absent", "type": "integer"}},
+    {"lowercase": {"field": "absent"}},
+    {"gsub": {"field": "absent", "pattern": "a", "replacement": "b"}},
+    {"kv": {"field": "absent", "field_split": " ", "value_split": "="}},
+    {"csv": {"field": "absent", "target_fields": ["a"]}},
+    {"dissect": {"field": "absent", "pattern": "%{a}"}},
+    {"grok": {"field": "absent", "patterns": ["%{WORD:a}"]}},
+    {"foreach": {"field": "absent", "processor": {"trim": {"field": "_ingest._value"}}}},
+]
+
+
+@pytest.mark.parametrize("processor", MISSING_FIELD, ids=lambda p: next(iter(p)))
+def test_missing_field_fails_unless_ignore_missing(processor):
+    (kind, body), = processor.items()
+    failed = _run([processor])
+    assert failed.source is None and failed.error.processor_type == kind
+    assert "absent" in failed.error.reason
+    assert _run([{kind: {**body, "ignore_missing": True}}]).source == SOURCE
+
+
+FAILING = [
+    {"convert": {"field": "level", "type": "integer"}},
+    {"json": {"field": "message"}},
+    {"date": {"field": "message", "formats": ["ISO8601"]}},
+    {"dissect": {"field": "message", "pattern": "%{a}|%{b}"}},
+    {"grok": {"field": "message", "patterns": ["^%{INT:n}$"]}},
+    {"join": {"field": "level", "separator": ","}},
+    {"set": {"field": "message.x", "value": 1}},
+    {"fail": {"message": "no"}},
+]
+
+
+@pytest.mark.parametrize("processor", FAILING, ids=lambda p: next(iter(p)))
+def test_ignore_failure_keeps_the_document(processor):
+    (kind, body), = processor.items()
+    assert isinstance(_run([processor]).error, ProcessorFailure)
+    result = _run([{kind: {**body, "ignore_failure": True}}, {"set": {"field": "after", "value": 1}}])
+    assert result.error is None
+    assert result.source == {**SOURCE, "after": 1}
+
+
+@pytest.mark.parametrize("processor", FAILING, ids=lambda p: next(iter(p)))
+def test_on_failure_sees_message_type_and_tag(processor):
+    (kind, body), = processor.items()
+    handler = {"set": {"field": "err", "value": {
+        "message": "{{_ingest.on_failure_message}}",
+        "type": "{{_ingest.on_failure_processor_type}}",
+        "tag": "{{_ingest.on_failure_processor_tag}}",
+        "pipeline": "{{_ingest.on_failure_pipeline}}",
+    }}}
+    result = _run([{kind: {**body, "tag": "t-1", "on_failure": [handler]}}, {"set": {"field": "after", "value": 1}}])
+    expected = _run([processor]).error
+    assert result.error is None
+    assert result.source["err"] == {
+        "message": expected.reason, "type": kind, "tag": "t-1", "pipeline": "_simulate_pipeline",
+    }
+    assert result.source["after"] == 1
+
+
+def test_pipeline_on_failure_stops_the_remaining_processors():
+    result = _run(
+        [{"fail": {"message": "boom", "tag": "x"}}, {"set": {"field": "after", "value": 1}}],
+        on_failure=[{"set": {"field": "err", "value": "{{_ingest.on_failure_processor_tag}}: "
+                                                     "{{_ingest.on_failure_message}}"}}],
+    )
+    assert result.source == {**SOURCE, "err": "x: boom"}
+
+
+def test_failing_on_failure_handler_fails_the_document():
+    result = _run([{"fail": {"message": "first", "on_failure": [{"fail": {"message": "second", "tag": "h"}}]}}])
+    assert (result.error.reason, result.error.tag) == ("second", "h")
+
+
+@pytest.mark.parametrize("condition, ran", [
+    ("ctx.level == 'WARN'", True),
+    ("ctx.level == 'ERROR'", False),
+    ("ctx.missing?.deep == null", True),
+    ({"source": "ctx.nested.x > params.min", "params": {"min": 0}}, True),
+])
+def test_if_gates_the_processor(condition, ran):
+    result = _run([{"set": {"field": "ran", "value": True, "if": condition}}])
+    assert ("ran" in result.source) is ran
+
+
+def test_failing_if_counts_as_a_processor_failure():
+    result = _run([{"set": {"field": "ran", "value": True, "if": "ctx.missing.deep == 1", "ignore_failure": True}}])
+    assert result.source == SOURCE
+    assert _run([{"set": {"field": "ran", "value": True, "if": "ctx.missing.deep == 1"}}]).error is not None
+
+
+# -----------------------------------------------------------------------------
+# Compile-time errors and _simulate shape
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("processor", [
+    {"geoip": {"field": "ip"}},
+    {"set": {"field": "a", "value": 1, "if": "def x = 1; return x == 1"}},
+    {"kv": {"field": "kv", "value_split": "="}},
+    {"csv": {"field": "csv", "target_fields": ["a"], "separator": "::"}},
+])
+def test_unsupported_input_fails_at_compile_time(processor):
+    with pytest.raises(ValueError):
+        compile_pipeline({"processors": [processor]})
+
+
+def test_simulate_response_shape():
+    out = simulate(
+        {"processors": [{"drop": {"if": "ctx.drop == true"}}, {"fail": {"message": "x", "if": "ctx.fail == true"}}]},
+        [{"_index": "i", "_id": "1", "_source": {"a": 1}}, {"_source": {"drop": True}}, {"_source": {"fail": True}}],
+    )
+    kept, dropped, failed = out["docs"]
+    assert kept["doc"]["_index"] == "i" and kept["doc"]["_id"] == "1" and kept["doc"]["_source"] == {"a": 1}
+    assert dropped is None
+    assert failed["error"]["processor_type"] == "fail" and failed["error"]["reason"] == "x"
@@ -0,0 +1,155 @@
+"""
+KQL / Lucene search-box syntax: operator precedence, not/and/or, field
+groups, ranges, phrases and exists compile to the Query DSL a hand-written
+body would use; unsupported syntax and malformed input are rejected.
+"""
+import pytest
+
+from kql import (
+    And, KqlSyntaxError, KqlUnsupportedError, Not, Or, Term,
+    compile_cache_info, compile_kql, parse, search_box_request,
+)
+
+
+def _dsl(text, **options):
+    return compile_kql(text, **options).model_dump(by_alias=True, exclude_none=True)
+
+
+def _match(token, field="message"):
+    return {"match": {field: token}}
+
+
+def _should(*clauses):
+    return {"bool": {"should": list(clauses), "minimum_should_match": 1}}
+
+
+# -----------------------------------------------------------------------------
+# Parser
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("text, tree", [
+    ("a and b or c", Or((And((Term(None, "a"), Term(None, "b"))), Term(None, "c")))),
+    ("a or b and c", Or((Term(None, "a"), And((Term(None, "b"), Term(None, "c")))))),
+    ("not a and b", And((Not(Term(None, "a")), Term(None, "b")))),
+    ("not (a or b)", Not(Or((Term(None, "a"), Term(None, "b"))))),
+    ("A AND b Or c", Or((And((Term(None, "A"), Term(None, "b"))), Term(None, "c")))),
+    ("!a && b || c", Or((And((Not(Term(None, "a")), Term(None, "b"))), Term(None, "c")))),
+    ("a b", Or((Term(None, "a"), Term(None, "b")))),
+    ("f:(a or b and c)", Or((Term("f", "a"), And((Term("f", "b"), Term("f", "c")))))),
+])
+def test_precedence(text, tree):
+    assert parse(text) == tree
+
+
+def test_default_operator_joins_juxtaposed_terms():
+    assert parse("a b or c", default_operator="and") == Or((And((Term(None, "a"), Term(None, "b"))), Term(None, "c")))
+
+
+# -----------------------------------------------------------------------------
+# Compiler
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("text, dsl", [
+    # text fields: scoring `match`; ORed tokens on one field share a `match`
+    ("timeout", _match("timeout")),
+    ("message:(error or timeout)", _match("error timeout")),
+    ("timeout or message:reset", _match("timeout reset")),
+    ("a and b", {"bool": {"must": [_match("a"), _match("b")]}}),
+    # the analyzer may split foo-bar: ANDed matches must stay separate
+    ("message:foo-bar and message:baz", {"bool": {"must": [_match("foo-bar"), _match("baz")]}}),
+    ("message:(foo-bar and baz)", {"bool": {"must": [_match("foo-bar"), _match("baz")]}}),
+    ("a and b or c", _should({"bool": {"must": [_match("a"), _match("b")]}}, _match("c"))),
+    ("not a and b", {"bool": {"must": [_match("b")], "must_not": [_match("a")]}}),
+    ("not (a or b)", {"bool": {"must_not": [_match("a b")]}}),
+    # exact fields: non-scoring filters; ORed values share a `terms`
+    ("service:payments", {"bool": {"filter": [{"term": {"service": "payments"}}]}}),
+    ("service:(payments or billing)", {"bool": {"filter": [{"terms": {"service": ["billing", "payments"]}}]}}),
+    ("service:payments or service:billing", {"bool": {"filter": [{"terms": {"service": ["billing", "payments"]}}]}}),
+    ("service:payments and not log.level:debug",
+     {"bool": {"filter": [{"term": {"service": "payments"}}], "must_not": [{"term": {"log.level": "debug"}}]}}),
+    ("service:payments and timeout", {"bool": {"must": [_match("timeout")], "filter": [{"term": {"service": "payments"}}]}}),
+    # ranges
+    ("status >= 500 and status < 600", {"bool": {"filter": [{"range": {"status": {"gte": 500, "lt": 600}}}]}}),
+    ("status:>=500", {"bool": {"filter": [{"range": {"status": {"gte": 500}}}]}}),
+    ("status < -1", {"bool": {"filter": [{"range": {"status": {"lt": -1}}}]}}),
+    ("status:[400 TO 499}", {"bool": {"filter": [{"range": {"status": {"gte": 400, "lt": 499}}}]}}),
+    ("status:{* TO 10]", {"bool": {"filter": [{"range": {"status": {"lte": 10}}}]}}),
+    ("ts:[2025-01-01 TO now]", {"bool": {"filter": [{"range": {"ts": {"gte": "2025-01-01", "lte": "now"}}}]}}),
+    ("status:[* TO *]", {"bool": {"filter": [{"exists": {"field": "status"}}]}}),
+    # phrases, exists, match_all
+    ('"connection reset"', {"multi_match": {"query": "connection reset", "fields": ["message"], "type": "phrase"}}),
+    ('service:"a b"', {"bool": {"filter": [{"term": {"service": "a b"}}]}}),
+    ("_exists_:host", {"bool": {"filter": [{"exists": {"field": "host"}}]}}),
+    ("host:*", {"bool": {"filter": [{"exists": {"field": "host"}}]}}),
+    ("*", {"match_all": {}}),
+    ("", {"match_all": {}}),
+    # Lucene +/- clauses, boost and fuzziness
+    ("+env:prod -host:web-1 message:timeout^2",
+     {"bool": {"filter": [{"term": {"env": "prod"}}], "must_not": [{"term": {"host": "web-1"}}],
+               "should": [{"match": {"message": {"query": "timeout", "boost": 2.0}}}]}}),
+    ("timeout~1", {"match": {"message": {"query": "timeout", "fuzziness": 1}}}),
+    ('path:a\\:b', {"bool": {"filter": [{"term": {"path": "a:b"}}]}}),
+])
+def test_compiles_to(text, dsl):
+    assert _dsl(text) == dsl
+
+
+def test_fields_options():
+    assert _dsl("x:y", text_fields={"x"}) == _match("y", "x")
+    assert _dsl("foo", default_fields=("message", "title")) == {
+        "multi_match": {"query": "foo", "fields": ["message", "title"]},
+    }
+
+
+@pytest.mark.parametrize("text, error", [
+    ("mess*", KqlUnsupportedError),
+    ("message:fo?o", KqlUnsupportedError),
+    ("message:/ab+/", KqlUnsupportedError),
+    ("host:{name:a}", KqlUnsupportedError),
+    ("(a or b)^2", KqlUnsupportedError),
+    ("service:payments~", KqlUnsupportedError),
+    ("a and", KqlSyntaxError),
+    ("a)", KqlSyntaxError),
+    ("(a", KqlSyntaxError),
+    ('"open', KqlSyntaxError),
+    ("status:[1 TO", KqlSyntaxError),
+    ("status >=", KqlSyntaxError),
+    ("a^x", KqlSyntaxError),
+])
+def test_rejected(text, error):
+    with pytest.raises(error):
+        compile_kql(text)
+
+
+def test_syntax_errors_carry_the_position():
+    with pytest.raises(KqlSyntaxError) as info:
+        compile_kql("a and (b or")
+    assert info.value.pos == 11
+
+
+# -----------------------------------------------------------------------------
+# Cache / search box
+# -----------------------------------------------------------------------------
+
+def test_compiled_queries_are_cached_and_frozen():
+    text = "service:cache-test and status >= 500"
+    first = compile_kql(text)
+    hits = compile_cache_info().hits
+    assert compile_kql(f"  {text} ") is first
+    assert compile_cache_info().hits == hits + 1
+    assert compile_kql(text, default_fields=("title",)) is not first
+    with pytest.raises(ValueError):   # frozen
+        first.bool.filter = []
+
+
+def test_search_box_adds_the_window_without_touching_the_cache():
+    cached = compile_kql("service:payments")
+    request = search_box_request("service:payments", "now-1h", "now", size=5)
+    assert request.model_dump(by_alias=True, exclude_none=True) == {
+        "query": {"bool": {"filter": [{"term": {"service": "payments"}},
+                                      {"range": {"@timestamp": {"gte": "now-1h", "lte": "now"}}}]}},
+        "size": 5,
+    }
+    assert len(cached.bool.filter) == 1
+    dsl = search_box_request('{"term": {"env": "prod"}}').query.model_dump(by_alias=True, exclude_none=True)
+    assert dsl == {"term": {"env": "prod"}}
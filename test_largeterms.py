@@ -0,0 +1,200 @@
+"""
+Large `terms` clauses: which clauses are found, how chunked and lookup
+bodies are built, that chunked runs match the unchunked search over a
+`LogBatch`, and that lookup documents are only written through an explicit
+store.
+"""
+import pytest
+
+import largeterms
+import localexec
+from dsl_models import SearchRequestWithAggs
+from largeterms import chunk_bodies, find_large_terms, lookup_body, run_large_terms
+
+
+THRESHOLD = 8
+
+
+def _terms(field, n, start=0):
+    return {"terms": {field: [f"v{i:03d}" for i in range(start, start + n)]}}
+
+
+def _request(query, **extra):
+    return SearchRequestWithAggs.model_validate({"query": query, **extra})
+
+
+# -----------------------------------------------------------------------------
+# find_large_terms
+# -----------------------------------------------------------------------------
+
+def test_finds_clauses_in_document_order_with_paths():
+    query = {"bool": {
+        "must": [_terms("a", 9)],
+        "filter": [_terms("b", 3), {"bool": {"filter": [_terms("c", 10)]}}],
+        "should": [_terms("d", 12)],
+        "must_not": [_terms("e", 20)],
+    }}
+    found = find_large_terms(query, THRESHOLD)
+    assert [(t.field, len(t.values), t.path, t.conjunctive) for t in found] == [
+        ("a", 9, ("bool", "must", 0), True),
+        ("c", 10, ("bool", "filter", 1, "bool", "filter", 0), True),
+        ("d", 12, ("bool", "should", 0), False),
+        ("e", 20, ("bool", "must_not", 0), False),
+    ]
+
+
+def test_threshold_is_exclusive_and_models_are_accepted():
+    assert find_large_terms(_terms("a", THRESHOLD), THRESHOLD) == []
+    (top,) = find_large_terms(_request(_terms("a", THRESHOLD + 1)).query, THRESHOLD)
+    assert top.path == () and top.conjunctive
+
+
+# -----------------------------------------------------------------------------
+# chunk_bodies / lookup_body
+# -----------------------------------------------------------------------------
+
+def test_chunk_bodies_split_the_largest_conjunctive_clause():
+    request = _request(
+        {"bool": {"filter": [_terms("a", 9), _terms("b", 20)], "should": [_terms("c", 50)]}},
+        size=5, **{"from": 10}, aggs={"x": {"avg": {"field": "n"}}},
+    )
+    bodies = chunk_bodies(request, THRESHOLD, chunk_size=6, single_valued={"a", "b"})
+    assert len(bodies) == 4
+    pieces = [b["query"]["bool"]["filter"][1]["terms"]["b"] for b in bodies]
+    assert [v for piece in pieces for v in piece] == [f"v{i:03d}" for i in range(20)]
+    for body in bodies:
+        assert body["query"]["bool"]["filter"][0] == _terms("a", 9)
+        assert body["query"]["bool"]["should"] == [_terms("c", 50)]
+        assert body["size"] == 15 and "from" not in body
+        assert body["aggs"] == {"x": {"stats": {"field": "n"}}}  # merge-friendly partials
+
+
+def test_chunk_bodies_need_a_conjunctive_clause():
+    with pytest.raises(ValueError, match="must/filter"):
+        chunk_bodies(_request({"bool": {"should": [_terms("_id", 20)]}}), THRESHOLD)
+    with pytest.raises(ValueError, match="chunk_size"):
+        chunk_bodies(_request(_terms("_id", 20)), THRESHOLD, chunk_size=0)
+
+
+def test_chunk_bodies_skip_fields_that_may_hold_several_values():
+    with pytest.raises(ValueError, match="single-valued"):
+        chunk_bodies(_request({"bool": {"filter": [_terms("tags", 20)]}}), THRESHOLD)
+    (body,) = chunk_bodies(_request({"bool": {"filter": [_terms("tags", 20), _terms("_id", 9)]}}), THRESHOLD,
+                           chunk_size=10)
+    assert body["query"]["bool"]["filter"][0] == _terms("tags", 20)
+
+
+def test_lookup_body_rewrites_every_large_clause():
+    request = _request({"bool": {"filter": [_terms("a", 9)], "must_not": [_terms("b", 12)], "must": [_terms("c", 2)]}})
+    body, documents = lookup_body(request, THRESHOLD, lookup_index="lookups", path="vals")
+    lookups = [body["query"]["bool"]["filter"][0]["terms"]["a"], body["query"]["bool"]["must_not"][0]["terms"]["b"]]
+    assert [documents[lk["id"]] for lk in lookups] == [{"vals": _terms("a", 9)["terms"]["a"]},
+                                                       {"vals": _terms("b", 12)["terms"]["b"]}]
+    assert all(lk["index"] == "lookups" and lk["path"] == "vals" for lk in lookups)
+    assert body["query"]["bool"]["must"] == [_terms("c", 2)]
+    assert request.query.bool.filter[0].terms["a"] == _terms("a", 9)["terms"]["a"]
+
+
+# -----------------------------------------------------------------------------
+# run_large_terms
+# -----------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def batch():
+    return localexec.synthetic_batch(20_000, seed=4)
+
+
+@pytest.mark.parametrize("chunk_size", [50, 333, 5_000])
+def test_chunked_run_matches_unchunked(batch, chunk_size):
+    request = _request(
+        {"bool": {"must": [{"match": {"message": "timeout"}}],
+                  "filter": [{"terms": {"_id": [f"doc-{i}" for i in range(0, 20_000, 9)]}}]}},
+        size=7, aggs={"svc": {"terms": {"field": "service.name", "size": 3}}},
+    )
+    local = lambda body: localexec.search(body, batch)  # noqa: E731
+    whole = local(request)
+    chunked = run_large_terms(request, search=local, strategy="chunk", threshold=100, chunk_size=chunk_size)
+    assert [h["_id"] for h in chunked["hits"]["hits"]] == [h["_id"] for h in whole["hits"]["hits"]]
+    assert chunked["hits"]["total"] == whole["hits"]["total"]
+    assert chunked["aggregations"]["svc"]["buckets"] == whole["aggregations"]["svc"]["buckets"]
+
+
+def test_auto_never_chunks_a_multi_valued_field():
+    # one document tagged with values that would land in different chunks
+    docs = [{"_id": "d1", "tags": ["v000", "v015"]}, {"_id": "d2", "tags": ["v003"]}]
+    sent = []
+
+    def search(body):
+        sent.append(body)
+        (clause,) = body["query"]["bool"]["filter"]
+        wanted = set(clause["terms"]["tags"])
+        hits = [{"_index": "logs", "_id": d["_id"], "_score": 0.0} for d in docs if wanted & set(d["tags"])]
+        return {"hits": {"total": {"value": len(hits), "relation": "eq"}, "max_score": 0.0, "hits": hits}}
+
+    request = _request({"bool": {"filter": [_terms("tags", 20)]}})
+    response = run_large_terms(request, search=search, threshold=THRESHOLD, chunk_size=10)
+    assert len(sent) == 1
+    assert [h["_id"] for h in response["hits"]["hits"]] == ["d1", "d2"]
+    assert response["hits"]["total"]["value"] == 2
+    with pytest.raises(ValueError, match="single-valued"):
+        run_large_terms(request, search=search, strategy="chunk", threshold=THRESHOLD, chunk_size=10)
+
+
+def test_lists_within_max_terms_count_go_out_in_one_request(monkeypatch):
+    sent = []
+    monkeypatch.setattr(largeterms, "_gateway_search", lambda index: sent.append)
+    request = _request({"bool": {"filter": [{"terms": {"_id": [f"doc-{i}" for i in range(5_000)]}}]}})
+    run_large_terms(request, index="logs-*")
+    assert sent == [request.model_dump(by_alias=True, exclude_none=True)]
+
+
+class RecordingStore:
+    def __init__(self):
+        self.calls = []
+
+    def put(self, index, doc_id, document):
+        self.calls.append(("put", index, doc_id))
+
+    def delete(self, index, doc_id):
+        self.calls.append(("delete", index, doc_id))
+
+
+def test_lookup_documents_are_deleted_after_the_search():
+    store, seen = RecordingStore(), []
+    request = _request({"bool": {"should": [_terms("a", 20)]}})
+    run_large_terms(request, search=lambda body: seen.append(body) or {}, strategy="lookup", threshold=THRESHOLD,
+                    store=store)
+    (body,) = seen
+    doc_id = body["query"]["bool"]["should"][0]["terms"]["a"]["id"]
+    assert store.calls == [("put", largeterms.LOOKUP_INDEX, doc_id), ("delete", largeterms.LOOKUP_INDEX, doc_id)]
+
+
+def test_gateway_store_is_opt_in(monkeypatch):
+    sent = []
+    monkeypatch.setattr(largeterms, "_gateway_search", lambda index: sent.append)
+    monkeypatch.setattr(largeterms, "GatewayLookupStore", lambda: pytest.fail("gateway store used without opt-in"))
+    request = _request({"bool": {"should": [_terms("a", 20)]}})
+    run_large_terms(request, index="logs-*", threshold=THRESHOLD)
+    assert sent == [request.model_dump(by_alias=True, exclude_none=True)]
+    with pytest.raises(ValueError, match="GATEWAY_LOOKUP_STORE"):
+        run_large_terms(request, index="logs-*", strategy="lookup", threshold=THRESHOLD)
+
+
+def test_gateway_store_when_enabled(monkeypatch):
+    store = RecordingStore()
+    monkeypatch.setattr(largeterms, "GATEWAY_LOOKUP_STORE", True)
+    monkeypatch.setattr(largeterms, "GatewayLookupStore", lambda: store)
+    monkeypatch.setattr(largeterms, "_gateway_search", lambda index: lambda body: {})
+    run_large_terms(_request({"bool": {"should": [_terms("a", 20)]}}), index="logs-*", threshold=THRESHOLD)
+    assert [c[0] for c in store.calls] == ["put", "delete"]
+
+
+def test_gateway_store_paths_are_absolute(monkeypatch):
+    server = pytest.importorskip("server")
+    calls = []
+    monkeypatch.setattr(server, "_post", lambda path, body: calls.append(path))
+    monkeypatch.setattr(server, "_delete", lambda path: calls.append(path))
+    store = largeterms.GatewayLookupStore()
+    store.put("lookups", "d1", {"values": [1]})
+    store.delete("lookups", "d1")
+    assert calls == ["/lookups/_doc/d1?refresh=wait_for", "/lookups/_doc/d1"]
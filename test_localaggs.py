@@ -0,0 +1,109 @@
+"""
+`localaggs.aggregate` against counts computed directly from the documents,
+plus the up-front errors for `terms` options the engine cannot honour.
+"""
+from collections import Counter
+
+import pytest
+
+from dsl_models import SearchRequestWithAggs
+from localaggs import aggregate
+from localexec import ExecContext, LogBatch, compile_query
+from test_localexec import DOCS, NOW
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return LogBatch.from_documents(DOCS)
+
+
+def _aggs(batch, aggs, query=None):
+    request = SearchRequestWithAggs.model_validate({"query": query or {"match_all": {}}, "aggs": aggs})
+    ctx = ExecContext(NOW)
+    mask, _ = compile_query(request.query, ctx)(batch)
+    return aggregate(request.aggs, batch, mask, ctx)
+
+
+def _buckets(result):
+    return {b["key"]: b["doc_count"] for b in result["buckets"]}
+
+
+def test_terms_counts_and_order(batch):
+    result = _aggs(batch, {"levels": {"terms": {"field": "level"}}})["levels"]
+    assert _buckets(result) == Counter(d["level"] for d in DOCS)
+    assert [b["key"] for b in result["buckets"]] == ["error", "info", "warn"]  # count desc, then key asc
+    assert result["sum_other_doc_count"] == 0
+
+
+def test_terms_size_and_other_count(batch):
+    result = _aggs(batch, {"services": {"terms": {"field": "service.name", "size": 1, "order": {"_key": "asc"}}}})
+    assert result["services"]["buckets"] == [{"key": "auth", "doc_count": 2}]
+    assert result["services"]["sum_other_doc_count"] == 3
+
+
+@pytest.mark.parametrize("field, missing, key", [
+    ("ok", True, 1),
+    ("ok", "false", 0),
+    ("status", 0, 0),
+    ("status", "503", 503),
+    ("absent", "none", "none"),
+])
+def test_terms_missing_bucket(batch, field, missing, key):
+    result = _aggs(batch, {"t": {"terms": {"field": field, "missing": missing}}})["t"]
+    expected = Counter(d.get(field) for d in DOCS if d.get(field) is not None)
+    assert _buckets(result)[key] == expected.get(key, 0) + sum(1 for d in DOCS if field not in d)
+
+
+@pytest.mark.parametrize("field, missing", [("status", "N/A"), ("ok", "maybe"), ("@timestamp", "never")])
+def test_terms_missing_must_fit_the_field(batch, field, missing):
+    with pytest.raises(ValueError, match=rf"terms.missing \[{missing}\] is not a valid value"):
+        _aggs(batch, {"t": {"terms": {"field": field, "missing": missing}}})
+
+
+def test_terms_order_by_sub_aggregation(batch):
+    result = _aggs(batch, {"services": {
+        "terms": {"field": "service.name", "order": {"worst.max": "desc"}},
+        "aggs": {"worst": {"stats": {"field": "status"}}},
+    }})
+    assert [b["key"] for b in result["services"]["buckets"]] == ["auth", "payments", "search"]
+
+
+@pytest.mark.parametrize("aggs", [
+    {"t": {"terms": {"field": "level", "order": {"worst": "desc"}}}},
+    {"t": {"terms": {"field": "level", "order": {"worst": "desc"}}, "aggs": {"best": {"min": {"field": "status"}}}}},
+])
+def test_terms_order_needs_a_sub_aggregation(batch, aggs):
+    with pytest.raises(ValueError, match=r"terms.order path \[worst\]"):
+        _aggs(batch, aggs)
+
+
+def test_date_histogram_counts(batch):
+    result = _aggs(batch, {"per_6h": {"date_histogram": {"field": "@timestamp", "fixed_interval": "6h"}}})
+    assert [(b["key_as_string"], b["doc_count"]) for b in result["per_6h"]["buckets"]] == [
+        ("2025-01-01T00:00:00.000Z", 1),
+        ("2025-01-01T06:00:00.000Z", 1),
+        ("2025-01-01T12:00:00.000Z", 1),
+        ("2025-01-01T18:00:00.000Z", 2),
+    ]
+
+
+def test_range_filters_and_metrics(batch):
+    result = _aggs(batch, {
+        "status": {"range": {"field": "status", "ranges": [{"to": 400}, {"from": 400}]}},
+        "levels": {"filters": {"filters": {"errors": {"term": {"level": "error"}}, "all": {"match_all": {}}}}},
+        "latency": {"stats": {"field": "status"}},
+    }, query={"exists": {"field": "status"}})
+    assert [b["doc_count"] for b in result["status"]["buckets"]] == [2, 2]
+    assert {k: b["doc_count"] for k, b in result["levels"]["buckets"].items()} == {"errors": 1, "all": 4}
+    statuses = [d["status"] for d in DOCS if "status" in d]
+    assert result["latency"]["count"] == len(statuses)
+    assert result["latency"]["min"] == min(statuses) and result["latency"]["max"] == max(statuses)
+    assert result["latency"]["avg"] == pytest.approx(sum(statuses) / len(statuses))
+
+
+def test_mask_restricts_rows(batch):
+    request = SearchRequestWithAggs.model_validate({"query": {"match_all": {}},
+                                                    "aggs": {"levels": {"terms": {"field": "level"}}}})
+    mask = batch.column("service.name").docs_for_vocab(batch.column("service.name").vocab == "payments")
+    result = aggregate(request.aggs, batch, mask, ExecContext(NOW))
+    assert _buckets(result["levels"]) == {"warn": 1, "info": 1}
@@ -0,0 +1,102 @@
+"""
+`localexec.search` over a small `LogBatch`: each query clause selects the
+documents a plain Python filter over the same `_source` dicts selects, and
+hits come back ES-shaped with size/from applied.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from localexec import LogBatch, search, synthetic_batch, top_hits
+
+
+NOW = datetime(2025, 1, 2, tzinfo=timezone.utc)
+DOCS = [
+    {"@timestamp": "2025-01-01T00:00:00Z", "service": {"name": "auth"}, "level": "error",
+     "message": "connection timeout after 30 ms", "status": 500, "ok": False},
+    {"@timestamp": "2025-01-01T06:00:00Z", "service": {"name": "auth"}, "level": "info",
+     "message": "login succeeded", "status": 200, "ok": True},
+    {"@timestamp": "2025-01-01T12:00:00Z", "service": {"name": "payments"}, "level": "warn",
+     "message": "payment declined timeout", "status": 402, "ok": False},
+    {"@timestamp": "2025-01-01T18:00:00Z", "service": {"name": "payments"}, "level": "info",
+     "message": "request completed in 12 ms", "status": 200, "ok": True},
+    {"@timestamp": "2025-01-01T23:00:00Z", "service": {"name": "search"}, "level": "error",
+     "message": "upstream error status 503"},
+]
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return LogBatch.from_documents(DOCS)
+
+
+def _ids(response):
+    return sorted(int(h["_id"]) for h in response["hits"]["hits"])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"match_all": {}}, [0, 1, 2, 3, 4]),
+    ({"term": {"service.name": "payments"}}, [2, 3]),
+    ({"terms": {"level": ["error", "warn"]}}, [0, 2, 4]),
+    ({"match": {"message": "timeout"}}, [0, 2]),
+    ({"match": {"message": {"query": "payment timeout", "operator": "and"}}}, [2]),
+    ({"range": {"status": {"gte": 400, "lt": 503}}}, [0, 2]),
+    ({"range": {"@timestamp": {"gte": "2025-01-01T06:00:00Z", "lt": "now-6h"}}}, [1, 2]),
+    ({"range": {"@timestamp": {"gt": "2024-12-31", "lte": "2025-01-01"}}}, [0, 1, 2, 3, 4]),
+    ({"exists": {"field": "ok"}}, [0, 1, 2, 3]),
+    ({"ids": {"values": ["1", "4"]}}, [1, 4]),
+    ({"term": {"ok": True}}, [1, 3]),
+    ({"bool": {"filter": [{"term": {"level": "error"}}], "must_not": [{"term": {"service.name": "search"}}]}}, [0]),
+    ({"bool": {"should": [{"term": {"level": "warn"}}, {"term": {"status": 500}}]}}, [0, 2]),
+    ({"bool": {"must": [{"match_all": {}}], "should": [{"term": {"level": "warn"}}, {"term": {"status": 500}}],
+               "minimum_should_match": 1}}, [0, 2]),
+])
+def test_clause_selects_expected_docs(batch, query, expected):
+    response = search({"query": query, "size": 10}, batch, now=NOW)
+    assert _ids(response) == expected
+    assert response["hits"]["total"] == {"value": len(expected), "relation": "eq"}
+
+
+@pytest.mark.parametrize("field, bounds, message", [
+    ("@timestamp", {"gte": "01/02/2025"}, "Cannot parse date"),
+    ("@timestamp", {"gte": "2025-01-01", "time_zone": "Mars/Olympus"}, "time zone"),
+    ("@timestamp", {"gte": "2025", "format": "yyyy QQ"}, "Unsupported date format token"),
+    ("status", {"gte": "five hundred"}, "as a number"),
+])
+def test_unparseable_range_bound_raises(batch, field, bounds, message):
+    # an error, as Elasticsearch returns, rather than a window that silently matches nothing
+    with pytest.raises(ValueError, match=message):
+        search({"query": {"range": {field: bounds}}}, batch, now=NOW)
+
+
+def test_hits_shape_and_source(batch):
+    response = search({"query": {"term": {"level": "info"}}, "size": 1}, batch, now=NOW)
+    (hit,) = response["hits"]["hits"]
+    assert set(hit) == {"_index", "_id", "_score", "_source"}
+    assert hit["_source"]["service"] == {"name": "auth"}
+    assert hit["_source"]["@timestamp"] == "2025-01-01T06:00:00.000Z"
+    assert response["hits"]["total"]["value"] == 2
+
+
+def test_size_and_from_page_through_hits(batch):
+    pages = [search({"query": {"match_all": {}}, "size": 2, "from": offset}, batch, now=NOW)
+             for offset in (0, 2, 4)]
+    seen = [h["_id"] for page in pages for h in page["hits"]["hits"]]
+    assert sorted(seen) == ["0", "1", "2", "3", "4"]
+
+
+def test_top_hits_orders_by_score_then_row():
+    score = np.array([1.0, 3.0, 3.0, 2.0, 3.0], dtype=np.float32)
+    mask = np.ones(5, dtype=bool)
+    assert top_hits(mask, score, 0, 3).tolist() == [1, 2, 4]
+    assert top_hits(mask, score, 3, 5).tolist() == [3, 0]
+    assert top_hits(mask, score, 0, 0).tolist() == []
+
+
+def test_synthetic_batch_term_counts_match_columns():
+    batch = synthetic_batch(5_000, seed=3)
+    level = batch.column("log.level")
+    expected = int((level.values == list(level.vocab).index("error")).sum())
+    response = search({"query": {"term": {"log.level": "error"}}, "size": 0}, batch)
+    assert response["hits"]["total"]["value"] == expected
@@ -0,0 +1,87 @@
+"""
+Painless condition subset: expressions evaluate as Painless would over `ctx`
+and `params`, runtime errors raise ValueError, and anything outside the
+subset is rejected at compile time.
+"""
+import pytest
+
+from painless import PainlessSyntaxError, PainlessUnsupportedError, compile_condition, compile_expression
+
+
+CTX = {
+    "log": {"level": "error"},
+    "message": "GET /health ok",
+    "tags": ["audit", "x"],
+    "event": {"duration": 812},
+    "service.name": "payments",
+    "n": 7,
+    "empty": "",
+}
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("ctx.log?.level == 'error'", True),
+    ("ctx.missing?.level == null", True),
+    ("ctx['service.name'].startsWith('pay')", True),
+    ("ctx.tags.contains('audit') && ctx.tags.size() == 2", True),
+    ("ctx.tags[1] == 'x'", True),
+    ("!ctx.containsKey('env')", True),
+    ("ctx.event?.duration instanceof Number && ctx.event.duration > params.slow_ms", True),
+    ("ctx.message.toUpperCase().contains('HEALTH')", True),
+    ("ctx.message.substring(0, 3) == 'GET'", True),
+    ("ctx.message.indexOf('/') == 4", True),
+    ("ctx.empty.isEmpty()", True),
+    ("ctx.n % 2 == 1 && ctx.n / 2 == 3", True),     # integer division
+    ("ctx.n * 1.5 > 10", True),
+    ("-ctx.n < 0", True),
+    ("(ctx.n > 5 ? 'big' : 'small') == 'big'", True),
+    ("(ctx.absent ?: 'dflt') == 'dflt'", True),
+    ("ctx.log.getOrDefault('x', 'y') == 'y'", True),
+    ("ctx.log.keySet().contains('level')", True),
+    ("[1, 2].contains(ctx.n)", False),
+    ("ctx.n === 7", True),
+    ("ctx.n != 7 || ctx.message == null", False),
+    ("return ctx.n == 7;", True),
+    ("'a' + ctx.n == 'a7'", True),
+])
+def test_condition_value(source, expected):
+    assert compile_condition(source, {"slow_ms": 500})(CTX) is expected
+
+
+def test_params_can_be_rebound_per_call():
+    cond = compile_condition("ctx.n > params.min", {"min": 1})
+    assert cond(CTX) is True
+    assert cond(CTX, {"min": 10}) is False
+
+
+def test_expressions_are_cached_per_source():
+    assert compile_expression("ctx.n == 1") is compile_expression("ctx.n == 1")
+
+
+@pytest.mark.parametrize("source", [
+    "ctx.missing.deep == 1",             # null dereference
+    "ctx.missing > 1",                   # null comparison
+    "ctx.n / 0 == 1",                    # division by zero
+    "ctx.tags[5] == 'x'",                # index out of bounds
+    "ctx.message",                       # not a boolean
+    "ctx.message < 'z'",                 # strings need compareTo
+])
+def test_runtime_errors_raise_value_error(source):
+    cond = compile_condition(source)
+    with pytest.raises(ValueError):
+        cond(CTX)
+
+
+@pytest.mark.parametrize("source, error", [
+    ("", PainlessSyntaxError),
+    ("ctx.n ==", PainlessSyntaxError),
+    ("ctx.n == (1", PainlessSyntaxError),
+    ("def x = 1; return x == 1", PainlessUnsupportedError),
+    ("for (int i = 0; i < 2; i++) {}", PainlessUnsupportedError),
+    ("ctx.message =~ /GET/", PainlessUnsupportedError),
+    ("ctx.message.frobnicate()", PainlessUnsupportedError),
+    ("ctx.tags.stream().anyMatch(t -> t == 'x')", PainlessUnsupportedError),
+])
+def test_outside_the_subset_fails_at_compile_time(source, error):
+    with pytest.raises(error):
+        compile_condition(source)
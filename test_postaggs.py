@@ -0,0 +1,268 @@
+"""
+Client-side pipelines: buckets_path lookups, each step's series math (gaps
+included), pipelines applied across nested histograms, and the request
+checks that reject pipelines which cannot apply.
+"""
+import math
+
+import numpy as np
+import pytest
+
+import localexec
+from dsl_models import ClientPipeline, SearchRequestWithAggs
+from postaggs import (
+    apply_pipelines, check_pipelines, cumulative_sum, derivative, lookup, moving_avg, rate_of_change, ratio, series,
+)
+
+
+BUCKET = {
+    "key": 1_735_689_600_000,
+    "doc_count": 40,
+    "lat": {"value": 12.5},
+    "dur": {"count": 40, "min": 1.0, "max": 90.0, "avg": 20.0, "sum": 800.0},
+    "p": {"values": {"50.0": 11.0, "99.0": 80.0}},
+    "p_list": {"values": [{"key": 50.0, "value": 11.0}, {"key": 99.0, "value": 80.0}]},
+    "level": {"buckets": {"error": {"doc_count": 4, "lat": {"value": 30.0}}, "warn": {"doc_count": 6}}},
+    "svc": {"buckets": [{"key": "api", "doc_count": 25, "lat": {"value": 5.0}}, {"key": 7, "doc_count": 15}]},
+    "one": {"doc_count": 9, "lat": {"value": 3.0}},
+    "gap": {"value": None},
+}
+
+
+def _pipeline(steps, histogram="per_hour"):
+    return ClientPipeline.model_validate({"histogram": histogram, "steps": steps})
+
+
+def _nan_list(x):
+    return [None if math.isnan(v) else v for v in np.asarray(x, dtype=np.float64).tolist()]
+
+
+# -----------------------------------------------------------------------------
+# buckets_path
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("path, value", [
+    ("_count", 40),
+    ("_key", 1_735_689_600_000),
+    ("lat", 12.5),
+    ("lat.value", 12.5),
+    ("dur.avg", 20.0),
+    ("dur.max", 90.0),
+    ("p[99.0]", 80.0),
+    ("p[99]", 80.0),
+    ("p['50.0']", 11.0),
+    ("p_list[99.0]", 80.0),
+    ("p_list[99]", 80.0),
+    ("level['error']>_count", 4),
+    ("level[error]>lat", 30.0),
+    ('level["warn"]>_count', 6),
+    ("level['error']", 4),
+    ("svc['api']>lat.value", 5.0),
+    ("svc[7]>_count", 15),
+    ("one>_count", 9),
+    ("one>lat", 3.0),
+    ("one", 9),
+    # missing pieces are gaps, not errors
+    ("gap", None),
+    ("nope", None),
+    ("p[95.0]", None),
+    ("level['fatal']>_count", None),
+    ("nope>_count", None),
+    ("dur.nope", None),
+])
+def test_lookup(path, value):
+    assert lookup(BUCKET, path) == value
+
+
+@pytest.mark.parametrize("path", ["lat>", "lat[x", "a.b.c", "x[1]]"])
+def test_lookup_rejects_malformed_paths(path):
+    with pytest.raises(ValueError, match="Invalid buckets_path"):
+        lookup(BUCKET, path)
+
+
+def test_series_turns_missing_values_into_nan():
+    buckets = [{"doc_count": 1, "lat": {"value": 2.0}}, {"doc_count": 0, "lat": {"value": None}}, {"doc_count": 3}]
+    assert _nan_list(series(buckets, "lat")) == [2.0, None, None]
+    assert series(buckets, "_count").tolist() == [1.0, 0.0, 3.0]
+    assert series([], "_count").tolist() == []
+
+
+# -----------------------------------------------------------------------------
+# Steps
+# -----------------------------------------------------------------------------
+
+X = np.array([1.0, 3.0, np.nan, 6.0, 10.0])
+
+
+@pytest.mark.parametrize("fn, expected", [
+    (derivative, [None, 2.0, None, None, 4.0]),
+    (cumulative_sum, [1.0, 4.0, 4.0, 10.0, 20.0]),
+    (lambda x: rate_of_change(x, 100), [None, 200.0, None, None, pytest.approx(66.666667)]),
+    (lambda x: moving_avg(x, 2), [None, 1.0, 2.0, 3.0, 6.0]),
+    (lambda x: moving_avg(x, 2, shift=1), [1.0, 2.0, 3.0, 6.0, 8.0]),
+    (lambda x: moving_avg(x, 3, shift=1), [1.0, 2.0, 2.0, 4.5, 8.0]),
+    (lambda x: moving_avg(x, 2, "ewma", alpha=0.5), [None, 1.0, 2.0, 3.0, 6.0]),
+    (lambda x: moving_avg(x, 3, "ewma", alpha=0.5, shift=1), [1.0, 2.0, 2.0, 4.5, 8.0]),
+    (lambda x: moving_avg(x, 3, "ewma", alpha=0.5), [None, 1.0, 2.0, 2.0, 4.5]),
+])
+def test_step_series(fn, expected):
+    assert _nan_list(fn(X)) == expected
+
+
+def test_ewma_weighs_the_newest_bucket_by_alpha():
+    x = np.array([2.0, 4.0, 8.0, 0.0])
+    assert moving_avg(x, 3, "ewma", alpha=0.25, shift=1).tolist() == [2.0, 2.5, 3.875, 3.75]
+
+
+def test_ratio_and_steps_on_empty_series():
+    assert _nan_list(ratio(np.array([1.0, 2.0, 0.0]), np.array([4.0, 0.0, 0.0]), 100)) == [25.0, None, None]
+    empty = np.array([])
+    for fn in (derivative, cumulative_sum, rate_of_change, lambda x: moving_avg(x, 3)):
+        assert fn(empty).tolist() == []
+
+
+# -----------------------------------------------------------------------------
+# apply_pipelines
+# -----------------------------------------------------------------------------
+
+def _hour(i, count, errors):
+    return {"key": i * 3_600_000, "doc_count": count, "level": {"buckets": {"error": {"doc_count": errors}}}}
+
+
+def _response():
+    return {
+        "per_hour": {"buckets": [_hour(0, 10, 1), _hour(1, 20, 5), _hour(2, 0, 0), _hour(3, 40, 4)]},
+        "svc": {"buckets": [
+            {"key": "api", "doc_count": 3, "per_hour": {"buckets": [_hour(0, 1, 0), _hour(1, 2, 1)]}},
+            {"key": "db", "doc_count": 5, "per_hour": {"buckets": [_hour(0, 5, 5)]}},
+        ]},
+        "by_env": {"buckets": {"prod": {"doc_count": 4, "per_hour": {"buckets": [_hour(0, 4, 2), _hour(1, 0, 0)]}}}},
+        "sample": {"doc_count": 2, "per_hour": {"buckets": [_hour(0, 2, 1), _hour(1, 6, 0)]}},
+    }
+
+
+def _column(buckets, name, key="value"):
+    return [b[name][key] for b in buckets]
+
+
+def test_apply_pipelines_steps_read_earlier_steps():
+    aggregations = _response()
+    result = apply_pipelines(aggregations, [_pipeline({
+        "error_pct": {"bucket_ratio": {"numerator": "level['error']>_count", "denominator": "_count", "scale": 100}},
+        "trend": {"moving_avg": {"buckets_path": "error_pct", "window": 2, "shift": 1}},
+        "change": {"rate_of_change": {"buckets_path": "_count", "scale": 100}},
+        "per_s": {"derivative": {"buckets_path": "_count", "unit": "1s"}},
+        "per_s_zeros": {"derivative": {"buckets_path": "error_pct", "gap_policy": "insert_zeros"}},
+        "total": {"cumulative_sum": {"buckets_path": "_count"}},
+    })])
+    assert result is aggregations
+    buckets = aggregations["per_hour"]["buckets"]
+    assert _column(buckets, "error_pct") == [10.0, 25.0, None, 10.0]
+    assert _column(buckets, "trend") == [10.0, 17.5, 25.0, 10.0]
+    assert _column(buckets, "change") == [None, 100.0, -100.0, None]
+    assert _column(buckets, "per_s") == [None, 10.0, -20.0, 40.0]
+    assert _column(buckets, "per_s", "normalized_value") == [None, 10 / 3600, -20 / 3600, 40 / 3600]
+    assert _column(buckets, "per_s_zeros") == [None, 15.0, -25.0, 10.0]
+    assert _column(buckets, "total") == [10.0, 30.0, 30.0, 70.0]
+
+
+@pytest.mark.parametrize("histogram, expected", [
+    ("svc>per_hour", [[1.0, 3.0], [5.0]]),             # once per parent bucket
+    ("svc['db']>per_hour", [[5.0]]),
+    ("by_env['prod']>per_hour", [[4.0, 4.0]]),          # keyed buckets
+    ("by_env>per_hour", [[4.0, 4.0]]),
+    ("sample>per_hour", [[2.0, 8.0]]),                  # single-bucket parent
+])
+def test_apply_pipelines_on_nested_histograms(histogram, expected):
+    aggregations = _response()
+    apply_pipelines(aggregations, [_pipeline({"total": {"cumulative_sum": {"buckets_path": "_count"}}}, histogram)])
+    parents = {
+        "svc": aggregations["svc"]["buckets"], "by_env": list(aggregations["by_env"]["buckets"].values()),
+        "sample": [aggregations["sample"]],
+    }[histogram.split(">")[0].split("[")[0]]
+    touched = [_column(p["per_hour"]["buckets"], "total") for p in parents if "total" in p["per_hour"]["buckets"][0]]
+    assert touched == expected
+    assert "total" not in aggregations["per_hour"]["buckets"][0]
+
+
+def test_apply_pipelines_skips_missing_histograms():
+    aggregations = _response()
+    apply_pipelines(aggregations, [_pipeline({"total": {"cumulative_sum": {"buckets_path": "_count"}}}, "nope>per_hour")])
+    assert aggregations == _response()
+
+
+def test_apply_pipelines_on_a_local_search():
+    batch = localexec.synthetic_batch(20_000, seed=6)
+    request = SearchRequestWithAggs.model_validate({
+        "query": {"range": {"@timestamp": {"gte": "2025-01-01", "lt": "2025-01-03"}}},
+        "size": 0,
+        "aggs": {"svc": {"terms": {"field": "service.name", "size": 2}, "aggs": {"per_hour": {
+            "date_histogram": {"field": "@timestamp", "fixed_interval": "1h"},
+            "aggs": {"lat": {"percentiles": {"field": "event.duration", "percents": [99]}}},
+        }}}},
+    })
+    pipelines = [_pipeline({
+        "total": {"cumulative_sum": {"buckets_path": "_count"}},
+        "p99_avg": {"moving_avg": {"buckets_path": "lat[99.0]", "window": 3}},
+    }, "svc>per_hour")]
+    check_pipelines(request.aggs, pipelines)
+    response = localexec.search(request, batch)
+    apply_pipelines(response["aggregations"], pipelines)
+    for parent in response["aggregations"]["svc"]["buckets"]:
+        buckets = parent["per_hour"]["buckets"]
+        assert _column(buckets, "total")[-1] == parent["doc_count"]
+        assert buckets[0]["p99_avg"]["value"] is None
+        assert buckets[1]["p99_avg"]["value"] == buckets[0]["lat"]["values"]["99.0"]
+
+
+# -----------------------------------------------------------------------------
+# check_pipelines
+# -----------------------------------------------------------------------------
+
+AGGS = SearchRequestWithAggs.model_validate({"query": {"match_all": {}}, "size": 0, "aggs": {
+    "per_hour": {"date_histogram": {"field": "@timestamp", "fixed_interval": "1h"},
+                 "aggs": {"lat": {"avg": {"field": "event.duration"}},
+                          "level": {"filters": {"filters": {"error": {"term": {"log.level": "error"}}}}}}},
+    "svc": {"terms": {"field": "service.name"},
+            "aggs": {"codes": {"histogram": {"field": "http.response.status_code", "interval": 100}}}},
+}}).aggs
+
+
+@pytest.mark.parametrize("histogram, steps", [
+    ("per_hour", {"a": {"derivative": {"buckets_path": "_count"}}}),
+    ("per_hour", {"a": {"derivative": {"buckets_path": "_key"}}}),
+    ("per_hour", {"a": {"moving_avg": {"buckets_path": "lat", "window": 3}},
+                  "b": {"rate_of_change": {"buckets_path": "a"}}}),
+    ("per_hour", {"a": {"bucket_ratio": {"numerator": "level['error']>_count", "denominator": "_count"}}}),
+    ("svc>codes", {"a": {"cumulative_sum": {"buckets_path": "_count"}}}),
+    ("svc['api']>codes", {"a": {"cumulative_sum": {"buckets_path": "_count"}}}),
+])
+def test_check_pipelines_accepts(histogram, steps):
+    check_pipelines(AGGS, [_pipeline(steps, histogram)])
+
+
+@pytest.mark.parametrize("histogram, steps, message", [
+    ("nope", {"a": {"derivative": {"buckets_path": "_count"}}}, "no aggregation 'nope'"),
+    ("svc>nope", {"a": {"derivative": {"buckets_path": "_count"}}}, "no aggregation 'nope'"),
+    ("svc", {"a": {"derivative": {"buckets_path": "_count"}}}, "must end at a"),
+    ("per_hour>lat", {"a": {"derivative": {"buckets_path": "_count"}}}, "must end at a"),
+    ("per_hour", {"a": {"derivative": {"buckets_path": "dur"}}}, "Step 'a'"),
+    ("per_hour", {"a": {"bucket_ratio": {"numerator": "_count", "denominator": "errors>_count"}}}, "Step 'a'"),
+    # steps only see earlier steps
+    ("per_hour", {"a": {"derivative": {"buckets_path": "b"}}, "b": {"derivative": {"buckets_path": "_count"}}}, "Step 'a'"),
+])
+def test_check_pipelines_rejects(histogram, steps, message):
+    with pytest.raises(ValueError, match=message):
+        check_pipelines(AGGS, [_pipeline(steps, histogram)])
+
+
+def test_check_pipelines_without_aggs():
+    with pytest.raises(ValueError, match="no aggregation"):
+        check_pipelines(None, [_pipeline({"a": {"derivative": {"buckets_path": "_count"}}})])
+
+
+def test_steps_define_exactly_one_kind():
+    with pytest.raises(ValueError, match="exactly one kind"):
+        _pipeline({"a": {"derivative": {"buckets_path": "_count"}, "cumulative_sum": {"buckets_path": "_count"}}})
+    with pytest.raises(ValueError, match="exactly one kind"):
+        _pipeline({"a": {}})
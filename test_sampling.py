@@ -0,0 +1,196 @@
+"""
+Sampled aggregations: the probability snaps to 1-2-5 steps, count intervals
+cover the true count at their confidence, and scaled responses match the
+exact ones within those intervals.
+"""
+import math
+
+import numpy as np
+import pytest
+
+import localexec
+from dsl_models import SearchRequestWithAggs
+from sampling import (
+    PROBABILITY_STEPS,
+    SAMPLE_WRAPPER,
+    choose_probability,
+    count_interval,
+    resolve_sampling,
+    run_sampled,
+    scale_sampled,
+)
+
+
+WEEK = {"range": {"@timestamp": {"gte": "2025-01-01T00:00:00Z", "lt": "2025-01-08T00:00:00Z"}}}
+AGGS = {
+    "levels": {"terms": {"field": "log.level"}},
+    "duration": {"stats": {"field": "event.duration"}},
+    "total": {"sum": {"field": "event.duration"}},
+}
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return localexec.synthetic_batch(200_000, seed=13)
+
+
+def _request(aggs=AGGS):
+    return SearchRequestWithAggs.model_validate({"query": {"bool": {"filter": [WEEK]}}, "size": 0, "aggs": aggs})
+
+
+# -----------------------------------------------------------------------------
+# choose_probability
+# -----------------------------------------------------------------------------
+
+def test_probability_steps_are_1_2_5():
+    assert PROBABILITY_STEPS[:3] == (1e-6, 2e-6, 5e-6)
+    assert PROBABILITY_STEPS[-3:] == (0.1, 0.2, 0.5)
+    assert list(PROBABILITY_STEPS) == sorted(PROBABILITY_STEPS)
+
+
+@pytest.mark.parametrize("expected, target, probability", [
+    (None, 100_000, 1.0),
+    (150_000, 100_000, 1.0),          # sampling at 0.5 would still exceed the target
+    (200_000, 100_000, 1.0),
+    (200_001, 100_000, 0.5),
+    (1_000_000, 100_000, 0.1),
+    (1_100_000, 100_000, 0.1),        # 0.0909 snaps up to the next step
+    (3_000_000, 100_000, 0.05),
+    (42_000_000, 100_000, 0.005),
+    (10**13, 100_000, 1e-6),          # floor at MIN_SAMPLING_PROBABILITY
+])
+def test_choose_probability_snaps_up_to_a_step(expected, target, probability):
+    assert choose_probability(expected, target) == probability
+
+
+@pytest.mark.parametrize("expected", [3e5, 7.7e6, 1.3e8, 9.1e9])
+def test_choose_probability_keeps_the_target(expected):
+    p = choose_probability(expected, 100_000)
+    assert p in PROBABILITY_STEPS
+    assert expected * p >= 100_000
+    assert expected * p < 100_000 * 2.5  # never more than one step above
+
+
+def test_choose_probability_rejects_empty_target():
+    with pytest.raises(ValueError):
+        choose_probability(1_000_000, 0)
+
+
+# -----------------------------------------------------------------------------
+# count_interval
+# -----------------------------------------------------------------------------
+
+def test_count_interval_is_exact_without_sampling():
+    assert count_interval(123, 1.0) == (123, 123)
+
+
+def test_count_interval_zero_hits():
+    lower, upper = count_interval(0, 0.01)
+    assert lower == 0
+    # `upper` docs show no hit with probability >= 5%, one more with < 5%
+    assert (1 - 0.01) ** upper >= 0.05 > (1 - 0.01) ** (upper + 1)
+
+
+def test_count_interval_is_floored_at_the_sample():
+    lower, upper = count_interval(3, 0.5)
+    assert lower >= 3
+    assert upper >= 6
+
+
+@pytest.mark.parametrize("true_count, probability", [(2_000, 0.05), (20_000, 0.01), (100_000, 0.2), (500, 0.5)])
+def test_count_interval_coverage(true_count, probability):
+    rng = np.random.default_rng(true_count)
+    hits = rng.binomial(true_count, probability, 2_000)
+    inside = sum(lo <= true_count <= hi for lo, hi in (count_interval(int(k), probability) for k in hits))
+    assert 0.92 <= inside / len(hits) <= 0.98
+
+
+def test_count_interval_narrows_with_confidence():
+    wide, narrow = count_interval(400, 0.1, 0.99), count_interval(400, 0.1, 0.8)
+    assert wide[0] < narrow[0] <= 4_000 <= narrow[1] < wide[1]
+
+
+# -----------------------------------------------------------------------------
+# resolve_sampling / scale_sampled
+# -----------------------------------------------------------------------------
+
+def test_resolve_sampling_wraps_top_level_aggs():
+    sampled = resolve_sampling(_request(), expected_docs=42_000_000, seed=3)
+    assert sampled.probability == 0.005 and sampled.wrapper == SAMPLE_WRAPPER
+    outer = sampled.request.aggs[SAMPLE_WRAPPER]
+    assert outer.random_sampler.probability == 0.005 and outer.random_sampler.seed == 3
+    assert set(outer.aggs) == set(AGGS)
+
+
+def test_resolve_sampling_leaves_small_windows_exact():
+    sampled = resolve_sampling(_request(), expected_docs=50_000)
+    assert sampled.probability == 1.0 and sampled.wrapper is None
+    assert set(sampled.request.aggs) == set(AGGS)
+
+
+def test_resolve_sampling_fills_auto_probability():
+    aggs = {"s": {"random_sampler": {"probability": "auto"}, "aggs": {"levels": AGGS["levels"]}}}
+    sampled = resolve_sampling(_request(aggs), expected_docs=1_000_000)
+    assert sampled.wrapper is None
+    assert sampled.request.aggs["s"].random_sampler.probability == 0.1
+
+
+def test_scale_sampled_divides_counts_and_unwraps():
+    sampled = resolve_sampling(_request(), expected_docs=1_000_000)
+    response = {"hits": {"total": {"value": 1000}}, "aggregations": {SAMPLE_WRAPPER: {
+        "doc_count": 100, "seed": 1,
+        "levels": {"sum_other_doc_count": 2, "buckets": [{"key": "info", "doc_count": 70}]},
+        "duration": {"count": 100, "min": 1.0, "max": 9.0, "avg": 5.0, "sum": 500.0},
+        "total": {"value": 500.0},
+    }}}
+    out = scale_sampled(sampled, response)
+    aggs = out["aggregations"]
+    assert SAMPLE_WRAPPER not in aggs
+    assert aggs["levels"]["sum_other_doc_count"] == 20
+    bucket = aggs["levels"]["buckets"][0]
+    assert bucket["doc_count"] == 700
+    assert bucket["doc_count_interval"] == dict(zip(("lower", "upper"), count_interval(70, 0.1)))
+    assert aggs["duration"] == {"count": 1000, "min": 1.0, "max": 9.0, "avg": 5.0, "sum": 5000.0}
+    assert aggs["total"]["value"] == 5000.0
+    assert out["sampling"]["probability"] == 0.1 and out["sampling"]["sampled_docs"] == 100
+    assert response["aggregations"][SAMPLE_WRAPPER]["doc_count"] == 100  # input untouched
+
+
+def test_scale_sampled_passes_exact_responses_through():
+    sampled = resolve_sampling(_request(), expected_docs=None)
+    response = {"aggregations": {"levels": {"buckets": [{"key": "info", "doc_count": 7}]}}}
+    assert scale_sampled(sampled, response) == response
+
+
+# -----------------------------------------------------------------------------
+# run_sampled over a local batch
+# -----------------------------------------------------------------------------
+
+def _local(batch):
+    search = lambda body: localexec.search(body, batch)  # noqa: E731
+    count = lambda body: search({**body, "size": 0})["hits"]["total"]["value"]  # noqa: E731
+    return search, count
+
+
+def test_run_sampled_small_window_is_exact(batch):
+    search, count = _local(batch)
+    req = _request()
+    exact = search(req.model_dump(by_alias=True, exclude_none=True))
+    out = run_sampled(req, search=search, count=count)
+    assert "sampling" not in out
+    assert out["aggregations"] == exact["aggregations"]
+
+
+def test_run_sampled_estimates_within_intervals(batch):
+    search, count = _local(batch)
+    req = _request()
+    exact = search(req.model_dump(by_alias=True, exclude_none=True))["aggregations"]
+    approx = run_sampled(req, search=search, count=count, target_docs=5_000, seed=7)
+    assert approx["sampling"]["probability"] < 1
+    truth = {b["key"]: b["doc_count"] for b in exact["levels"]["buckets"]}
+    for b in approx["aggregations"]["levels"]["buckets"]:
+        ci = b["doc_count_interval"]
+        assert ci["lower"] <= b["doc_count"] <= ci["upper"]
+        assert math.isclose(b["doc_count"], truth[b["key"]], rel_tol=0.25)
+    assert math.isclose(approx["aggregations"]["duration"]["count"], exact["duration"]["count"], rel_tol=0.1)
+    assert math.isclose(approx["aggregations"]["duration"]["avg"], exact["duration"]["avg"], rel_tol=0.1)
@@ -0,0 +1,66 @@
+"""
+MCP tool bodies: what the gateway receives is the `_search` body itself,
+serializable the way `_post` sends it.
+"""
+import json
+
+import pytest
+
+pytest.importorskip("mcp")
+
+import server  # noqa: E402
+from dsl_models import SearchRequest, SearchRequestWithAggs  # noqa: E402
+from fastjson import dump_json  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+
+@pytest.fixture
+def posted(monkeypatch):
+    calls = []
+
+    def fake_post(path, payload):
+        calls.append((path, payload))
+        return {"hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}, "aggregations": {}}
+
+    monkeypatch.setattr(server, "_post", fake_post)
+    return calls
+
+
+def _wire(payload) -> dict:
+    """The JSON `_post` would send for `payload`."""
+    if isinstance(payload, BaseModel):
+        return json.loads(dump_json(payload))
+    return json.loads(json.dumps(payload))
+
+
+def test_search_logs_posts_the_request_body(posted):
+    body = {"query": {"bool": {"filter": [{"term": {"log.level": "error"}}]}}, "size": 5, "from": 10}
+    server.search_logs(SearchRequest.model_validate(body), index="logs-*")
+    ((path, payload),) = posted
+    assert path == "/logs-*/_search"
+    assert _wire(payload) == body
+
+
+def test_aggregate_logs_posts_the_request_body_by_default(posted):
+    body = {"query": {"match_all": {}}, "size": 0, "aggs": {"levels": {"terms": {"field": "log.level"}}}}
+    server.aggregate_logs(SearchRequestWithAggs.model_validate(body), index="logs-*")
+    ((path, payload),) = posted
+    assert path == "/logs-*/_search"
+    assert _wire(payload) == body
+
+
+def test_compact_tool_schemas_logs_instead_of_printing(capsys, caplog):
+    tools = server._registered_tools()
+    assert {t.name for t in tools} >= {"search_logs", "aggregate_logs"}
+    before = {t.name: len(json.dumps(t.parameters)) for t in tools}
+    with caplog.at_level("INFO", logger=server.__name__):
+        server._compact_tool_schemas()
+    assert capsys.readouterr().out == ""
+    assert any("tool schema search_logs" in r.getMessage() for r in caplog.records)
+    assert all(len(json.dumps(t.parameters)) <= before[t.name] for t in server._registered_tools())
+
+
+def test_compact_tool_schemas_without_tool_manager(monkeypatch):
+    monkeypatch.delattr(server.mcp, "_tool_manager")
+    assert server._registered_tools() == []
+    server._compact_tool_schemas()
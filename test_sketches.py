@@ -0,0 +1,207 @@
+"""
+Quantile sketches: t-digest and HDR quantiles/ranks stay within their error
+bounds of the exact numpy values, merges are order independent, empty and
+single-value sketches answer sensibly, and `percentile_ranks` agrees with
+the exact ranks both unsliced and merged from time slices.
+"""
+import copy
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import localexec
+from dsl_models import SearchRequestWithAggs
+from sketches import MAX_HDR_DIGITS, HdrHistogram, TDigest
+from slicing import run_sliced
+
+
+QS = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+NOW = datetime(2025, 2, 1, tzinfo=timezone.utc)
+WEEK = {"gte": "2025-01-01T00:00:00Z", "lt": "2025-01-08T00:00:00Z"}
+
+SKETCHES = {
+    "tdigest": lambda: TDigest(100),
+    "tdigest-200": lambda: TDigest(200),
+    "hdr-2": lambda: HdrHistogram(2),
+    "hdr-3": lambda: HdrHistogram(3),
+}
+
+
+@pytest.fixture(scope="module")
+def latencies():
+    return np.random.default_rng(3).lognormal(4.0, 1.0, 100_000)
+
+
+def _assert_within_bounds(sketch, values):
+    if isinstance(sketch, HdrHistogram):
+        # a bucket's highest equivalent value is within 10 ** -digits of the nearest-rank value
+        exact = np.quantile(values, QS, method="inverted_cdf")
+        assert np.all(np.abs(sketch.quantiles(QS) - exact) <= 10.0 ** -sketch.digits * exact)
+    else:
+        exact = np.quantile(values, QS)
+        assert np.all(np.abs(sketch.quantiles(QS) - exact) <= 0.03 * exact)
+        # the estimate's true rank is close to the asked-for quantile
+        ranks = np.searchsorted(np.sort(values), sketch.quantiles(QS)) / len(values)
+        assert np.all(np.abs(ranks - QS) <= 0.005)
+
+
+# -----------------------------------------------------------------------------
+# Error bounds
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_quantiles_within_error_bound(latencies, name):
+    _assert_within_bounds(SKETCHES[name]().add(latencies), latencies)
+
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_ranks_match_exact_fractions(latencies, name):
+    thresholds = np.quantile(latencies, QS)
+    exact = np.searchsorted(np.sort(latencies), thresholds, side="right") / len(latencies)
+    assert np.all(np.abs(SKETCHES[name]().add(latencies).ranks(thresholds) - exact) <= 0.002)
+
+
+def test_tdigest_stays_near_its_compression(latencies):
+    for compression in (50, 100, 200):
+        assert len(TDigest(compression).add(latencies)) <= compression
+
+
+def test_weights_count_as_repeated_values():
+    for name in SKETCHES:
+        weighted = SKETCHES[name]().add([1.0, 10.0, 100.0], [1, 2, 1])
+        repeated = SKETCHES[name]().add([1.0, 10.0, 10.0, 100.0])
+        assert weighted.count == repeated.count == 4
+        assert weighted.quantiles([0.5]).tolist() == repeated.quantiles([0.5]).tolist() == pytest.approx([10.0], rel=0.01)
+
+
+def test_hdr_rejects_negative_values_and_mixed_precision():
+    with pytest.raises(ValueError, match="non-negative"):
+        HdrHistogram().add([-1.0])
+    with pytest.raises(ValueError, match="precision"):
+        HdrHistogram(2).merge(HdrHistogram(3).add([1.0]))
+    with pytest.raises(ValueError):
+        HdrHistogram(MAX_HDR_DIGITS + 1)
+    with pytest.raises(ValueError):
+        TDigest(0)
+
+
+# -----------------------------------------------------------------------------
+# Merging
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_merged_slices_stay_within_error_bound(latencies, name):
+    merged = SKETCHES[name]()
+    for part in np.array_split(latencies, 7):
+        merged.merge(SKETCHES[name]().add(part))
+    assert merged.count == len(latencies)
+    assert (merged.min, merged.max) == (latencies.min(), latencies.max())
+    _assert_within_bounds(merged, latencies)
+
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_merge_is_associative(latencies, name):
+    a, b, c = (SKETCHES[name]().add(part) for part in np.array_split(latencies, 3))
+    left = copy.deepcopy(a).merge(copy.deepcopy(b)).merge(copy.deepcopy(c))
+    right = copy.deepcopy(a).merge(copy.deepcopy(b).merge(copy.deepcopy(c)))
+    swapped = copy.deepcopy(c).merge(copy.deepcopy(a)).merge(copy.deepcopy(b))
+    for sketch in (left, right, swapped):
+        assert sketch.count == len(latencies)
+        _assert_within_bounds(sketch, latencies)
+    if name.startswith("hdr"):   # bucket counts add up exactly
+        assert left.quantiles(QS).tolist() == right.quantiles(QS).tolist() == swapped.quantiles(QS).tolist()
+
+
+# -----------------------------------------------------------------------------
+# Empty / single value
+# -----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_empty_sketch_answers_nan(name):
+    for sketch in (SKETCHES[name](), SKETCHES[name]().add([]), SKETCHES[name]().add([np.nan])):
+        assert sketch.count == 0 and len(sketch) == 0
+        assert np.isnan(sketch.quantiles([0.5, 0.99])).all()
+        assert np.isnan(sketch.ranks([1.0])).all()
+
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_merging_empty_sketches_is_a_no_op(name):
+    one = SKETCHES[name]().add([42.0])
+    assert one.merge(SKETCHES[name]()).count == 1
+    assert SKETCHES[name]().merge(one).quantiles([0.5]).tolist() == [42.0]
+    assert len(SKETCHES[name]().merge(SKETCHES[name]())) == 0
+
+
+@pytest.mark.parametrize("name", list(SKETCHES))
+def test_single_value(name):
+    sketch = SKETCHES[name]().add([42.0])
+    assert sketch.quantiles([0.0, 0.5, 1.0]).tolist() == [42.0, 42.0, 42.0]
+    assert sketch.ranks([41.0, 42.0, 43.0]).tolist() == [0.0, 1.0, 1.0]
+
+
+# -----------------------------------------------------------------------------
+# percentiles / percentile_ranks aggregations
+# -----------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def batch():
+    return localexec.synthetic_batch(50_000, seed=11)
+
+
+@pytest.fixture(scope="module")
+def durations(batch):
+    ts = batch.column("@timestamp").values
+    start, end = (int(datetime.fromisoformat(WEEK[k].replace("Z", "+00:00")).timestamp() * 1000) for k in ("gte", "lt"))
+    return np.sort(batch.column("event.duration").values[(ts >= start) & (ts < end)])
+
+
+def _request(agg):
+    return SearchRequestWithAggs.model_validate(
+        {"query": {"range": {"@timestamp": WEEK}}, "size": 0, "aggs": {"agg": agg}}
+    )
+
+
+def _values(response):
+    return {float(k): v for k, v in response["aggregations"]["agg"]["values"].items()}
+
+
+METHODS = [{}, {"tdigest": {"compression": 200}}, {"hdr": {}}, {"hdr": {"number_of_significant_value_digits": 2}}]
+THRESHOLDS = [0.5, 20.0, 55.0, 150.0, 600.0, 1e6]
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("slices", [0, 5])
+def test_percentile_ranks_match_exact_ranks(batch, durations, method, slices):
+    request = _request({"percentile_ranks": {"field": "event.duration", "values": THRESHOLDS, **method}})
+    if slices:
+        search = lambda body: localexec.search(body, batch, now=NOW)  # noqa: E731
+        response = run_sliced(request, search=search, slices=slices, now=NOW)
+    else:
+        response = localexec.search(request, batch, now=NOW)
+    ranks = _values(response)
+    exact = np.searchsorted(durations, THRESHOLDS, side="right") / len(durations) * 100
+    # sliced ranks are read off a sketch rebuilt from each slice's percent grid
+    tolerance = 0.5 if slices else 0.2
+    assert list(ranks) == THRESHOLDS
+    assert np.abs(np.array(list(ranks.values())) - exact).max() <= tolerance
+    assert ranks[0.5] == 0.0 and ranks[1e6] == 100.0
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_sliced_percentiles_match_unsliced(batch, durations, method):
+    request = _request({"percentiles": {"field": "event.duration", "percents": [1, 50, 99], **method}})
+    whole = _values(localexec.search(request, batch, now=NOW))
+    sliced = _values(run_sliced(request, search=lambda body: localexec.search(body, batch, now=NOW), slices=5, now=NOW))
+    exact = np.percentile(durations, [1, 50, 99])
+    assert list(sliced) == list(whole) == [1.0, 50.0, 99.0]
+    assert np.all(np.abs(np.array(list(whole.values())) - exact) <= 0.02 * exact)
+    # a sliced HDR rebuilds its buckets from interpolated values: up to a bucket more
+    assert np.all(np.abs(np.array(list(sliced.values())) - exact) <= 0.03 * exact)
+
+
+def test_empty_selection_reports_null_values(batch):
+    request = SearchRequestWithAggs.model_validate({"query": {"term": {"service.name": "no-such-service"}}, "size": 0, "aggs": {
+        "agg": {"percentile_ranks": {"field": "event.duration", "values": [10], "keyed": False}},
+    }})
+    assert localexec.search(request, batch, now=NOW)["aggregations"]["agg"] == {"values": [{"key": 10.0, "value": None}]}
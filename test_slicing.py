@@ -0,0 +1,124 @@
+"""
+Time slicing: a request run as merged slices over a `LogBatch` returns what
+the same request returns unsliced (hits, totals, buckets and metrics).
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+import localexec
+from dsl_models import SearchRequestWithAggs
+from slicing import merge_responses, run_sliced, slice_request
+
+
+NOW = datetime(2025, 2, 1, tzinfo=timezone.utc)
+WEEK = {"range": {"@timestamp": {"gte": "2025-01-01T00:00:00Z", "lt": "2025-01-08T00:00:00Z"}}}
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return localexec.synthetic_batch(50_000, seed=11)
+
+
+def _request(aggs=None, query=None, size=5, offset=0):
+    must = [query] if query else []
+    body = {"query": {"bool": {"must": must, "filter": [WEEK]}}, "size": size, "from": offset}
+    if aggs:
+        body["aggs"] = aggs
+    return SearchRequestWithAggs.model_validate(body)
+
+
+def _local(batch):
+    return lambda body: localexec.search(body, batch, now=NOW)
+
+
+def _strip(value):
+    """Drop fields that legitimately differ (timings) and round floats."""
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in ("took", "doc_count_error_upper_bound")}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+AGGS = {
+    "terms_avg": {"svc": {"terms": {"field": "service.name", "size": 3},
+                          "aggs": {"lat": {"avg": {"field": "event.duration"}}}}},
+    "terms_min_doc_count": {"levels": {"terms": {"field": "log.level", "min_doc_count": 1000}}},
+    "date_histogram_stats": {"per_day": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d"},
+                                         "aggs": {"dur": {"stats": {"field": "event.duration"}}}}},
+    "histogram_sum": {"codes": {"histogram": {"field": "http.response.status_code", "interval": 100},
+                                "aggs": {"total": {"sum": {"field": "event.duration"}}}}},
+    "range_min_max": {"slow": {"range": {"field": "event.duration", "ranges": [{"to": 50}, {"from": 50}]},
+                               "aggs": {"lo": {"min": {"field": "event.duration"}},
+                                        "hi": {"max": {"field": "event.duration"}}}}},
+    "filters": {"levels": {"filters": {"filters": {"err": {"term": {"log.level": "error"}},
+                                                   "warn": {"term": {"log.level": "warn"}}}}}},
+}
+
+
+@pytest.mark.parametrize("name", list(AGGS))
+@pytest.mark.parametrize("slices", [1, 3, 7])
+def test_sliced_matches_unsliced(batch, name, slices):
+    request = _request(AGGS[name])
+    whole = localexec.search(request, batch, now=NOW)
+    sliced = run_sliced(request, search=_local(batch), slices=slices, max_concurrency=2, now=NOW)
+    assert _strip(sliced["aggregations"]) == _strip(whole["aggregations"])
+    assert sliced["hits"]["total"] == whole["hits"]["total"]
+
+
+def test_high_cardinality_terms_stay_within_error_bound(batch):
+    request = _request({"hosts": {"terms": {"field": "host.name", "size": 5}}})
+    truth = {b["key"]: b["doc_count"] for b in localexec.search(
+        _request({"hosts": {"terms": {"field": "host.name", "size": 1000}}}), batch, now=NOW,
+    )["aggregations"]["hosts"]["buckets"]}
+    merged = run_sliced(request, search=_local(batch), slices=7, now=NOW)["aggregations"]["hosts"]
+    bound = merged["doc_count_error_upper_bound"]
+    assert len(merged["buckets"]) == 5
+    for bucket in merged["buckets"]:
+        assert bucket["doc_count"] <= truth[bucket["key"]] <= bucket["doc_count"] + bound
+
+
+@pytest.mark.parametrize("size, offset", [(5, 0), (10, 7), (0, 0)])
+def test_sliced_hits_match_unsliced(batch, size, offset):
+    request = _request(query={"match": {"message": "timeout"}}, size=size, offset=offset)
+    whole = localexec.search(request, batch, now=NOW)
+    parts = slice_request(request, slices=4, now=NOW)
+    merged = merge_responses(request, [_local(batch)(s.body) for s in parts])
+    assert [h["_id"] for h in merged["hits"]["hits"]] == [h["_id"] for h in whole["hits"]["hits"]]
+    assert merged["hits"]["max_score"] == pytest.approx(whole["hits"]["max_score"])
+
+
+def test_slices_partition_the_window():
+    parts = slice_request(_request(), slices=7, now=NOW)
+    assert len(parts) == 7
+    assert parts[0].start is None and parts[-1].end is None
+    assert all(a.end == b.start for a, b in zip(parts, parts[1:]))
+    assert [p.index for p in parts] == list(range(7))
+
+
+def test_short_windows_get_fewer_slices():
+    request = SearchRequestWithAggs.model_validate(
+        {"query": {"range": {"@timestamp": {"gte": "2025-01-01T00:00:00Z", "lt": "2025-01-01T00:03:00Z"}}}}
+    )
+    assert len(slice_request(request, slices=8, now=NOW)) == 3
+
+
+def test_unbounded_window_is_rejected():
+    request = SearchRequestWithAggs.model_validate({"query": {"match_all": {}}})
+    with pytest.raises(ValueError, match="bounded range"):
+        slice_request(request, now=NOW)
+
+
+def test_gateway_paths_are_absolute(monkeypatch):
+    server = pytest.importorskip("server")
+    import sampling
+    import slicing
+
+    paths = []
+    monkeypatch.setattr(server, "_post", lambda path, body: paths.append(path) or {"count": 0})
+    slicing._gateway_search("logs-*")({"query": {"match_all": {}}})
+    sampling._gateway_count("logs-*")({"query": {"match_all": {}}})
+    assert paths == ["/logs-*/_search", "/logs-*/_count"]
@@ -0,0 +1,107 @@
+"""
+Incremental `_search` parsing: any chunking of a response yields the same
+hits and body as `json.loads`, and truncated or malformed input raises
+`StreamJSONError` instead of returning a partial response.
+"""
+import json
+
+import pytest
+
+from streamjson import SearchResponseStream, StreamJSONError, iter_search_events
+
+
+RESPONSE = {
+    "took": 7,
+    "timed_out": False,
+    "_shards": {"total": 2, "successful": 2, "skipped": 0, "failed": 0},
+    "hits": {
+        "total": {"value": 3, "relation": "eq"},
+        "max_score": 1.25,
+        "hits": [
+            {"_index": "logs", "_id": "a", "_score": 1.25,
+             "_source": {"message": "naïve \"quoted\" \\ ☃ 🚀", "n": -12.5e-3, "tags": ["x", {"y": [1, 2]}]}},
+            {"_index": "logs", "_id": "b", "_score": None, "_source": {"empty": {}, "list": [], "ok": True}},
+            {"_index": "logs", "_id": "c", "_score": 0.5, "_source": {"brackets": "}]{[", "null": None}},
+        ],
+    },
+    "aggregations": {"levels": {"buckets": [{"key": "error", "doc_count": 2}]}},
+}
+BODY = json.dumps(RESPONSE, ensure_ascii=False, indent=1).encode()
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _read(chunks, **options):
+    stream = SearchResponseStream(chunks, **options)
+    hits = list(stream.hits())
+    return hits, stream.response()
+
+
+def _without_hits(response):
+    return {**response, "hits": {k: v for k, v in response["hits"].items() if k != "hits"}}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_fixed_chunk_sizes(size):
+    hits, rest = _read(_chunks(BODY, size))
+    assert hits == RESPONSE["hits"]["hits"]
+    assert rest == _without_hits(RESPONSE)
+
+
+def test_every_single_split_point():
+    for cut in range(1, len(BODY)):
+        hits, rest = _read([BODY[:cut], BODY[cut:]])
+        assert hits == RESPONSE["hits"]["hits"], cut
+        assert rest == _without_hits(RESPONSE), cut
+
+
+def test_text_chunks_and_compact_body():
+    compact = json.dumps(RESPONSE, separators=(",", ":"))
+    hits, rest = _read([compact[i:i + 5] for i in range(0, len(compact), 5)])
+    assert hits == RESPONSE["hits"]["hits"] and rest == _without_hits(RESPONSE)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 5])
+def test_batches_and_progress(batch_size):
+    progress = []
+    stream = SearchResponseStream(_chunks(BODY, 16), on_progress=lambda b, h: progress.append((b, h)))
+    batches = list(stream.hits(batch_size=batch_size))
+    assert [h for b in batches for h in b] == RESPONSE["hits"]["hits"]
+    assert all(len(b) <= batch_size for b in batches)
+    assert [h for _, h in progress] == sorted(h for _, h in progress) and progress[-1][1] == 3
+    assert stream.bytes_read <= len(BODY)
+
+
+def test_max_hits_drops_the_rest():
+    hits, rest = _read(_chunks(BODY, 9), max_hits=1)
+    assert hits == RESPONSE["hits"]["hits"][:1]
+    assert rest["aggregations"] == RESPONSE["aggregations"]
+
+
+def test_event_order():
+    kinds = [kind for kind, _ in iter_search_events(_chunks(BODY, 11))]
+    assert kinds == ["took", "timed_out", "_shards", "hits.total", "hits.max_score", "hit", "hit", "hit", "aggregations"]
+
+
+@pytest.mark.parametrize("size", [1, 13, len(BODY)])
+def test_truncated_input_raises(size):
+    stripped = BODY.rstrip()
+    for end in range(len(stripped)):
+        with pytest.raises(StreamJSONError):
+            _read(_chunks(stripped[:end], size))
+
+
+@pytest.mark.parametrize("body", [
+    b'{"took": 1} {"took": 2}',
+    b'{"took": 1,}',
+    b'{"hits": {"hits": [{"_id": "a"} {"_id": "b"}]}}',
+    b'{"took" 1}',
+    b'[1, 2]',
+    b'{"took": "\xff"}',
+])
+def test_malformed_input_raises(body):
+    with pytest.raises(StreamJSONError) as info:
+        _read(_chunks(body, 4))
+    assert info.value.offset >= 0
@@ -0,0 +1,278 @@
+"""
+Tool schema compaction: the compact schema accepts and rejects the same
+payloads as the full pydantic schema (checked with a small validator for the
+JSON Schema keywords the models emit, so no MCP SDK is needed), and the
+passes do what they claim.
+"""
+import math
+import re
+
+import pytest
+
+from dsl_models import ClientPipeline, SearchRequest, SearchRequestWithAggs
+from dslstrategies import sample_payloads
+from toolschema import compact_schema, token_cost
+
+
+# -----------------------------------------------------------------------------
+# Validator for the keywords the models emit (format is an annotation)
+# -----------------------------------------------------------------------------
+
+ANNOTATIONS = {"title", "description", "default", "format", "$defs", "examples"}
+TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool) and float(v).is_integer(),
+}
+
+
+def _equal(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+def valid(instance, schema, root=None):
+    root = schema if root is None else root
+    if isinstance(schema, bool):
+        return schema
+    unknown = set(schema) - ANNOTATIONS - CHECKS.keys() - {"properties", "additionalProperties"}
+    assert not unknown, f"validator does not implement {sorted(unknown)}"
+    if "properties" in schema or "additionalProperties" in schema:
+        if not _object(instance, schema, root):
+            return False
+    return all(CHECKS[k](instance, v, root, schema) for k, v in schema.items() if k in CHECKS)
+
+
+def _object(instance, schema, root):
+    if not isinstance(instance, dict):
+        return True
+    props = schema.get("properties", {})
+    extra = schema.get("additionalProperties", True)
+    return all(
+        valid(v, props[k], root) if k in props else valid(v, extra, root)
+        for k, v in instance.items()
+    )
+
+
+def _ref(instance, ref, root, _):
+    node = root
+    for part in ref.removeprefix("#/").split("/"):
+        node = node[part]
+    return valid(instance, node, root)
+
+
+def _type(instance, types, root, _):
+    return any(TYPES[t](instance) for t in ([types] if isinstance(types, str) else types))
+
+
+def _numeric(check):
+    def run(instance, bound, root, _):
+        return not TYPES["number"](instance) or check(instance, bound)
+    return run
+
+
+def _sized(kind, check):
+    def run(instance, bound, root, _):
+        return not TYPES[kind](instance) or check(len(instance), bound)
+    return run
+
+
+CHECKS = {
+    "$ref": _ref,
+    "type": _type,
+    "enum": lambda i, values, root, _: any(_equal(i, v) for v in values),
+    "const": lambda i, value, root, _: _equal(i, value),
+    "required": lambda i, names, root, _: not isinstance(i, dict) or all(n in i for n in names),
+    "items": lambda i, s, root, _: not isinstance(i, list) or all(valid(v, s, root) for v in i),
+    "propertyNames": lambda i, s, root, _: not isinstance(i, dict) or all(valid(k, s, root) for k in i),
+    "anyOf": lambda i, members, root, _: any(valid(i, m, root) for m in members),
+    "oneOf": lambda i, members, root, _: sum(valid(i, m, root) for m in members) == 1,
+    "allOf": lambda i, members, root, _: all(valid(i, m, root) for m in members),
+    "minimum": _numeric(lambda v, b: v >= b),
+    "maximum": _numeric(lambda v, b: v <= b),
+    "exclusiveMinimum": _numeric(lambda v, b: v > b),
+    "exclusiveMaximum": _numeric(lambda v, b: v < b),
+    "minItems": _sized("array", lambda n, b: n >= b),
+    "maxItems": _sized("array", lambda n, b: n <= b),
+    "minProperties": _sized("object", lambda n, b: n >= b),
+    "maxProperties": _sized("object", lambda n, b: n <= b),
+    "minLength": _sized("string", lambda n, b: n >= b),
+    "maxLength": _sized("string", lambda n, b: n <= b),
+    "pattern": lambda i, p, root, _: not isinstance(i, str) or re.search(p, i) is not None,
+}
+
+
+# -----------------------------------------------------------------------------
+# Same verdicts, full vs compact
+# -----------------------------------------------------------------------------
+
+MODELS = {"SearchRequest": SearchRequest, "SearchRequestWithAggs": SearchRequestWithAggs,
+          "ClientPipeline": ClientPipeline}
+
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def schemas(request):
+    full = MODELS[request.param].model_json_schema(by_alias=True)
+    return request.param, full, compact_schema(full)
+
+
+QUERIES = [
+    {"match_all": {}},
+    {"match_all": {"boost": 2}},
+    {"term": {"service.name": "api"}},
+    {"term": {"status": 500}},
+    {"term": {"ok": True}},
+    {"term": {"service.name": {"value": "api", "boost": 1.5}}},
+    {"terms": {"log.level": ["error", "warn"]}},
+    {"terms": {"status": [500, 503]}},
+    {"match": {"message": "timeout"}},
+    {"match": {"message": {"query": "payment timeout", "operator": "and"}}},
+    {"multi_match": {"query": "timeout", "fields": ["message", "title"], "type": "phrase"}},
+    {"range": {"@timestamp": {"gte": "now-1h", "lt": "now", "time_zone": "+01:00"}}},
+    {"range": {"status": {"gte": 400, "lt": 500.5}}},
+    {"exists": {"field": "host"}},
+    {"ids": {"values": ["1", "2"]}},
+    {"bool": {"must": [{"match": {"message": "timeout"}}], "filter": [{"term": {"env": "prod"}}],
+              "must_not": [{"exists": {"field": "x"}}], "should": [], "minimum_should_match": 1}},
+    {"bool": {"filter": [{"bool": {"should": [{"term": {"a": "b"}}, {"range": {"n": {"gt": 1}}}]}}]}},
+    # invalid
+    {},
+    {"term": {"a": "b"}, "match": {"message": "x"}},
+    {"nope": {}},
+    {"term": "api"},
+    {"term": {"a": ["b"]}},
+    {"terms": {"a": "b"}},
+    {"match": {"message": {"query": "x", "operator": "xor"}}},
+    {"range": {"n": {"gte": [1]}}},
+    {"bool": {"must": {"term": {"a": "b"}}}},
+    {"bool": {"must": [{}]}},
+    {"bool": {"musts": []}},
+    {"exists": {"field": 3}},
+    {"match_all": {"boost": "high"}},
+]
+
+AGGS = [
+    {"svc": {"terms": {"field": "service.name", "size": 5}, "aggs": {"lat": {"avg": {"field": "event.duration"}}}}},
+    {"per_day": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d", "time_zone": "Europe/Paris"}}},
+    {"codes": {"histogram": {"field": "status", "interval": 100}}},
+    {"slow": {"range": {"field": "event.duration", "ranges": [{"to": 50}, {"from": 50, "key": "slow"}]}}},
+    {"levels": {"filters": {"filters": {"err": {"term": {"log.level": "error"}}}}}},
+    {"p": {"percentiles": {"field": "event.duration", "percents": [50, 99.9], "hdr": {}}}},
+    {"r": {"percentile_ranks": {"field": "event.duration", "values": [100], "tdigest": {"compression": 50}}}},
+    {"pages": {"composite": {"size": 10, "sources": [{"h": {"terms": {"field": "host.name", "missing_bucket": True}}}],
+                             "after": {"h": "web-1"}}}},
+    {"sample": {"random_sampler": {"probability": 0.01}, "aggs": {"n": {"cardinality": {"field": "host.name"}}}}},
+    # invalid
+    {"svc": {"terms": {"field": "service.name", "size": "five"}}},
+    {"svc": {"terms": {"field": "service.name", "order": {"_count": "sideways"}}}},
+    {"svc": {"terms": {"field": "service.name"}, "aggs": []}},
+    {"p": {"percentiles": {"field": "event.duration", "percents": "50"}}},
+    {"svc": {"terms": {"field": "service.name", "bogus": 1}}},
+    {"svc": []},
+]
+
+PIPELINES = [
+    {"histogram": "per_hour", "steps": {"d": {"derivative": {"buckets_path": "_count", "unit": "1s"}}}},
+    {"histogram": "svc>per_hour", "steps": {
+        "r": {"bucket_ratio": {"numerator": "level['error']>_count", "denominator": "_count", "scale": 100}},
+        "m": {"moving_avg": {"buckets_path": "r", "window": 6, "model": "ewma", "alpha": 0.5, "shift": 1}},
+        "c": {"cumulative_sum": {"buckets_path": "_count"}},
+        "p": {"rate_of_change": {"buckets_path": "lat[99.0]", "gap_policy": "insert_zeros"}},
+    }},
+    # invalid
+    {"histogram": "per_hour", "steps": {}},
+    {"histogram": "per_hour", "steps": {"m": {"moving_avg": {"buckets_path": "_count", "window": 0}}}},
+    {"histogram": "per_hour", "steps": {"m": {"moving_avg": {"buckets_path": "_count", "window": 2, "alpha": 0}}}},
+    {"histogram": "per_hour", "steps": {"m": {"moving_avg": {"buckets_path": "_count", "window": 2, "model": "holt"}}}},
+    {"histogram": "per_hour", "steps": {"d": {"derivative": {"buckets_path": "_count", "gap_policy": "drop"}}}},
+    {"histogram": 3, "steps": {"d": {"derivative": {"buckets_path": "_count"}}}},
+    {"steps": {"d": {"derivative": {"buckets_path": "_count"}}}},
+]
+
+
+def _payloads(name):
+    if name == "ClientPipeline":
+        return PIPELINES
+    bodies = [{"query": q} for q in QUERIES]
+    bodies += [{"query": {"match_all": {}}, "size": 5, "from": 10}, {"query": {"match_all": {}}, "size": "5"},
+               {"query": {"match_all": {}}, "size": 1.5}, {"query": {"match_all": {}}, "bogus": 1}, {"size": 5}]
+    if name == "SearchRequestWithAggs":
+        bodies += [{"query": {"match_all": {}}, "size": 0, "aggs": aggs} for aggs in AGGS]
+    return bodies
+
+
+def test_same_verdicts_on_samples(schemas):
+    name, full, compact = schemas
+    payloads = _payloads(name)
+    verdicts = [(valid(p, full), valid(p, compact)) for p in payloads]
+    assert [p for p, (a, b) in zip(payloads, verdicts) if a != b] == []
+    assert any(a for a, _ in verdicts) and not all(a for a, _ in verdicts)  # the samples cut both ways
+
+
+@pytest.mark.parametrize("model, with_aggs", [(SearchRequest, False), (SearchRequestWithAggs, True)])
+def test_generated_payloads_pass_both(model, with_aggs):
+    full = model.model_json_schema(by_alias=True)
+    compact = compact_schema(full)
+    for payload in sample_payloads(100, with_aggs=with_aggs):
+        assert valid(payload, full) and valid(payload, compact), payload
+
+
+def test_explicit_nulls_are_the_one_difference():
+    # `X | None` loses its null arm: omitted fields are how None is sent
+    full = SearchRequest.model_json_schema(by_alias=True)
+    payload = {"query": {"match_all": {}}, "size": None}
+    assert valid(payload, full) and not valid(payload, compact_schema(full))
+
+
+# -----------------------------------------------------------------------------
+# Passes
+# -----------------------------------------------------------------------------
+
+def test_compaction_shrinks_and_leaves_the_input_alone():
+    full = SearchRequestWithAggs.model_json_schema(by_alias=True)
+    before = repr(full)
+    compact = compact_schema(full)
+    assert repr(full) == before
+    assert token_cost(compact) < 0.7 * token_cost(full)
+    assert "title" not in repr(compact)
+
+
+def test_primitive_arms_merge_into_a_type_list():
+    schema = {"type": "object", "properties": {"v": {"anyOf": [
+        {"type": "string", "format": "date-time"}, {"type": "integer"}, {"type": "number"}, {"type": "null"},
+    ]}}}
+    assert compact_schema(schema)["properties"]["v"] == {"type": ["string", "number"]}
+
+
+def test_one_key_objects_become_a_discriminated_one_of():
+    def one_key(key):
+        return {"type": "object", "properties": {key: {"type": "string"}}, "required": [key],
+                "additionalProperties": False}
+
+    schema = {"anyOf": [one_key("a"), one_key("b")]}
+    assert "oneOf" in compact_schema(schema)
+    assert "anyOf" in compact_schema({"anyOf": [one_key("a"), one_key("a")]})
+
+
+def test_long_descriptions_keep_the_first_sentence():
+    schema = {"type": "string", "description": "Short first sentence. " + "More words " * 30}
+    assert compact_schema(schema)["description"] == "Short first sentence."
+    assert compact_schema(schema, description_budget=None) == schema
+    cut = compact_schema({"type": "string", "description": "word " * 60}, description_budget=20)["description"]
+    assert len(cut) <= 20 and cut.endswith("…")
+
+
+def test_repeated_subtrees_are_shared_and_small_defs_inlined():
+    big = {"type": "object", "properties": {f"field_{i}": {"type": "string"} for i in range(12)},
+           "additionalProperties": False}
+    schema = {"type": "object", "properties": {"a": dict(big, description="A"), "b": dict(big, description="B")}}
+    compact = compact_schema(schema, inline_max_chars=0)
+    (name,) = compact["$defs"]
+    assert compact["properties"]["a"] == {"$ref": f"#/$defs/{name}", "description": "A"}
+    inlined = compact_schema(schema, inline_max_chars=math.inf)
+    assert "$defs" not in inlined and inlined["properties"]["b"]["description"] == "B"
@@ -0,0 +1,161 @@
+"""
+`ValidationCache` hit/miss accounting, keys that cover the validation
+context (bucket policy and `now` included), warnings re-emitted on hits, and
+read-only cached trees: a model returned from the cache is shared, so neither
+its attributes nor its nested lists/dicts may be changed through it.
+"""
+import copy
+import json
+import warnings
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+import dsl_models.aggs
+import valcache
+from dsl_models import BucketBudgetWarning, SearchRequestWithAggs
+from valcache import ValidationCache, payload_key
+
+
+BODY = {
+    "query": {"bool": {"filter": [
+        {"terms": {"tags": ["a", "b"]}},
+        {"match": {"message": {"query": "timeout", "operator": "and"}}},
+    ]}},
+    "size": 10,
+}
+
+
+NOW = datetime(2025, 1, 2, tzinfo=timezone.utc)
+PER_MINUTE = {"query": {"range": {"@timestamp": {"gte": "now-1d"}}},
+              "aggs": {"minutes": {"date_histogram": {"field": "@timestamp", "fixed_interval": "1m"}}}}
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Pinned wall clock (the implicit `now` is part of the key)."""
+    now = {"ms": NOW.timestamp() * 1000}
+    monkeypatch.setattr(valcache, "_now_ms", lambda: now["ms"])
+    return now
+
+
+@pytest.fixture
+def cache():
+    return ValidationCache(SearchRequestWithAggs, maxsize=2)
+
+
+def test_payload_key_ignores_formatting():
+    assert payload_key(BODY) == payload_key(json.dumps(BODY, indent=2)) == payload_key(
+        json.dumps(BODY, sort_keys=True).encode()
+    )
+
+
+def test_hits_return_the_shared_model(cache):
+    first = cache.validate(BODY)
+    assert cache.validate(json.dumps(BODY)) is first
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_lru_eviction(cache):
+    for size in (1, 2, 3):
+        cache.validate({"query": {"match_all": {}}, "size": size})
+    assert cache.stats().evictions == 1
+    cache.validate({"query": {"match_all": {}}, "size": 1})
+    assert cache.stats().misses == 4
+
+
+def test_errors_are_cached_and_reraised(cache):
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            cache.validate({"query": {"match_all": {}}, "size": "many"})
+    assert cache.stats().hits == 1
+
+
+def test_errors_not_cached_when_disabled():
+    cache = ValidationCache(SearchRequestWithAggs, cache_errors=False)
+    with pytest.raises(ValidationError):
+        cache.validate({"query": {"match_all": {}}, "size": "many"})
+    assert len(cache) == 0
+
+
+def test_warnings_are_re_emitted_on_hits(cache):
+    body = {"query": {"match_all": {}},
+            "aggs": {"hosts": {"terms": {"field": "host", "size": 20},
+                               "aggs": {"days": {"date_histogram": {"field": "@timestamp", "calendar_interval": "1d"}}}}}}
+    for _ in range(3):
+        with pytest.warns(BucketBudgetWarning, match="guessed|unbounded histograms"):
+            cache.validate(body, context={"bucket_budget": 10_000})
+    assert (cache.stats().hits, cache.stats().misses) == (2, 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", BucketBudgetWarning)
+        cache.validate(body)   # within the default budget: no warning
+
+
+def test_context_is_part_of_the_key(cache):
+    assert cache.validate(PER_MINUTE, context={"bucket_budget": 10_000}).aggs["minutes"]
+    with pytest.raises(ValidationError, match="budget 1000"):
+        cache.validate(PER_MINUTE, context={"bucket_budget": 1_000})
+    reduced = cache.validate(PER_MINUTE, context={"bucket_budget": 1_000, "bucket_policy": "reduce"})
+    assert reduced.aggs["minutes"].date_histogram.fixed_interval != "1m"
+    assert cache.stats().misses == 3
+
+
+def test_module_bucket_policy_is_part_of_the_key(cache, monkeypatch):
+    with pytest.raises(ValidationError):
+        cache.validate(PER_MINUTE, context={"bucket_budget": 1_000})
+    monkeypatch.setattr(dsl_models.aggs, "BUCKET_BUDGET_POLICY", "reduce")
+    reduced = cache.validate(PER_MINUTE, context={"bucket_budget": 1_000})
+    assert reduced.aggs["minutes"].date_histogram.fixed_interval != "1m"
+
+
+def test_now_is_part_of_the_key(clock):
+    cache = ValidationCache(SearchRequestWithAggs)
+    since_2025 = {"query": {"range": {"@timestamp": {"gte": "2025-01-01"}}},
+                  "aggs": {"hours": {"date_histogram": {"field": "@timestamp", "fixed_interval": "1h"}}}}
+    later = datetime(2035, 1, 1, tzinfo=timezone.utc)
+    assert cache.validate(since_2025, context={"now": NOW})
+    with pytest.raises(ValidationError, match="buckets"):   # ten years of hours
+        cache.validate(since_2025, context={"now": later})
+    # without one, `now` is the clock floored to CLOCK_RESOLUTION_S
+    first = cache.validate(since_2025)
+    assert first is cache.validate(since_2025, context={"now": NOW})
+    clock["ms"] += valcache.CLOCK_RESOLUTION_S * 1000 - 1
+    assert cache.validate(since_2025) is first
+    clock["ms"] += 1
+    assert cache.validate(since_2025) is not first
+    assert cache.stats().misses == 3
+    clock["ms"] = later.timestamp() * 1000
+    with pytest.raises(ValidationError, match="buckets"):
+        cache.validate(since_2025)
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda m: setattr(m, "size", 1),
+    lambda m: setattr(m.query.bool, "filter", []),
+    lambda m: m.query.bool.filter.append(m.query.bool.filter[0]),
+    lambda m: m.query.bool.filter.pop(),
+    lambda m: m.query.bool.filter[0].terms["tags"].append("c"),
+    lambda m: m.query.bool.filter[0].terms.update({"other": ["x"]}),
+    lambda m: m.query.bool.filter[1].match.pop("message"),
+], ids=["attr", "nested-attr", "list-append", "list-pop", "terms-values", "dict-update", "dict-pop"])
+def test_cached_tree_is_read_only(cache, mutate):
+    model = cache.validate(BODY)
+    before = model.model_dump(exclude_none=True)
+    with pytest.raises((TypeError, ValidationError)):
+        mutate(model)
+    assert cache.validate(BODY).model_dump(exclude_none=True) == before == BODY
+
+
+def test_frozen_tree_dumps_and_copies_as_plain_containers(cache):
+    model = cache.validate(BODY)
+    dumped = model.model_dump(exclude_none=True)
+    assert type(dumped["query"]["bool"]["filter"]) is list
+    copied = copy.deepcopy(model.query.bool.filter)
+    copied.append(copied[0])
+    assert len(model.query.bool.filter) == 2
+    editable = SearchRequestWithAggs.model_validate(dumped)
+    editable.size = 1
+    assert cache.validate(BODY).size == 10
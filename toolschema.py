@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import copy
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Iterator, Mapping
+
+from pydantic import BaseModel
+
+
+DESCRIPTION_BUDGET = 120  # chars kept per description (first sentence, then cut)
+INLINE_MAX_CHARS = 300  # definitions at most this big are inlined at every use
+DEDUPE_MIN_CHARS = 200  # repeated subtrees at least this big are hoisted into $defs
+
+_REF_PREFIX = "#/$defs/"
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|\s+|[^\sA-Za-z\d]")
+_CAMEL_RE = re.compile(r"[A-Z][a-z\d]*")
+
+
+# -----------------------------------------------------------------------------
+# Tree helpers
+# -----------------------------------------------------------------------------
+
+def _dumps(node: Any) -> str:
+    return json.dumps(node, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def _walk(node: Any) -> Iterator[dict[str, Any]]:
+    """Every schema object below (and including) `node`, parents first."""
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, dict):
+            yield n
+            stack.extend(n.values())
+        elif isinstance(n, list):
+            stack.extend(n)
+
+
+def _ref_name(node: Any) -> str | None:
+    if isinstance(node, dict) and isinstance(node.get("$ref"), str) and node["$ref"].startswith(_REF_PREFIX):
+        return node["$ref"][len(_REF_PREFIX):]
+    return None
+
+
+def _map(node: Any, fn) -> Any:
+    """Rebuild the tree bottom-up, applying `fn` to every schema object."""
+    if isinstance(node, list):
+        return [_map(n, fn) for n in node]
+    if isinstance(node, dict):
+        return fn({k: _map(v, fn) for k, v in node.items()})
+    return node
+
+
+# -----------------------------------------------------------------------------
+# Passes
+# -----------------------------------------------------------------------------
+
+def _strip(node: dict[str, Any]) -> dict[str, Any]:
+    """Drop titles and `default: null`; `X | None` -> `X` (None fields are omitted anyway)."""
+    node.pop("title", None)
+    if "default" in node and node["default"] is None:
+        del node["default"]
+    members = node.get("anyOf")
+    if members and any(m == {"type": "null"} for m in members):
+        rest = [m for m in members if m != {"type": "null"}]
+        del node["anyOf"]
+        if len(rest) == 1:
+            inner = rest[0]
+            clash = set(inner) & set(node)
+            if clash and _ref_name(inner) is None:
+                node["anyOf"] = rest
+            else:
+                node = {**inner, **node}
+        else:
+            node["anyOf"] = rest
+    return node
+
+
+def _merge_primitives(node: dict[str, Any]) -> dict[str, Any]:
+    """Primitive-type arms of an anyOf -> one `type` list (formats are hints only)."""
+    members = node.get("anyOf")
+    if not members:
+        return node
+    plain = [m for m in members if isinstance(m, dict) and "type" in m and set(m) <= {"type", "format"}]
+    if len(plain) < 2:
+        return node
+    types: list[str] = []
+    for m in plain:
+        for t in m["type"] if isinstance(m["type"], list) else [m["type"]]:
+            if t not in types:
+                types.append(t)
+    if "number" in types and "integer" in types:
+        types.remove("integer")
+    merged = {"type": types[0] if len(types) == 1 else types}
+    rest = [m for m in members if m not in plain]
+    if not rest:
+        del node["anyOf"]
+        node.update(merged)
+    else:
+        node["anyOf"] = [merged, *rest]
+    return node
+
+
+def _single_key(schema: dict[str, Any], defs: Mapping[str, Any]) -> str | None:
+    name = _ref_name(schema)
+    target = defs.get(name, {}) if name else schema
+    props = list(target.get("properties", {}))
+    if target.get("type") == "object" and target.get("additionalProperties") is False and len(props) == 1:
+        return props[0]
+    return None
+
+
+def _discriminate(node: dict[str, Any], defs: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    anyOf of one-key objects with distinct keys (the `Query` containers) ->
+    `oneOf`: exactly one member can match, so the LLM picks by key.
+    """
+    members = node.get("anyOf")
+    if not members or len(members) < 2:
+        return node
+    keys = [_single_key(m, defs) for m in members]
+    if None in keys or len(set(keys)) != len(keys):
+        return node
+    node["oneOf"] = node.pop("anyOf")
+    return node
+
+
+def _shorten(text: str, budget: int) -> str:
+    text = text.strip()
+    if len(text) <= budget:
+        return text
+    first = re.split(r"\n\s*\n|(?<=\.)\s", text, maxsplit=1)[0].strip()
+    if len(first) <= budget:
+        return first
+    cut = first[:budget - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+
+def _common_suffix(names: list[str]) -> str | None:
+    words = [_CAMEL_RE.findall(n) for n in names]
+    suffix: list[str] = []
+    while all(len(w) > len(suffix) for w in words):
+        candidate = {w[-len(suffix) - 1] for w in words}
+        if len(candidate) != 1:
+            break
+        suffix.insert(0, candidate.pop())
+    return "".join(suffix) or None
+
+
+def _hoist_name(node: dict[str, Any], defs: Mapping[str, Any]) -> str:
+    members = node.get("oneOf") or node.get("anyOf") or []
+    names = [_ref_name(m) for m in members]
+    base = _common_suffix(names) if names and None not in names else None
+    base = base or "Shared"
+    name, i = base, 2
+    while name in defs:
+        name, i = f"{base}{i}", i + 1
+    return name
+
+
+def _shape(node: dict[str, Any]) -> str:
+    """Identity of a subtree for dedupe: everything but its own description."""
+    return _dumps({k: v for k, v in node.items() if k != "description"})
+
+
+def _dedupe(schema: dict[str, Any], min_chars: int) -> None:
+    """
+    Hoist subtrees repeated at least twice (and big enough to matter) into
+    $defs; each use keeps its own description next to the `$ref`.
+    """
+    defs = schema.setdefault("$defs", {})
+    while True:
+        counts: Counter[str] = Counter()
+        for node in _walk(schema):
+            if node is schema or node is defs or _ref_name(node) is not None:
+                continue
+            text = _shape(node)
+            if len(text) >= min_chars:
+                counts[text] += 1
+        hoisted = {_dumps(d) for d in defs.values()}
+        repeated = [t for t, c in counts.items() if c > 1 and t not in hoisted]
+        if not repeated:
+            return
+        text = max(repeated, key=lambda t: len(t) * counts[t])
+        target = json.loads(text)
+        name = _hoist_name(target, defs)
+        ref = {"$ref": _REF_PREFIX + name}
+
+        def swap(node: dict[str, Any]) -> dict[str, Any]:
+            if _ref_name(node) is None and _shape(node) == text:
+                return {**ref, **({"description": node["description"]} if "description" in node else {})}
+            return node
+
+        for key in [k for k in schema if k != "$defs"]:
+            schema[key] = _map(schema[key], swap)
+        for key in list(defs):
+            defs[key] = {k: _map(v, swap) for k, v in defs[key].items()}
+        defs[name] = target
+
+
+def _refs(node: Any) -> Counter[str]:
+    return Counter(n for n in map(_ref_name, _walk(node)) if n is not None)
+
+
+def _recursive(name: str, defs: Mapping[str, Any]) -> bool:
+    seen, stack = set(), [name]
+    while stack:
+        for ref in _refs(defs.get(stack.pop(), {})):
+            if ref == name:
+                return True
+            if ref not in seen:
+                seen.add(ref)
+                stack.append(ref)
+    return False
+
+
+def _inline(schema: dict[str, Any], max_chars: int) -> None:
+    """Inline non-recursive defs used once (or small enough); drop unused ones."""
+    defs = schema.get("$defs", {})
+    while True:
+        uses = _refs({k: v for k, v in schema.items() if k != "$defs"}) + sum(
+            (_refs(d) for d in defs.values()), Counter()
+        )
+        for name in [n for n in defs if not uses[n]]:
+            del defs[name]
+        pick = next(
+            (n for n in defs
+             if not _recursive(n, defs) and (uses[n] == 1 or len(_dumps(defs[n])) <= max_chars)),
+            None,
+        )
+        if pick is None:
+            break
+        body = defs.pop(pick)
+
+        def expand(node: dict[str, Any]) -> dict[str, Any]:
+            if _ref_name(node) != pick:
+                return node
+            extra = {k: v for k, v in node.items() if k != "$ref"}
+            return {**copy.deepcopy(body), **extra}
+
+        for key in list(schema):
+            if key != "$defs":
+                schema[key] = _map(schema[key], expand)
+        for key in list(defs):
+            defs[key] = {k: _map(v, expand) for k, v in defs[key].items()}
+    if not defs:
+        schema.pop("$defs", None)
+
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+def compact_schema(
+    schema: dict[str, Any],
+    description_budget: int | None = DESCRIPTION_BUDGET,
+    inline_max_chars: int = INLINE_MAX_CHARS,
+    dedupe_min_chars: int = DEDUPE_MIN_CHARS,
+) -> dict[str, Any]:
+    """
+    Smaller, equivalent-for-an-LLM JSON schema for tool registration.
+
+    Passes (the input is not modified):
+      - drop `title`, `default: null` and the `| null` arm of optional fields
+        (None fields are omitted on the wire, so null never needs sending);
+      - anyOf of primitive types -> one `type` list;
+      - anyOf of one-key objects (the `Query` union) -> discriminated `oneOf`;
+      - descriptions over `description_budget` chars -> first sentence, cut
+        at a word boundary (None keeps them verbatim);
+      - repeated subtrees -> one shared `$defs` entry (named after the common
+        suffix of its members, e.g. `Query`); non-recursive defs used once or
+        no bigger than `inline_max_chars` are inlined.
+
+    Usage:
+      params = compact_schema(SearchRequest.model_json_schema(by_alias=True))
+
+    Notes:
+      - Only the advertised schema changes: arguments are still validated by
+        the pydantic models, which stay the source of truth.
+    """
+    out = copy.deepcopy(schema)
+    defs = out.get("$defs", {})
+    out = _map(out, _strip)
+    out = _map(out, _merge_primitives)
+    defs = out.get("$defs", {})
+    out = _map(out, lambda n: _discriminate(n, defs))
+    if description_budget is not None:
+        for node in _walk(out):
+            if isinstance(node.get("description"), str):
+                node["description"] = _shorten(node["description"], description_budget)
+    _dedupe(out, dedupe_min_chars)
+    _inline(out, inline_max_chars)
+    return out
+
+
+def token_cost(schema: Any) -> int:
+    """
+    Approximate prompt tokens for a schema as sent (compact JSON).
+
+    BPE-like count: letter runs cost one token per 6 chars, digit runs one per
+    3, punctuation one each, whitespace runs one. Stable across machines, so
+    usable as a benchmark baseline (relative sizes, not exact billing).
+    """
+    text = schema if isinstance(schema, str) else json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 6)
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+@dataclass(frozen=True, slots=True)
+class ToolCost:
+    tool: str
+    full_bytes: int
+    full_tokens: int
+    compact_bytes: int
+    compact_tokens: int
+
+    @property
+    def saved(self) -> float:
+        return 1 - self.compact_tokens / self.full_tokens if self.full_tokens else 0.0
+
+
+def tool_costs(tools: Mapping[str, dict[str, Any] | type[BaseModel]], **options: Any) -> list[ToolCost]:
+    """
+    Per-tool schema cost before/after compaction, most expensive first.
+
+    Usage:
+      for c in tool_costs({"search_logs": SearchRequest}):
+          print(f"{c.tool}: {c.full_tokens} -> {c.compact_tokens} tokens")
+    """
+    out = []
+    for name, schema in tools.items():
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            schema = schema.model_json_schema(by_alias=True)
+        small = compact_schema(schema, **options)
+        full_text = json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+        small_text = json.dumps(small, separators=(",", ":"), ensure_ascii=False)
+        out.append(ToolCost(
+            name, len(full_text.encode()), token_cost(full_text), len(small_text.encode()), token_cost(small_text),
+        ))
+    return sorted(out, key=lambda c: -c.full_tokens)
+
+
+if __name__ == "__main__":
+    from dsl_models import SearchRequest, SearchRequestWithAggs
+
+    for c in tool_costs({"search_logs": SearchRequest, "search_logs+aggs": SearchRequestWithAggs}):
+        print(f"{c.tool:>18}: {c.full_bytes:6d} B {c.full_tokens:5d} tok -> "
+              f"{c.compact_bytes:6d} B {c.compact_tokens:5d} tok ({c.saved:.0%} saved)")
+    print(json.dumps(compact_schema(SearchRequest.model_json_schema(by_alias=True)), indent=1)[:3000])
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+import dsl_models.aggs
+from dsl_models import SearchRequestWithAggs
+from dsl_models.aggs import _now_ms
+
+
+CLOCK_RESOLUTION_S = 60  # implicit `now` is floored to this, so cached verdicts age with the clock
+
+
+# -----------------------------------------------------------------------------
+# Canonical payload key
+# -----------------------------------------------------------------------------
+
+def payload_key(payload: dict[str, Any] | str | bytes) -> bytes:
+    """
+    Stable digest of a raw `_search` payload.
+
+    Raw JSON text is parsed first so that whitespace/key-order variants of the
+    same query share one cache slot.
+    """
+    if isinstance(payload, (str, bytes, bytearray)):
+        payload = json.loads(payload)
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+# -----------------------------------------------------------------------------
+# Freezing validated trees (cached models are shared between callers)
+# -----------------------------------------------------------------------------
+
+_FROZEN_CLASSES: dict[type[BaseModel], type[BaseModel]] = {}
+_FROZEN_LOCK = threading.Lock()
+
+
+def _frozen_class(cls: type[BaseModel]) -> type[BaseModel]:
+    frozen = _FROZEN_CLASSES.get(cls)
+    if frozen is not None:
+        return frozen
+    if cls.model_config.get("frozen"):
+        return cls
+    with _FROZEN_LOCK:
+        frozen = _FROZEN_CLASSES.get(cls)
+        if frozen is None:
+            frozen = type(
+                cls.__name__,
+                (cls,),
+                {
+                    "__module__": cls.__module__,
+                    "__qualname__": cls.__qualname__,
+                    "model_config": ConfigDict(**cls.model_config, frozen=True),
+                },
+            )
+            _FROZEN_CLASSES[cls] = frozen
+            _FROZEN_CLASSES[frozen] = frozen
+    return frozen
+
+
+def _readonly(*_: Any, **__: Any) -> Any:
+    raise TypeError("cached search models are read-only; re-validate model_dump() to edit")
+
+
+class FrozenList(list):
+    """`list` that rejects mutation; copies and pickles come back as plain lists."""
+    __slots__ = ()
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+
+    def __reduce_ex__(self, protocol: Any) -> tuple:
+        return list, (list(self),)
+
+    def __copy__(self) -> list:
+        return list(self)
+
+
+class FrozenDict(dict):
+    """`dict` that rejects mutation; copies and pickles come back as plain dicts."""
+    __slots__ = ()
+    pop = popitem = clear = update = setdefault = _readonly
+    __setitem__ = __delitem__ = __ior__ = _readonly
+
+    def __reduce_ex__(self, protocol: Any) -> tuple:
+        return dict, (dict(self),)
+
+    def __copy__(self) -> dict:
+        return dict(self)
+
+
+def _freeze_value(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        fields = value.__dict__
+        for name, item in fields.items():
+            fields[name] = _freeze_value(item)
+        object.__setattr__(value, "__class__", _frozen_class(type(value)))
+        return value
+    if isinstance(value, list):
+        return FrozenList(map(_freeze_value, value))
+    if isinstance(value, tuple):
+        return tuple(map(_freeze_value, value))
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze_value(v)) for k, v in value.items())
+    return value
+
+
+def freeze(obj: Any) -> Any:
+    """
+    Make a validated tree read-only: models reject attribute assignment and
+    nested lists/dicts (`terms` values, `match` options, ...) reject mutation.
+
+    Models are re-classed in place to a frozen subclass and containers are
+    swapped for `FrozenList`/`FrozenDict`, so `isinstance` checks and
+    `model_dump(...)` output are unchanged.
+    """
+    return _freeze_value(obj)
+
+
+# -----------------------------------------------------------------------------
+# LRU validation cache
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    result: BaseModel | ValidationError
+    warnings: tuple[warnings.WarningMessage, ...]
+
+
+_CAPTURE_LOCK = threading.Lock()  # warnings.catch_warnings swaps process-wide state
+
+
+def _validation_context(context: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    `context` with the inputs validation would otherwise read implicitly:
+    the module's bucket policy and `now` (floored to CLOCK_RESOLUTION_S).
+    """
+    out = {"bucket_policy": dsl_models.aggs.BUCKET_BUDGET_POLICY, **(context or {})}
+    if out.get("now") is None:
+        now_s = _now_ms() // 1000
+        out["now"] = datetime.fromtimestamp(now_s - now_s % CLOCK_RESOLUTION_S, timezone.utc)
+    return out
+
+
+class ValidationCache:
+    """
+    Memoizing front end for `model.model_validate`.
+
+    Usage:
+      cache = ValidationCache(SearchRequestWithAggs, maxsize=2048)
+      req = cache.validate({"query": {"match_all": {}}, "size": 10})
+      req = cache.validate(body, context={"bucket_budget": 10_000})
+      cache.stats().hit_rate
+
+    Notes:
+      - Keys are digests of the canonical JSON payload (see `payload_key`)
+        and of the validation context, which always carries the bucket
+        policy and `now`: without one in `context`, `now` is the current
+        time floored to CLOCK_RESOLUTION_S, so a verdict that depends on the
+        clock is re-checked once that step passes.
+      - Returned models are shared and frozen, nested lists/dicts included;
+        re-validate `model.model_dump()` if you need to edit one.
+      - A `ValidationError` is cached too and re-raised on later hits.
+      - Warnings raised while validating (e.g. BucketBudgetWarning) are
+        stored with the entry and re-emitted on every hit.
+      - Safe for concurrent use; misses capture their warnings one at a
+        time, hits run outside every lock but the LRU's.
+    """
+
+    def __init__(
+        self,
+        model: type[BaseModel] = SearchRequestWithAggs,
+        maxsize: int = 1024,
+        cache_errors: bool = True,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be > 0")
+        self.model = model
+        self.maxsize = maxsize
+        self.cache_errors = cache_errors
+        self._entries: OrderedDict[bytes, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def validate(self, payload: dict[str, Any] | str | bytes, context: dict[str, Any] | None = None) -> BaseModel:
+        if isinstance(payload, (str, bytes, bytearray)):
+            payload = json.loads(payload)
+        context = _validation_context(context)
+        key = payload_key(payload) + payload_key(context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+        if entry is None:
+            entry = self._validate_uncached(payload, context)
+            if self.cache_errors or not isinstance(entry.result, ValidationError):
+                entry = self._store(key, entry)
+        for w in entry.warnings:
+            warnings.warn(w.message, w.category, stacklevel=2)
+        if isinstance(entry.result, ValidationError):
+            raise entry.result.with_traceback(None)
+        return entry.result
+
+    def _validate_uncached(self, payload: dict[str, Any], context: dict[str, Any]) -> _Entry:
+        with _CAPTURE_LOCK, warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            try:
+                result: BaseModel | ValidationError = freeze(self.model.model_validate(payload, context=context))
+            except ValidationError as exc:
+                result = exc
+        return _Entry(result, tuple(caught))
+
+    def _store(self, key: bytes, entry: _Entry) -> _Entry:
+        with self._lock:
+            # Another thread may have validated the same payload meanwhile; keep the first.
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache for the `_search` body model.
+search_request_cache = ValidationCache(SearchRequestWithAggs, maxsize=4096)
+
+
+def validate_search_request(
+    payload: dict[str, Any] | str | bytes,
+    context: dict[str, Any] | None = None,
+) -> SearchRequestWithAggs:
+    """Cached `SearchRequestWithAggs.model_validate` (see `ValidationCache`)."""
+    return search_request_cache.validate(payload, context)  # type: ignore[return-value]
+
+
+if __name__ == "__main__":
+    body = {"query": {"match": {"message": "timeout"}}, "size": 10}
+    for _ in range(100):
+        validate_search_request(body)
+    validate_search_request(json.dumps(body, indent=2))
+    print(search_request_cache.stats())